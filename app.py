@@ -1,34 +1,53 @@
-import email
-from num2words import num2words
-from enum import unique
-from fileinput import filename
-from http import client
-from os import replace
 import re
-import site
-from sqlite3.dbapi2 import Timestamp
-from flask import Flask, render_template, request, redirect, url_for, abort, Response, flash, send_file, current_app
+from flask import Flask, Blueprint, render_template, request, redirect, url_for, abort, Response, flash, send_file, current_app, g
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolEsgotado
+from sqlalchemy.pool import QueuePool, NullPool
 from flask_bcrypt import Bcrypt
-from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
+from flask_login import LoginManager, UserMixin, current_user
 from flask_migrate import Migrate
-from datetime import datetime
+from datetime import datetime, timedelta
 import click
-import markdown2
 from functools import wraps
-from io import BytesIO
-from xhtml2pdf import pisa
+from io import BytesIO, StringIO, RawIOBase
+import csv
+import unicodedata
+import time
+from types import SimpleNamespace
+from collections import deque
+import zipfile
+import shutil
+import mimetypes
+import gzip
+import posixpath
+import json
+import signal
+import threading
+import uuid
+import hashlib
+import importlib
+import base64
+import binascii
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FuturesTimeout, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from xml.sax.saxutils import escape as escapar_xml
+from PIL import Image, ImageOps
 import os
+import logging
 from datetime import datetime
 from werkzeug.utils import secure_filename
+from werkzeug.datastructures import FileStorage
+from werkzeug.middleware.proxy_fix import ProxyFix
 from datetime import date
-from htmldocx import HtmlToDocx
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, TextAreaField, IntegerField, SubmitField, FieldList, Form, FormField, DateField, BooleanField, SelectField
 from wtforms.validators import DataRequired, Email, Optional
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, contains_eager
 
 
 #função Fábrica de Decoradores de login
@@ -50,29 +69,407 @@ def role_required(role):
         return decorated_function
     return decorator
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = '0625fa577ac24b41fd655e4935191fb6'
+# Pastas do projeto: o app é montado em create_app() (no fim deste arquivo),
+# mas caches, filas e armazenamento são criados no import e precisam delas.
+PASTA_APP = os.path.dirname(os.path.abspath(__file__))
+PASTA_INSTANCIA = os.path.join(PASTA_APP, 'instance')
+PASTA_ESTATICOS = os.path.join(PASTA_APP, 'static')
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.environ.get('DATABASE_URL')
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL or 'sqlite:///site.db'
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
-bcrypt = Bcrypt(app)
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'
+# Atrás do nginx/Heroku, quantos proxies acrescentam X-Forwarded-For: sem isso
+# request.remote_addr é sempre o do proxy (ex.: limite de login por IP)
+PROXIES_CONFIAVEIS = int(os.environ.get('PROXIES_CONFIAVEIS', 0))
+BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+
+db = SQLAlchemy()
+migrate = Migrate()
+bcrypt = Bcrypt()
+login_manager = LoginManager()
+login_manager.login_view = 'autenticacao.login'
+
+# Comandos do "flask ..." (create-user, compilar-estaticos...), registrados sem grupo
+comandos = Blueprint('comandos', __name__, cli_group=None)
+
+#Conexões com o banco
+# O Postgres (ou um firewall/NAT no caminho) derruba conexões ociosas, e sem
+# cuidado a primeira requisição depois de um tempo parado pega do pool uma
+# conexão morta e falha. Com DB_POOL_PRE_PING=1 cada conexão é testada ao sair
+# do pool (um "SELECT 1"; se caiu, abre outra), e DB_POOL_RECYCLE fecha as que
+# estão abertas há mais de N segundos (use um valor menor que o timeout de
+# ociosidade do servidor). O pool é por processo: DB_POOL_SIZE +
+# DB_MAX_OVERFLOW deve cobrir as GUNICORN_THREADS de cada worker.
+#
+# Com PgBouncer em modo transaction (DB_PGBOUNCER=1): o statement_timeout vai
+# por SET LOCAL em cada transação (o PgBouncer recusa o parâmetro "options" na
+# conexão e um SET comum vazaria para outros clientes) e os prepared
+# statements do driver ficam desligados (DB_PREPARED_STATEMENTS; o psycopg2
+# não usa prepared statements no servidor, o psycopg 3 sim). DB_POOL_SIZE=0
+# troca o pool por conexões avulsas, deixando o pooling só para o PgBouncer.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))  # segundos esperando uma conexão livre
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # -1 = nunca
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') != '0'
+DB_POOL_LIFO = os.environ.get('DB_POOL_LIFO', '1') != '0'  # reusa as mais recentes; as sobrando envelhecem e saem
+DB_POOL_ESPERA_ALERTA_MS = int(os.environ.get('DB_POOL_ESPERA_ALERTA_MS', 500))
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 0))  # 0 = sem limite
+DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', 10))
+DB_APPLICATION_NAME = os.environ.get('DB_APPLICATION_NAME', 'oficina')
+DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', '0') == '1'
+DB_PREPARED_STATEMENTS = os.environ.get('DB_PREPARED_STATEMENTS', '0' if DB_PGBOUNCER else '1') != '0'
+
+
+class MetricasPool:
+    """Contadores do pool de conexões deste processo (cada worker do gunicorn tem os seus)."""
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.checkouts = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.esperas_lentas = 0
+        self.esgotados = 0
+        self.conexoes_abertas = 0
+        self.invalidadas = 0
+
+    def registrar_espera(self, segundos, esgotou=False):
+        with self._trava:
+            if esgotou:
+                self.esgotados += 1
+            else:
+                self.checkouts += 1
+            self.espera_total += segundos
+            self.espera_maxima = max(self.espera_maxima, segundos)
+            if segundos * 1000 >= DB_POOL_ESPERA_ALERTA_MS:
+                self.esperas_lentas += 1
+
+    def contar(self, campo):
+        with self._trava:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def resumo(self, pool):
+        with self._trava:
+            resumo = {
+                'checkouts': self.checkouts,
+                'espera_media_ms': round(self.espera_total / self.checkouts * 1000, 2) if self.checkouts else None,
+                'espera_maxima_ms': round(self.espera_maxima * 1000, 2),
+                'esperas_lentas': self.esperas_lentas,
+                'esgotados': self.esgotados,
+                'conexoes_abertas': self.conexoes_abertas,
+                'invalidadas': self.invalidadas,
+            }
+        if isinstance(pool, QueuePool):
+            resumo.update(tamanho=pool.size(), em_uso=pool.checkedout(), livres=pool.checkedin(),
+                          overflow=max(pool.overflow(), 0))
+        return resumo
+
 
-UPLOAD_FOLDER = os.path.join(app.root_path, 'static', 'uploads')
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+class PoolMedido:
+    """
+    Mede quanto cada pedido de conexão esperou pelo pool (inclui abrir uma
+    conexão nova quando falta) e quantos estouraram o DB_POOL_TIMEOUT.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metricas = MetricasPool()
+
+    def recreate(self):
+        # engine.dispose() (post_fork do gunicorn.conf.py) troca o pool; as métricas continuam
+        novo = super().recreate()
+        novo.metricas = self.metricas
+        return novo
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except PoolEsgotado:
+            self.metricas.registrar_espera(time.perf_counter() - inicio, esgotou=True)
+            logger.warning("Nenhuma conexão livre no pool do banco em %ss: %s", DB_POOL_TIMEOUT, self.status())
+            raise
+        espera = time.perf_counter() - inicio
+        self.metricas.registrar_espera(espera)
+        if espera * 1000 >= DB_POOL_ESPERA_ALERTA_MS:
+            logger.warning("Esperou %.0f ms por uma conexão do banco: %s", espera * 1000, self.status())
+        return conexao
+
+
+class QueuePoolMedido(PoolMedido, QueuePool):
+    pass
+
+
+class NullPoolMedido(PoolMedido, NullPool):
+    pass
+
+
+def opcoes_engine(url):
+    """SQLALCHEMY_ENGINE_OPTIONS a partir das variáveis DB_*."""
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}  # banco em memória: o Flask-SQLAlchemy usa uma conexão só (StaticPool)
+    opcoes = {'pool_pre_ping': DB_POOL_PRE_PING, 'pool_recycle': DB_POOL_RECYCLE}
+    if DB_POOL_SIZE > 0:
+        opcoes.update(poolclass=QueuePoolMedido, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                      pool_timeout=DB_POOL_TIMEOUT, pool_use_lifo=DB_POOL_LIFO)
+    else:
+        opcoes['poolclass'] = NullPoolMedido
+    if url.get_backend_name() == 'postgresql':
+        argumentos = {'application_name': DB_APPLICATION_NAME, 'connect_timeout': DB_CONNECT_TIMEOUT}
+        if DB_STATEMENT_TIMEOUT_MS and not DB_PGBOUNCER:
+            argumentos['options'] = f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'
+        if not DB_PREPARED_STATEMENTS and url.get_driver_name() == 'psycopg':
+            argumentos['prepare_threshold'] = None
+        opcoes['connect_args'] = argumentos
+    return opcoes
+
+
+def medir_pool(engine):
+    """Liga os contadores de conexões abertas e invalidadas ao pool do engine."""
+    def contar(campo):
+        def ouvinte(*args):
+            metricas = getattr(engine.pool, 'metricas', None)
+            if metricas is not None:
+                metricas.contar(campo)
+        return ouvinte
+    db.event.listen(engine.pool, 'connect', contar('conexoes_abertas'))
+    db.event.listen(engine.pool, 'invalidate', contar('invalidadas'))
+    db.event.listen(engine.pool, 'soft_invalidate', contar('invalidadas'))
+
+
+def estatisticas_pool():
+    """Métricas do pool de cada engine neste processo, para /banco/pool."""
+    estatisticas = {'pid': os.getpid()}
+    for nome, engine in db.engines.items():
+        metricas = getattr(engine.pool, 'metricas', None)
+        if metricas is not None:
+            estatisticas[nome or 'padrao'] = metricas.resumo(engine.pool)
+    return estatisticas
+
+
+if DB_PGBOUNCER and DB_STATEMENT_TIMEOUT_MS:
+    @db.event.listens_for(db.session, "after_begin")
+    def limitar_tempo_da_transacao(session, transaction, connection):
+        if connection.dialect.name == 'postgresql':
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {DB_STATEMENT_TIMEOUT_MS}")
+
+UPLOAD_FOLDER = os.path.join(PASTA_ESTATICOS, 'uploads')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+#Armazenamento dos arquivos enviados (fotos e logomarca)
+# Toda leitura/gravação de upload passa por `armazenamento`, escolhido pela
+# variável ARMAZENAMENTO: 'local' (pasta ARMAZENAMENTO_PASTA, por padrão
+# static/uploads) ou 's3' (qualquer serviço compatível: AWS, MinIO, R2...).
+# Os nomes são imutáveis: um arquivo novo sempre ganha um nome novo, então as
+# cópias locais do S3 (usadas pelo Pillow e pelo xhtml2pdf) não envelhecem. A
+# única regravação é a do original pela fila de fotos, antes de Foto.pronta.
+ARMAZENAMENTO_BLOCO = 1024 * 1024
+
+
+class ArmazenamentoLocal:
+    """
+    Arquivos numa pasta do disco. Para servir, usa send_file (em blocos) ou
+    delega ao servidor web com ARMAZENAMENTO_OFFLOAD=x-sendfile (Apache,
+    lighttpd) ou x-accel-redirect (nginx, com um location interno apontando
+    para a pasta em ARMAZENAMENTO_ACCEL_PREFIXO).
+    """
+    def __init__(self, pasta, offload='', prefixo_accel='/_uploads/'):
+        self.pasta = pasta
+        self.offload = offload
+        self.prefixo_accel = prefixo_accel
+
+    def caminho_local(self, nome):
+        return os.path.join(self.pasta, nome)
+
+    def salvar(self, nome, origem):
+        """Grava o conteúdo do arquivo `origem` (lido em blocos) em `nome`."""
+        destino = self.caminho_local(nome)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporario = f"{destino}.{os.getpid()}.tmp"
+        with open(temporario, 'wb') as arquivo:
+            shutil.copyfileobj(origem, arquivo, ARMAZENAMENTO_BLOCO)
+        os.replace(temporario, destino)
+
+    def abrir(self, nome):
+        return open(self.caminho_local(nome), 'rb')
+
+    def existe(self, nome):
+        return os.path.exists(self.caminho_local(nome))
+
+    def remover(self, nome):
+        try:
+            os.remove(self.caminho_local(nome))
+        except FileNotFoundError:
+            pass
+
+    def resposta(self, nome, max_age=0):
+        caminho = self.caminho_local(nome)
+        if not os.path.exists(caminho):
+            abort(404)
+        if self.offload == 'x-accel-redirect':
+            resposta = Response(mimetype=mimetypes.guess_type(nome)[0] or 'application/octet-stream')
+            resposta.headers['X-Accel-Redirect'] = self.prefixo_accel + nome
+            resposta.cache_control.max_age = max_age
+            return resposta
+        # Com ARMAZENAMENTO_OFFLOAD=x-sendfile o Flask troca o corpo pelo cabeçalho X-Sendfile
+        return send_file(caminho, max_age=max_age, conditional=True)
+
+
+class ArmazenamentoS3:
+    """
+    Bucket S3 (ou compatível, via S3_ENDPOINT_URL). Uploads vão em partes
+    (upload_fileobj) e downloads são servidos por URL assinada ou repassados
+    em blocos. Bibliotecas que precisam de arquivo em disco usam
+    caminho_local(), que baixa uma cópia de cada versão (ETag) para `pasta_cache`.
+    """
+    def __init__(self, bucket, prefixo, pasta_cache, url_assinada=True, validade_url=3600, **opcoes_cliente):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise RuntimeError("ARMAZENAMENTO=s3 precisa do pacote boto3 (pip install boto3).")
+        self.cliente = boto3.client('s3', **opcoes_cliente)
+        # Upload em partes de 8 MB com no máximo duas em memória: o consumo não cresce com o arquivo
+        self.transferencia = TransferConfig(multipart_chunksize=8 * ARMAZENAMENTO_BLOCO, max_concurrency=2)
+        self.transferencia.max_in_memory_upload_chunks = 2
+        self.ClientError = ClientError
+        self.bucket = bucket
+        self.prefixo = prefixo
+        self.pasta_cache = pasta_cache
+        self.url_assinada = url_assinada
+        self.validade_url = validade_url
+
+    def chave(self, nome):
+        return self.prefixo + nome
+
+    def versoes_locais(self, nome):
+        return os.path.join(self.pasta_cache, nome + '.versoes')
+
+    def caminho_local(self, nome):
+        # A cópia leva a ETag do objeto no nome: se outro host ou worker
+        # sobrescrever a chave, a ETag muda e a versão nova é baixada
+        while True:
+            try:
+                etag = self.cliente.head_object(Bucket=self.bucket, Key=self.chave(nome))['ETag']
+            except self.ClientError:
+                raise FileNotFoundError(nome)
+            caminho = os.path.join(self.versoes_locais(nome), etag.strip('"') + os.path.splitext(nome)[1])
+            if os.path.exists(caminho):
+                return caminho
+            try:
+                objeto = self.cliente.get_object(Bucket=self.bucket, Key=self.chave(nome), IfMatch=etag)
+            except self.ClientError as e:
+                if e.response['ResponseMetadata'].get('HTTPStatusCode') == 412:
+                    continue  # sobrescrito entre o HEAD e o download: consulta a ETag de novo
+                raise FileNotFoundError(nome)
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporario, 'wb') as arquivo:
+                shutil.copyfileobj(objeto['Body'], arquivo, ARMAZENAMENTO_BLOCO)
+            os.replace(temporario, caminho)
+            return caminho
+
+    def salvar(self, nome, origem):
+        tipo = mimetypes.guess_type(nome)[0] or 'application/octet-stream'
+        self.cliente.upload_fileobj(origem, self.bucket, self.chave(nome), ExtraArgs={'ContentType': tipo},
+                                    Config=self.transferencia)
+        # as cópias locais são de versões anteriores (nos outros hosts a ETag nova as ignora)
+        shutil.rmtree(self.versoes_locais(nome), ignore_errors=True)
+
+    def abrir(self, nome):
+        try:
+            return self.cliente.get_object(Bucket=self.bucket, Key=self.chave(nome))['Body']
+        except self.ClientError:
+            raise FileNotFoundError(nome)
+
+    def existe(self, nome):
+        try:
+            self.cliente.head_object(Bucket=self.bucket, Key=self.chave(nome))
+        except self.ClientError:
+            return False
+        return True
+
+    def remover(self, nome):
+        self.cliente.delete_object(Bucket=self.bucket, Key=self.chave(nome))
+        shutil.rmtree(self.versoes_locais(nome), ignore_errors=True)
+
+    def resposta(self, nome, max_age=0):
+        if self.url_assinada:
+            url = self.cliente.generate_presigned_url('get_object', ExpiresIn=self.validade_url, Params={
+                'Bucket': self.bucket,
+                'Key': self.chave(nome),
+                'ResponseCacheControl': f'private, max-age={max_age}',
+            })
+            # o redirecionamento expira junto com a assinatura
+            resposta = redirect(url)
+            resposta.cache_control.max_age = min(max_age, self.validade_url // 2)
+            return resposta
+        condicoes = {}
+        if request.if_none_match:
+            condicoes['IfNoneMatch'] = request.headers['If-None-Match']
+        try:
+            objeto = self.cliente.get_object(Bucket=self.bucket, Key=self.chave(nome), **condicoes)
+        except self.ClientError as e:
+            if e.response['ResponseMetadata'].get('HTTPStatusCode') != 304:
+                abort(404)
+            # O navegador já tem esta versão: nada a repassar
+            resposta = Response(status=304)
+            resposta.headers['ETag'] = request.headers['If-None-Match']
+            resposta.cache_control.max_age = max_age
+            return resposta
+        resposta = Response(
+            objeto['Body'].iter_chunks(ARMAZENAMENTO_BLOCO),
+            mimetype=objeto.get('ContentType') or mimetypes.guess_type(nome)[0],
+            direct_passthrough=True
+        )
+        resposta.content_length = objeto['ContentLength']
+        resposta.set_etag(objeto['ETag'].strip('"'))
+        resposta.cache_control.max_age = max_age
+        return resposta
+
+
+def criar_armazenamento():
+    tipo = os.environ.get('ARMAZENAMENTO', 'local')
+    if tipo == 's3':
+        opcoes = {
+            'endpoint_url': os.environ.get('S3_ENDPOINT_URL') or None,
+            'region_name': os.environ.get('S3_REGIAO') or None,
+        }
+        return ArmazenamentoS3(
+            os.environ['S3_BUCKET'],
+            os.environ.get('S3_PREFIXO', 'uploads/'),
+            os.environ.get('ARMAZENAMENTO_CACHE') or os.path.join(PASTA_INSTANCIA, 'armazenamento'),
+            url_assinada=os.environ.get('S3_URL_ASSINADA', '1') != '0',
+            validade_url=int(os.environ.get('S3_URL_VALIDADE', 3600)),
+            **opcoes
+        )
+    offload = os.environ.get('ARMAZENAMENTO_OFFLOAD', '')
+    return ArmazenamentoLocal(
+        os.environ.get('ARMAZENAMENTO_PASTA') or UPLOAD_FOLDER,
+        offload=offload,
+        prefixo_accel=os.environ.get('ARMAZENAMENTO_ACCEL_PREFIXO', '/_uploads/')
+    )
+
+armazenamento = criar_armazenamento()
+
+
+def arquivo_local(nome):
+    """Caminho em disco de um arquivo enviado, para os templates de PDF (xhtml2pdf)."""
+    try:
+        return armazenamento.caminho_local(nome)
+    except FileNotFoundError:
+        return ''
+
+
 #Criação comando pra criar usuario master
-@app.cli.command("create-user")  # Define o nome do comando no terminal
+@comandos.cli.command("create-user")  # Define o nome do comando no terminal
 @click.argument("username")      # Define o primeiro argumento que o comando espera
 @click.argument("password")      # Define o segundo argumento
 def create_user(username, password):
@@ -81,7 +478,7 @@ def create_user(username, password):
         print("Erro: Usuário já existe!")
         return
     else:
-        password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        password_hash = gerar_hash_senha(password)
         novo_usuario = Usuario(username = username, password_hash = password_hash)
         db.session.add(novo_usuario)
         db.session.commit()
@@ -89,7 +486,7 @@ def create_user(username, password):
 
 
 #Criação comando pra deletar usuario master
-@app.cli.command("delete-user")  # Define o nome do comando no terminal
+@comandos.cli.command("delete-user")  # Define o nome do comando no terminal
 @click.argument("username")      # Define o primeiro argumento que o comando espera
 def delete_user(username):
     usuario_a_deletar = Usuario.query.filter_by(username=username).first()
@@ -101,27 +498,329 @@ def delete_user(username):
         print(f"Usuario {username} não encontrado!")
 
 
-@app.route('/sw.js')
-def service_worker():
-    resposta = current_app.send_static_file('js/sw.js')
-    resposta.mimetype = 'application/javascript'
-    return resposta
+#Arquivos estáticos
+# CSS/JS/imagens de static/ ganham na URL um trecho do hash do conteúdo
+# (js/catalogo.js -> js/catalogo.1a2b3c4d5e6f.js, feito em url_for('static')),
+# então navegador e CDN podem guardar por um ano sem risco de versão velha.
+# "flask compilar-estaticos" (no build.sh) grava em ESTATICOS_PASTA as cópias
+# com hash e versões .gz/.br já comprimidas; sem ele os hashes são calculados
+# na hora e os arquivos saem sem compressão. A entrega é do send_file: no
+# gunicorn o arquivo vai por sendfile() (wsgi.file_wrapper) sem ser copiado
+# pelo Python, e com ESTATICOS_OFFLOAD=x-accel-redirect ou x-sendfile quem
+# envia os arquivos compilados é o nginx/Apache.
+ESTATICOS_PASTA = os.environ.get('ESTATICOS_PASTA') or os.path.join(PASTA_INSTANCIA, 'estaticos')
+ESTATICOS_MAX_AGE = int(os.environ.get('ESTATICOS_MAX_AGE', 365 * 24 * 3600))
+ESTATICOS_SEM_HASH_MAX_AGE = int(os.environ.get('ESTATICOS_SEM_HASH_MAX_AGE', 3600))
+ESTATICOS_OFFLOAD = os.environ.get('ESTATICOS_OFFLOAD', '')
+ESTATICOS_ACCEL_PREFIXO = os.environ.get('ESTATICOS_ACCEL_PREFIXO', '/_static/')
+
+PADRAO_URL_CSS = re.compile(r'''url\(\s*["']?(?!data:|[a-z]+://|/|#)([^"')?#]+)([^"')]*)["']?\s*\)''')
+EXTENSOES_COMPRIMIVEIS = {'.css', '.js', '.json', '.svg', '.html', '.txt', '.map', '.webmanifest'}
+# Subpastas de static/ que não são servidas direto (uploads passam por /fotos, com login)
+PASTAS_ESTATICAS_PRIVADAS = ('uploads',)
+
+
+def compressores_estaticos():
+    compressores = {'.gz': lambda dados: gzip.compress(dados, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        pass  # sem o pacote brotli, só gzip
+    else:
+        compressores['.br'] = lambda dados: brotli.compress(dados, quality=11)
+    return compressores
+
+
+class ArquivosEstaticos:
+    """
+    Manifesto nome original -> nome com hash. Vem de `destino`/manifesto.json
+    quando os estáticos foram compilados; senão cada arquivo é lido e tem o
+    hash calculado na primeira vez (e de novo se mudar no disco).
+    """
+    CODIFICACOES = (('.br', 'br'), ('.gz', 'gzip'))
+
+    def __init__(self, origem, destino):
+        self.origem = origem
+        self.destino = os.path.abspath(destino)
+        self.compilado = None
+        self._originais = {}
+        self._em_tempo_real = {}
+        self._trava = threading.Lock()
+
+    @staticmethod
+    def nome_com_hash(nome, conteudo):
+        raiz, extensao = os.path.splitext(nome)
+        return f"{raiz}.{hashlib.sha256(conteudo).hexdigest()[:12]}{extensao}"
+
+    @staticmethod
+    def privado(nome):
+        return nome.split('/', 1)[0] in PASTAS_ESTATICAS_PRIVADAS
+
+    def listar(self):
+        for pasta, subpastas, arquivos in os.walk(self.origem):
+            relativa = os.path.relpath(pasta, self.origem)
+            if relativa == '.':
+                subpastas[:] = [sub for sub in subpastas if not self.privado(sub)]
+            for arquivo in arquivos:
+                yield os.path.normpath(os.path.join(relativa, arquivo)).replace(os.sep, '/')
+
+    def _carregar(self):
+        if self.compilado is None:
+            with self._trava:
+                if self.compilado is None:
+                    try:
+                        with open(os.path.join(self.destino, 'manifesto.json'), encoding='utf-8') as arquivo:
+                            compilado = json.load(arquivo)
+                    except (FileNotFoundError, ValueError):
+                        compilado = {}
+                    self._originais.update((com_hash, nome) for nome, com_hash in compilado.items())
+                    self.compilado = compilado
+
+    def foi_compilado(self):
+        self._carregar()
+        return bool(self.compilado)
+
+    def _hash_em_tempo_real(self, nome):
+        caminho = os.path.join(self.origem, nome)
+        try:
+            info = os.stat(caminho)
+        except OSError:
+            return None
+        versao = (info.st_mtime_ns, info.st_size)
+        anterior = self._em_tempo_real.get(nome)
+        if anterior and anterior[0] == versao:
+            return anterior[1]
+        with open(caminho, 'rb') as arquivo:
+            com_hash = self.nome_com_hash(nome, arquivo.read())
+        self._em_tempo_real[nome] = (versao, com_hash)
+        self._originais[com_hash] = nome
+        return com_hash
+
+    def nome_publico(self, nome):
+        """Nome com hash para montar a URL (o próprio nome se o arquivo não existe)."""
+        self._carregar()
+        if self.privado(nome):
+            return nome
+        return self.compilado.get(nome) or self._hash_em_tempo_real(nome) or nome
+
+    def resolver(self, nome):
+        """
+        Caminho em disco para o nome pedido na URL e se ele pode ser guardado
+        como imutável, ou (None, False) se não existe.
+        """
+        self._carregar()
+        if self.privado(nome):
+            return None, False
+        original = self._originais.get(nome)
+        if original is not None:
+            if self.compilado.get(original) == nome:
+                return os.path.join(self.destino, nome), True
+            if self._hash_em_tempo_real(original) == nome:
+                return os.path.join(self.origem, original), True
+            # Hash antigo (arquivo mudou sem compilar): entrega o atual, sem prender no cache
+            return os.path.join(self.origem, original), False
+        caminho = os.path.join(self.origem, nome)
+        return (caminho, False) if os.path.isfile(caminho) else (None, False)
+
+    def _reescrever_css(self, nome, conteudo, manifesto):
+        # url(fonts/x.woff2) -> url(fonts/x.<hash>.woff2), para as fontes também serem imutáveis
+        pasta = posixpath.dirname(nome)
+
+        def trocar(encontrado):
+            alvo = posixpath.normpath(posixpath.join(pasta, encontrado.group(1)))
+            if alvo not in manifesto:
+                return encontrado.group(0)
+            return f'url("{posixpath.relpath(manifesto[alvo], pasta or ".")}{encontrado.group(2)}")'
+        return PADRAO_URL_CSS.sub(trocar, conteudo.decode('utf-8')).encode('utf-8')
+
+    def gravar(self, nome, conteudo, compressores, economia=None):
+        """Grava `nome` em `destino` e, se for texto, as versões comprimidas que valem a pena."""
+        destino = os.path.join(self.destino, nome)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        gravar_atomico(destino, conteudo)
+        if os.path.splitext(nome)[1].lower() not in EXTENSOES_COMPRIMIVEIS:
+            return
+        for extensao, comprimir in compressores.items():
+            comprimido = comprimir(conteudo)
+            # Comprimir o que quase não diminui só gasta CPU do navegador
+            if len(comprimido) < len(conteudo) * 0.9:
+                gravar_atomico(destino + extensao, comprimido)
+                if extensao == '.gz' and economia is not None:
+                    economia[0] += len(conteudo)
+                    economia[1] += len(comprimido)
+
+    def compilar(self):
+        """Grava as cópias com hash, as versões comprimidas e o manifesto em `destino`."""
+        compressores = compressores_estaticos()
+        manifesto, economia = {}, [0, 0]
+        # CSS por último: as referências a fontes e imagens já precisam ter hash
+        for nome in sorted(self.listar(), key=lambda nome: nome.endswith('.css')):
+            with open(os.path.join(self.origem, nome), 'rb') as arquivo:
+                conteudo = arquivo.read()
+            if nome.endswith('.css'):
+                conteudo = self._reescrever_css(nome, conteudo, manifesto)
+            manifesto[nome] = self.nome_com_hash(nome, conteudo)
+            self.gravar(manifesto[nome], conteudo, compressores, economia)
+        gravar_atomico(os.path.join(self.destino, 'manifesto.json'),
+                       json.dumps(manifesto, indent=2, sort_keys=True).encode('utf-8'))
+        with self._trava:
+            self.compilado = None
+            self._originais = {}
+        return manifesto, economia, sorted(compressores)
+
+    def resposta(self, caminho, max_age, imutavel=False):
+        """
+        Envia `caminho` usando a versão .br/.gz quando ela existe e o navegador
+        aceita. Arquivos da pasta compilada podem ser entregues pelo servidor web.
+        """
+        mimetype = mimetypes.guess_type(caminho)[0] or 'application/octet-stream'
+        comprimivel = os.path.splitext(caminho)[1].lower() in EXTENSOES_COMPRIMIVEIS
+        codificacao = None
+        if comprimivel:
+            for extensao, nome_codificacao in self.CODIFICACOES:
+                if request.accept_encodings[nome_codificacao] and os.path.exists(caminho + extensao):
+                    caminho, codificacao = caminho + extensao, nome_codificacao
+                    break
+
+        compilado = os.path.commonpath([caminho, self.destino]) == self.destino
+        if compilado and ESTATICOS_OFFLOAD in ('x-accel-redirect', 'x-sendfile'):
+            resposta = Response(mimetype=mimetype)
+            if ESTATICOS_OFFLOAD == 'x-accel-redirect':
+                relativo = os.path.relpath(caminho, self.destino).replace(os.sep, '/')
+                resposta.headers['X-Accel-Redirect'] = ESTATICOS_ACCEL_PREFIXO + relativo
+            else:
+                resposta.headers['X-Sendfile'] = caminho
+        else:
+            resposta = send_file(caminho, mimetype=mimetype, max_age=max_age, conditional=True)
+        if codificacao:
+            resposta.headers['Content-Encoding'] = codificacao
+        if comprimivel:
+            resposta.vary.add('Accept-Encoding')
+        resposta.cache_control.max_age = max_age
+        if max_age:
+            resposta.cache_control.public = True
+        if imutavel:
+            resposta.cache_control.immutable = True
+        return resposta
+
+
+estaticos = ArquivosEstaticos(PASTA_ESTATICOS, ESTATICOS_PASTA)
+
+
+def estatico_com_hash(endpoint, values):
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = estaticos.nome_publico(values['filename'])
+
+
+def servir_estatico(filename):
+    nome = posixpath.normpath(filename)
+    if nome.startswith(('../', '/')) or nome == '..':
+        abort(404)
+    caminho, imutavel = estaticos.resolver(nome)
+    if caminho is None:
+        abort(404)
+    return estaticos.resposta(caminho, ESTATICOS_MAX_AGE if imutavel else ESTATICOS_SEM_HASH_MAX_AGE, imutavel)
+
+
+@comandos.cli.command("compilar-estaticos")
+def compilar_estaticos_comando():
+    """Gera as cópias com hash e as versões comprimidas de static/ e o service worker."""
+    manifesto, (tamanho, comprimido), formatos = estaticos.compilar()
+    with current_app.test_request_context():
+        estaticos.gravar('sw.js', gerar_service_worker().encode('utf-8'), compressores_estaticos())
+    print(f"{len(manifesto)} arquivo(s) e o sw.js em {estaticos.destino} (compressão: {', '.join(formatos)}).")
+    if tamanho:
+        print(f"Texto: {tamanho / 1024:.0f} KB -> {comprimido / 1024:.0f} KB com gzip.")
+
+
+#Dependências web e service worker
+# Bootstrap, Bootstrap Icons e IMask vinham só da CDN. "flask
+# baixar-dependencias-web" (no build.sh) grava cópias em static/vendor/; com
+# elas os templates usam a cópia local (com hash, comprimida e no cache
+# offline) e, sem elas, continuam na CDN. O /sw.js é gerado a partir do
+# manifesto dos estáticos: a versão do cache é o hash do próprio script, então
+# muda a cada release que altera algum arquivo pré-carregado.
+DEPENDENCIAS_WEB = {
+    'bootstrap/bootstrap.min.css': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css',
+    'bootstrap/bootstrap.bundle.min.js': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js',
+    'bootstrap-icons/bootstrap-icons.css': 'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/bootstrap-icons.css',
+    'bootstrap-icons/fonts/bootstrap-icons.woff2': 'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/fonts/bootstrap-icons.woff2',
+    'bootstrap-icons/fonts/bootstrap-icons.woff': 'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/fonts/bootstrap-icons.woff',
+    'imask/imask.js': 'https://unpkg.com/imask',
+}
+
+EXTENSOES_PRECACHE_SW = {'.css', '.js', '.json', '.woff2'}
+PAGINAS_PUBLICAS_SW = ('/', '/contato')  # stale-while-revalidate; o resto é network-first
+SAIDAS_SW = ('/logout', '/logout_cliente')  # apagam as páginas guardadas
+
+
+def dependencia_web(nome):
+    local = 'vendor/' + nome
+    if estaticos.nome_publico(local) != local:
+        return url_for('static', filename=local)
+    return DEPENDENCIAS_WEB[nome]
+
+
+@comandos.cli.command("baixar-dependencias-web")
+def baixar_dependencias_web_comando():
+    """Baixa para static/vendor/ as bibliotecas que os templates buscavam na CDN."""
+    import urllib.request
+    baixados = {}
+    for nome, url in DEPENDENCIAS_WEB.items():
+        try:
+            with urllib.request.urlopen(url, timeout=30) as resposta:
+                baixados[nome] = resposta.read()
+        except OSError as e:
+            # Tudo ou nada: CSS local com fonte faltando seria pior que a CDN
+            print(f"Falha ao baixar {url}: {e}. Os templates continuam usando a CDN.")
+            return
+    for nome, conteudo in baixados.items():
+        destino = os.path.join(PASTA_ESTATICOS, 'vendor', nome)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        gravar_atomico(destino, conteudo)
+    print(f"{len(baixados)} arquivo(s) em static/vendor/.")
+
+
+def gerar_service_worker():
+    precache = sorted(
+        f"/static/{estaticos.nome_publico(nome)}" for nome in estaticos.listar()
+        if os.path.splitext(nome)[1].lower() in EXTENSOES_PRECACHE_SW
+    )
+    precache.append(url_for('principal.offline'))
+    dados = {
+        'precache': precache,
+        'paginas_publicas': PAGINAS_PUBLICAS_SW,
+        'saidas': SAIDAS_SW,
+        'pagina_offline': url_for('principal.offline'),
+    }
+    # A versão cobre o script, a lista de arquivos (com hash) e a página offline
+    versao = hashlib.sha256(
+        (render_template('sw.js', versao='', **dados) + render_template('offline.html')).encode('utf-8')
+    ).hexdigest()[:12]
+    return render_template('sw.js', versao=versao, **dados)
+
+
+def indice_prefixo(nome, coluna):
+    """
+    Índice das colunas que a busca global compara por prefixo (filtro_prefixo).
+    No PostgreSQL usa text_pattern_ops: o LIKE 'x%' só aproveita o índice
+    comum com collation C, e os bancos costumam estar em pt_BR/en_US.
+    """
+    return db.Index(nome, coluna, postgresql_ops={coluna: 'text_pattern_ops'})
 
-@app.route('/offline.html')
-def offline():
-    return render_template('offline.html')
 
 # Tabela "Ponte" (Muitos-para-Muitos)
 cliente_impressora_association = db.Table('cliente_impressora', db.metadata,
     db.Column('cliente_id', db.Integer, db.ForeignKey('cliente.id'), primary_key=True),
-    db.Column('impressora_id', db.Integer, db.ForeignKey('impressora.id'), primary_key=True)
+    db.Column('impressora_id', db.Integer, db.ForeignKey('impressora.id'), primary_key=True),
+    db.Index('ix_cliente_impressora_impressora_id', 'impressora_id')
 )
 #Classes
 class Cliente(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key = True)
     ordens_servico = db.relationship('OrdemServico', back_populates='cliente', cascade="all, delete-orphan")
     orcamento = db.relationship('Orcamento', back_populates='cliente', cascade="all, delete-orphan")
-    nome = db.Column(db.String(100), nullable=False)
+    nome = db.Column(db.String(100), nullable=False, index=True)
     #login usuario
     username_cliente = db.Column(db.String(20), unique=True, nullable=False)
     password_hash = db.Column(db.String(60), nullable=False)
@@ -152,6 +851,12 @@ class Cliente(db.Model, UserMixin):
     )
     senha_plana_temporaria = db.Column(db.String(100), nullable=True) # Para guardar a senha em texto
 
+    __table_args__ = (
+        indice_prefixo('ix_cliente_telefone_celular', 'telefone_celular'),
+        indice_prefixo('ix_cliente_cpf', 'cpf'),
+        indice_prefixo('ix_cliente_cnpj', 'cnpj'),
+    )
+
     def get_id(self):
         return f"cliente-{self.id}"
     
@@ -165,7 +870,7 @@ class Cliente(db.Model, UserMixin):
 class OrdemServico(db.Model):
     id = db.Column(db.Integer, primary_key = True)
     cliente = db.relationship('Cliente', back_populates='ordens_servico')
-    cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), nullable = False)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), nullable = False, index = True)
 
     # --- Campos de Numeração ---
     numero_sequencial = db.Column(db.Integer, nullable = True)
@@ -190,8 +895,8 @@ class OrdemServico(db.Model):
     observacoes_internas = db.Column(db.Text) # <--- NOVO
 
     # --- Campos de Controle ---
-    status = db.Column(db.String(50), nullable = False)
-    data_de_criacao = db.Column(db.DateTime, nullable = False, default = datetime.now)
+    status = db.Column(db.String(50), nullable = False, index = True)
+    data_de_criacao = db.Column(db.DateTime, nullable = False, default = datetime.now, index = True)
     orcamento_id = db.Column(db.Integer, db.ForeignKey('orcamento.id'), nullable=True, unique=True)
     
     # --- Relacionamentos ---
@@ -199,11 +904,17 @@ class OrdemServico(db.Model):
     itens_peca = db.relationship('ItemPeca', backref='ordem_servico', lazy=True, cascade="all, delete-orphan")
     fotos = db.relationship('Foto', backref='ordem_servico', lazy=True, cascade="all, delete-orphan")
 
+    # Total dos itens, mantido pelo banco a cada flush (ver atualizar_totais_dos_itens)
+    valor_total_itens = db.Column(db.Float, nullable = False, default = 0.0, server_default = '0')
+
+    __table_args__ = (
+        db.UniqueConstraint('ano', 'numero_sequencial', name='uq_ordem_servico_ano_numero_sequencial'),
+        indice_prefixo('ix_ordem_servico_numero_de_serie', 'numero_de_serie'),
+    )
+
     @property
     def valor_calculado(self):
-        total_servicos = sum(item.quantidade * item.preco_cobrado for item in self.itens_servico)
-        total_pecas = sum(item.quantidade * item.preco_cobrado for item in self.itens_peca)
-        return total_servicos + total_pecas
+        return self.valor_total_itens or 0.0
     
     @property
     def numero_formatado(self):
@@ -211,7 +922,7 @@ class OrdemServico(db.Model):
 
 class Orcamento(db.Model):
     id = db.Column(db.Integer, primary_key = True)
-    cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), nullable = False)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), nullable = False, index = True)
     cliente = db.relationship('Cliente', back_populates='orcamento')
     numero_orcamento = db.Column(db.Integer, nullable = True)
     ano = db.Column(db.Integer, nullable = True)
@@ -225,13 +936,21 @@ class Orcamento(db.Model):
     #servico_executado = db.Column(db.Text, nullable = False)
     observacoes_cliente = db.Column(db.Text)
     observacoes_internas = db.Column(db.Text)
-    status = db.Column(db.String(50), nullable = False)
+    status = db.Column(db.String(50), nullable = False, index = True)
     tecnico_responsavel = db.Column(db.String(50))
-    data_de_criacao = db.Column(db.Date, nullable = False, default = date.today)
+    data_de_criacao = db.Column(db.Date, nullable = False, default = date.today, index = True)
     itens_servico = db.relationship('ItemOrcamentoServico', backref='orcamento', lazy=True, cascade="all, delete-orphan")
     itens_peca = db.relationship('ItemOrcamentoPeca', backref='orcamento', lazy=True, cascade="all, delete-orphan")
     fotos = db.relationship('Foto', backref='orcamento', lazy=True, cascade="all, delete-orphan")
 
+    # Total dos itens, mantido pelo banco a cada flush (ver atualizar_totais_dos_itens)
+    valor_total_itens = db.Column(db.Float, nullable = False, default = 0.0, server_default = '0')
+
+    __table_args__ = (
+        db.UniqueConstraint('ano', 'numero_orcamento', name='uq_orcamento_ano_numero_orcamento'),
+        indice_prefixo('ix_orcamento_numero_de_serie', 'numero_de_serie'),
+    )
+
     @property
     def numero_formatado(self):
         if self.numero_orcamento and self.ano:
@@ -240,25 +959,23 @@ class Orcamento(db.Model):
     
     @property
     def valor_total(self):
-        total_servicos = sum(item.quantidade * item.preco_cobrado for item in self.itens_servico)
-        total_pecas = sum(item.quantidade * item.preco_cobrado for item in self.itens_peca)
-        return total_servicos + total_pecas
+        return self.valor_total_itens or 0.0
 
 
 class ItemOrcamentoServico(db.Model):
     id = db.Column(db.Integer, primary_key = True)
     quantidade = db.Column(db.Integer, nullable = False)
     preco_cobrado = db.Column(db.Float, nullable = False)
-    orcamento_id = db.Column(db.Integer, db.ForeignKey('orcamento.id'))
-    servico_id = db.Column(db.Integer, db.ForeignKey('servico.id'))
+    orcamento_id = db.Column(db.Integer, db.ForeignKey('orcamento.id'), index = True)
+    servico_id = db.Column(db.Integer, db.ForeignKey('servico.id'), index = True)
     servico = db.relationship('Servico', backref='itens_orcamento_servico')
 
 class ItemOrcamentoPeca(db.Model):
     id = db.Column(db.Integer, primary_key = True)
     quantidade = db.Column(db.Integer, nullable = False)
     preco_cobrado = db.Column(db.Float, nullable = False)
-    orcamento_id = db.Column(db.Integer, db.ForeignKey('orcamento.id'))
-    peca_id = db.Column(db.Integer, db.ForeignKey('peca.id'))
+    orcamento_id = db.Column(db.Integer, db.ForeignKey('orcamento.id'), index = True)
+    peca_id = db.Column(db.Integer, db.ForeignKey('peca.id'), index = True)
     peca = db.relationship('Peca', backref='itens_orcamento_peca')
 
 class Servico(db.Model):
@@ -284,15 +1001,15 @@ class ItemServico(db.Model):
     id = db.Column(db.Integer, primary_key = True)
     quantidade = db.Column(db.Integer, nullable = False)
     preco_cobrado = db.Column(db.Float, nullable = False)
-    ordem_servico_id = db.Column(db.Integer, db.ForeignKey('ordem_servico.id'))
-    servico_id = db.Column(db.Integer, db.ForeignKey('servico.id'))
+    ordem_servico_id = db.Column(db.Integer, db.ForeignKey('ordem_servico.id'), index = True)
+    servico_id = db.Column(db.Integer, db.ForeignKey('servico.id'), index = True)
 
 class ItemPeca(db.Model):
     id = db.Column(db.Integer, primary_key = True)
     quantidade = db.Column(db.Integer, nullable = False)
     preco_cobrado = db.Column(db.Float, nullable = False)
-    ordem_servico_id = db.Column(db.Integer, db.ForeignKey('ordem_servico.id'))
-    peca_id = db.Column(db.Integer, db.ForeignKey('peca.id'))
+    ordem_servico_id = db.Column(db.Integer, db.ForeignKey('ordem_servico.id'), index = True)
+    peca_id = db.Column(db.Integer, db.ForeignKey('peca.id'), index = True)
 
 class Usuario(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key = True)
@@ -305,10 +1022,48 @@ class Usuario(db.Model, UserMixin):
 
 class Foto(db.Model):
     id = db.Column(db.Integer, primary_key = True)
-    nome_arquivo = db.Column(db.String(20))
+    nome_arquivo = db.Column(db.String(255))
     legenda = db.Column(db.String(150))
-    ordem_servico_id = db.Column(db.Integer, db.ForeignKey('ordem_servico.id'), nullable=True) 
-    orcamento_id = db.Column(db.Integer, db.ForeignKey('orcamento.id'), nullable=True) 
+    ordem_servico_id = db.Column(db.Integer, db.ForeignKey('ordem_servico.id'), nullable=True, index=True)
+    orcamento_id = db.Column(db.Integer, db.ForeignKey('orcamento.id'), nullable=True, index=True)
+    # False enquanto o upload espera na fila de processamento (ver FilaFotos)
+    pronta = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
+
+    @property
+    def arquivo_pdf(self):
+        # Versão reduzida usada nos PDFs (ver gerar_variantes_foto), ou o original enquanto
+        # a foto está na fila. Sem consultar o armazenamento: no S3 seria um HEAD por foto
+        if self.pronta:
+            return nome_variante_foto(self.nome_arquivo, 'pdf')
+        return self.nome_arquivo
+
+class ProcessamentoFoto(db.Model):
+    # Fila persistente do worker de fotos: uma linha por upload ainda não tratado
+    id = db.Column(db.Integer, primary_key = True)
+    foto_id = db.Column(db.Integer, db.ForeignKey('foto.id', ondelete='CASCADE'), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='pendente', index=True)  # pendente, processando, erro
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    erro = db.Column(db.Text)
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    iniciado_em = db.Column(db.DateTime)
+
+    foto = db.relationship('Foto', backref=db.backref('processamentos', passive_deletes=True))
+
+class EnvioOffline(db.Model):
+    # Chave de idempotência de cada cadastro feito offline no PWA (ver /offline/sincronizar):
+    # reenviar a mesma chave devolve o documento já criado em vez de criar outro
+    id = db.Column(db.Integer, primary_key = True)
+    chave = db.Column(db.String(64), nullable=False, unique=True)
+    tipo = db.Column(db.String(20), nullable=False)  # 'os' ou 'orcamento'
+    documento_id = db.Column(db.Integer, nullable=False)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'))
+    recebido_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class ContadorDocumento(db.Model):
+    # Último número emitido por tipo de documento ('os', 'orcamento') e ano
+    tipo = db.Column(db.String(20), primary_key = True)
+    ano = db.Column(db.Integer, primary_key = True)
+    ultimo_numero = db.Column(db.Integer, nullable = False, default = 0)
 
 class Curriculo(db.Model):
     id = db.Column(db.Integer, primary_key = True)
@@ -394,12 +1149,12 @@ class ContratoForm(FlaskForm):
 class FormacaoAcademica(db.Model):
     id = db.Column(db.Integer, primary_key = True)
     descricao = db.Column(db.Text)
-    curriculo_id = db.Column(db.Integer, db.ForeignKey("curriculo.id"))
+    curriculo_id = db.Column(db.Integer, db.ForeignKey("curriculo.id"), index = True)
 
 class Curso(db.Model):
     id = db.Column(db.Integer, primary_key = True)
     descricao = db.Column(db.Text)
-    curriculo_id = db.Column(db.Integer, db.ForeignKey("curriculo.id"))
+    curriculo_id = db.Column(db.Integer, db.ForeignKey("curriculo.id"), index = True)
 
 class ExperienciaProfissional(db.Model):
     id = db.Column(db.Integer, primary_key = True)
@@ -409,7 +1164,7 @@ class ExperienciaProfissional(db.Model):
     data_demissao = db.Column(db.Date)
     desabilitar_datas = db.Column(db.Boolean)
     periodo = db.Column(db.Text)
-    curriculo_id = db.Column(db.Integer, db.ForeignKey("curriculo.id"))
+    curriculo_id = db.Column(db.Integer, db.ForeignKey("curriculo.id"), index = True)
 
 class CurriculoPasso1Form(FlaskForm):
     nome = StringField("Nome", validators=[DataRequired("Digite o nome")])
@@ -478,7 +1233,7 @@ class Impressora(db.Model):
 class RecursoImpressora(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     # A Chave Estrangeira que "amarra" este link a uma impressora
-    impressora_id = db.Column(db.Integer, db.ForeignKey('impressora.id'), nullable=False)
+    impressora_id = db.Column(db.Integer, db.ForeignKey('impressora.id'), nullable=False, index=True)
 
     # Campos para descrever o link, como você sugeriu
     tipo = db.Column(db.String(50), nullable=False) # Ex: "Reset", "Driver", "Scanner"
@@ -526,15 +1281,441 @@ class ReciboSimplesForm(FlaskForm):
     data_emissao = DateField("Data", default=date.today)
     submit = SubmitField("Gerar Recibo em PDF")
 
+#Totais armazenados das ordens e orçamentos
+# Cada tipo de item aponta para o "pai" cujo total ele compõe.
+ITENS_COM_TOTAL = {
+    ItemServico: (OrdemServico, 'ordem_servico_id'),
+    ItemPeca: (OrdemServico, 'ordem_servico_id'),
+    ItemOrcamentoServico: (Orcamento, 'orcamento_id'),
+    ItemOrcamentoPeca: (Orcamento, 'orcamento_id'),
+}
+
+def expressao_total_itens(modelo_pai):
+    """
+    Expressão SQL (subconsulta escalar) com a soma de quantidade * preco_cobrado
+    de todos os itens ligados a cada linha de `modelo_pai`.
+    """
+    somas = []
+    for modelo_item, (pai, coluna_fk) in ITENS_COM_TOTAL.items():
+        if pai is not modelo_pai:
+            continue
+        somas.append(
+            db.select(func.coalesce(func.sum(modelo_item.quantidade * modelo_item.preco_cobrado), 0.0))
+            .where(getattr(modelo_item, coluna_fk) == modelo_pai.id)
+            .scalar_subquery()
+        )
+    return somas[0] + somas[1]
+
+def recalcular_totais(modelo_pai, ids=None, conexao=None):
+    """Regrava valor_total_itens a partir dos itens. Sem `ids`, recalcula todos."""
+    comando = modelo_pai.__table__.update().values(valor_total_itens=expressao_total_itens(modelo_pai))
+    if ids is not None:
+        comando = comando.where(modelo_pai.id.in_(ids))
+    (conexao or db.session).execute(comando)
+
+@db.event.listens_for(db.session, "after_flush")
+def atualizar_totais_dos_itens(session, flush_context):
+    """
+    Depois de cada flush, recalcula o total das ordens/orçamentos cujos itens
+    foram adicionados, editados ou removidos. O novo valor é gravado via SQL e
+    o atributo é expirado para ser relido na próxima leitura.
+    """
+    afetados = {OrdemServico: set(), Orcamento: set()}
+    for objeto in list(session.new) + list(session.dirty) + list(session.deleted):
+        if type(objeto) not in ITENS_COM_TOTAL:
+            continue
+        pai, coluna_fk = ITENS_COM_TOTAL[type(objeto)]
+        historico = db.inspect(objeto).attrs[coluna_fk].history
+        for pai_id in list(historico.added) + list(historico.unchanged) + list(historico.deleted):
+            if pai_id is not None:
+                afetados[pai].add(pai_id)
+
+    if not any(afetados.values()):
+        return
+
+    conexao = session.connection()
+    for pai, ids in afetados.items():
+        if ids:
+            recalcular_totais(pai, ids, conexao)
+    session.info.setdefault('totais_para_expirar', []).extend(
+        (pai, pai_id) for pai, ids in afetados.items() for pai_id in ids
+    )
+
+@db.event.listens_for(db.session, "after_flush_postexec")
+def expirar_totais_atualizados(session, flush_context):
+    for pai, pai_id in session.info.pop('totais_para_expirar', []):
+        objeto = session.identity_map.get(db.inspect(pai).identity_key_from_primary_key((pai_id,)))
+        if objeto is not None:
+            session.expire(objeto, ['valor_total_itens'])
+
+@comandos.cli.command("recalcular-totais")
+@click.option("--verificar", is_flag=True, help="Apenas compara os totais gravados com os itens, sem alterar nada.")
+def recalcular_totais_comando(verificar):
+    """Preenche ou confere valor_total_itens de todas as ordens e orçamentos."""
+    for modelo in (OrdemServico, Orcamento):
+        if verificar:
+            divergentes = db.session.query(modelo.id).filter(
+                func.abs(modelo.valor_total_itens - expressao_total_itens(modelo)) > 0.005
+            ).all()
+            if divergentes:
+                print(f"{modelo.__name__}: {len(divergentes)} total(is) divergente(s): {[d.id for d in divergentes][:20]}")
+            else:
+                print(f"{modelo.__name__}: todos os totais conferem.")
+        else:
+            recalcular_totais(modelo)
+            print(f"{modelo.__name__}: totais recalculados.")
+    if not verificar:
+        db.session.commit()
+
+#Numeração sequencial de OS e orçamentos
+def reservar_proximo_numero(tipo, ano):
+    """
+    Incrementa e devolve o contador de `tipo` no `ano` com um único comando
+    (INSERT ... ON CONFLICT DO UPDATE ... RETURNING). A linha do contador fica
+    travada até o commit/rollback da transação, então dois workers nunca
+    recebem o mesmo número e um rollback devolve o número (sem buracos).
+    """
+    tabela = ContadorDocumento.__table__
+    dialeto = db.session.get_bind().dialect.name
+
+    if dialeto in ('postgresql', 'sqlite'):
+        insert_dialeto = postgresql.insert if dialeto == 'postgresql' else sqlite.insert
+        comando = insert_dialeto(tabela).values(tipo=tipo, ano=ano, ultimo_numero=1)
+        comando = comando.on_conflict_do_update(
+            index_elements=[tabela.c.tipo, tabela.c.ano],
+            set_={'ultimo_numero': tabela.c.ultimo_numero + 1}
+        ).returning(tabela.c.ultimo_numero)
+        return db.session.execute(comando).scalar_one()
+
+    contador = db.session.query(ContadorDocumento).filter_by(tipo=tipo, ano=ano).with_for_update().first()
+    if contador is None:
+        contador = ContadorDocumento(tipo=tipo, ano=ano, ultimo_numero=0)
+        db.session.add(contador)
+    contador.ultimo_numero += 1
+    db.session.flush()
+    return contador.ultimo_numero
+
+#Busca indexada
+# Colunas pesquisadas em cada listagem. No PostgreSQL cada coluna tem um índice
+# GIN de trigramas sobre f_unaccent(lower(coluna)); no SQLite cada modelo tem
+# uma tabela FTS5 "<tabela>_busca" (content=<tabela>) mantida por triggers.
+# Ambos são criados pela migração "busca indexada".
+CAMPOS_BUSCA = {
+    Cliente: ['nome'],
+    Peca: ['nome_peca', 'codigo_interno'],
+    Servico: ['descricao_servico'],
+    Curriculo: ['nome'],
+    Contrato: ['locatario_nome'],
+    Impressora: ['modelo'],
+}
+
+def termos_fts(termo):
+    """Transforma o texto digitado em uma consulta FTS5: cada palavra vira um prefixo obrigatório."""
+    palavras = re.findall(r'\w+', termo)
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+def aplicar_busca(query, modelo, termo, candidatos=None):
+    """
+    Filtra `query` pelas colunas de CAMPOS_BUSCA[modelo] usando o índice de
+    busca do banco e ordena pela relevância. Ignora acentos e maiúsculas.
+
+    Com `candidatos`, só as primeiras N linhas encontradas pelo índice são
+    ordenadas por relevância. Serve para a busca enquanto digita, em que um
+    prefixo curto ("jo") casa com boa parte da base e ordenar tudo custaria caro.
+    """
+    colunas = [getattr(modelo, nome) for nome in CAMPOS_BUSCA[modelo]]
+    dialeto = db.session.get_bind().dialect.name
+
+    if dialeto == 'sqlite':
+        consulta = termos_fts(termo)
+        if not consulta:
+            return query
+        nome_fts = f"{modelo.__tablename__}_busca"
+        fts = db.table(nome_fts, db.column('rowid'), db.column('rank'))
+        encontrados = db.select(fts.c.rowid, fts.c.rank)\
+            .where(db.literal_column(nome_fts).op('MATCH')(consulta))
+        if candidatos:
+            encontrados = encontrados.limit(candidatos)
+        encontrados = encontrados.subquery()
+        return query.join(encontrados, encontrados.c.rowid == modelo.id)\
+            .order_by(encontrados.c.rank)
+
+    if dialeto == 'postgresql':
+        termo_normalizado = func.f_unaccent(func.lower(termo))
+        padrao = func.f_unaccent(func.lower(f"%{termo}%"))
+        expressoes = [func.f_unaccent(func.lower(coluna)) for coluna in colunas]
+        relevancia = func.greatest(*[func.similarity(expr, termo_normalizado) for expr in expressoes])\
+            if len(expressoes) > 1 else func.similarity(expressoes[0], termo_normalizado)
+        filtro = db.or_(*[expr.like(padrao) for expr in expressoes])
+        if candidatos:
+            filtro = modelo.id.in_(db.select(modelo.id).where(filtro).limit(candidatos))
+        return query.filter(filtro).order_by(relevancia.desc())
+
+    return query.filter(db.or_(*[coluna.ilike(f"%{termo}%") for coluna in colunas]))
+
+@comandos.cli.command("reindexar-busca")
+def reindexar_busca():
+    """Reconstrói as tabelas FTS5 (SQLite) ou os índices de trigramas (PostgreSQL)."""
+    dialeto = db.session.get_bind().dialect.name
+    for modelo in CAMPOS_BUSCA:
+        tabela = modelo.__tablename__
+        if dialeto == 'sqlite':
+            db.session.execute(db.text(f"INSERT INTO {tabela}_busca({tabela}_busca) VALUES('rebuild')"))
+        elif dialeto == 'postgresql':
+            for coluna in CAMPOS_BUSCA[modelo]:
+                db.session.execute(db.text(f"REINDEX INDEX ix_{tabela}_{coluna}_trgm"))
+        print(f"{tabela}: índice de busca reconstruído.")
+    db.session.commit()
+
+# --- Busca global (omnibox) ---
+MASCARAS_DOCUMENTO = {
+    'telefone_celular': '(00) 00000-0000',
+    'cpf': '000.000.000-00',
+    'cnpj': '00.000.000/0000-00',
+}
+CANDIDATOS_BUSCA_GLOBAL = 500
+PADRAO_NUMERO_DOCUMENTO = re.compile(r'^\s*(\d{1,6})\s*(?:[-/]\s*(\d{4}))?\s*$')
+
+def aplicar_mascara(digitos, mascara):
+    """Formata o começo de um número como nos formulários (imask): '3199' -> '(31) 99'."""
+    resultado = ''
+    for caractere in mascara:
+        if not digitos:
+            break
+        if caractere == '0':
+            resultado += digitos[0]
+            digitos = digitos[1:]
+        else:
+            resultado += caractere
+    return resultado
+
+def filtro_prefixo(coluna, prefixo):
+    # No SQLite (ordem binária) o intervalo usa o índice B-tree comum. Nos
+    # outros bancos a ordem do collation (pt_BR, en_US) ignora a pontuação de
+    # "(31) 9" e não garante onde fica U+FFFF, então vai LIKE 'x%', que no
+    # PostgreSQL usa os índices text_pattern_ops (indice_prefixo)
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return db.and_(coluna >= prefixo, coluna < prefixo + '\uffff')
+    padrao = prefixo.replace('/', '//').replace('%', '/%').replace('_', '/_')
+    return coluna.like(padrao + '%', escape='/')
+
+def colunas_resultado(tipo, id, titulo, detalhe, numero=None, ano=None):
+    return (
+        db.literal(tipo).label('tipo'),
+        id.label('id'),
+        titulo.label('titulo'),
+        detalhe.label('detalhe'),
+        (numero if numero is not None else db.null()).label('numero'),
+        (ano if ano is not None else db.null()).label('ano'),
+    )
+
+def buscar_tudo(termo, limite=8):
+    """
+    Procura o termo em clientes (nome, telefone, CPF/CNPJ), ordens de serviço
+    e orçamentos (número "012-2026" ou número de série), peças e serviços.
+    Cada tipo vira um SELECT limitado e tudo vai ao banco em um único UNION ALL.
+    """
+    termo = termo.strip()
+    if not termo:
+        return []
+    digitos = re.sub(r'\D', '', termo)
+    numero_documento = PADRAO_NUMERO_DOCUMENTO.match(termo)
+    consultas = []
+
+    if re.search(r'[^\W\d_]', termo):
+        consultas.append(aplicar_busca(
+            db.select(*colunas_resultado('cliente', Cliente.id, Cliente.nome, Cliente.telefone_celular)),
+            Cliente, termo, candidatos=CANDIDATOS_BUSCA_GLOBAL))
+        consultas.append(aplicar_busca(
+            db.select(*colunas_resultado('peca', Peca.id, Peca.nome_peca, Peca.codigo_interno)),
+            Peca, termo, candidatos=CANDIDATOS_BUSCA_GLOBAL))
+        consultas.append(aplicar_busca(
+            db.select(*colunas_resultado('servico', Servico.id, Servico.descricao_servico, Servico.unidade_medida)),
+            Servico, termo, candidatos=CANDIDATOS_BUSCA_GLOBAL))
+
+    if len(digitos) >= 3:
+        filtros = []
+        for campo, mascara in MASCARAS_DOCUMENTO.items():
+            coluna = getattr(Cliente, campo)
+            filtros.append(filtro_prefixo(coluna, aplicar_mascara(digitos, mascara)))
+            filtros.append(filtro_prefixo(coluna, digitos))
+        consultas.append(
+            db.select(*colunas_resultado('cliente', Cliente.id, Cliente.nome, Cliente.telefone_celular))
+            .where(db.or_(*filtros)))
+
+    if numero_documento:
+        numero = int(numero_documento.group(1))
+        ano = numero_documento.group(2)
+        consulta_os = db.select(*colunas_resultado(
+            'os', OrdemServico.id, Cliente.nome, OrdemServico.equipamento,
+            OrdemServico.numero_sequencial, OrdemServico.ano
+        )).join(Cliente).where(OrdemServico.numero_sequencial == numero)
+        consulta_orc = db.select(*colunas_resultado(
+            'orcamento', Orcamento.id, Cliente.nome, Orcamento.equipamento,
+            Orcamento.numero_orcamento, Orcamento.ano
+        )).join(Cliente).where(Orcamento.numero_orcamento == numero)
+        if ano:
+            consulta_os = consulta_os.where(OrdemServico.ano == int(ano))
+            consulta_orc = consulta_orc.where(Orcamento.ano == int(ano))
+        consultas.append(consulta_os.order_by(OrdemServico.ano.desc()))
+        consultas.append(consulta_orc.order_by(Orcamento.ano.desc()))
+
+    if len(termo) >= 3:
+        for variante in {termo, termo.upper()}:
+            consultas.append(db.select(*colunas_resultado(
+                'os', OrdemServico.id, Cliente.nome, OrdemServico.numero_de_serie,
+                OrdemServico.numero_sequencial, OrdemServico.ano
+            )).join(Cliente).where(filtro_prefixo(OrdemServico.numero_de_serie, variante)))
+            consultas.append(db.select(*colunas_resultado(
+                'orcamento', Orcamento.id, Cliente.nome, Orcamento.numero_de_serie,
+                Orcamento.numero_orcamento, Orcamento.ano
+            )).join(Cliente).where(filtro_prefixo(Orcamento.numero_de_serie, variante)))
+
+    if not consultas:
+        return []
+
+    # Cada SELECT fica num subselect para que o LIMIT/ORDER BY valha por tipo
+    partes = [db.select(consulta.limit(limite).subquery()) for consulta in consultas]
+    linhas = db.session.execute(db.union_all(*partes)).all()
+
+    resultados, vistos = [], set()
+    for linha in linhas:
+        chave = (linha.tipo, linha.id)
+        if chave in vistos:
+            continue
+        vistos.add(chave)
+        resultados.append(formatar_resultado_busca(linha))
+    return resultados
+
+ROTULOS_BUSCA = {'cliente': 'Cliente', 'os': 'OS', 'orcamento': 'Orçamento', 'peca': 'Peça', 'servico': 'Serviço'}
+
+def formatar_resultado_busca(linha):
+    if linha.tipo == 'cliente':
+        titulo, url = linha.titulo, url_for('clientes.detalhes_cliente', id=linha.id)
+    elif linha.tipo == 'os':
+        titulo = f"OS {linha.numero:03d}-{linha.ano} — {linha.titulo}" if linha.numero else f"OS — {linha.titulo}"
+        url = url_for('os.detalhes_os', id=linha.id)
+    elif linha.tipo == 'orcamento':
+        titulo = f"Orçamento {linha.numero:03d}-{linha.ano} — {linha.titulo}" if linha.numero else f"Orçamento — {linha.titulo}"
+        url = url_for('orcamentos.detalhes_orcamento', id=linha.id)
+    elif linha.tipo == 'peca':
+        titulo, url = linha.titulo, url_for('catalogo.editar_peca', id=linha.id)
+    else:
+        titulo, url = linha.titulo, url_for('catalogo.editar_servico', id=linha.id)
+    return {'tipo': linha.tipo, 'id': linha.id, 'titulo': titulo, 'detalhe': linha.detalhe or '', 'url': url}
+
+#Serviços de consulta
+def calcular_faturamento(status='Concluído'):
+    """
+    Soma o total armazenado (valor_total_itens) das ordens com o status
+    informado, em uma única consulta agregada.
+    """
+    total = db.session.query(func.coalesce(func.sum(OrdemServico.valor_total_itens), 0.0))\
+        .filter(OrdemServico.status == status).scalar()
+    return float(total or 0.0)
+
 #Funções principais
-@app.context_processor
 def inject_now():
     return {'now': datetime.now}
 
-@app.context_processor
-def inject_config():
-    # Busca a primeira (e única) linha de configuração do banco
+# --- Caches por processo ---
+class CacheVersionado:
+    """
+    Guarda em memória o resultado de `carregar()` e só chama de novo quando:
+      - o arquivo de versão em instance/ muda (invalidar() chamado em qualquer
+        worker do gunicorn na mesma máquina), ou
+      - passam `ttl` segundos (limite de atraso entre máquinas/dynos).
+    O valor guardado não pode depender da sessão do SQLAlchemy.
+    """
+    def __init__(self, nome, carregar, ttl):
+        self.carregar = carregar
+        self.ttl = ttl
+        self.arquivo_versao = os.path.join(PASTA_INSTANCIA, f'{nome}.versao')
+        self._estado = (None, None, 0.0)  # (valor, versão do arquivo, carregado_em)
+
+    def versao(self):
+        try:
+            return os.stat(self.arquivo_versao).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def obter(self):
+        valor, versao_em_cache, carregado_em = self._estado
+        versao = self.versao()
+        if not carregado_em or versao != versao_em_cache or time.monotonic() - carregado_em > self.ttl:
+            valor = self.carregar()
+            self._estado = (valor, versao, time.monotonic())
+        return valor
+
+    def invalidar(self):
+        """Chamar depois do commit que altera os dados guardados."""
+        os.makedirs(PASTA_INSTANCIA, exist_ok=True)
+        with open(self.arquivo_versao, 'w') as arquivo:
+            arquivo.write(str(time.time_ns()))
+        self._estado = (None, None, 0.0)
+
+# A linha de Configuracao muda raramente, mas é usada em toda renderização.
+def carregar_configuracao():
     config = Configuracao.query.first()
+    if not config:
+        return None
+    return SimpleNamespace(**{coluna.name: getattr(config, coluna.name) for coluna in Configuracao.__table__.columns})
+
+cache_configuracao = CacheVersionado(
+    'configuracao', carregar_configuracao, ttl=int(os.environ.get('CONFIG_CACHE_TTL', 300))
+)
+
+def obter_configuracao():
+    """Configuração da loja (ou None), consultando o banco só quando o cache expira."""
+    if 'configuracao' not in g:
+        g.configuracao = cache_configuracao.obter()
+    return g.configuracao
+
+def invalidar_cache_configuracao():
+    cache_configuracao.invalidar()
+    g.pop('configuracao', None)
+
+# Catálogo compacto (id, nome, código, preço) de serviços e peças, usado pela
+# busca dos campos "adicionar item" da OS e do orçamento.
+def normalizar_texto(texto):
+    return unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii').lower()
+
+def carregar_catalogo():
+    servicos = db.session.execute(
+        db.select(Servico.id, Servico.descricao_servico, Servico.preco_unitario).order_by(Servico.descricao_servico)
+    ).all()
+    pecas = db.session.execute(
+        db.select(Peca.id, Peca.nome_peca, Peca.codigo_interno, Peca.preco_unitario).order_by(Peca.nome_peca)
+    ).all()
+    catalogo = {
+        'servico': [{'id': s.id, 'nome': s.descricao_servico, 'codigo': None, 'preco': s.preco_unitario} for s in servicos],
+        'peca': [{'id': p.id, 'nome': p.nome_peca, 'codigo': p.codigo_interno, 'preco': p.preco_unitario} for p in pecas],
+    }
+    # Junto de cada item vai o texto já normalizado para a busca
+    return {
+        tipo: [(normalizar_texto(f"{item['nome']} {item['codigo'] or ''}"), item) for item in itens]
+        for tipo, itens in catalogo.items()
+    }
+
+cache_catalogo = CacheVersionado(
+    'catalogo', carregar_catalogo, ttl=int(os.environ.get('CATALOGO_CACHE_TTL', 300))
+)
+
+def buscar_no_catalogo(tipo, termo, limite=20):
+    """Itens do catálogo que contêm todas as palavras digitadas; os que começam pelo termo vêm primeiro."""
+    palavras = normalizar_texto(termo).split()
+    inicio = ' '.join(palavras)
+    comeca, contem = [], []
+    for texto, item in cache_catalogo.obter()[tipo]:
+        if all(palavra in texto for palavra in palavras):
+            (comeca if texto.startswith(inicio) else contem).append(item)
+            if len(comeca) >= limite:
+                break
+    return (comeca + contem)[:limite]
+
+def inject_config():
+    # Busca a primeira (e única) linha de configuração (em cache)
+    config = obter_configuracao()
 
     # Se nenhuma configuração foi salva ainda, retorna um dicionário vazio
     # para evitar erros nos templates.
@@ -561,1944 +1742,1735 @@ def load_user(user_id_string): # O nome agora reflete que é uma string
     
     return None
 
-@app.route("/logout")
-def logout():
-    logout_user()
-    flash("Logoff efetuado!", "danger")
-    return redirect(url_for("login"))
-
-@app.route("/logout_cliente")
-def logout_cliente():
-    logout_user()
-    flash("Logoff efetuado!", "danger")
-    return redirect(url_for("index"))
-
-@app.route("/login", methods = ("GET", "POST"))
-def login():
-    if request.method == "POST":
-        username = request.form["username"]
-        password = request.form["password"]
-
-        user = Usuario.query.filter_by(username=username).first()
-
-        if user and bcrypt.check_password_hash(user.password_hash, password):
-            login_user(user)
-            return redirect(url_for('home'))
-        else:
-            flash("Usuário ou senha incorretos", "danger")
-            return redirect(url_for('login'))
-
-    return render_template('login.html')
+#Senhas e tentativas de login
+# O bcrypt é a parte cara do login (~250 ms de CPU com custo 12). Para uma
+# enxurrada de logins (clientes conferindo a OS quando a loja abre) não
+# derrubar o servidor:
+#   - o hash roda num pool de SENHA_THREADS threads (o bcrypt solta o GIL),
+#     então no máximo SENHA_THREADS hashes disputam a CPU; passando de
+#     SENHA_FILA_MAX esperando, o login responde 503 na hora;
+#   - senhas erradas demais para um usuário a partir do mesmo IP, ou de um IP
+#     no total, são recusadas (429) antes de qualquer hash. Só falhas contam:
+#     logins certos nunca esgotam o limite, e errar a senha de alguém de outro
+#     IP não bloqueia o dono da conta. Atrás de proxy (Heroku, nginx) é
+#     preciso PROXIES_CONFIAVEIS, senão todos os clientes têm o IP do proxy;
+#   - BCRYPT_LOG_ROUNDS muda o custo; o hash de quem entra com o custo antigo
+#     é refeito no próprio login.
+SENHA_THREADS = int(os.environ.get('SENHA_THREADS', os.cpu_count() or 2))
+SENHA_FILA_MAX = int(os.environ.get('SENHA_FILA_MAX', SENHA_THREADS * 16))
+SENHA_TIMEOUT = int(os.environ.get('SENHA_TIMEOUT', 10))
+LOGIN_MAX_POR_USUARIO = int(os.environ.get('LOGIN_MAX_POR_USUARIO', 5))  # falhas por usuário e IP na janela
+LOGIN_MAX_POR_IP = int(os.environ.get('LOGIN_MAX_POR_IP', 30))  # falhas por IP na janela
+LOGIN_JANELA = int(os.environ.get('LOGIN_JANELA', 15 * 60))
+
+pool_senhas = ThreadPoolExecutor(max_workers=SENHA_THREADS, thread_name_prefix='senhas')
+vagas_senhas = threading.BoundedSemaphore(SENHA_THREADS + SENHA_FILA_MAX)
+
+
+class SenhasOcupadas(Exception):
+    pass
+
+
+def no_pool_de_senhas(funcao, *args):
+    if not vagas_senhas.acquire(blocking=False):
+        raise SenhasOcupadas()
+    try:
+        tarefa = pool_senhas.submit(funcao, *args)
+    except BaseException:
+        vagas_senhas.release()
+        raise
+    # A vaga só volta quando o hash termina, mesmo que a requisição desista antes
+    tarefa.add_done_callback(lambda _: vagas_senhas.release())
+    return tarefa.result(timeout=SENHA_TIMEOUT)
 
-@app.route("/login_cliente", methods = ("GET", "POST"))
-def login_cliente():
-    if request.method == "POST":
-        username = request.form["username"]
-        password = request.form["password"]
 
-        user = Cliente.query.filter_by(username_cliente=username).first()
+def gerar_hash_senha(senha):
+    return no_pool_de_senhas(bcrypt.generate_password_hash, senha).decode('utf-8')
 
-        if user and bcrypt.check_password_hash(user.password_hash, password):
-            login_user(user)
-            return redirect(url_for('dashboard_cliente'))
 
-    return render_template('login_cliente.html')
+def conferir_senha(usuario, senha):
+    """
+    Confere a senha de um Usuario/Cliente. Se o hash foi gerado com outro
+    custo, grava um novo com o custo atual (quem chama faz o commit).
+    """
+    if not no_pool_de_senhas(bcrypt.check_password_hash, usuario.password_hash, senha):
+        return False
+    if custo_do_hash(usuario.password_hash) != current_app.config['BCRYPT_LOG_ROUNDS']:
+        usuario.password_hash = gerar_hash_senha(senha)
+    return True
 
-@app.route("/cliente/dashboard")
-@role_required('cliente')
-def dashboard_cliente():
-    return render_template("dashboard_cliente.html")
 
-@app.route("/cliente/os/<int:id>")
-@role_required("cliente")
-def ver_os_cliente(id):
-    ordem_servico = OrdemServico.query.get(id)
-    if ordem_servico.cliente_id == current_user.id:
-        return render_template("ver_os_cliente.html", ordem_servico=ordem_servico)
-    else:
-        abort(403)
- 
-@app.route("/")
-def index():
-    return render_template("index.html")
-
-@app.route("/dashboard")
-@role_required('funcionario')
-def home():
-    total_clientes = Cliente.query.count()
-    ordens_abertas = OrdemServico.query.filter(OrdemServico.status != "Concluído").count()
-    ordens_concluidas = OrdemServico.query.filter(OrdemServico.status == "Concluído").count()
-    orcamento_aberto = Orcamento.query.filter(Orcamento.status != "Aprovado" or Orcamento.status != "Convertido em OS").count()
-    orcamento_concluido = Orcamento.query.filter(Orcamento.status == "Aprovado" or Orcamento.status == "Convertido em OS").count()
-
-    total_curriculos = Curriculo.query.count()
-    total_contratos = Contrato.query.count()
-    total_links = Impressora.query.count()
-
-    ordens_pagas = OrdemServico.query.filter_by(status='Concluído').all()
-    # Somamos os valores usando a @property via Python
-    faturamento_total = sum(os.valor_calculado for os in ordens_pagas) if ordens_pagas else 0.0
-
-    ultimas_os = OrdemServico.query.order_by(OrdemServico.data_de_criacao.desc()).limit(5).all()
-
-    return render_template(
-        "home.html",
-        total_clientes=total_clientes,
-        ordens_abertas=ordens_abertas,
-        ordens_concluidas=ordens_concluidas,
-        orcamento_aberto = orcamento_aberto,
-        orcamento_concluido = orcamento_concluido,
-        total_curriculos = total_curriculos,
-        total_contratos = total_contratos,
-        total_links = total_links,
-        ultimas_os = ultimas_os,
-        faturamento_total = faturamento_total
-        )
+def custo_do_hash(password_hash):
+    # $2b$12$<salt+hash>
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
 
-@app.route("/clientes/cadastrar", methods=["GET", "POST"])
-@role_required('funcionario')
-def cadastrar_cliente():
-    if request.method == "POST":
-        #dados do usuario e senha do cliente
-        username_cliente = request.form["username_cliente"]
-        password_cliente = request.form["password_cliente"]
-
-        password_hash = bcrypt.generate_password_hash(password_cliente).decode('utf-8')
-
-        #dados do cliente
-        nome_cliente = request.form["nome"]
-        telefone_celular = request.form["telefone_celular"]
-        telefone_auxiliar = request.form["telefone_auxiliar"]
-        cpf = request.form["cpf"]
-        cnpj = request.form["cnpj"]
-        cep = request.form["cep"]
-        logradouro = request.form["logradouro"]
-        numero = request.form["numero"]
-        complemento = request.form["complemento"]
-        bairro = request.form["bairro"]
-        cidade = request.form["cidade"]
-        estado = request.form["estado"]
-        anotacoes = request.form["anotacoes"]
-        novo_cliente = Cliente(
-            nome=nome_cliente,
-            username_cliente=username_cliente,
-            password_hash=password_hash,
-            senha_plana_temporaria = password_cliente,
-            telefone_celular=telefone_celular,
-            telefone_auxiliar = telefone_auxiliar,
-            cpf = cpf,
-            cnpj = cnpj,
-            cep = cep,
-            logradouro = logradouro,
-            numero = numero,
-            complemento = complemento,
-            bairro = bairro,
-            cidade = cidade,
-            estado = estado,
-            anotacoes = anotacoes
-            )
-        db.session.add(novo_cliente)
-        db.session.commit()
 
-        flash("Cliente cadastrado com sucesso!", "success")
-        return redirect(url_for("listar_clientes"))
+class LimiteTentativas:
+    """
+    Janela deslizante por chave, em memória e por processo: com N workers o
+    limite efetivo fica até N vezes maior, o que basta para cortar força bruta
+    e rajadas sem um serviço externo.
+    """
+    def __init__(self, maximo, janela, max_chaves=10000):
+        self.maximo = maximo
+        self.janela = janela
+        self.max_chaves = max_chaves
+        self._tentativas = {}
+        self._trava = threading.Lock()
+
+    def _recentes(self, chave, agora):
+        tentativas = self._tentativas.get(chave)
+        while tentativas and tentativas[0] <= agora - self.janela:
+            tentativas.popleft()
+        return tentativas
+
+    def espera(self, chave):
+        """Segundos até a chave poder tentar de novo (0 se pode agora)."""
+        agora = time.monotonic()
+        with self._trava:
+            tentativas = self._recentes(chave, agora)
+            if not tentativas or len(tentativas) < self.maximo:
+                return 0
+            return int(tentativas[0] + self.janela - agora) + 1
+
+    def registrar(self, chave):
+        agora = time.monotonic()
+        with self._trava:
+            if chave not in self._tentativas and len(self._tentativas) >= self.max_chaves:
+                # Muitas chaves (varredura de usuários/IPs): descarta as que já expiraram
+                for antiga in [c for c in self._tentativas if not self._recentes(c, agora)]:
+                    del self._tentativas[antiga]
+                if len(self._tentativas) >= self.max_chaves:
+                    del self._tentativas[next(iter(self._tentativas))]
+            self._tentativas.setdefault(chave, deque()).append(agora)
+
+    def limpar(self, chave):
+        with self._trava:
+            self._tentativas.pop(chave, None)
+
+
+falhas_por_usuario = LimiteTentativas(LOGIN_MAX_POR_USUARIO, LOGIN_JANELA)
+falhas_por_ip = LimiteTentativas(LOGIN_MAX_POR_IP, LOGIN_JANELA)
+
+
+def autenticar(modelo, coluna_usuario, tipo):
+    """
+    Login do formulário (username/password) contra `modelo`. Devolve
+    (usuario, None) ou (None, resposta de erro 429/503); usuario None sem
+    resposta é usuário ou senha incorretos.
+    """
+    username = request.form["username"]
+    password = request.form["password"]
+    chave_ip = f"{tipo}:{request.remote_addr}"
+    chave_usuario = f"{chave_ip}:{username.strip().lower()}"
 
-    return render_template("cadastrar_cliente.html")
+    espera = max(falhas_por_usuario.espera(chave_usuario), falhas_por_ip.espera(chave_ip))
+    if espera:
+        flash(f"Muitas tentativas de login. Tente novamente em {espera // 60 + 1} minuto(s).", "danger")
+        return None, (render_template(f'{tipo}.html'), 429, {'Retry-After': str(espera)})
 
-@app.route("/clientes/deletar/<int:id>")
-@role_required('funcionario')
-def deletar_cliente(id):
-    cliente_a_deletar = Cliente.query.get(id)
-    db.session.delete(cliente_a_deletar)
-    db.session.commit()
-    flash("Cliente apagado com sucesso!", "success")
-    return redirect(url_for("listar_clientes"))
-
-@app.route("/clientes/editar/<int:id>", methods=["GET", "POST"])
-@role_required('funcionario')
-def editar_cliente(id):
-    cliente_a_editar = Cliente.query.get_or_404(id)
-    todas_impressoras = Impressora.query.options(joinedload(Impressora.clientes_com_acesso)).order_by(Impressora.modelo).all()
-
-    if request.method == "POST": 
-        nome_cliente = request.form["nome"]
-        telefone_celular = request.form["telefone_celular"]
-        telefone_auxiliar = request.form["telefone_auxiliar"]
-        cpf = request.form["cpf"]
-        cnpj = request.form["cnpj"]
-        cep = request.form["cep"]
-        logradouro = request.form["logradouro"]
-        numero = request.form["numero"]
-        complemento = request.form["complemento"]
-        bairro = request.form["bairro"]
-        cidade = request.form["cidade"]
-        estado = request.form["estado"]
-        anotacoes = request.form["anotacoes"]
-
-        cliente_a_editar.impressoras_permitidas = []
-        ids_impressoras_permitidas = request.form.getlist("impressora_permitida")
-        for impressora_id_str in ids_impressoras_permitidas:
-            impressora_id = int(impressora_id_str)
-            impressora = Impressora.query.get(impressora_id)
-            if impressora:
-                cliente_a_editar.impressoras_permitidas.append(impressora)
-
-        nova_senha = request.form.get('nova_senha')
-        if nova_senha:
-            # Criptografa a nova senha
-            password_hash = bcrypt.generate_password_hash(nova_senha).decode('utf-8')
-            # Salva a nova senha criptografada no banco
-            cliente_a_editar.password_hash = password_hash
-            cliente_a_editar.senha_plana_temporaria = nova_senha
-
-
-        cliente_a_editar.nome = nome_cliente
-        cliente_a_editar.telefone_celular = telefone_celular
-        cliente_a_editar.telefone_auxiliar = telefone_auxiliar
-        cliente_a_editar.cpf = cpf
-        cliente_a_editar.cnpj = cnpj
-        cliente_a_editar.cep = cep
-        cliente_a_editar.logradouro = logradouro
-        cliente_a_editar.numero = numero
-        cliente_a_editar.complemento = complemento
-        cliente_a_editar.bairro = bairro
-        cliente_a_editar.cidade = cidade
-        cliente_a_editar.estado = estado
-        cliente_a_editar.anotacoes = anotacoes
+    user = modelo.query.filter(coluna_usuario == username).first()
+    try:
+        senha_certa = user is not None and conferir_senha(user, password)
+    except (SenhasOcupadas, FuturesTimeout):
+        flash("Servidor ocupado. Tente novamente em alguns segundos.", "warning")
+        return None, (render_template(f'{tipo}.html'), 503, {'Retry-After': '5'})
+    if not senha_certa:
+        falhas_por_usuario.registrar(chave_usuario)
+        falhas_por_ip.registrar(chave_ip)
+        return None, None
+    falhas_por_usuario.limpar(chave_usuario)
+    db.session.commit()  # hash refeito com o custo atual, se foi o caso
+    return user, None
+
+def criar_os(cliente_id, dados, criado_em=None):
+    """
+    Monta a OS da entrada de equipamento (formulário de cadastrar_os ou envio
+    offline) e adiciona na sessão, sem commit. `dados` é o request.form ou um
+    dict com os mesmos campos.
+    """
+    ano_atual = datetime.utcnow().year
 
-        db.session.commit()
-        flash("Cliente editado com sucesso!", "success")
+    # Reserva o próximo número do ano (atômico, vale até o commit)
+    novo_numero_sequencial = reservar_proximo_numero('os', ano_atual)
 
-        return redirect(url_for("listar_clientes"))
-    
-    return render_template(
-        "editar_cliente.html", 
-        cliente_a_editar = cliente_a_editar,
-        todas_impressoras = todas_impressoras
+    nova_os = OrdemServico(
+        cliente_id = cliente_id,
+        numero_sequencial = novo_numero_sequencial,
+        ano = ano_atual,
+        equipamento = dados["equipamento"],
+        marca = dados.get("marca"),
+        modelo = dados.get("modelo"),
+        defeito = dados["defeito"],
+        status = dados.get("status") or 'Pendente'
         )
-    
-@app.route("/clientes", methods = ["GET"])
-@role_required('funcionario')
-def listar_clientes():
-    page = request.args.get("page", 1, type=int)
-
-    termo_busca = request.args.get("termo_busca")
-    query_clientes = Cliente.query
-    
-    if termo_busca:
-        query_clientes = query_clientes.filter(Cliente.nome.ilike(f"%{termo_busca}%"))
-
-    paginacao = query_clientes.order_by(Cliente.nome).paginate(page=page, per_page=15, error_out=False)
-
-    clientes_da_pagina = paginacao.items
-        
-    return render_template(
-        "listar_clientes.html",
-         clientes = clientes_da_pagina,
-         paginacao = paginacao,
-         termo_busca = termo_busca
-         )
-
-@app.route("/cliente/<int:id>")
-@role_required('funcionario')
-def detalhes_cliente(id):
-    cliente_a_detalhar = Cliente.query.get(id)
-    ordens_servico = cliente_a_detalhar.ordens_servico
-    orcamentos = cliente_a_detalhar.orcamento
-    return render_template("detalhes_cliente.html", cliente_a_detalhar = cliente_a_detalhar, ordens_servico = ordens_servico, orcamentos=orcamentos)
-
-@app.route("/cliente/<int:cliente_id>/os/cadastrar", methods = ["GET", "POST"])
-@role_required('funcionario')
-def cadastrar_os(cliente_id):
-    cliente = Cliente.query.get_or_404(cliente_id)
-    if request.method == "POST":
-        ano_atual = datetime.utcnow().year
-
-        # Encontra o maior numero_sequencial para o ano atual
-        maior_numero_os_do_ano = db.session.query(func.max(OrdemServico.numero_sequencial)).filter_by(ano=ano_atual).scalar()
-
-        # Se não houver nenhuma OS este ano, começa em 1. Senão, incrementa.
-        if maior_numero_os_do_ano is None:
-            novo_numero_sequencial = 1
-        else:
-            novo_numero_sequencial = maior_numero_os_do_ano + 1
-
-        equipamento = request.form["equipamento"]
-        marca = request.form["marca"]
-        modelo = request.form["modelo"]
-        defeito = request.form["defeito"]
-        status = request.form["status"]
-
-        nova_os = OrdemServico(
-            cliente_id = cliente_id,
-            numero_sequencial = novo_numero_sequencial,
-            ano = ano_atual,
-            equipamento=equipamento,
-            marca = marca,
-            modelo = modelo,
-            defeito = defeito,
-            status = status
-            )
-        db.session.add(nova_os)
-        db.session.commit()
-        flash(f"OS cadastrado com sucesso!", "success")
-        return redirect(url_for("detalhes_cliente", id=cliente_id))
-
-    return render_template("cadastrar_os.html", cliente = cliente)
+    if criado_em:
+        nova_os.data_de_criacao = criado_em
+    db.session.add(nova_os)
+    db.session.flush()
+    return nova_os
 
 # app.py
 
-@app.route("/os/<int:id>", methods=["GET", "POST"])
-@role_required('funcionario')
-def detalhes_os(id):
-    ordem_servico = OrdemServico.query.get_or_404(id) # Alterado para get_or_404
-    lista_servicos = Servico.query.all()
-    lista_pecas = Peca.query.all()
-
-    if request.method == "POST":
-        # Salva os campos existentes
-        ordem_servico.equipamento = request.form["equipamento"]
-        ordem_servico.marca = request.form["marca"]
-        ordem_servico.modelo = request.form["modelo"]
-        ordem_servico.defeito = request.form["defeito"]
-        ordem_servico.status = request.form["status"]
-        
-        # Salva os NOVOS campos
-        ordem_servico.tecnico_responsavel = request.form.get('tecnico_responsavel')
-        ordem_servico.numero_de_serie = request.form.get('numero_de_serie')
-        ordem_servico.problema_constatado = request.form.get('problema_constatado')
-        ordem_servico.servico_executado = request.form.get('servico_executado')
-        ordem_servico.observacoes_cliente = request.form.get('observacoes_cliente')
-        ordem_servico.observacoes_internas = request.form.get('observacoes_internas')
-    
-        db.session.commit()
-        flash("Ordem de Serviço salva com sucesso!", "success")
-        return redirect(url_for("detalhes_os", id=ordem_servico.id))
-    
-    return render_template("detalhes_os.html", ordem_servico=ordem_servico, lista_servicos=lista_servicos, lista_pecas=lista_pecas)
-
-@app.route("/os/deletar/<int:id>")
-@role_required('funcionario')
-def deletar_os(id):
-    os_a_deletar = OrdemServico.query.get(id)
-    id_do_cliente = os_a_deletar.cliente.id
-    db.session.delete(os_a_deletar)
-    db.session.commit()
-    flash("Os apagada com sucesso!", "success")
-    return redirect(url_for("detalhes_cliente", id=id_do_cliente))
-
-@app.route("/servicos")
-@role_required('funcionario')
-def listar_servicos():
-    page = request.args.get("page", 1, type=int)
-    termo_busca = request.args.get("termo_busca")
-    servico_query = Servico.query
-
-    if termo_busca:
-        servico_query = servico_query.filter(Servico.descricao_servico.ilike(f"%{termo_busca}%"))
-
-    paginacao = servico_query.order_by(Servico.descricao_servico).paginate(
-        page=page, per_page=15, error_out=False
-    )
-    servicos_por_pagina = paginacao.items
-
-    return render_template(
-        "listar_servicos.html",
-          servicos = servicos_por_pagina,
-          paginacao = paginacao,
-          termo_busca = termo_busca
-          )
-
-@app.route("/servicos/cadastrar", methods = ["GET", "POST"])
-@role_required('funcionario')
-def cadastrar_servico():
-    if request.method == "POST":
-        descricao_servico = request.form["descricao_servico"]
-        detalhes_opcional = request.form["detalhes_opcional"]
-        unidade_medida = request.form["unidade_medida"]
-        preco_unitario = request.form["preco_unitario"]
-        if preco_unitario == "":
-            preco_unitario_novo = 0.0
-        else:
-            preco_unitario_novo = preco_unitario.replace(",", ".")
-
-        novo_servico = Servico(
-            descricao_servico=descricao_servico,
-            detalhes_opcional=detalhes_opcional,
-            unidade_medida = unidade_medida,
-            preco_unitario = preco_unitario_novo,
-            )
-        db.session.add(novo_servico)
-        db.session.commit()
-        flash("Serviço cadastrado com sucesso!", "success")
-        return redirect(url_for("listar_servicos"))
-    
-    return render_template("cadastrar_servico.html")
-
-@app.route("/servicos/editar/<int:id>", methods=["GET", "POST"])
-@role_required('funcionario')
-def editar_servico(id):
-    servico_a_editar = Servico.query.get_or_404(id)
-    if request.method == "POST": 
-        descricao_servico = request.form["descricao_servico"]
-        detalhes_opcional = request.form["detalhes_opcional"]
-        unidade_medida = request.form["unidade_medida"]
-        preco_unitario = request.form["preco_unitario"]
-
-        servico_a_editar.descricao_servico = descricao_servico
-        servico_a_editar.detalhes_opcional = detalhes_opcional
-        servico_a_editar.unidade_medida = unidade_medida
-        servico_a_editar.preco_unitario = preco_unitario
-
-        db.session.commit()
-        flash("Serviço editado com sucesso!", "success")
-
-        return redirect(url_for("listar_servicos"))
-    
-    return render_template("editar_servicos.html", servico_a_editar = servico_a_editar)
-
-@app.route("/servicos/deletar/<int:id>")
-@role_required('funcionario')
-def deletar_servico(id):
-    servico_a_deletar = Servico.query.get(id)
-    db.session.delete(servico_a_deletar)
-    db.session.commit()
-    flash("Serviço apagado com sucesso!", "success")
-    return redirect(url_for("listar_servicos"))
-
-@app.route("/peca", methods = ["GET"])
-@role_required('funcionario')
-def listar_pecas():
-    page = request.args.get("page", 1, type=int)
-    termo_busca = request.args.get("termo_busca")
-    pecas_query = Peca.query
-
-    if termo_busca:
-        pecas_query = pecas_query.filter(Peca.nome_peca.ilike(f"%{termo_busca}%"))
-
-    paginacao = pecas_query.order_by(Peca.nome_peca).paginate(
-        page=page, per_page=15, error_out=False
-    )
-
-    pecas = paginacao.items
-    
-
-    return render_template("listar_pecas.html", pecas = pecas, paginacao = paginacao, termo_busca = termo_busca)
-
-@app.route("/peca/cadastrar", methods = ["GET", "POST"])
-@role_required('funcionario')
-def cadastrar_peca():
-    if request.method == "POST":
-        nome_peca = request.form["nome_peca"]
-        detalhes_opcional = request.form["detalhes_opcional"]
-        codigo_interno = request.form["codigo_interno"]
-        unidade_medida = request.form["unidade_medida"]
-        preco_unitario = request.form["preco_unitario"]
-        if preco_unitario == "":
-            preco_unitario_novo = 0.0
-        else:
-            preco_unitario_novo = preco_unitario.replace(",", ".")
-
-        nova_peca = Peca(
-            nome_peca=nome_peca,
-            detalhes_opcional=detalhes_opcional,
-            codigo_interno=codigo_interno,
-            unidade_medida = unidade_medida,
-            preco_unitario = preco_unitario_novo,
-            )
-        db.session.add(nova_peca)
-        db.session.commit()
-        flash("Peça cadastrada com sucesso!", "success")
-        return redirect(url_for("listar_pecas"))
-    
-    return render_template("cadastrar_peca.html")
-
-@app.route("/peca/editar/<int:id>", methods=["GET", "POST"])
-@role_required('funcionario')
-def editar_peca(id):
-    peca_a_editar = Peca.query.get_or_404(id)
-    if request.method == "POST": 
-        nome_peca = request.form["nome_peca"]
-        detalhes_opcional = request.form["detalhes_opcional"]
-        codigo_interno = request.form["codigo_interno"]
-        unidade_medida = request.form["unidade_medida"]
-        preco_unitario = request.form["preco_unitario"]
-
-        peca_a_editar.nome_peca = nome_peca
-        peca_a_editar.detalhes_opcional = detalhes_opcional
-        peca_a_editar.codigo_interno = codigo_interno
-        peca_a_editar.unidade_medida = unidade_medida
-        peca_a_editar.preco_unitario = preco_unitario
-
-        db.session.commit()
-        flash("Peça editada com sucesso!", "success")
-
-        return redirect(url_for("listar_pecas"))
-    
-    return render_template("editar_peca.html", peca_a_editar = peca_a_editar)
-
-@app.route("/peca/deletar/<int:id>")
-@role_required('funcionario')
-def deletar_peca(id):
-    peca_a_deletar = Peca.query.get(id)
-    db.session.delete(peca_a_deletar)
-    db.session.commit()
-    flash("Peça apagada com sucesso!", "success")
-    return redirect(url_for("listar_pecas"))
-
-@app.route("/item/adicionar/<int:os_id>", methods=["GET", "POST"])
-@role_required('funcionario')
-def adicionar_servico(os_id):
-    if request.method == "POST":
-        quantidade = request.form["quantidade"]
-        preco_cobrado = request.form["preco_cobrado"]
-        
-        servico_id = request.form["servico_id"]
-        servico = Servico.query.get(servico_id)
-
-        if preco_cobrado == "":
-            preco_cobrado_novo = servico.preco_unitario
-        else:
-            preco_cobrado_novo = preco_cobrado.replace(",", ".")
-
-        novo_item = ItemServico(
-            quantidade = int(quantidade),
-            preco_cobrado = float(preco_cobrado_novo),
-            ordem_servico_id = os_id,
-            servico_id = servico_id
-        )
-
-        db.session.add(novo_item)
-        db.session.commit()
-        flash("Serviço adicionado com sucesso!", "success")
-        return redirect(url_for("detalhes_os", id=os_id) + "#adicionar_servico")
-    
-    return render_template("detalhes_os.html")
-
-@app.route("/item/adicionar_peca/<int:os_id>", methods=["GET", "POST"])
-@role_required('funcionario')
-def adicionar_peca(os_id):
-    if request.method == "POST":
-        quantidade = request.form["quantidade"]
-        preco_cobrado = request.form["preco_cobrado"]
-        
-        peca_id = request.form["peca_id"]
-        peca = Peca.query.get(peca_id)
-
-        if preco_cobrado == "":
-            preco_cobrado_novo = peca.preco_unitario
-        else:
-            preco_cobrado_novo = preco_cobrado.replace(",", ".")
-
-        novo_item = ItemPeca(
-            quantidade = int(quantidade),
-            preco_cobrado = float(preco_cobrado_novo),
-            ordem_servico_id = os_id,
-            peca_id = peca_id
+def filtrar_relatorio(busca_nome='', data_inicio_str='', data_fim_str=''):
+    """
+    Monta a query do relatório de ordens com os filtros do formulário.
+    O cliente vem no mesmo SELECT (contains_eager) e o total já está gravado
+    na ordem, então a listagem não dispara consultas extras por linha.
+    """
+    query = OrdemServico.query.join(Cliente).options(contains_eager(OrdemServico.cliente))
+
+    # Se o usuário preencheu um nome, adiciona o filtro de nome
+    if busca_nome:
+        query = query.filter(Cliente.nome.ilike(f'%{busca_nome}%'))
+
+    # Se o usuário preencheu as datas, adiciona o filtro de datas
+    if data_inicio_str and data_fim_str:
+        data_inicio = datetime.strptime(data_inicio_str, '%Y-%m-%d')
+        data_fim = datetime.strptime(data_fim_str, '%Y-%m-%d')
+        query = query.filter(
+            OrdemServico.data_de_criacao >= data_inicio,
+            OrdemServico.data_de_criacao <= data_fim
         )
 
-        db.session.add(novo_item)
-        db.session.commit()
-        flash("Peça adicionado com sucesso!", "success")
-        return redirect(url_for("detalhes_os", id=os_id) + "#adicionar_peca")
-    
-    return render_template("detalhes_os.html")
-
-@app.route("/item/deletar/<int:id>")
-@role_required('funcionario')
-def remover_servico(id):
-    item_a_deletar = ItemServico.query.get(id)
-    os_id = item_a_deletar.ordem_servico.id
-    db.session.delete(item_a_deletar)
-    db.session.commit()
-    flash("Serviço apagado com sucesso!", "success")
-    
-    return redirect(url_for("detalhes_os", id = os_id) + "#adicionar_servico")
-
-@app.route("/item_peca/deletar/<int:id>")
-@role_required('funcionario')
-def remover_peca(id):
-    peca_a_deletar = ItemPeca.query.get(id)
-    os_id = peca_a_deletar.ordem_servico.id
-    db.session.delete(peca_a_deletar)
-    db.session.commit()
-    flash("Peça removida com sucesso!", "success")
-    return redirect(url_for("detalhes_os", id = os_id)+ "#adicionar_peca")
-
-@app.route("/relatorios", methods=["GET", "POST"])
-@role_required('funcionario')
-def relatorios():
-    # Começa com uma query base que será modificada
-    query = OrdemServico.query
-
-    if request.method == "POST":
-        # Pega os dados do formulário
-        busca_nome = request.form.get('busca_nome', '')
-        data_inicio_str = request.form.get('data_inicio')
-        data_fim_str = request.form.get('data_fim')
-
-        # Se o usuário preencheu um nome, adiciona o filtro de nome
-        if busca_nome:
-            query = query.join(Cliente).filter(Cliente.nome.ilike(f'%{busca_nome}%'))
-
-        # Se o usuário preencheu as datas, adiciona o filtro de datas
-        if data_inicio_str and data_fim_str:
-            data_inicio = datetime.strptime(data_inicio_str, '%Y-%m-%d')
-            data_fim = datetime.strptime(data_fim_str, '%Y-%m-%d')
-            query = query.filter(
-                OrdemServico.data_de_criacao >= data_inicio,
-                OrdemServico.data_de_criacao <= data_fim
+    return query.order_by(OrdemServico.data_de_criacao.desc(), OrdemServico.id.desc())
+
+# --- Exportação do relatório ---
+# As linhas são lidas do banco em lotes (yield_per usa cursor no servidor no
+# PostgreSQL) e enviadas ao navegador conforme são geradas, então o uso de
+# memória não depende de quantas ordens entram no filtro.
+COLUNAS_EXPORTACAO = ["Número OS", "Data", "Cliente", "Equipamento", "Status", "Valor total"]
+LINHAS_POR_LOTE = 500
+
+def linhas_exportacao(query):
+    for ordem in query.yield_per(LINHAS_POR_LOTE):
+        yield [
+            ordem.numero_formatado,
+            ordem.data_de_criacao.strftime('%d/%m/%Y %H:%M') if ordem.data_de_criacao else '',
+            ordem.cliente.nome,
+            ordem.equipamento,
+            ordem.status,
+            round(ordem.valor_calculado, 2),
+        ]
+
+def gerar_csv(linhas):
+    buffer = StringIO()
+    # ';' e vírgula decimal para o Excel em português abrir direto
+    escritor = csv.writer(buffer, delimiter=';')
+    buffer.write('\ufeff')
+    escritor.writerow(COLUNAS_EXPORTACAO)
+    for linha in linhas:
+        linha[-1] = f"{linha[-1]:.2f}".replace('.', ',')
+        escritor.writerow(linha)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+class BufferDeSaida(RawIOBase):
+    """Arquivo "sem seek" que só acumula o que o zipfile escreve, para ser enviado em pedaços."""
+    def __init__(self):
+        self.pedacos = []
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self.pedacos.append(bytes(dados))
+        return len(dados)
+
+    def retirar(self):
+        dados = b''.join(self.pedacos)
+        self.pedacos.clear()
+        return dados
+
+CARACTERES_INVALIDOS_XML = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+def celula_xlsx(valor):
+    if isinstance(valor, (int, float)):
+        return f'<c><v>{valor}</v></c>'
+    texto = escapar_xml(CARACTERES_INVALIDOS_XML.sub('', str(valor or '')))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+def linha_xlsx(valores):
+    return ('<row>' + ''.join(celula_xlsx(v) for v in valores) + '</row>').encode('utf-8')
+
+ARQUIVOS_FIXOS_XLSX = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Relatorio" sheetId="1" r:id="rId1"/></sheets></workbook>'),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'),
+}
+
+def gerar_xlsx(linhas):
+    """
+    Monta uma planilha .xlsx mínima (uma aba, células inline) direto no fluxo
+    da resposta. O zip é escrito sem seek, então nada fica guardado inteiro.
+    """
+    buffer = BufferDeSaida()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+        for nome, conteudo in ARQUIVOS_FIXOS_XLSX.items():
+            arquivo_zip.writestr(nome, conteudo)
+        yield buffer.retirar()
+
+        with arquivo_zip.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as planilha:
+            planilha.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
             )
-        
-        # Executa a query construída com os filtros
-        ordens_exibidas = query.order_by(OrdemServico.data_de_criacao.desc()).all()
-
-    else: # Lógica para o GET (quando a página é carregada pela primeira vez)
-        ordens_exibidas = OrdemServico.query.order_by(OrdemServico.data_de_criacao.desc()).limit(10).all()
-        
-    # Renderiza o template, passando a lista de ordens
-    return render_template("relatorios.html", ordens_exibidas=ordens_exibidas)
-
-@app.route("/os/pdf/<int:os_id>")
-@login_required
-@role_required('funcionario')
-def gerar_pdf_os(os_id):
-    # 1. Busca os dados (igual a antes)
-    ordem_servico = OrdemServico.query.get_or_404(os_id)
-    
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    # 2. Renderiza um template HTML para uma string (igual a antes)
-    # Lembre-se que tínhamos falado em criar um pdf_template.html limpo
-    html_renderizado = render_template("template_pdf.html", ordem_servico=ordem_servico, base_dir=base_dir)
-    
-    # 3. Prepara um "arquivo" em memória para receber o PDF
+            planilha.write(linha_xlsx(COLUNAS_EXPORTACAO))
+            for linha in linhas:
+                planilha.write(linha_xlsx(linha))
+                dados = buffer.retirar()
+                if dados:
+                    yield dados
+            planilha.write(b'</sheetData></worksheet>')
+    yield buffer.retirar()
+
+FORMATOS_EXPORTACAO = {
+    'csv': (gerar_csv, 'text/csv'),
+    'xlsx': (gerar_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+#Bibliotecas de documentos sob demanda
+# xhtml2pdf (com reportlab, lxml e pyHanko), htmldocx e num2words somam mais
+# de um segundo de importação e só servem às rotas de PDF, Word e recibo, então
+# são importados dentro das funções que os usam: o boot do gunicorn e o
+# restart de um worker não pagam por eles. Com o preload do gunicorn.conf.py
+# (que liga PRECARREGAR_DOCUMENTOS=1), o master importa tudo uma vez antes do
+# fork e os workers já nascem com os módulos carregados (páginas compartilhadas).
+BIBLIOTECAS_DOCUMENTOS = ('xhtml2pdf.pisa', 'reportlab.platypus', 'htmldocx', 'num2words')
+
+
+def precarregar_bibliotecas_documentos():
+    for nome in BIBLIOTECAS_DOCUMENTOS:
+        importlib.import_module(nome)
+
+
+if os.environ.get('PRECARREGAR_DOCUMENTOS') == '1':
+    precarregar_bibliotecas_documentos()
+
+#PDF direto no ReportLab
+# A OS e o orçamento são os documentos mais gerados. Em vez de HTML →
+# xhtml2pdf (que interpreta o CSS e o HTML de novo a cada PDF), o motor
+# 'reportlab' monta o mesmo layout de template_pdf.html e
+# template_pdf_orcamento.html direto com o platypus. A rota monta um dict só
+# com textos, números e caminhos de arquivo (vai para o pool de processos e
+# para a chave do cache) e layout_reportlab() desenha. O motor de cada tipo
+# de documento vem de PDF_MOTOR_OS / PDF_MOTOR_ORCAMENTO ('reportlab' ou
+# 'xhtml2pdf'); mudanças no desenho devem aumentar LAYOUT_REPORTLAB_VERSAO,
+# que faz parte da chave do cache de PDFs.
+MOTORES_PDF = {
+    'os': os.environ.get('PDF_MOTOR_OS', 'reportlab'),
+    'orcamento': os.environ.get('PDF_MOTOR_ORCAMENTO', 'reportlab'),
+}
+LAYOUT_REPORTLAB_VERSAO = 1
+
+# Medidas do CSS dos templates (o xhtml2pdf converte 1px em 0,75pt). As cores
+# ficam em hex: o ReportLab aceita strings e só é importado ao gerar o PDF
+PX = 0.75
+COR_TEXTO = '#333333'
+COR_FUNDO_TITULO = '#f2f2f2'
+COR_BORDA_ITENS = '#cccccc'
+COR_BORDA_TOTAL = '#a8a8a8'
+COR_GARANTIA = '#555555'
+LADO_FOTO_PDF = 150 * PX
+ALTURA_LOGO_PDF = 60 * PX
+
+
+def estilos_reportlab():
+    from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_RIGHT
+    from reportlab.lib.styles import ParagraphStyle
+    base = ParagraphStyle('base', fontName='Helvetica', fontSize=12 * PX, leading=12 * PX * 1.25,
+                          textColor=COR_TEXTO, spaceBefore=3 * PX, spaceAfter=3 * PX)
+    return {
+        'p': base,
+        'h1': ParagraphStyle('h1', base, fontName='Helvetica-Bold', fontSize=12 * PX * 1.385,
+                             leading=12 * PX * 1.385 * 1.25),
+        'h2': ParagraphStyle('h2', base, fontName='Helvetica-Bold', fontSize=12 * PX * 1.231,
+                             leading=12 * PX * 1.231 * 1.25, alignment=TA_RIGHT),
+        'direita': ParagraphStyle('direita', base, alignment=TA_RIGHT),
+        'celula': ParagraphStyle('celula', base, spaceBefore=0, spaceAfter=0),
+        'celula_direita': ParagraphStyle('celula_direita', base, spaceBefore=0, spaceAfter=0, alignment=TA_RIGHT),
+        'th': ParagraphStyle('th', base, fontName='Helvetica-Bold', spaceBefore=0, spaceAfter=0, alignment=TA_CENTER),
+        'th_direita': ParagraphStyle('th_direita', base, fontName='Helvetica-Bold', spaceBefore=0, spaceAfter=0,
+                                     alignment=TA_RIGHT),
+        'titulo': ParagraphStyle('titulo', base, fontName='Helvetica-Bold', spaceBefore=0, spaceAfter=0),
+        'garantia': ParagraphStyle('garantia', base, fontSize=11 * PX, leading=11 * PX * 1.25,
+                                   textColor=COR_GARANTIA, alignment=TA_JUSTIFY, spaceBefore=10 * PX),
+        'legenda': ParagraphStyle('legenda', base, alignment=TA_CENTER),
+        'assinatura': ParagraphStyle('assinatura', base, alignment=TA_CENTER),
+    }
+
+
+def texto_pdf(valor):
+    """Texto do banco escapado para o mini-HTML dos Paragraph do ReportLab."""
+    return escapar_xml('' if valor is None else str(valor))
+
+
+def imagem_no_limite(caminho, largura_max, altura_max):
+    """Image do ReportLab reduzida para caber na caixa, sem distorcer; None se não abre."""
+    from reportlab.lib.utils import ImageReader
+    from reportlab.platypus import Image as RLImage
+    try:
+        largura, altura = ImageReader(caminho).getSize()
+    except Exception:
+        return None
+    escala = min(largura_max / largura, altura_max / altura)
+    return RLImage(caminho, width=largura * escala, height=altura * escala)
+
+
+def titulo_secao_reportlab(titulo, estilos, largura):
+    from reportlab.platypus import Paragraph, Table, TableStyle
+    # .section-title: faixa cinza com padding de 4px e margem 10px acima, 4px abaixo
+    tabela = Table([[Paragraph(texto_pdf(titulo), estilos['titulo'])]], colWidths=[largura])
+    tabela.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), COR_FUNDO_TITULO),
+        ('LEFTPADDING', (0, 0), (-1, -1), 4 * PX),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 4 * PX),
+        ('TOPPADDING', (0, 0), (-1, -1), 4 * PX),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4 * PX),
+    ]))
+    tabela.spaceBefore = 10 * PX
+    tabela.spaceAfter = 4 * PX
+    return tabela
+
+
+def campos_reportlab(campos, estilos):
+    from reportlab.platypus import Paragraph
+    return [Paragraph(f"<b>{texto_pdf(rotulo)}:</b> {texto_pdf(valor)}", estilos['p']) for rotulo, valor in campos]
+
+
+def tabela_itens_reportlab(linhas, estilos, largura):
+    from reportlab.platypus import Paragraph, Table, TableStyle
+    cabecalho = [Paragraph("Descrição", estilos['th']), Paragraph("Qtd", estilos['th_direita']),
+                 Paragraph("Valor Unit. (R$)", estilos['th_direita']), Paragraph("Subtotal (R$)", estilos['th_direita'])]
+    dados = [cabecalho] + [
+        [Paragraph(texto_pdf(descricao), estilos['celula']),
+         Paragraph(str(quantidade), estilos['celula_direita']),
+         Paragraph(f"{preco:.2f}", estilos['celula_direita']),
+         Paragraph(f"{quantidade * preco:.2f}", estilos['celula_direita'])]
+        for descricao, quantidade, preco in linhas
+    ]
+    tabela = Table(dados, colWidths=[largura / 4] * 4, repeatRows=1)
+    # O xhtml2pdf deixa cada linha ~25pt mais alta que o padding de 4px do CSS;
+    # o padding vertical maior repete essa altura (e o número de páginas)
+    tabela.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 1 * PX, COR_BORDA_ITENS),
+        ('BACKGROUND', (0, 0), (-1, 0), COR_FUNDO_TITULO),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 4 * PX),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 4 * PX),
+        ('TOPPADDING', (0, 0), (-1, -1), 7),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 7),
+    ]))
+    return tabela
+
+
+def fotos_reportlab(fotos, estilos, largura):
+    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
+    # .fotos-table: 3 por linha, 150x150px com padding de 6px e a legenda embaixo
+    celulas = []
+    for caminho, legenda in fotos:
+        imagem = imagem_no_limite(caminho, LADO_FOTO_PDF, LADO_FOTO_PDF) if caminho else None
+        celulas.append([imagem or Spacer(LADO_FOTO_PDF, LADO_FOTO_PDF),
+                        Paragraph(texto_pdf(legenda), estilos['legenda'])])
+    linhas = [celulas[i:i + 3] for i in range(0, len(celulas), 3)]
+    linhas[-1] += [''] * (3 - len(linhas[-1]))
+    tabela = Table(linhas, colWidths=[largura / 3] * 3)
+    tabela.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('TOPPADDING', (0, 0), (-1, -1), 6 * PX),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6 * PX),
+    ]))
+    return tabela
+
+
+def total_reportlab(valor, estilos, largura):
+    from reportlab.platypus import Paragraph, Table, TableStyle
+    tabela = Table([[Paragraph("<b>Total Geral</b>", estilos['celula']),
+                     Paragraph(f"<b>R$ {valor:.2f}</b>", estilos['celula_direita'])]],
+                   colWidths=[largura * 0.2] * 2, hAlign='RIGHT')
+    tabela.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 1 * PX, COR_BORDA_TOTAL),
+        ('LEFTPADDING', (0, 0), (-1, -1), 4 * PX),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 4 * PX),
+        ('TOPPADDING', (0, 0), (-1, -1), 4 * PX),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4 * PX),
+    ]))
+    tabela.spaceBefore = 10 * PX
+    return tabela
+
+
+def assinaturas_reportlab(nome_loja, estilos, largura, espaco):
+    from reportlab.platypus import KeepTogether, Paragraph, Table
+    linha = "_" * 44
+    tabela = Table([[Paragraph(f"{linha}<br/><b>{texto_pdf(nome_loja)}</b>", estilos['assinatura']),
+                     Paragraph(f"{linha}<br/><b>Cliente</b>", estilos['assinatura'])]],
+                   colWidths=[largura / 2] * 2)
+    tabela.spaceBefore = espaco
+    return KeepTogether([tabela])
+
+
+def layout_reportlab(documento):
+    """Desenha o dict montado por documento_pdf_os / documento_pdf_orcamento. Devolve os bytes do PDF."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Table, TableStyle
+    estilos = estilos_reportlab()
+    saida = BytesIO()
+    margem = 10 * mm
+    # o Frame do platypus tem 6pt de padding: desconta para o conteúdo começar nos 10mm do @page
+    pdf = SimpleDocTemplate(saida, pagesize=A4, leftMargin=margem - 6, rightMargin=margem - 6,
+                            topMargin=margem - 6, bottomMargin=margem - 6, title=documento['titulo'])
+    largura = A4[0] - 2 * margem
+    loja = documento['loja']
+
+    logo = imagem_no_limite(loja['logomarca'], largura * 0.15, ALTURA_LOGO_PDF) if loja['logomarca'] else None
+    cabecalho = Table([[
+        logo or '',
+        [Paragraph(texto_pdf(loja['nome']), estilos['h1'])] + [Paragraph(texto_pdf(t), estilos['p']) for t in loja['linhas']],
+        [Paragraph(texto_pdf(documento['titulo']), estilos['h2'])]
+        + [Paragraph(texto_pdf(t), estilos['direita']) for t in documento['cabecalho']],
+    ]], colWidths=[largura * 0.15, largura * 0.55, largura * 0.30])
+    cabecalho.setStyle(TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 0),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 2),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 5 * PX),
+    ]))
+    historia = [cabecalho]
+
+    colunas = Table([[
+        [titulo_secao_reportlab(titulo, estilos, largura / 2 - 4)] + campos_reportlab(campos, estilos)
+        for titulo, campos in documento['colunas']
+    ]], colWidths=[largura / 2] * 2)
+    colunas.setStyle(TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 0),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ]))
+    colunas.spaceBefore = 10 * PX
+    historia.append(colunas)
+
+    for bloco in documento['blocos']:
+        tipo = bloco['tipo']
+        if bloco.get('titulo'):
+            historia.append(titulo_secao_reportlab(bloco['titulo'], estilos, largura))
+        if tipo == 'campos':
+            historia += campos_reportlab(bloco['campos'], estilos)
+        elif tipo == 'texto' and bloco['texto']:
+            historia.append(Paragraph(texto_pdf(bloco['texto']), estilos[bloco.get('estilo', 'p')]))
+        elif tipo == 'fotos':
+            historia.append(fotos_reportlab(bloco['fotos'], estilos, largura))
+        elif tipo == 'itens':
+            historia.append(tabela_itens_reportlab(bloco['linhas'], estilos, largura))
+        elif tipo == 'total':
+            historia.append(total_reportlab(bloco['valor'], estilos, largura))
+        elif tipo == 'assinaturas':
+            historia.append(assinaturas_reportlab(bloco['nome_loja'], estilos, largura, bloco['espaco'] * PX))
+
+    pdf.build(historia)
+    return saida.getvalue()
+
+
+def dados_loja_pdf():
+    config = obter_configuracao() or SimpleNamespace()
+    campo = lambda nome: getattr(config, nome, None) or ''
+    linhas = [campo('endereco'), f"CNPJ: {campo('cnpj')} | Telefone: {campo('telefone')}"]
+    if campo('site'):
+        linhas.append(f"Site: {campo('site')}")
+    if campo('email_contato'):
+        linhas.append(f"E-mail: {campo('email_contato')}")
+    return {
+        'nome': campo('nome_loja'),
+        'logomarca': arquivo_local(campo('logomarca')) if campo('logomarca') else '',
+        'linhas': linhas,
+    }
+
+
+def blocos_itens_pdf(documento, titulo_servicos, titulo_pecas):
+    blocos = []
+    if documento.itens_servico:
+        blocos.append({'tipo': 'itens', 'titulo': titulo_servicos, 'linhas': [
+            [item.servico.descricao_servico, item.quantidade, float(item.preco_cobrado)]
+            for item in documento.itens_servico]})
+    if documento.itens_peca:
+        blocos.append({'tipo': 'itens', 'titulo': titulo_pecas, 'linhas': [
+            [item.peca.nome_peca, item.quantidade, float(item.preco_cobrado)]
+            for item in documento.itens_peca]})
+    return blocos
+
+
+def bloco_fotos_pdf(documento):
+    if not documento.fotos:
+        return []
+    return [{'tipo': 'fotos', 'titulo': "Fotos",
+             'fotos': [[arquivo_local(foto.arquivo_pdf), foto.legenda or ''] for foto in documento.fotos]}]
+
+
+def completar_documento_reportlab(documento):
+    documento['motor'] = 'reportlab'
+    documento['versao'] = LAYOUT_REPORTLAB_VERSAO
+    # Arquivos usados, para a chave do cache mudar quando uma foto ou a logomarca muda
+    documento['arquivos'] = [documento['loja']['logomarca']] + [
+        caminho for bloco in documento['blocos'] if bloco['tipo'] == 'fotos' for caminho, _ in bloco['fotos']]
+    return documento
+
+
+def documento_pdf_os(ordem_servico):
+    """O que a fila de PDFs converte para a OS: HTML (xhtml2pdf) ou dict (reportlab)."""
+    if MOTORES_PDF['os'] != 'reportlab':
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        return render_template("template_pdf.html", ordem_servico=ordem_servico, base_dir=base_dir)
+
+    loja = dados_loja_pdf()
+    cliente = ordem_servico.cliente
+    campos_cliente = [["Nome", cliente.nome], ["Telefone", cliente.telefone_celular]]
+    if cliente.username_cliente:
+        campos_cliente.append(["Usuário", cliente.username_cliente])
+    if cliente.senha_plana_temporaria:
+        campos_cliente.append(["Senha de Acesso", cliente.senha_plana_temporaria])
+    return completar_documento_reportlab({
+        'titulo': f"Ordem de Serviço #{ordem_servico.numero_formatado}",
+        'loja': loja,
+        'cabecalho': [f"Data: {ordem_servico.data_de_criacao.strftime('%d/%m/%Y')}"],
+        'colunas': [
+            ["Informações do Cliente", campos_cliente],
+            ["Detalhes do Equipamento", [
+                ["Equipamento", ordem_servico.equipamento],
+                ["Marca / Modelo", f"{ordem_servico.marca} / {ordem_servico.modelo}"],
+                ["Defeito Relatado", ordem_servico.defeito],
+            ]],
+        ],
+        'blocos': [
+            {'tipo': 'texto', 'titulo': "Sobre a Garantia do Serviço", 'estilo': 'garantia',
+             'texto': getattr(obter_configuracao(), 'texto_garantia', None) or ''},
+            *bloco_fotos_pdf(ordem_servico),
+            *blocos_itens_pdf(ordem_servico, "Serviços Executados", "Peças Utilizadas"),
+            {'tipo': 'total', 'valor': float(ordem_servico.valor_calculado)},
+            {'tipo': 'assinaturas', 'nome_loja': loja['nome'], 'espaco': 100},
+        ],
+    })
+
+
+def documento_pdf_orcamento(orcamento):
+    """O que a fila de PDFs converte para o orçamento: HTML (xhtml2pdf) ou dict (reportlab)."""
+    if MOTORES_PDF['orcamento'] != 'reportlab':
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        return render_template("template_pdf_orcamento.html", orcamento=orcamento, base_dir=base_dir)
+
+    loja = dados_loja_pdf()
+    cabecalho = [f"Data: {orcamento.data_de_criacao.strftime('%d/%m/%Y')}"]
+    if orcamento.validade_do_orcamento:
+        cabecalho.append(f"Validade: {orcamento.validade_do_orcamento}")
+    equipamento = [["Equipamento", orcamento.equipamento],
+                   ["Marca / Modelo", f"{orcamento.marca} / {orcamento.modelo}"]]
+    if orcamento.numero_de_serie:
+        equipamento.append(["Nº de Série", orcamento.numero_de_serie])
+    situacao = [["Status", orcamento.status]]
+    if orcamento.tecnico_responsavel:
+        situacao.append(["Técnico Responsável", orcamento.tecnico_responsavel])
+    return completar_documento_reportlab({
+        'titulo': f"Orçamento #{orcamento.numero_formatado}",
+        'loja': loja,
+        'cabecalho': cabecalho,
+        'colunas': [
+            ["Informações do Cliente", [["Nome", orcamento.cliente.nome],
+                                        ["Telefone", orcamento.cliente.telefone_celular]]],
+            ["Detalhes do Equipamento", equipamento],
+        ],
+        'blocos': [
+            {'tipo': 'campos', 'titulo': "Problemas Identificados", 'campos': [
+                ["Informado pelo cliente", orcamento.problema_informado],
+                ["Constatado pelo técnico", orcamento.problema_constatado],
+            ]},
+            *bloco_fotos_pdf(orcamento),
+            *blocos_itens_pdf(orcamento, "Serviços Propostos", "Peças Necessárias"),
+            {'tipo': 'total', 'valor': float(orcamento.valor_total)},
+            *([{'tipo': 'texto', 'titulo': "Observações do Cliente", 'texto': orcamento.observacoes_cliente}]
+              if orcamento.observacoes_cliente else []),
+            {'tipo': 'campos', 'titulo': "Situação do Orçamento", 'campos': situacao},
+            {'tipo': 'assinaturas', 'nome_loja': loja['nome'], 'espaco': 40},
+        ],
+    })
+
+
+def documento_para_pdf(documento):
+    """Converte o que as rotas montaram: HTML vai para o xhtml2pdf, dict para o ReportLab."""
+    if isinstance(documento, dict):
+        return layout_reportlab(documento)
+    return html_para_pdf(documento)
+
+
+#Geração de PDF em segundo plano
+# O xhtml2pdf leva de centenas de ms a alguns segundos por documento (mais com
+# fotos). As rotas montam o HTML na requisição (precisa do banco) e só a
+# conversão vai para um pool de processos; o navegador acompanha o job e baixa
+# o arquivo quando fica pronto. O estado de cada job fica em instance/pdf_jobs/
+# e os PDFs prontos em instance/pdf_cache/, então qualquer worker do gunicorn
+# responde o acompanhamento e o download.
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', 2))  # 0 = gera na própria requisição
+PDF_FILA_MAX = int(os.environ.get('PDF_FILA_MAX', max(PDF_WORKERS, 1) * 4))
+PDF_TIMEOUT = int(os.environ.get('PDF_TIMEOUT', 60))
+PDF_JOBS_TTL = int(os.environ.get('PDF_JOBS_TTL', 3600))
+PDF_CACHE_MAX_MB = int(os.environ.get('PDF_CACHE_MAX_MB', 200))
+
+PADRAO_JOB_PDF = re.compile(r'[0-9a-f]{32}')
+PADRAO_ARQUIVO_LOCAL = re.compile(r'src="([^"]+)"')
+
+
+class FilaPDFCheia(Exception):
+    pass
+
+
+def html_para_pdf(html):
+    """Converte o HTML com o xhtml2pdf. Devolve os bytes do PDF, ou None se deu erro."""
+    from xhtml2pdf import pisa
     result = BytesIO()
-    
-    # 4. Mágica do xhtml2pdf: converte o HTML para PDF e salva no "result"
-    pdf = pisa.pisaDocument(BytesIO(html_renderizado.encode("UTF-8")), result)
-    
-    # 5. Se não houve erro na conversão...
-    if not pdf.err:
-        # Cria um nome de arquivo dinâmico
-        nome_arquivo = f"OS-{ordem_servico.numero_formatado}.pdf"
-        # Retorna o PDF para o navegador como um download
-        flash("PDF gerado com sucesso!", "success")
-        return Response(
-            result.getvalue(),
-            mimetype="application/pdf",
-            headers={"Content-disposition": f"attachment; filename={nome_arquivo}"}
-        )
-        
-    
-    # Se houve algum erro, retorna uma mensagem simples
-    return flash("Ocorreu um erro ao gerar o PDF."), 500
-
-@app.route("/os/exibir_pdf/<int:os_id>")
-@login_required
-def exibir_pdf_os(os_id):
-    ordem_servico = OrdemServico.query.get_or_404(os_id)
-    return render_template("template_pdf.html", ordem_servico=ordem_servico)
-
-@app.route("/os/<int:os_id>/adicionar_foto", methods=["POST"])
-@login_required
-@role_required('funcionario')
-def adicionar_foto(os_id):
-    if 'foto' not in request.files:
-        return redirect(request.referrer or url_for('detalhes_os', id=os_id))
-    
-    file = request.files['foto']
-    legenda = request.form.get('legenda', '')
-
-    if file.filename == '' or not allowed_file(file.filename):
-        return redirect(request.referrer or url_for('detalhes_os', id=os_id))
-
-    if file:
-        timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
-        original_filename = secure_filename(file.filename)
-        novo_nome_arquivo = f"{timestamp}_{original_filename}"
-        
-        # --- ESTA É A LINHA IMPORTANTE PARA ADICIONAR ---
-        # Garante que a pasta de upload exista antes de tentar salvar
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-        
-        # Agora a linha abaixo não dará mais erro
-        file.save(os.path.join(app.config['UPLOAD_FOLDER'], novo_nome_arquivo))
-
-        nova_foto = Foto(
-            nome_arquivo=novo_nome_arquivo,
-            legenda=legenda,
-            ordem_servico_id=os_id
-        )
-        db.session.add(nova_foto)
-        db.session.commit()
-        flash("Foto adicionada com sucesso!", "success")
-
-    return redirect(url_for('detalhes_os', id=os_id) + "#adicionar-foto")
-
-@app.route("/os/<int:foto_id>/remover_foto", methods=["POST"])
-@login_required
-@role_required('funcionario')
-def remover_foto(foto_id):
-    foto_a_remover = Foto.query.get_or_404(foto_id)
+    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
+    return None if pdf.err else result.getvalue()
 
-    os_id = foto_a_remover.ordem_servico_id
-
-    caminho_arquivo = os.path.join(app.config['UPLOAD_FOLDER'], foto_a_remover.nome_arquivo)
-
-    try:
-        # 3. Deleta o arquivo físico do servidor
-        os.remove(caminho_arquivo)
-        
-        # 4. Deleta o registro do banco de dados
-        db.session.delete(foto_a_remover)
-        db.session.commit()
-        flash("Foto apagada com sucesso!", "success")
-    except Exception as e:
-        # (Opcional) Adicionar uma mensagem de erro se algo der errado
-        print(f"Erro ao deletar foto: {e}")
-        db.session.rollback()
 
-    return redirect(url_for('detalhes_os', id=os_id) + "#fotos_equipamento")
+def gravar_atomico(caminho, dados):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(dados)
+    os.replace(temporario, caminho)
 
-@app.route("/contato")
-def pagina_contato():
-    return render_template("pagina_contato.html")
 
-@app.route("/orcamento/<int:cliente_id>/novo", methods=["POST", "GET"])
-@login_required
-@role_required('funcionario')
-def novo_orcamento(cliente_id):
-    cliente = Cliente.query.get_or_404(cliente_id)
-    
-    if request.method == "POST":
-        # --- Lógica para gerar o número do Orçamento ---
-        ano_atual = datetime.utcnow().year
-        maior_numero_orc_do_ano = db.session.query(func.max(Orcamento.numero_orcamento))\
-                                    .filter_by(ano=ano_atual).scalar()        
-       
-        if maior_numero_orc_do_ano is None:
-            proximo_numero = 1
+class CachePDF:
+    """
+    PDFs já gerados, em `pasta`/<sha256>.pdf. A chave é o hash do HTML
+    renderizado (ou do dict do motor ReportLab) mais a data e o tamanho de cada
+    arquivo local que ele usa (fotos, logomarca): qualquer mudança na OS, nos
+    itens, nas fotos, na configuração, no template ou no motor gera outra
+    chave, e o PDF antigo simplesmente
+    deixa de ser pedido. Os arquivos são apagados do menos usado para o mais
+    usado (data de modificação, renovada a cada acerto) quando a pasta passa de
+    `limite_bytes`. Acertos e falhas são contados por processo em
+    `pasta`/contadores/<pid>.json e somados em estatisticas().
+    """
+    def __init__(self, pasta, limite_bytes):
+        self.pasta = pasta
+        self.limite_bytes = limite_bytes
+        self.acertos = 0
+        self.falhas = 0
+
+    def chave(self, documento):
+        if isinstance(documento, dict):
+            hash_ = hashlib.sha256(json.dumps(documento, sort_keys=True, default=str).encode('utf-8'))
+            arquivos = documento['arquivos']
         else:
-            proximo_numero = maior_numero_orc_do_ano + 1
-
-        validade_str = request.form.get("validade_do_orcamento") or None
-
-        # --- Lógica principal ---
-        novo_orcamento = Orcamento(
-            cliente_id = cliente_id,
-            numero_orcamento = proximo_numero, # Usando o número gerado
-            ano=ano_atual,
-            equipamento = request.form.get('equipamento'),
-            marca = request.form.get('marca'),
-            modelo = request.form.get('modelo'),
-            numero_de_serie = request.form.get('numero_de_serie'),
-            validade_do_orcamento = validade_str,
-            problema_informado = request.form.get('problema_informado'),
-            problema_constatado = request.form.get('problema_constatado'),
-            observacoes_cliente = request.form.get('observacoes_cliente'),
-            observacoes_internas = request.form.get('observacoes_internas'),
-            status = request.form.get('status'),
-            data_de_criacao = datetime.now().date(),
-            tecnico_responsavel = request.form.get('tecnico_responsavel')
-        )
-        db.session.add(novo_orcamento)
-        db.session.commit()
-        
-        flash(f"Orçamento {novo_orcamento.numero_orcamento} criado com sucesso! Agora adicione os itens.", "success")
-        
-        # Redireciona para uma futura página de detalhes do orçamento
-        # return redirect(url_for("detalhes_orcamento", id=novo_orcamento.id))
-        
-        # Por enquanto, redireciona para a página do cliente
-        return redirect(url_for("detalhes_cliente", id=cliente_id))
-
-    return render_template("novo_orcamento.html", cliente = cliente)
-
-@app.route("/orcamento/deletar/<int:id>")
-@role_required('funcionario')
-def deletar_orcamento(id):
-    orcamento_a_deletar = Orcamento.query.get(id)
-    id_do_cliente = orcamento_a_deletar.cliente.id
-    db.session.delete(orcamento_a_deletar)
-    db.session.commit()
-    flash("Orçamento apagado com sucesso!", "success")
-    return redirect(url_for("detalhes_cliente", id=id_do_cliente))
-
-@app.route("/orcamento/<int:id>", methods=["GET", "POST"])
-@role_required('funcionario')
-def detalhes_orcamento(id):
-    orcamento = Orcamento.query.get(id)
-    lista_servicos = Servico.query.all()
-    lista_pecas = Peca.query.all()
-
-    
-
+            hash_ = hashlib.sha256(documento.encode('utf-8'))
+            arquivos = PADRAO_ARQUIVO_LOCAL.findall(documento)
+        for caminho in sorted(set(filter(None, arquivos))):
+            try:
+                info = os.stat(caminho)
+            except (OSError, ValueError):
+                continue
+            hash_.update(f"\0{caminho}:{info.st_mtime_ns}:{info.st_size}".encode('utf-8'))
+        return hash_.hexdigest()
+
+    def caminho(self, chave):
+        return os.path.join(self.pasta, f'{chave}.pdf')
+
+    def _contar(self, acerto):
+        if acerto:
+            self.acertos += 1
+        else:
+            self.falhas += 1
+        pasta_contadores = os.path.join(self.pasta, 'contadores')
+        try:
+            os.makedirs(pasta_contadores, exist_ok=True)
+            gravar_atomico(
+                os.path.join(pasta_contadores, f'{os.getpid()}.json'),
+                json.dumps({'acertos': self.acertos, 'falhas': self.falhas}).encode('utf-8')
+            )
+        except OSError:
+            pass
 
+    def obter(self, chave):
+        """Caminho do PDF em cache (renovando sua posição no LRU), ou None."""
+        caminho = self.caminho(chave)
+        try:
+            os.utime(caminho)
+        except FileNotFoundError:
+            self._contar(acerto=False)
+            return None
+        self._contar(acerto=True)
+        return caminho
+
+    def guardar(self, chave, conteudo):
+        os.makedirs(self.pasta, exist_ok=True)
+        gravar_atomico(self.caminho(chave), conteudo)
+        self.podar()
+
+    def _arquivos(self):
+        try:
+            entradas = [entrada for entrada in os.scandir(self.pasta) if entrada.name.endswith('.pdf')]
+        except FileNotFoundError:
+            return []
+        arquivos = []
+        for entrada in entradas:
+            try:
+                info = entrada.stat()
+            except FileNotFoundError:
+                continue
+            arquivos.append((info.st_mtime, info.st_size, entrada.path))
+        return arquivos
+
+    def podar(self):
+        """Remove os PDFs usados há mais tempo até a pasta caber no limite."""
+        arquivos = self._arquivos()
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= self.limite_bytes:
+                break
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+            total -= tamanho
+
+    def estatisticas(self):
+        acertos = falhas = 0
+        pasta_contadores = os.path.join(self.pasta, 'contadores')
+        if os.path.isdir(pasta_contadores):
+            for entrada in os.scandir(pasta_contadores):
+                try:
+                    with open(entrada.path, encoding='utf-8') as arquivo:
+                        contadores = json.load(arquivo)
+                except (OSError, ValueError):
+                    continue
+                acertos += contadores['acertos']
+                falhas += contadores['falhas']
+        arquivos = self._arquivos()
+        return {
+            'acertos': acertos,
+            'falhas': falhas,
+            'taxa_de_acerto': round(acertos / (acertos + falhas), 3) if acertos + falhas else None,
+            'arquivos': len(arquivos),
+            'bytes': sum(tamanho for _, tamanho, _ in arquivos),
+            'limite_bytes': self.limite_bytes,
+        }
+
+
+cache_pdf = CachePDF(
+    os.environ.get('PDF_CACHE_PASTA') or os.path.join(PASTA_INSTANCIA, 'pdf_cache'),
+    PDF_CACHE_MAX_MB * 1024 * 1024
+)
 
-    if request.method == "POST":
-        equipamento = request.form.get('equipamento')
-        marca = request.form.get('marca')
-        modelo = request.form.get('modelo')
-        numero_de_serie = request.form.get('numero_de_serie')
-        
-        problema_informado = request.form.get('problema_informado')
-        problema_constatado = request.form.get('problema_constatado')
-        observacoes_cliente = request.form.get('observacoes_cliente')
-        observacoes_internas = request.form.get('observacoes_internas')
-        status = request.form.get('status')
-        tecnico_responsavel = request.form.get('tecnico_responsavel')
-
-        orcamento.equipamento = equipamento
-        orcamento.marca = marca
-        orcamento.modelo = modelo
-        orcamento.numero_de_serie = numero_de_serie
-        orcamento.validade_do_orcamento = request.form.get("validade_do_orcamento") or None
-        orcamento.problema_informado = problema_informado
-        orcamento.problema_constatado = problema_constatado
-        orcamento.observacoes_cliente = observacoes_cliente
-        orcamento.observacoes_internas = observacoes_internas
-        orcamento.status = status
-        orcamento.tecnico_responsavel = tecnico_responsavel
-    
-        db.session.commit()
 
-        return redirect(url_for("detalhes_cliente", id=orcamento.cliente_id))
-    
-    return render_template("detalhes_orcamento.html", orcamento = orcamento, lista_servicos = lista_servicos, lista_pecas=lista_pecas)
+def _estourar_tempo(signum, frame):
+    raise TimeoutError("Tempo limite de geração do PDF excedido.")
 
 
-
-@app.route("/orcamento/item_servico/adicionar/<int:orcamento_id>", methods=["POST"])
-@role_required('funcionario')
-def adicionar_servico_orcamento(orcamento_id):
+def converter_com_prazo(documento, timeout):
     """
-    Rota para adicionar um item de serviço a um orçamento específico.
+    Executada dentro de um processo de pool: devolve (conteúdo do PDF, None)
+    ou (None, mensagem de erro). O SIGALRM interrompe documentos que passam de
+    `timeout` segundos sem derrubar o processo (no Windows não há alarme e
+    vale só o prazo conferido por quem espera o resultado).
     """
-    orcamento = Orcamento.query.get_or_404(orcamento_id)
-    
-    # Pega os dados do formulário
-    servico_id = request.form.get("servico_id")
-    quantidade = request.form.get("quantidade", 1, type=int) # Padrão é 1
-    preco_cobrado_str = request.form.get("preco_cobrado")
-
-    # Busca o serviço no banco de dados para pegar o preço padrão
-    servico = Servico.query.get(servico_id)
-    if not servico:
-        flash("Serviço não encontrado!", "danger")
-        return redirect(url_for("detalhes_orcamento", id=orcamento_id))
-
-    # Define o preço a ser usado
-    if preco_cobrado_str:
-        preco_cobrado = float(preco_cobrado_str.replace(",", "."))
-    else:
-        preco_cobrado = servico.preco_unitario # Usa o preço padrão do serviço
-
-    # Cria o novo item de serviço para o orçamento
-    novo_item = ItemOrcamentoServico(
-        quantidade=quantidade,
-        preco_cobrado=preco_cobrado,
-        orcamento_id=orcamento.id,
-        servico_id=servico.id
-    )
-
-    db.session.add(novo_item)
-    db.session.commit()
-    
-    flash("Serviço adicionado ao orçamento com sucesso!", "success")
-    # Redireciona de volta para a página de detalhes, focando na seção de serviços
-    return redirect(url_for("detalhes_orcamento", id=orcamento_id) + "#adicionar_servico")
+    alarme = hasattr(signal, 'SIGALRM')
+    if alarme:
+        signal.signal(signal.SIGALRM, _estourar_tempo)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        conteudo = documento_para_pdf(documento)
+        erro = None if conteudo else "O gerador de PDF não conseguiu converter o documento."
+    except Exception as e:
+        conteudo, erro = None, str(e) or e.__class__.__name__
+    finally:
+        if alarme:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return conteudo, erro
 
 
-@app.route("/orcamento/item_servico/remover/<int:item_id>", methods=["POST"])
-@role_required('funcionario')
-def remover_servico_orcamento(item_id):
+def renderizar_pdf_em_arquivo(documento, destino, marcador, timeout):
     """
-    Rota para remover um item de serviço de um orçamento.
+    Executada dentro de um processo do pool: gera o PDF em `destino` ou grava
+    a mensagem de erro em `marcador`.erro (`marcador`.inicio marca que o job
+    começou).
     """
-    item_a_remover = ItemOrcamentoServico.query.get_or_404(item_id)
-    orcamento_id = item_a_remover.orcamento_id
-    
-    db.session.delete(item_a_remover)
-    db.session.commit()
-    
-    flash("Serviço removido do orçamento com sucesso!", "success")
-    return redirect(url_for("detalhes_orcamento", id=orcamento_id) + "#adicionar_servico")
-
+    with open(marcador + '.inicio', 'wb'):
+        pass
+    conteudo, erro = converter_com_prazo(documento, timeout)
 
-@app.route("/orcamento/item_peca/adicionar/<int:orcamento_id>", methods=["POST"])
-@role_required('funcionario')
-def adicionar_peca_orcamento(orcamento_id):
-    """
-    Rota para adicionar um item de peça a um orçamento específico.
-    """
-    orcamento = Orcamento.query.get_or_404(orcamento_id)
-    
-    # Pega os dados do formulário
-    peca_id = request.form.get("peca_id")
-    quantidade = request.form.get("quantidade", 1, type=int)
-    preco_cobrado_str = request.form.get("preco_cobrado")
-
-    # Busca a peça para pegar o preço padrão
-    peca = Peca.query.get(peca_id)
-    if not peca:
-        flash("Peça não encontrada!", "danger")
-        return redirect(url_for("detalhes_orcamento", id=orcamento_id))
-
-    # Define o preço
-    if preco_cobrado_str:
-        preco_cobrado = float(preco_cobrado_str.replace(",", "."))
+    if conteudo:
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        gravar_atomico(destino, conteudo)
     else:
-        preco_cobrado = peca.preco_unitario
-
-    # Cria o novo item de peça para o orçamento
-    novo_item = ItemOrcamentoPeca(
-        quantidade=quantidade,
-        preco_cobrado=preco_cobrado,
-        orcamento_id=orcamento.id,
-        peca_id=peca.id
-    )
-
-    db.session.add(novo_item)
-    db.session.commit()
-    
-    flash("Peça adicionada ao orçamento com sucesso!", "success")
-    return redirect(url_for("detalhes_orcamento", id=orcamento_id) + "#adicionar_peca")
+        gravar_atomico(marcador + '.erro', erro.encode('utf-8'))
 
 
-@app.route("/orcamento/item_peca/remover/<int:item_id>", methods=["POST"])
-@role_required('funcionario')
-def remover_peca_orcamento(item_id):
+class FilaPDF:
     """
-    Rota para remover um item de peça de um orçamento.
+    Pool de processos para o xhtml2pdf com fila limitada a `fila_max` jobs por
+    worker do gunicorn. O pool é criado na primeira utilização (depois do fork
+    do gunicorn) e refeito se quebrar. Arquivos de cada job em `pasta`:
+      <id>.json    dados do pedido (chave no cache, nome do arquivo, usuário, prazo, volta)
+      <id>.inicio  criado quando um processo do pool pega o job
+      <id>.erro    mensagem de erro
+    O PDF pronto vai direto para o `cache`.
     """
-    item_a_remover = ItemOrcamentoPeca.query.get_or_404(item_id)
-    orcamento_id = item_a_remover.orcamento_id
-    
-    db.session.delete(item_a_remover)
-    db.session.commit()
-    
-    flash("Peça removida do orçamento com sucesso!", "success")
-    return redirect(url_for("detalhes_orcamento", id=orcamento_id) + "#adicionar_peca")
-
-# app.py
-
-@app.route("/orcamento/<int:orcamento_id>/adicionar_foto", methods=["POST"])
-@login_required
-@role_required('funcionario')
-def adicionar_foto_orcamento(orcamento_id):
-    if 'foto' not in request.files:
-        return redirect(request.referrer)
-    
-    file = request.files['foto']
-    legenda = request.form.get('legenda', '')
-
-    if file.filename == '' or not allowed_file(file.filename):
-        return redirect(request.referrer)
-
-    if file:
-        timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
-        original_filename = secure_filename(file.filename)
-        novo_nome_arquivo = f"{timestamp}_{original_filename}"
-        
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-        file.save(os.path.join(app.config['UPLOAD_FOLDER'], novo_nome_arquivo))
-
-        # AQUI, conectamos a foto ao ORÇAMENTO
-        nova_foto = Foto(
-            nome_arquivo=novo_nome_arquivo,
-            legenda=legenda,
-            orcamento_id=orcamento_id # Usamos orcamento_id
-        )
-        db.session.add(nova_foto)
-        db.session.commit()
-        flash("Foto adicionada com sucesso!", "success")
-
-    return redirect(url_for('detalhes_orcamento', id=orcamento_id) + "#adicionar-foto")
-
-
-@app.route("/orcamento/<int:foto_id>/remover_foto", methods=["POST"])
-@login_required
-@role_required('funcionario')
-def remover_foto_orcamento(foto_id):
-    foto_a_remover = Foto.query.get_or_404(foto_id)
-    
-    # Precisamos saber para qual orçamento voltar
-    orcamento_id = foto_a_remover.orcamento_id 
-
-    caminho_arquivo = os.path.join(app.config['UPLOAD_FOLDER'], foto_a_remover.nome_arquivo)
-
-    try:
-        if os.path.exists(caminho_arquivo):
-            os.remove(caminho_arquivo)
-        
-        db.session.delete(foto_a_remover)
-        db.session.commit()
-        flash("Foto apagada com sucesso!", "success")
-    except Exception as e:
-        print(f"Erro ao deletar foto: {e}")
-        db.session.rollback()
-
-    return redirect(url_for('detalhes_orcamento', id=orcamento_id) + "#fotos_equipamento")
-
-@app.route("/orcamento/pdf/<int:orcamento_id>")
-@login_required
-@role_required('funcionario')
-def gerar_pdf_orcamento(orcamento_id):
-    # 1. Busca os dados do orçamento
-    orcamento = Orcamento.query.get_or_404(orcamento_id)
-    
-    # 2. Renderiza o template HTML específico para o PDF
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    html_renderizado = render_template("template_pdf_orcamento.html", orcamento=orcamento, base_dir=base_dir)
-    
-    # 3. Prepara um "arquivo" em memória para receber o PDF
-    result = BytesIO()
-    
-    # 4. Converte o HTML para PDF e salva no "result"
-    pdf = pisa.pisaDocument(BytesIO(html_renderizado.encode("UTF-8")), result)
-    
-    # 5. Se não houver erro na conversão, retorna o PDF para download
-    if not pdf.err:
-        nome_arquivo = f"Orcamento-{orcamento.numero_formatado}.pdf"
-        flash("PDF gerado com sucesso!", "success")
-        return Response(
-            result.getvalue(),
-            mimetype="application/pdf",
-            headers={"Content-disposition": f"attachment; filename={nome_arquivo}"}
-        )
-        
-    # Se houver algum erro, retorna uma mensagem de erro
-    flash("Ocorreu um erro ao gerar o PDF.", "danger")
-    return redirect(url_for('detalhes_orcamento', id=orcamento_id))
-
-@app.route("/orcamento/exibir_pdf/<int:orcamento_id>")
-@login_required
-@role_required('funcionario')
-def exibir_pdf_orcamento(orcamento_id):
-    orcamento = Orcamento.query.get_or_404(orcamento_id)
-    
-    return render_template("template_pdf_orcamento.html", orcamento=orcamento)
-
-@app.route("/orcamento/converter/<int:orcamento_id>", methods=["POST"])
-@login_required
-@role_required('funcionario')
-def converter_orcamento_para_os(orcamento_id):
-    orcamento = Orcamento.query.get_or_404(orcamento_id)
-
-    if orcamento.status != 'Aprovado':
-        flash("Apenas orçamentos aprovados podem ser convertidos em OS.", "warning")
-        return redirect(url_for('detalhes_orcamento', id=orcamento_id))
-
-    os_existente = OrdemServico.query.filter_by(orcamento_id=orcamento.id).first()
-    if os_existente:
-        flash(f"Este orçamento já foi convertido na OS #{os_existente.numero_formatado}.", "info")
-        return redirect(url_for('detalhes_os', id=os_existente.id))
-
-    ano_atual = datetime.utcnow().year
-    maior_numero_os_do_ano = db.session.query(func.max(OrdemServico.numero_sequencial)).filter_by(ano=ano_atual).scalar()
-    novo_numero_sequencial = 1 if maior_numero_os_do_ano is None else maior_numero_os_do_ano + 1
-
-    # --- LÓGICA DE CÓPIA ATUALIZADA ---
-    nova_os = OrdemServico(
-        cliente_id=orcamento.cliente_id,
-        numero_sequencial=novo_numero_sequencial,
-        ano=ano_atual,
-        equipamento=orcamento.equipamento,
-        marca=orcamento.marca,
-        modelo=orcamento.modelo,
-        status='Em andamento',
-        orcamento_id=orcamento.id,
-        
-        # Copiando os novos campos
-        numero_de_serie=orcamento.numero_de_serie,
-        tecnico_responsavel=orcamento.tecnico_responsavel,
-        defeito=orcamento.problema_informado, # 'defeito' na OS recebe 'problema_informado'
-        problema_constatado=orcamento.problema_constatado,
-        observacoes_cliente=orcamento.observacoes_cliente,
-        observacoes_internas=orcamento.observacoes_internas
-    )
-    db.session.add(nova_os)
-    
-    for item_orc in orcamento.itens_servico:
-        novo_item_servico = ItemServico(
-            quantidade=item_orc.quantidade,
-            preco_cobrado=item_orc.preco_cobrado,
-            servico_id=item_orc.servico_id,
-            ordem_servico=nova_os
-        )
-        db.session.add(novo_item_servico)
-
-    for item_orc in orcamento.itens_peca:
-        novo_item_peca = ItemPeca(
-            quantidade=item_orc.quantidade,
-            preco_cobrado=item_orc.preco_cobrado,
-            peca_id=item_orc.peca_id,
-            ordem_servico=nova_os
-        )
-        db.session.add(novo_item_peca)
-
-    for foto in orcamento.fotos:
-        foto.ordem_servico_id = nova_os.id
-    
-    orcamento.status = 'Convertido em OS'
-    
-    db.session.commit()
-
-    flash(f"Orçamento convertido com sucesso na OS #{nova_os.numero_formatado}!", "success")
-    return redirect(url_for('detalhes_os', id=nova_os.id))
-
-@app.route("/curriculo/novo")
-@login_required
-@role_required('funcionario')
-def novo_curriculo():
-    novo_curriculo = Curriculo(data_criacao = datetime.now())
-    db.session.add(novo_curriculo)
-    db.session.commit()
-
-    return redirect(url_for('curriculo_passo1', curriculo_id=novo_curriculo.id))
-
-@app.route("/curriculo/passo1/<int:curriculo_id>", methods=["GET", "POST"])
-@login_required
-@role_required('funcionario')
-def curriculo_passo1(curriculo_id):
-    curriculo = Curriculo.query.get_or_404(curriculo_id)
-    form = CurriculoPasso1Form()
-
-    if form.validate_on_submit():
-        curriculo.nome = form.nome.data
-        curriculo.estado_civil = form.estado_civil.data
-        curriculo.idade = form.idade.data
-        curriculo.endereco = form.endereco.data
-        curriculo.telefone_principal = form.telefone_principal.data
-        curriculo.email = form.email.data
-
-        db.session.commit()
-        flash("Passo um concluido com sucesso!", "success")
-
-        return redirect(url_for('curriculo_passo2', curriculo_id=curriculo.id))
-    if request.method == "GET":
-        form.nome.data = curriculo.nome
-        form.estado_civil.data = curriculo.estado_civil
-        form.idade.data = curriculo.idade
-        form.endereco.data = curriculo.endereco
-        form.telefone_principal.data = curriculo.telefone_principal
-        form.email.data = curriculo.email
-    
-    return render_template("curriculo_passo1.html", form=form)
-
-@app.route("/curriculo/passo2/<int:curriculo_id>", methods=["GET", "POST"])
-@login_required
-@role_required('funcionario')
-def curriculo_passo2(curriculo_id):
-    curriculo = Curriculo.query.get_or_404(curriculo_id)
-    form = CurriculoPasso2Form()
-
-    if form.validate_on_submit():
-        lista_de_descricoes = form.formacoes.data
-        lista_de_cursos = form.cursos.data
-        for formacoes in curriculo.formacoes:
-            db.session.delete(formacoes)
-        for cursos in curriculo.cursos:
-            db.session.delete(cursos)
-
-
-        for descricao in lista_de_descricoes:
-            if descricao:
-                nova_formacao = FormacaoAcademica(descricao=descricao, curriculo_id=curriculo.id)
-                db.session.add(nova_formacao)
-
-        for descricao in lista_de_cursos:
-            if descricao:
-                novo_curso = Curso(descricao=descricao, curriculo_id=curriculo.id)
-                db.session.add(novo_curso)
-
-        db.session.commit()
-        flash("Formações cadastradas com sucesso!", "success")
-
-        return redirect(url_for('curriculo_passo3', curriculo_id=curriculo.id))
-    if request.method == "GET":
-        formacoes_atuais = curriculo.formacoes
-        cursos_atuais = curriculo.cursos
-        lista_de_descricoes = [formacao.descricao for formacao in formacoes_atuais]
-        lista_de_cursos = [curso.descricao for curso in cursos_atuais]
-        form = CurriculoPasso2Form(formacoes=lista_de_descricoes, cursos=lista_de_cursos)
-
-    return render_template("curriculo_passo2.html", form=form)
-
-@app.route("/curriculo/passo3/<int:curriculo_id>", methods=["GET", "POST"])
-@login_required
-@role_required('funcionario')
-def curriculo_passo3(curriculo_id):
-    curriculo = Curriculo.query.get_or_404(curriculo_id)
-    form = CurriculoPasso3Form()
-
-    if form.validate_on_submit():
-        lista_de_experiencias  = form.experiencias.data
-        for experiencias in curriculo.experiencias:
-            db.session.delete(experiencias)
-        
-        for dados_experiencia in lista_de_experiencias:
-            if dados_experiencia['empresa'] and dados_experiencia['cargo']:
-                nova_experiencia = ExperienciaProfissional(
-                    empresa = dados_experiencia['empresa'],
-                    cargo = dados_experiencia['cargo'],
-                    data_admissao = dados_experiencia['data_admissao'],
-                    data_demissao = dados_experiencia['data_demissao'],
-                    desabilitar_datas = dados_experiencia['desabilitar_datas'],
-                    periodo = dados_experiencia['periodo'],
-                    curriculo_id = curriculo.id
+    def __init__(self, pasta, cache, workers, fila_max, timeout, ttl):
+        self.pasta = pasta
+        self.cache = cache
+        self.workers = workers
+        self.fila_max = fila_max
+        self.timeout = timeout
+        self.ttl = ttl
+        self._pool = None
+        self._pid = None
+        self._pendentes = set()
+        self._trava = threading.Lock()
+        self._ultima_limpeza = 0.0
+
+    def caminho(self, job_id, extensao):
+        return os.path.join(self.pasta, f'{job_id}.{extensao}')
+
+    def _obter_pool(self):
+        if self._pool is None or self._pid != os.getpid():
+            # spawn: o filho não herda threads nem conexões do worker
+            contexto = multiprocessing.get_context('spawn')
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=contexto)
+            self._pid = os.getpid()
+            self._pendentes = set()
+        return self._pool
+
+    def _descartar_pool(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+    def _finalizar(self, job_id, futuro):
+        if futuro.cancelled() or futuro.exception() is not None:
+            # Processo do pool morreu (ou job cancelado) sem gravar o resultado
+            motivo = "cancelado" if futuro.cancelled() else repr(futuro.exception())
+            try:
+                gravar_atomico(self.caminho(job_id, 'erro'), f"Falha no gerador de PDF: {motivo}".encode('utf-8'))
+            except OSError:
+                pass
+        else:
+            self.cache.podar()
+
+    def limpar_antigos(self):
+        """Apaga arquivos de jobs com mais de `ttl` segundos (no máximo uma vez por minuto)."""
+        agora = time.time()
+        if agora - self._ultima_limpeza < 60:
+            return
+        self._ultima_limpeza = agora
+        try:
+            entradas = list(os.scandir(self.pasta))
+        except FileNotFoundError:
+            return
+        for entrada in entradas:
+            try:
+                if agora - entrada.stat().st_mtime > self.ttl:
+                    os.remove(entrada.path)
+            except OSError:
+                pass
+
+    def enviar(self, documento, chave, nome_arquivo, voltar):
+        """
+        Coloca a conversão na fila e devolve o id do job, ou None quando o PDF
+        deve ser gerado na própria requisição (pool desligado ou indisponível).
+        Se o PDF de `chave` já está no cache o job nasce pronto.
+        Levanta FilaPDFCheia se este worker já tem `fila_max` PDFs pendentes.
+        """
+        if self.workers <= 0:
+            return None
+
+        with self._trava:
+            pronto = os.path.exists(self.cache.caminho(chave))
+            self._pendentes = {futuro for futuro in self._pendentes if not futuro.done()}
+            if not pronto and len(self._pendentes) >= self.fila_max:
+                raise FilaPDFCheia()
+
+            os.makedirs(self.pasta, exist_ok=True)
+            self.limpar_antigos()
+            job_id = uuid.uuid4().hex
+            dados = {
+                'chave': chave,
+                'nome_arquivo': nome_arquivo,
+                'voltar': voltar,
+                'usuario_id': current_user.get_id(),
+                # pior caso da fila andar até este job (inclui subir o pool)
+                'prazo_inicio': time.time() + self.timeout * (self.fila_max // self.workers + 1),
+            }
+            gravar_atomico(self.caminho(job_id, 'json'), json.dumps(dados).encode('utf-8'))
+            if pronto:
+                return job_id
+
+            try:
+                futuro = self._obter_pool().submit(
+                    renderizar_pdf_em_arquivo, documento, self.cache.caminho(chave),
+                    os.path.join(self.pasta, job_id), self.timeout
                 )
-                db.session.add(nova_experiencia)
-
-        db.session.commit()
-        flash("Experiências cadastradas com sucesso!", "success")
-
-        return redirect(url_for('curriculo_passo4', curriculo_id=curriculo.id))
-    if request.method == "GET":
-        experiencias_atuais = curriculo.experiencias
-        dados_para_o_form = []
-        for experiencia in experiencias_atuais:
-            dados_para_o_form.append({
-                'empresa': experiencia.empresa,
-                'cargo': experiencia.cargo,
-                'data_admissao': experiencia.data_admissao,
-                'data_demissao': experiencia.data_demissao,
-                'desabilitar_datas': experiencia.desabilitar_datas,
-                'periodo': experiencia.periodo
-            })
-        form = CurriculoPasso3Form(experiencias=dados_para_o_form)
+            except (BrokenProcessPool, OSError, RuntimeError, NotImplementedError):
+                logger.exception("Pool de PDF indisponível, gerando na requisição")
+                self._descartar_pool()
+                os.remove(self.caminho(job_id, 'json'))
+                return None
+
+            futuro.add_done_callback(lambda futuro: self._finalizar(job_id, futuro))
+            self._pendentes.add(futuro)
+        return job_id
+
+    def consultar(self, job_id):
+        """
+        Estado do job: dict com 'estado' ('pendente', 'pronto', 'erro' ou
+        'expirado') e os dados gravados no envio, ou None se não existe.
+        """
+        if not PADRAO_JOB_PDF.fullmatch(job_id):
+            return None
+        try:
+            with open(self.caminho(job_id, 'json'), encoding='utf-8') as arquivo:
+                job = json.load(arquivo)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if os.path.exists(self.cache.caminho(job['chave'])):
+            job['estado'] = 'pronto'
+        elif os.path.exists(self.caminho(job_id, 'erro')):
+            with open(self.caminho(job_id, 'erro'), encoding='utf-8') as arquivo:
+                job['estado'], job['mensagem'] = 'erro', arquivo.read()
+        elif self._expirou(job_id, job):
+            job['estado'], job['mensagem'] = 'expirado', "A geração do PDF demorou demais."
+        else:
+            job['estado'] = 'pendente'
+        return job
 
-    return render_template("curriculo_passo3.html", form=form)
+    def _expirou(self, job_id, job):
+        # Segundos de folga além do timeout para o alarme agir e o arquivo ser gravado
+        try:
+            inicio = os.stat(self.caminho(job_id, 'inicio')).st_mtime
+        except FileNotFoundError:
+            return time.time() > job['prazo_inicio']
+        return time.time() > inicio + self.timeout + 5
 
-@app.route("/curriculo/passo4/<int:curriculo_id>", methods=["GET", "POST"])
-@login_required
-@role_required('funcionario')
-def curriculo_passo4(curriculo_id):
-    curriculo = Curriculo.query.get_or_404(curriculo_id)
-    form = CurriculoPasso4Form()
 
-    if form.validate_on_submit():
-        curriculo.objetivo = form.objetivo.data
+fila_pdf = FilaPDF(
+    os.path.join(PASTA_INSTANCIA, 'pdf_jobs'), cache_pdf,
+    PDF_WORKERS, PDF_FILA_MAX, PDF_TIMEOUT, PDF_JOBS_TTL
+)
 
-        db.session.commit()
-        flash("Passo 4 concluido com sucesso!", "success")
 
-        return redirect(url_for('curriculo_passo_final', curriculo_id=curriculo.id))
-    
-    if request.method == "GET":
-        if curriculo.objetivo != None:
-            form.objetivo.data = curriculo.objetivo
-        else:
-            form.objetivo.data = """Busco uma vaga no mercado de trabalho, numa empresa onde eu possa
-me desenvolver profissionalmente, demonstrar minhas competências e habilidades
-técnicas e emocionais e, em conjunto com os meus colegas e gestores, eu possa
-colaborar para o crescimento da organização e do grupo"""
-        
-    return render_template("curriculo_passo4.html", form=form)
-
-@app.route("/curriculo/passo_final/<int:curriculo_id>")
-@login_required
-@role_required('funcionario')
-def curriculo_passo_final(curriculo_id):
-    curriculo = Curriculo.query.get_or_404(curriculo_id)
-    
-    return render_template("curriculo_preview.html", curriculo=curriculo)
-
-@app.route("/curriculo/<int:curriculo_id>/download_pdf")
-@login_required
-@role_required('funcionario')
-def download_curriculo_pdf(curriculo_id):
-    # 1. Busca os dados (igual a antes)
-    curriculo = Curriculo.query.get_or_404(curriculo_id)
-    
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    # 2. Renderiza um template HTML para uma string (igual a antes)
-    # Lembre-se que tínhamos falado em criar um pdf_template.html limpo
-    html_renderizado = render_template("curriculo_preview.html", curriculo=curriculo, para_pdf = True)
-    
-    # 3. Prepara um "arquivo" em memória para receber o PDF
-    result = BytesIO()
-    
-    # 4. Mágica do xhtml2pdf: converte o HTML para PDF e salva no "result"
-    pdf = pisa.pisaDocument(BytesIO(html_renderizado.encode("UTF-8")), result)
-    
-    # 5. Se não houve erro na conversão...
-    if not pdf.err:
-        # Cria um nome de arquivo dinâmico
-        nome_arquivo = f"Curriculo-{curriculo.nome}.pdf"
-        # Retorna o PDF para o navegador como um download
-        flash("PDF gerado com sucesso!", "success")
-        return Response(
-            result.getvalue(),
-            mimetype="application/pdf",
-            headers={"Content-disposition": f"attachment; filename={nome_arquivo}"}
-        )
-        
-    
-    # Se houve algum erro, retorna uma mensagem simples
-    return flash("Ocorreu um erro ao gerar o PDF."), 500
-
-@app.route("/curriculos")
-@login_required
-@role_required('funcionario')
-def listar_curriculos():
-    page = request.args.get('page', 1, type=int)
-    termos_busca = request.args.get('busca', '')
-    query = Curriculo.query
-
-    if termos_busca:
-        query = query.filter(Curriculo.nome.ilike(f'%{termos_busca}%'))
-
-    paginacao = query.order_by(Curriculo.nome).paginate(page=page, per_page=15, error_out=False)
-
-    curriculos = paginacao.items
-                                      
-    return render_template('listar_curriculos.html', curriculos=curriculos, paginacao = paginacao, termos_busca=termos_busca)
-
-@app.route("/curriculos/deletar/<int:curriculo_id>")
-@login_required
-@role_required('funcionario')
-def deletar_curriculo(curriculo_id): 
-    curriculo_a_deletar = Curriculo.query.get_or_404(curriculo_id)
-    db.session.delete(curriculo_a_deletar)
-    db.session.commit()
-    flash("Curriculo apagado com sucesso!", "success")
-    return redirect(url_for('listar_curriculos'))
-
-@app.route("/curriculo/<int:curriculo_id>/download_word")
-@login_required
-@role_required('funcionario')
-def download_curriculo_word(curriculo_id):
-    curriculo = Curriculo.query.get_or_404(curriculo_id)
-    html_renderizado = render_template("curriculo_preview.html", curriculo=curriculo, para_pdf = True)
-    
-    parser = HtmlToDocx()
+def enviar_pdf(caminho, nome_arquivo):
+    return send_file(caminho, mimetype="application/pdf", as_attachment=True, download_name=nome_arquivo)
 
-    docx = parser.parse_html_string(html_renderizado)
 
-    buffer = BytesIO()
-    docx.save(buffer)
-    buffer.seek(0)
-    
-    return send_file(
-        buffer, 
-        as_attachment=True, 
-        download_name=f'Curriculo-{curriculo.nome}.docx', 
-        mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-        
-@app.route("/contrato/novo", methods=["POST", "GET"])
-@login_required
-@role_required('funcionario')
-def novo_contrato():
-    form = ContratoForm()
-
-    if form.validate_on_submit():
-        novo_contrato = Contrato()
-        novo_contrato.locador_nome = form.locador_nome.data
-        novo_contrato.locador_rg = form.locador_rg.data
-        novo_contrato.locador_cpf = form.locador_cpf.data
-        novo_contrato.locador_endereco = form.locador_endereco.data
-        
-        novo_contrato.locatario_nome = form.locatario_nome.data
-        novo_contrato.locatario_rg = form.locatario_rg.data
-        novo_contrato.locatario_cpf = form.locatario_cpf.data
-        novo_contrato.locatario_endereco = form.locatario_endereco.data
-        
-        novo_contrato.endereco_imovel = form.endereco_imovel.data
-        novo_contrato.finalidade = form.finalidade.data
-        novo_contrato.prazo_meses = form.prazo_meses.data
-        novo_contrato.data_inicio = form.data_inicio.data
-        novo_contrato.data_fim = form.data_fim.data
-        novo_contrato.dia_pagamento = form.dia_pagamento.data
-        novo_contrato.indice_reajuste = form.indice_reajuste.data
-        novo_contrato.multa_percentual = form.multa_percentual.data
-        novo_contrato.juros_percentual = form.juros_percentual.data
-        valor_str = form.valor_aluguel.data or '0'
-
-        # Tenta converter para um número float, tratando os formatos brasileiros
-        try:
-            # 1. Remove o separador de milhar (ponto)
-            # 2. Troca o separador decimal (vírgula) por ponto
-            valor_float = float(valor_str.replace('.', '').replace(',', '.'))
-        except ValueError:
-            # Se o usuário digitar um texto inválido (ex: "mil reais"), salva 0.0
-            valor_float = 0.0
-
-        # Salva o número float e limpo no banco de dados
-        novo_contrato.valor_aluguel = valor_float
-
-        novo_contrato.cidade_foro = form.cidade_foro.data
-        novo_contrato.cidade = form.cidade.data
-        novo_contrato.data_assinatura = form.data_assinatura.data
-        novo_contrato.data_criacao = datetime.now()
-
-        db.session.add(novo_contrato)
-        db.session.commit()
-        flash("Contrato criado com sucesso!", "success")
-
-        return redirect(url_for('preview_contrato', id=novo_contrato.id))
-    
-    return render_template("novo_contrato.html", form=form)
-
-@app.route("/contrato/preview/<int:id>")
-@login_required
-@role_required('funcionario')
-def preview_contrato(id):
-    contrato = Contrato.query.get_or_404(id)
-    return render_template("template_contrato.html", contrato=contrato)
-
-    
-@app.route("/contrato/<int:id>/download_pdf")
-@login_required
-@role_required('funcionario')
-def download_contrato_pdf(id):
+def responder_pdf(documento, nome_arquivo, voltar):
+    """
+    Resposta comum das rotas de PDF. `documento` é o HTML renderizado ou o dict
+    do motor ReportLab. PDF já gerado (mesma chave no cache) é devolvido na
+    hora; senão o documento vai para a fila e o usuário para a página
+    de acompanhamento (ou recebe o job em JSON com ?formato=json). Sem pool
+    disponível, gera o PDF na própria requisição, como antes.
+    """
+    em_json = request.args.get('formato') == 'json'
+    chave = cache_pdf.chave(documento)
+    em_cache = cache_pdf.obter(chave)
+    if em_cache and not em_json:
+        return enviar_pdf(em_cache, nome_arquivo)
 
-    # 1. Busca os dados (igual a antes)
-    contrato = Contrato.query.get_or_404(id)
-    
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    # 2. Renderiza um template HTML para uma string (igual a antes)
-    # Lembre-se que tínhamos falado em criar um pdf_template.html limpo
-    html_renderizado = render_template("template_contrato.html", contrato=contrato, para_pdf = True)
-    
-    # 3. Prepara um "arquivo" em memória para receber o PDF
-    result = BytesIO()
-    
-    # 4. Mágica do xhtml2pdf: converte o HTML para PDF e salva no "result"
-    pdf = pisa.pisaDocument(BytesIO(html_renderizado.encode("UTF-8")), result)
-    
-    # 5. Se não houve erro na conversão...
-    if not pdf.err:
-        # Cria um nome de arquivo dinâmico
-        nome_arquivo = f"Contrato-{contrato.locatario_nome}.pdf"
-        # Retorna o PDF para o navegador como um download
+    try:
+        job_id = fila_pdf.enviar(documento, chave, nome_arquivo, voltar)
+    except FilaPDFCheia:
+        mensagem = "Muitos PDFs sendo gerados agora. Tente novamente em alguns segundos."
+        if em_json:
+            return {'erro': mensagem}, 503, {'Retry-After': '5'}
+        flash(mensagem, "warning")
+        return redirect(voltar)
+
+    if job_id is None:
+        if em_cache:
+            return enviar_pdf(em_cache, nome_arquivo)
+        conteudo = documento_para_pdf(documento)
+        if conteudo is None:
+            flash("Ocorreu um erro ao gerar o PDF.", "danger")
+            return redirect(voltar)
+        cache_pdf.guardar(chave, conteudo)
         flash("PDF gerado com sucesso!", "success")
         return Response(
-            result.getvalue(),
+            conteudo,
             mimetype="application/pdf",
             headers={"Content-disposition": f"attachment; filename={nome_arquivo}"}
         )
-        
-    
-    # Se houve algum erro, retorna uma mensagem simples
-    return flash("Ocorreu um erro ao gerar o PDF."), 500
-
-@app.route("/contrato/<int:id>/download_word")
-@login_required
-@role_required('funcionario')
-def download_contrato_word(id):
-    contrato = Contrato.query.get_or_404(id)
-    html_renderizado = render_template("template_contrato.html", contrato=contrato, para_pdf = True)
-    
-    parser = HtmlToDocx()
 
-    docx = parser.parse_html_string(html_renderizado)
-
-    buffer = BytesIO()
-    docx.save(buffer)
-    buffer.seek(0)
-    
-    return send_file(
-        buffer, 
-        as_attachment=True, 
-        download_name=f'Contrato-{contrato.locador_nome}.docx', 
-        mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-
-@app.route("/contrato/deletar/<int:id>")
-@login_required
-@role_required('funcionario')
-def deletar_contrato(id): 
-    contrato_a_deletar = Contrato.query.get_or_404(id)
-    db.session.delete(contrato_a_deletar)
-    db.session.commit()
-    flash("Contrato apagado com sucesso!", "success")
-    return redirect(url_for('listar_contratos'))
-
-@app.route("/contrato/editar/<int:id>", methods=["GET", "POST"])
-@login_required
-@role_required('funcionario')
-def editar_contrato(id):
-    contrato = Contrato.query.get_or_404(id)
-    form = ContratoForm()
-
-    if form.validate_on_submit():
-        contrato.locador_nome = form.locador_nome.data
-        contrato.locador_rg = form.locador_rg.data
-        contrato.locador_cpf = form.locador_cpf.data
-        contrato.locador_endereco = form.locador_endereco.data
-        
-        contrato.locatario_nome = form.locatario_nome.data
-        contrato.locatario_rg = form.locatario_rg.data
-        contrato.locatario_cpf = form.locatario_cpf.data
-        contrato.locatario_endereco = form.locatario_endereco.data
-        
-        contrato.endereco_imovel = form.endereco_imovel.data
-        contrato.finalidade = form.finalidade.data
-        contrato.prazo_meses = form.prazo_meses.data
-        contrato.data_inicio = form.data_inicio.data
-        contrato.data_fim = form.data_fim.data
-        contrato.dia_pagamento = form.dia_pagamento.data
-        contrato.indice_reajuste = form.indice_reajuste.data
-        contrato.multa_percentual = form.multa_percentual.data
-        contrato.juros_percentual = form.juros_percentual.data
-        valor_str = form.valor_aluguel.data or '0' # Pega o texto do form ou '0' se estiver vazio
+    if em_json:
+        return {
+            'job': job_id,
+            'status': url_for('pdf.status_pdf', job_id=job_id),
+            'download': url_for('pdf.baixar_pdf', job_id=job_id),
+        }, 200 if em_cache else 202
+    return redirect(url_for('pdf.acompanhar_pdf', job_id=job_id))
+
+
+#Exportação de PDFs em lote
+# No fechamento do mês, todas as OS e comprovantes de entrada de um período
+# num ZIP só. O HTML de cada documento é montado na requisição (precisa do
+# banco) e convertido num pool de processos próprio da exportação, com no
+# máximo PDF_LOTE_WORKERS * 2 documentos em andamento; cada PDF entra no ZIP
+# assim que fica pronto e o ZIP vai sendo enviado ao navegador, então a
+# memória não depende do tamanho do lote. Os PDFs saem do cache_pdf e vão para
+# ele, como nas rotas avulsas. O progresso fica em instance/pdf_jobs/<lote>.lote, para a
+# página acompanhar de qualquer worker do gunicorn. Exportações longas
+# precisam de workers com threads (gthread): o worker síncrono é derrubado
+# pelo --timeout no meio do envio.
+PDF_LOTE_WORKERS = int(os.environ.get('PDF_LOTE_WORKERS', max(PDF_WORKERS, 1)))
+PDF_LOTE_MAX = int(os.environ.get('PDF_LOTE_MAX', 2000))  # documentos por exportação
+PDF_LOTE_SIMULTANEOS = int(os.environ.get('PDF_LOTE_SIMULTANEOS', 1))  # exportações por worker
+DOCUMENTOS_POR_CONSULTA = 50
+
+vagas_lote_pdf = threading.BoundedSemaphore(PDF_LOTE_SIMULTANEOS)
+
+# documentos: (modelo, pasta no ZIP)
+DOCUMENTOS_LOTE_PDF = {
+    'os': (OrdemServico, 'OS'),
+    'comprovantes': (Orcamento, 'Comprovantes'),
+}
+
+
+def filtrar_documentos_lote(modelo, data_inicio_str, data_fim_str, status, busca_nome):
+    """ids dos documentos de `modelo` que entram na exportação, em ordem de criação."""
+    query = db.session.query(modelo.id).join(Cliente)
+    # date (não datetime): serve para a coluna DateTime da OS e a Date do orçamento
+    if data_inicio_str:
+        query = query.filter(modelo.data_de_criacao >= datetime.strptime(data_inicio_str, '%Y-%m-%d').date())
+    if data_fim_str:
+        # o dia final inteiro entra
+        data_fim = datetime.strptime(data_fim_str, '%Y-%m-%d').date() + timedelta(days=1)
+        query = query.filter(modelo.data_de_criacao < data_fim)
+    if status:
+        query = query.filter(modelo.status == status)
+    if busca_nome:
+        query = query.filter(Cliente.nome.ilike(f'%{busca_nome}%'))
+    return [id_ for (id_,) in query.order_by(modelo.data_de_criacao, modelo.id)]
+
+
+def documento_lote_pdf(tipo, documento, base_dir):
+    """(nome do arquivo, documento para o PDF) iguais aos de gerar_pdf_os / gerar_comprovante_entrada_pdf."""
+    if tipo == 'os':
+        return f"OS-{documento.numero_formatado}.pdf", documento_pdf_os(documento)
+    html = render_template("template_comprovante_entrada.html", orcamento=documento,
+                           config=obter_configuracao(), para_pdf=True, base_dir=base_dir)
+    return f"Comprovante-Entrada-{documento.numero_formatado}.pdf", html
+
+
+def documentos_do_lote(selecionados):
+    """Gera (nome no ZIP, documento para o PDF) carregando os documentos do banco em grupos."""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for tipo, ids in selecionados:
+        modelo, pasta = DOCUMENTOS_LOTE_PDF[tipo]
+        for inicio in range(0, len(ids), DOCUMENTOS_POR_CONSULTA):
+            grupo = ids[inicio:inicio + DOCUMENTOS_POR_CONSULTA]
+            por_id = {documento.id: documento for documento in
+                      modelo.query.options(joinedload(modelo.cliente)).filter(modelo.id.in_(grupo))}
+            for documento in (por_id[id_] for id_ in grupo if id_ in por_id):
+                nome, conteudo = documento_lote_pdf(tipo, documento, base_dir)
+                yield f"{pasta}/{nome}", conteudo
+            # o ZIP pode levar minutos: não segura os objetos já usados na sessão
+            db.session.expunge_all()
+
+
+class ProgressoLotePDF:
+    """Contadores da exportação gravados em `caminho` a cada documento."""
+    def __init__(self, caminho, total, usuario_id):
+        self.caminho = caminho
+        self.dados = {'usuario_id': usuario_id, 'total': total, 'prontos': 0, 'erros': 0, 'estado': 'gerando'}
+        self.gravar()
+
+    def gravar(self):
         try:
-            valor_float = float(valor_str.replace('.', '').replace(',', '.')) # Remove o separador de milhar e troca a vírgula
-        except ValueError:
-            valor_float = 0.0 # Define um valor padrão em caso de erro
-
-        contrato.valor_aluguel = valor_float # Salva o número float convertido
-
-
-        contrato.cidade_foro = form.cidade_foro.data
-        contrato.cidade = form.cidade.data
-        contrato.data_assinatura = form.data_assinatura.data
-
-        db.session.commit()
-        flash("Contrato editado com sucesso!", "success")
-        return redirect(url_for('listar_contratos'))
-    
-    elif request.method == "GET":
-        form.locador_nome.data = contrato.locador_nome
-        form.locador_rg.data = contrato.locador_rg
-        form.locador_cpf.data = contrato.locador_cpf
-        form.locador_endereco.data = contrato.locador_endereco
-        
-        form.locatario_nome.data = contrato.locatario_nome
-        form.locatario_rg.data = contrato.locatario_rg
-        form.locatario_cpf.data = contrato.locatario_cpf
-        form.locatario_endereco.data = contrato.locatario_endereco
-        
-        form.endereco_imovel.data = contrato.endereco_imovel
-        form.finalidade.data = contrato.finalidade 
-        form.prazo_meses.data = contrato.prazo_meses
-        form.data_inicio.data = contrato.data_inicio
-        form.data_fim.data = contrato.data_fim
-        form.valor_aluguel.data = contrato.valor_aluguel
-        form.dia_pagamento.data = contrato.dia_pagamento
-        form.indice_reajuste.data = contrato.indice_reajuste
-        form.multa_percentual.data = contrato.multa_percentual
-        form.juros_percentual.data = contrato.juros_percentual
-        form.valor_aluguel.data = contrato.valor_aluguel
-
-        form.cidade_foro.data = contrato.cidade_foro
-        form.cidade.data = contrato.cidade
-        form.data_assinatura.data = contrato.data_assinatura
-    
-    return render_template("novo_contrato.html", form=form, contrato=contrato)
-
-@app.route("/contratos") # Ou a URL que você preferir
-@login_required
-@role_required('funcionario')
-def listar_contratos():
-    # 1. Pega o termo de busca (igual antes)
-    page = request.args.get('page', 1, type=int)
-    termos_busca = request.args.get('busca', '')
-    
-    # 2. Muda a query para o modelo Contrato
-    query = Contrato.query
+            os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+            gravar_atomico(self.caminho, json.dumps(self.dados).encode('utf-8'))
+        except OSError:
+            logger.exception("Não foi possível gravar o progresso da exportação de PDFs")
 
-    # 3. Muda o filtro para um campo do Contrato (ex: nome do locatário)
-    if termos_busca:
-        query = query.filter(Contrato.locatario_nome.ilike(f'%{termos_busca}%'))
+    def avancar(self, erro=False):
+        self.dados['erros' if erro else 'prontos'] += 1
+        self.gravar()
 
-    paginacao = query.order_by(Contrato.locatario_nome).paginate(page=page, per_page=15, error_out=False)
-    contratos = paginacao.items
-        
-    # 5. Renderiza o template de listagem de contratos
-    return render_template('listar_contratos.html', contratos=contratos, paginacao = paginacao, termos_busca=termos_busca)
+    def terminar(self, estado):
+        self.dados['estado'] = estado
+        self.gravar()
 
 
-@app.route("/configuracoes", methods=["GET", "POST"])
-@login_required
-@role_required('funcionario')
-def configuracoes():
-    config = Configuracao.query.first()
-    if not config:
-        config = Configuracao()
-        db.session.add(config)
-    
-    form = ConfiguracaoForm()
-    if form.validate_on_submit():
-        config.nome_loja = form.nome_loja.data
-        config.cnpj = form.cnpj.data
-        config.endereco = form.endereco.data
-        config.telefone = form.telefone.data
-
-        if form.logomarca.data:
-            logo_file = form.logomarca.data
-            filename = secure_filename(logo_file.filename)
-            logo_file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-            config.logomarca = filename
-        
-        config.texto_garantia = form.texto_garantia.data
-        config.email_contato = form.email_contato.data
-        config.site = form.site.data
-        
-        db.session.commit()
-        flash("Configurações salvas com sucesso!", "success")
-        return redirect(url_for('configuracoes'))
-    elif request.method == "GET":
-        form.nome_loja.data = config.nome_loja
-        form.cnpj.data = config.cnpj
-        form.endereco.data = config.endereco
-        form.telefone.data = config.telefone
-        form.texto_garantia.data = config.texto_garantia
-        form.email_contato.data = config.email_contato
-        form.site.data = config.site
-    
-    return render_template("configuracoes.html", form=form, config=config)
-    
-
-@app.route("/configuracoes/reset", methods=["POST"])
-@login_required
-@role_required('funcionario')
-def configuracoes_reset():
-    config = Configuracao.query.first()
-    if config:
-        db.session.delete(config)
-    db.session.commit()
-    flash("Configurações resetadas com sucesso!", "success")
-    return redirect(url_for('configuracoes'))
+def gerar_zip_pdfs(documentos, progresso):
+    """
+    Converte os documentos no pool e monta o ZIP direto no fluxo da resposta
+    (ZIP_STORED: o PDF já vem comprimido). Documentos que falham são listados
+    em ERROS.txt dentro do ZIP.
+    """
+    buffer = BufferDeSaida()
+    erros = []
+    pool = None
+    terminou = False
+    try:
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as arquivo_zip:
+            pendentes = {}
+
+            def guardar(nome, conteudo, erro):
+                if conteudo:
+                    arquivo_zip.writestr(nome, conteudo)
+                else:
+                    erros.append(f"{nome}: {erro}")
+                progresso.avancar(erro=not conteudo)
+
+            def concluir():
+                feitos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in feitos:
+                    nome, chave = pendentes.pop(futuro)
+                    try:
+                        conteudo, erro = futuro.result()
+                    except Exception as e:  # processo do pool morreu
+                        conteudo, erro = None, f"Falha no gerador de PDF: {e!r}"
+                    if conteudo:
+                        cache_pdf.guardar(chave, conteudo)  # a reimpressão avulsa sai pronta
+                    guardar(nome, conteudo, erro)
+
+            for nome, documento in documentos:
+                chave = cache_pdf.chave(documento)
+                em_cache = cache_pdf.obter(chave)
+                if em_cache:
+                    with open(em_cache, 'rb') as arquivo:
+                        guardar(nome, arquivo.read(), None)
+                else:
+                    if pool is None:
+                        pool = ProcessPoolExecutor(max_workers=PDF_LOTE_WORKERS,
+                                                   mp_context=multiprocessing.get_context('spawn'))
+                    pendentes[pool.submit(converter_com_prazo, documento, PDF_TIMEOUT)] = (nome, chave)
+                    while len(pendentes) >= PDF_LOTE_WORKERS * 2:
+                        concluir()
+                dados = buffer.retirar()
+                if dados:
+                    yield dados
+            while pendentes:
+                concluir()
+                dados = buffer.retirar()
+                if dados:
+                    yield dados
+            if erros:
+                arquivo_zip.writestr('ERROS.txt', '\n'.join(erros) + '\n')
+        terminou = True
+        yield buffer.retirar()
+    finally:
+        # Navegador cancelou o download: o pool para sem esperar os documentos da fila
+        if pool is not None:
+            pool.shutdown(wait=terminou, cancel_futures=True)
+        progresso.terminar('pronto' if terminou else 'cancelado')
+
+
+#Fotos: versões reduzidas
+# As fotos chegam do celular com vários megapixels. Cada upload ganha cópias
+# reduzidas em static/uploads/<tamanho>/: 'pdf' (JPEG para os 150px dos
+# templates de PDF, via Foto.arquivo_pdf) e 'miniatura'/'media' (WebP + JPEG
+# para a galeria, servidas por /fotos/<id>/<tamanho>, que gera na hora a que
+# estiver faltando). Fotos antigas: flask gerar-derivados-fotos.
+FOTO_PDF_LADO_MAX = int(os.environ.get('FOTO_PDF_LADO_MAX', 600))  # ~300 dpi nos 150px do PDF
+FOTO_PDF_QUALIDADE = int(os.environ.get('FOTO_PDF_QUALIDADE', 80))
+FOTO_GALERIA_QUALIDADE = int(os.environ.get('FOTO_GALERIA_QUALIDADE', 75))
+FOTO_CACHE_MAX_AGE = int(os.environ.get('FOTO_CACHE_MAX_AGE', 7 * 24 * 3600))
+FOTO_ORIGINAL_LADO_MAX = int(os.environ.get('FOTO_ORIGINAL_LADO_MAX', 3000))  # 0 = mantém a resolução
+FOTO_ORIGINAL_QUALIDADE = int(os.environ.get('FOTO_ORIGINAL_QUALIDADE', 85))
+
+# tamanho: (lado máximo em px, formatos gerados, qualidade)
+VARIANTES_FOTO = {
+    'pdf': (FOTO_PDF_LADO_MAX, ('jpg',), FOTO_PDF_QUALIDADE),
+    'miniatura': (400, ('webp', 'jpg'), FOTO_GALERIA_QUALIDADE),
+    'media': (1280, ('webp', 'jpg'), FOTO_GALERIA_QUALIDADE),
+}
+TAMANHOS_GALERIA = ('miniatura', 'media')
+FORMATOS_PILLOW = {'jpg': 'JPEG', 'webp': 'WEBP'}
+
+
+def nome_variante_foto(nome_arquivo, tamanho, formato='jpg'):
+    return f"{tamanho}/{os.path.splitext(nome_arquivo)[0]}.{formato}"
+
+
+def salvar_variantes(imagem, nome_arquivo, tamanhos):
+    """Grava as versões reduzidas de `imagem` (já na orientação certa) nos `tamanhos` pedidos."""
+    if imagem.mode != 'RGB':
+        # PNG/GIF com transparência ou paleta: fundo branco, como no papel
+        imagem = imagem.convert('RGBA')
+        fundo = Image.new('RGB', imagem.size, 'white')
+        fundo.paste(imagem, mask=imagem.getchannel('A'))
+        imagem = fundo
+    else:
+        imagem = imagem.copy()
 
-@app.route("/configuracoes/logo/remover", methods=["POST"])
-@login_required
-@role_required('funcionario')
-def configuracoes_remove_logo():
-    config = Configuracao.query.first()
+    arquivos = {}
+    for tamanho in sorted(tamanhos, key=lambda tamanho: VARIANTES_FOTO[tamanho][0], reverse=True):
+        lado, formatos, qualidade = VARIANTES_FOTO[tamanho]
+        # do maior para o menor: cada redução parte da anterior
+        imagem.thumbnail((lado, lado), Image.LANCZOS)
+        for formato in formatos:
+            saida = BytesIO()
+            imagem.save(saida, FORMATOS_PILLOW[formato], quality=qualidade, optimize=True)
+            arquivos[nome_variante_foto(nome_arquivo, tamanho, formato)] = saida.getvalue()
 
-    if config and config.logomarca:
-        caminho_arquivo = os.path.join(app.config['UPLOAD_FOLDER'], config.logomarca)
+    for nome, conteudo in arquivos.items():
+        armazenamento.salvar(nome, BytesIO(conteudo))
 
-        try:
-            if os.path.exists(caminho_arquivo):
-                os.remove(caminho_arquivo)
 
-            config.logomarca = None
-            db.session.commit()
-            flash("Logomarca removida com sucesso!", "success")
-        except Exception as e:
-            db.session.rollback()
-            flash(f"Erro ao remover a logomarca: {e}", "danger")
+def gerar_variantes_foto(nome_arquivo, tamanhos=tuple(VARIANTES_FOTO)):
+    """
+    Cria (ou refaz) as versões reduzidas da foto nos `tamanhos` pedidos,
+    decodificando o original uma vez só. Devolve False se a imagem não pôde
+    ser lida (quem usa as variantes cai no original).
+    """
+    maior = max(VARIANTES_FOTO[tamanho][0] for tamanho in tamanhos)
+    try:
+        with Image.open(armazenamento.caminho_local(nome_arquivo)) as imagem:
+            # JPEG: o decodificador já entrega a imagem reduzida (1/2, 1/4, 1/8)
+            imagem.draft('RGB', (maior, maior))
+            salvar_variantes(ImageOps.exif_transpose(imagem), nome_arquivo, tamanhos)
+    except (OSError, Image.DecompressionBombError) as e:
+        logger.warning("Não foi possível reduzir a foto %s: %s", nome_arquivo, e)
+        return False
+    return True
 
-    return redirect(url_for('configuracoes'))
 
-@app.route("/orcamento/<int:id>/comprovante_entrada_pdf", methods=["GET"])
-@login_required
-@role_required('funcionario')
-def gerar_comprovante_entrada_pdf(id):
-    orcamento = Orcamento.query.get_or_404(id)
-        
-    config = Configuracao.query.first()
-    
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    html_renderizado = render_template(
-        "template_comprovante_entrada.html",
-          orcamento=orcamento,
-          config=config,
-          para_pdf = True,
-          base_dir=base_dir
-    )
-    
-    result = BytesIO()
-    
-    pdf = pisa.pisaDocument(BytesIO(html_renderizado.encode("UTF-8")), result)
-    
-    # 5. Se não houve erro na conversão...
-    if not pdf.err:
-        # Cria um nome de arquivo dinâmico
-        nome_arquivo = f"Comprovante-Entrada-{orcamento.numero_formatado}.pdf"
-        # Retorna o PDF para o navegador como um download
-        flash("PDF gerado com sucesso!", "success")
-        return Response(
-            result.getvalue(),
-            mimetype="application/pdf",
-            headers={"Content-disposition": f"attachment; filename={nome_arquivo}"}
-        )
-        
-    
-    # Se houve algum erro, retorna uma mensagem simples
-    return flash("Ocorreu um erro ao gerar o PDF."), 500
-    
-@app.route("/utilidades/impressoras")
-@login_required
-@role_required('funcionario')
-def listar_impressoras():
-    page = request.args.get('page', 1, type=int)
-    termos_busca = request.args.get('busca', '')
-    query = Impressora.query
-
-    if termos_busca:
-        query = query.filter(Impressora.modelo.ilike(f'%{termos_busca}%'))
-
-    paginacao = query.order_by(Impressora.modelo).paginate(page=page, per_page=15, error_out=False)
-    impressoras = paginacao.items
-
-    # Vamos usar um novo template para esta página
-    return render_template(
-        'listar_impressoras.html', 
-        impressoras=impressoras, 
-        paginacao = paginacao, 
-        termos_busca=termos_busca
-    )
-
-@app.route("/utilidades/impressoras/nova", methods=["GET", "POST"])
-@login_required
-@role_required('funcionario')
-def nova_impressora():
-    form = ImpressoraForm()
-    if form.validate_on_submit():
-        # Verifica se o modelo já existe
-        modelo_existente = Impressora.query.filter_by(modelo=form.modelo.data).first()
-        if modelo_existente:
-            flash('Erro: Já existe uma impressora cadastrada com esse modelo.', 'danger')
+def processar_foto_enviada(nome_arquivo):
+    """
+    Tratamento completo de um upload, feito pelo worker de fotos: gira conforme
+    a orientação do EXIF, limita o lado maior a FOTO_ORIGINAL_LADO_MAX,
+    regrava o original sem os metadados (GPS, modelo do celular...) e gera
+    todas as variantes. GIFs mantêm o original (podem ser animados).
+    """
+    with Image.open(armazenamento.caminho_local(nome_arquivo)) as original:
+        formato = original.format
+        imagem = ImageOps.exif_transpose(original)
+        if formato in ('JPEG', 'PNG'):
+            if FOTO_ORIGINAL_LADO_MAX:
+                imagem.thumbnail((FOTO_ORIGINAL_LADO_MAX, FOTO_ORIGINAL_LADO_MAX), Image.LANCZOS)
+            saida = BytesIO()
+            if formato == 'JPEG':
+                imagem.convert('RGB').save(saida, 'JPEG', quality=FOTO_ORIGINAL_QUALIDADE, optimize=True)
+            else:
+                imagem.save(saida, 'PNG', optimize=True)
+            saida.seek(0)
+            armazenamento.salvar(nome_arquivo, saida)
+        salvar_variantes(imagem, nome_arquivo, VARIANTES_FOTO)
+
+
+def remover_derivados_foto(nome_arquivo):
+    for tamanho, (_, formatos, _) in VARIANTES_FOTO.items():
+        for formato in formatos:
+            armazenamento.remover(nome_variante_foto(nome_arquivo, tamanho, formato))
+
+
+@comandos.cli.command("gerar-derivados-fotos")
+@click.option("--refazer", is_flag=True, help="Gera de novo mesmo as versões que já existem.")
+def gerar_derivados_fotos_comando(refazer):
+    """Cria as versões reduzidas (PDF e galeria) das fotos já cadastradas."""
+    geradas = existentes = falhas = 0
+    for (nome_arquivo,) in db.session.query(Foto.nome_arquivo).yield_per(500):
+        faltando = [
+            tamanho for tamanho, (_, formatos, _) in VARIANTES_FOTO.items()
+            if refazer or not all(
+                armazenamento.existe(nome_variante_foto(nome_arquivo, tamanho, formato))
+                for formato in formatos
+            )
+        ]
+        if not faltando:
+            existentes += 1
+        elif gerar_variantes_foto(nome_arquivo, faltando):
+            geradas += 1
         else:
-            nova_imp = Impressora(
-                modelo=form.modelo.data,
-                descricao=form.descricao.data
+            falhas += 1
+    print(f"{geradas} foto(s) reduzida(s), {existentes} já estava(m) completa(s), {falhas} com erro (ficam com o original).")
+
+
+#Fila de processamento de fotos
+# O upload só grava os bytes recebidos e enfileira uma linha em
+# processamento_foto; uma thread por worker do gunicorn (ou o comando
+# "flask processar-fotos") faz o trabalho pesado com processar_foto_enviada e
+# marca Foto.pronta. Como a fila está no banco, jobs de um processo que caiu
+# são retomados: linhas 'processando' há mais de FOTO_FILA_TIMEOUT segundos
+# voltam a ser reservadas.
+FOTO_WORKER = os.environ.get('FOTO_WORKER', '1') != '0'  # 0 = só o comando processa
+FOTO_FILA_INTERVALO = int(os.environ.get('FOTO_FILA_INTERVALO', 10))
+FOTO_FILA_TIMEOUT = int(os.environ.get('FOTO_FILA_TIMEOUT', 300))
+FOTO_FILA_TENTATIVAS = 3
+
+
+class FilaFotos:
+    def __init__(self):
+        self._thread = None
+        self._pid = None
+        self._acordar = threading.Event()
+        self._trava = threading.Lock()
+
+    def reservar(self):
+        """
+        Marca o próximo job livre como 'processando' e devolve seu id (ou None).
+        O UPDATE condicional garante que dois workers não pegam o mesmo job.
+        """
+        while True:
+            limite = datetime.utcnow() - timedelta(seconds=FOTO_FILA_TIMEOUT)
+            livre = db.or_(
+                ProcessamentoFoto.status == 'pendente',
+                db.and_(ProcessamentoFoto.status == 'processando', ProcessamentoFoto.iniciado_em < limite),
             )
-            db.session.add(nova_imp)
+            candidato = db.session.query(ProcessamentoFoto.id).filter(livre)\
+                .order_by(ProcessamentoFoto.id).limit(1).scalar()
+            if candidato is None:
+                db.session.rollback()
+                return None
+            reservado = db.session.query(ProcessamentoFoto)\
+                .filter(ProcessamentoFoto.id == candidato, livre)\
+                .update({
+                    'status': 'processando',
+                    'iniciado_em': datetime.utcnow(),
+                    'tentativas': ProcessamentoFoto.tentativas + 1,
+                }, synchronize_session=False)
             db.session.commit()
-            flash('Impressora cadastrada com sucesso!', 'success')
-            return redirect(url_for('listar_impressoras'))
-
-    # Vamos criar um template simples para o formulário
-    return render_template('form_impressora.html', form=form, titulo='Nova Categoria de Link')
-
-@app.route("/utilidades/impressoras/editar/<int:id>", methods=["GET", "POST"])
-@login_required
-@role_required('funcionario')
-def editar_impressora(id):
-    impressora = Impressora.query.get_or_404(id)
-    form = ImpressoraForm()
-
-    if form.validate_on_submit():
-        impressora.modelo = form.modelo.data
-        impressora.descricao = form.descricao.data
-        db.session.commit()
-        flash('Impressora atualizada com sucesso!', 'success')
-        return redirect(url_for('listar_impressoras'))
-
-    elif request.method == "GET":
-        form.modelo.data = impressora.modelo
-        form.descricao.data = impressora.descricao
-
-    return render_template('form_impressora.html', form=form, titulo=f'Editar Categoria: {impressora.modelo}')
-
-@app.route("/utilidades/impressoras/deletar/<int:id>", methods=["POST"])
-@login_required
-@role_required('funcionario')
-def deletar_impressora(id):
-    # Usamos POST para segurança, e o botão no template já faz isso.
-    impressora = Impressora.query.get_or_404(id)
-
-    # Graças ao 'cascade' que definimos no modelo, 
-    # o banco de dados também apagará todos os 'Recursos' (links) 
-    # associados a esta impressora.
-
-    db.session.delete(impressora)
-    db.session.commit()
-    flash(f'Impressora "{impressora.modelo}" e todos os seus links foram apagados com sucesso!', 'success')
-    return redirect(url_for('listar_impressoras'))
-
-
-@app.route("/utilidades/impressoras/<int:id>/detalhes", methods=["GET", "POST"])
-@login_required
-@role_required('funcionario')
-def detalhes_impressora(id):
-    # 1. Busca a impressora (a "categoria")
-    impressora = Impressora.query.get_or_404(id)
-
-    # 2. Cria o formulário para adicionar um NOVO recurso
-    form = RecursoForm()
-
-    # 3. Lógica para salvar o NOVO recurso
-    if form.validate_on_submit():
-        novo_recurso = RecursoImpressora(
-            impressora_id = impressora.id,
-            tipo = form.tipo.data,
-            descricao = form.descricao.data,
-            sistema_operacional = form.sistema_operacional.data,
-            link_download = form.link_download.data
-        )
-        db.session.add(novo_recurso)
+            if reservado:
+                return candidato
+
+    def processar(self, job_id):
+        job = db.session.get(ProcessamentoFoto, job_id)
+        foto = db.session.get(Foto, job.foto_id)
+        if foto is None:
+            # Foto apagada antes de ser processada
+            db.session.delete(job)
+            db.session.commit()
+            return
+        try:
+            processar_foto_enviada(foto.nome_arquivo)
+        except FileNotFoundError:
+            db.session.delete(job)
+        except Exception as e:
+            logger.warning("Erro ao processar a foto %s: %s", foto.nome_arquivo, e)
+            job.erro = str(e) or e.__class__.__name__
+            if job.tentativas < FOTO_FILA_TENTATIVAS:
+                job.status = 'pendente'
+            else:
+                # Desiste: a foto segue com o original e as variantes são geradas sob demanda
+                job.status = 'erro'
+                foto.pronta = True
+        else:
+            foto.pronta = True
+            db.session.delete(job)
         db.session.commit()
-        flash('Novo recurso adicionado com sucesso!', 'success')
-        return redirect(url_for('detalhes_impressora', id=impressora.id)) # Recarrega a página
-
-    # 4. No GET, apenas busca os recursos já existentes para listar
-    recursos_cadastrados = impressora.recursos
-
-    # 5. Renderiza um novo template
-    return render_template(
-        'detalhes_impressora.html', 
-        impressora=impressora, 
-        recursos=recursos_cadastrados, 
-        form=form
-    )
-
-@app.route("/utilidades/recurso/deletar/<int:id>", methods=["POST"])
-@login_required
-@role_required('funcionario')
-def deletar_recurso(id):
-    # 1. Busca o recurso (o link) que será deletado
-    recurso = RecursoImpressora.query.get_or_404(id)
-
-    # 2. IMPORTANTE: Precisamos saber para qual impressora voltar.
-    #    Guardamos o ID da impressora "pai" antes de deletar.
-    impressora_id = recurso.impressora_id
 
-    # 3. Deleta o recurso
-    db.session.delete(recurso)
+    def processar_pendentes(self):
+        """Esvazia a fila. Devolve quantos jobs foram processados."""
+        processados = 0
+        while (job_id := self.reservar()) is not None:
+            self.processar(job_id)
+            processados += 1
+        return processados
+
+    def _executar(self, app):
+        while True:
+            try:
+                with app.app_context():
+                    self.processar_pendentes()
+            except Exception:
+                logger.exception("Falha no worker de fotos")
+            self._acordar.wait(FOTO_FILA_INTERVALO)
+            self._acordar.clear()
+
+    def iniciar(self):
+        """
+        Garante a thread do worker neste processo (criada depois do fork do
+        gunicorn). Chamar dentro de uma requisição: a thread usa o app atual.
+        """
+        if not FOTO_WORKER or (self._pid == os.getpid() and self._thread.is_alive()):
+            return
+        with self._trava:
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, args=(current_app._get_current_object(),),
+                                                name='fila-fotos', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def avisar(self):
+        """Chamar depois do commit que enfileirou fotos."""
+        self.iniciar()
+        self._acordar.set()
+
+
+fila_fotos = FilaFotos()
+
+
+def iniciar_worker_de_fotos():
+    # Retoma jobs que ficaram na fila mesmo sem novos uploads
+    fila_fotos.iniciar()
+
+
+def receber_fotos(arquivos, legenda, **documento):
+    """
+    Grava os arquivos enviados como estão e enfileira o processamento de cada
+    um. `documento` é ordem_servico_id=... ou orcamento_id=.... Devolve
+    quantas fotos foram aceitas.
+    """
+    aceitas = guardar_fotos(arquivos, legenda, **documento)
     db.session.commit()
+    if aceitas:
+        fila_fotos.avisar()
+    return len(aceitas)
 
-    flash('Recurso (link) removido com sucesso!', 'success')
 
-    # 4. Redireciona de volta para a página de detalhes da impressora
-    return redirect(url_for('detalhes_impressora', id=impressora_id))
-
-@app.route("/utilidades/recurso/editar/<int:id>", methods=["GET", "POST"])
-@login_required
-@role_required('funcionario')
-def editar_recurso(id):
+def guardar_fotos(arquivos, legenda, **documento):
+    """
+    Como receber_fotos, mas sem commit: quem chama faz o commit e depois
+    fila_fotos.avisar(). Devolve os nomes dos arquivos gravados.
+    """
+    return registrar_fotos(gravar_arquivos_fotos(arquivos), legenda, **documento)
 
-    # 1. Busca o recurso específico que queremos editar
-    recurso = RecursoImpressora.query.get_or_404(id)
 
-    # 2. Reutilizamos o mesmo formulário que já criamos
-    form = RecursoForm()
+def gravar_arquivos_fotos(arquivos):
+    """
+    Só grava os arquivos aceitos no armazenamento e devolve os nomes, sem
+    tocar no banco. Os cadastros que reservam número gravam as fotos antes de
+    reservar: a linha do contador fica travada até o commit e o upload (S3,
+    várias fotos) não pode segurar as outras OS do ano.
+    """
+    timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    nomes = []
+    for arquivo in arquivos:
+        if arquivo.filename == '' or not allowed_file(arquivo.filename):
+            continue
+        # o trecho aleatório evita colisão entre fotos de mesmo nome no mesmo segundo
+        novo_nome_arquivo = f"{timestamp}_{uuid.uuid4().hex[:8]}_{secure_filename(arquivo.filename)}"
+        armazenamento.salvar(novo_nome_arquivo, arquivo.stream)
+        nomes.append(novo_nome_arquivo)
+    return nomes
+
+
+def registrar_fotos(nomes, legenda, **documento):
+    """Adiciona na sessão as Fotos (e os jobs da fila) dos arquivos já gravados. Devolve `nomes`."""
+    for nome_arquivo in nomes:
+        nova_foto = Foto(nome_arquivo=nome_arquivo, legenda=legenda, pronta=False, **documento)
+        db.session.add(nova_foto)
+        db.session.add(ProcessamentoFoto(foto=nova_foto))
+    return nomes
+
+
+@comandos.cli.command("processar-fotos")
+@click.option("--continuo", is_flag=True, help="Continua rodando e processa novos uploads (worker dedicado).")
+def processar_fotos_comando(continuo):
+    """Processa as fotos enviadas que estão na fila."""
+    if continuo:
+        print("Processando a fila de fotos (Ctrl+C para sair)...")
+        while True:
+            fila_fotos.processar_pendentes()
+            time.sleep(FOTO_FILA_INTERVALO)
+    print(f"{fila_fotos.processar_pendentes()} foto(s) processada(s).")
+    com_erro = ProcessamentoFoto.query.filter_by(status='erro').count()
+    if com_erro:
+        print(f"{com_erro} foto(s) com erro permanente (ver processamento_foto.erro).")
+
+
+def criar_orcamento(cliente_id, dados, criado_em=None):
+    """Monta o orçamento (formulário de novo_orcamento ou envio offline) e adiciona na sessão, sem commit."""
+    # --- Lógica para gerar o número do Orçamento ---
+    ano_atual = datetime.utcnow().year
+    proximo_numero = reservar_proximo_numero('orcamento', ano_atual)
 
-    # 3. Lógica de salvamento (POST)
-    if form.validate_on_submit():
-        # Atualiza os dados do objeto 'recurso'
-        recurso.tipo = form.tipo.data
-        recurso.descricao = form.descricao.data
-        recurso.sistema_operacional = form.sistema_operacional.data
-        recurso.link_download = form.link_download.data
+    validade_str = dados.get("validade_do_orcamento") or None
 
-        db.session.commit()
-        flash('Recurso atualizado com sucesso!', 'success')
-
-        # Redireciona de volta para a página de detalhes
-        return redirect(url_for('detalhes_impressora', id=recurso.impressora_id))
-
-    # 4. Lógica de carregamento (GET)
-    elif request.method == "GET":
-        # Preenche o formulário com os dados atuais do recurso
-        form.tipo.data = recurso.tipo
-        form.descricao.data = recurso.descricao
-        form.sistema_operacional.data = recurso.sistema_operacional
-        form.link_download.data = recurso.link_download
-
-    # 5. Renderiza um novo template para o formulário de edição
-    return render_template(
-        'form_recurso.html', 
-        form=form, 
-        recurso=recurso,  # Passamos 'recurso' para o template
-        titulo=f'Editar Recurso: {recurso.descricao[:30]}...'
+    # --- Lógica principal ---
+    novo_orcamento = Orcamento(
+        cliente_id = cliente_id,
+        numero_orcamento = proximo_numero, # Usando o número gerado
+        ano=ano_atual,
+        equipamento = dados.get('equipamento'),
+        marca = dados.get('marca'),
+        modelo = dados.get('modelo'),
+        numero_de_serie = dados.get('numero_de_serie'),
+        validade_do_orcamento = validade_str,
+        problema_informado = dados.get('problema_informado'),
+        problema_constatado = dados.get('problema_constatado'),
+        observacoes_cliente = dados.get('observacoes_cliente'),
+        observacoes_internas = dados.get('observacoes_internas'),
+        status = dados.get('status'),
+        data_de_criacao = (criado_em or datetime.now()).date(),
+        tecnico_responsavel = dados.get('tecnico_responsavel')
     )
+    db.session.add(novo_orcamento)
+    db.session.flush()
+    return novo_orcamento
+
+#Cadastros feitos offline no PWA
+# O tablet do balcão guarda no IndexedDB as entradas de OS e orçamento feitas
+# sem conexão (static/js/fila_offline.js) e manda em lotes para
+# /offline/sincronizar quando a conexão volta. Cada item traz uma chave de
+# idempotência gerada no aparelho, gravada em envio_offline na mesma
+# transação do documento: reenviar (resposta perdida, duas abas sincronizando)
+# devolve o documento que já existe em vez de criar outro.
+OFFLINE_MAX_ITENS = int(os.environ.get('OFFLINE_MAX_ITENS', 20))
+OFFLINE_MAX_FOTOS = int(os.environ.get('OFFLINE_MAX_FOTOS', 10))  # por item
+PADRAO_CHAVE_OFFLINE = re.compile(r'[A-Za-z0-9-]{8,64}')
+
+# tipo: (função que cria o documento, coluna da Foto, modelo, rota de detalhes)
+DOCUMENTOS_OFFLINE = {
+    'os': (criar_os, 'ordem_servico_id', OrdemServico, 'os.detalhes_os'),
+    'orcamento': (criar_orcamento, 'orcamento_id', Orcamento, 'orcamentos.detalhes_orcamento'),
+}
+# Os mesmos campos "required" dos formulários cadastrar_os.html e novo_orcamento.html
+CAMPOS_OBRIGATORIOS_OFFLINE = {
+    'os': {'equipamento': "o equipamento", 'defeito': "o defeito relatado"},
+    'orcamento': {'equipamento': "o equipamento", 'problema_informado': "o problema informado"},
+}
+
+
+class ItemOfflineInvalido(Exception):
+    pass
+
+
+def resultado_envio_offline(envio, estado):
+    _, _, modelo, rota = DOCUMENTOS_OFFLINE[envio.tipo]
+    documento = db.session.get(modelo, envio.documento_id)
+    return {
+        'chave': envio.chave,
+        'estado': estado,
+        'tipo': envio.tipo,
+        'id': envio.documento_id,
+        'numero': documento.numero_formatado if documento else None,
+        'url': url_for(rota, id=envio.documento_id),
+    }
+
+
+def fotos_do_envio_offline(fotos):
+    """Fotos do item ({'nome', 'conteudo' em base64}) no formato que guardar_fotos espera."""
+    if not isinstance(fotos, list) or len(fotos) > OFFLINE_MAX_FOTOS:
+        raise ItemOfflineInvalido(f"Envie no máximo {OFFLINE_MAX_FOTOS} fotos por cadastro.")
+    arquivos = []
+    for foto in fotos:
+        try:
+            conteudo = base64.b64decode(foto['conteudo'], validate=True)
+        except (KeyError, TypeError, ValueError, binascii.Error):
+            raise ItemOfflineInvalido("Foto com conteúdo inválido.")
+        arquivos.append(FileStorage(stream=BytesIO(conteudo), filename=str(foto.get('nome') or 'foto.jpg')))
+    return arquivos
 
-@app.route("/resets")
-@login_required
-@role_required('cliente')
-def dashboard_resets():
-    # --- PASSO 1: Verificação de Permissão (NOVA LÓGICA) ---
-    # Verifica se o cliente tem PELO MENOS UMA impressora permitida.
-    # .count() é mais rápido do que carregar todos os objetos.
-    if current_user.impressoras_permitidas.count() == 0:
-        flash("Você não tem permissão para acessar esta área.", "danger")
-        return redirect(url_for('dashboard_cliente')) # Volta para o dashboard normal
-
-    # --- PASSO 2: Lógica de Busca (NOVA LÓGICA) ---
-    page = request.args.get('page', 1, type=int)
-    termos_busca = request.args.get('busca', '')
-
-    # A MUDANÇA PRINCIPAL:
-    # Em vez de Impressora.query, buscamos DENTRO da lista do usuário
-    query = current_user.impressoras_permitidas.options(
-        joinedload(Impressora.recursos) # A otimização que já tínhamos
-    ).order_by(Impressora.modelo)
-
-    if termos_busca:
-        # Filtra pelo modelo da impressora
-        query = query.filter(Impressora.modelo.ilike(f'%{termos_busca}%'))
-
-    # A paginação funciona exatamente da mesma forma
-    paginacao = query.paginate(
-        page=page, 
-        per_page=10,
-        error_out=False
-    )
-    impressoras_da_pagina = paginacao.items
-
-    # --- PASSO 3: Renderizar o Template ---
-    # O template 'dashboard_resets.html' não precisa de NENHUMA MUDANÇA,
-    # pois ele já espera as variáveis 'impressoras' e 'paginacao'.
-    return render_template(
-        'dashboard_resets.html', 
-        impressoras=impressoras_da_pagina, 
-        paginacao=paginacao,
-        termos_busca=termos_busca
-    )
 
-@app.route("/recibo/gerar", methods=["GET", "POST"])
-@login_required
-@role_required('funcionario')
-def gerar_recibo_rapido():
-    form = ReciboSimplesForm()
-    
-    if form.validate_on_submit():
-        try:
-            # 1. Tratamento do valor para conversão numérica
-            # Remove pontos de milhar e troca vírgula por ponto decimal
-            valor_str = form.valor.data.replace('.', '').replace(',', '.')
-            valor_float = float(valor_str)
-            
-            # 2. Geração do valor por extenso (Ex: "cento e cinquenta reais")
-            # O parâmetro to='currency' cuida dos termos "reais" e "centavos"
-            valor_extenso = num2words(valor_float, to='currency', lang='pt_BR')
-            
-            # 3. Organização dos dados para o template
-            dados_recibo = {
-                'valor': form.valor.data,
-                'valor_extenso': valor_extenso, # Enviando o extenso para o PDF
-                'pagador': form.pagador.data,
-                'documento': form.document_pagador.data,
-                'referente': form.referente_a.data,
-                'cidade': form.cidade.data,
-                'data': form.data_emissao.data.strftime('%d/%m/%Y')
-            }
-            
-            # 4. Preparação para o PDF
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            # Certifique-se de que 'config' está disponível (via context_processor ou query direta)
-            html_renderizado = render_template(
-                "template_recibo_pdf.html", 
-                recibo=dados_recibo, 
-                base_dir=base_dir
-            )
-            
-            # 5. Geração do arquivo PDF
-            result = BytesIO()
-            pdf = pisa.pisaDocument(BytesIO(html_renderizado.encode("UTF-8")), result)
-            
-            if not pdf.err:
-                nome_arquivo = f"Recibo_{form.pagador.data[:15]}.pdf"
-                return Response(
-                    result.getvalue(),
-                    mimetype="application/pdf",
-                    headers={"Content-disposition": f"attachment; filename={nome_arquivo}"}
-                )
-            
-            flash("Erro técnico ao gerar o PDF.", "danger")
-            
-        except ValueError:
-            flash("Valor numérico inválido. Use o formato 00,00", "warning")
-        except Exception as e:
-            flash(f"Ocorreu um erro inesperado: {str(e)}", "danger")
-        
-    return render_template("gerar_recibo.html", form=form)
+def data_do_envio_offline(texto):
+    """Momento do cadastro no aparelho (ISO 8601), se for plausível; senão, agora."""
+    if not texto:
+        return None
+    try:
+        data = datetime.fromisoformat(str(texto).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if data.tzinfo is not None:
+        # data_de_criacao é gravada no horário local do servidor, como datetime.now
+        data = data.astimezone().replace(tzinfo=None)
+    agora = datetime.now()
+    return data if agora - timedelta(days=30) <= data <= agora + timedelta(minutes=5) else None
+
 
-if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+def sincronizar_item_offline(item, fotos_gravadas):
+    """
+    Cria o documento de um item enviado offline e devolve o resultado em dict,
+    sem commit. Os nomes das fotos gravadas vão para `fotos_gravadas`, para
+    quem chama apagar os arquivos se a transação não for confirmada.
+    """
+    if not isinstance(item, dict):
+        raise ItemOfflineInvalido("Item em formato inválido.")
+    chave = str(item.get('chave') or '')
+    if not PADRAO_CHAVE_OFFLINE.fullmatch(chave):
+        raise ItemOfflineInvalido("Chave de idempotência inválida.")
+    existente = EnvioOffline.query.filter_by(chave=chave).first()
+    if existente:
+        return resultado_envio_offline(existente, 'duplicado')
+
+    if item.get('tipo') not in DOCUMENTOS_OFFLINE:
+        raise ItemOfflineInvalido("Tipo de cadastro desconhecido.")
+    criar, coluna_foto, _, _ = DOCUMENTOS_OFFLINE[item['tipo']]
+    cliente = db.session.get(Cliente, item.get('cliente_id')) if isinstance(item.get('cliente_id'), int) else None
+    if cliente is None:
+        raise ItemOfflineInvalido("Cliente não encontrado.")
+    dados = item.get('dados')
+    if not isinstance(dados, dict):
+        raise ItemOfflineInvalido("Dados do cadastro em formato inválido.")
+    for campo, descricao in CAMPOS_OBRIGATORIOS_OFFLINE[item['tipo']].items():
+        if not str(dados.get(campo) or '').strip():
+            raise ItemOfflineInvalido(f"Informe {descricao}.")
+    arquivos = fotos_do_envio_offline(item.get('fotos') or [])
+    # Antes de criar o documento, que trava o contador do ano até o commit
+    fotos_gravadas.extend(gravar_arquivos_fotos(arquivos))
+
+    # Campos que o formulário sempre manda e a tabela não aceita nulos
+    dados = {'problema_constatado': '', 'status': 'Pendente',
+             **{campo: str(valor) for campo, valor in dados.items() if valor is not None}}
+    documento = criar(cliente.id, dados, criado_em=data_do_envio_offline(item.get('criado_em')))
+    envio = EnvioOffline(chave=chave, tipo=item['tipo'], documento_id=documento.id, usuario_id=current_user.id)
+    db.session.add(envio)
+    # A chave única barra a segunda de duas sincronizações simultâneas do mesmo item
+    db.session.flush()
+    registrar_fotos(fotos_gravadas, '', **{coluna_foto: documento.id})
+    return resultado_envio_offline(envio, 'criado')
+
+
+
+#Montagem do app
+def create_app():
+    """
+    Fábrica do app: configuração, extensões, hooks e os blueprints de rotas/.
+    O wsgi.py chama uma vez por processo; com o preload do gunicorn.conf.py
+    isso acontece no master, antes do fork dos workers.
+    """
+    from rotas import BLUEPRINTS
+
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = '0625fa577ac24b41fd655e4935191fb6'
+    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL or 'sqlite:///site.db'
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['BCRYPT_LOG_ROUNDS'] = BCRYPT_LOG_ROUNDS
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    app.config['USE_X_SENDFILE'] = getattr(armazenamento, 'offload', '') == 'x-sendfile'
+    if PROXIES_CONFIAVEIS:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXIES_CONFIAVEIS, x_proto=PROXIES_CONFIAVEIS)
+
+    db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            medir_pool(engine)
+    migrate.init_app(app, db)
+    bcrypt.init_app(app)
+    login_manager.init_app(app)
+
+    app.template_global()(arquivo_local)
+    app.template_global()(dependencia_web)
+    app.context_processor(inject_now)
+    app.context_processor(inject_config)
+    app.url_defaults(estatico_com_hash)
+    # Troca a view da rota /static/<path:filename> do Flask (url_for('static') continua igual)
+    app.view_functions['static'] = servir_estatico
+    app.before_request(iniciar_worker_de_fotos)
+
+    app.register_blueprint(comandos)
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
+    return app
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+Exercita o armazenamento de uploads configurado (ARMAZENAMENTO=local ou s3):
+envia fotos para uma OS, espera a fila de fotos, baixa a galeria e o PDF e
+mede o pico de memória do Python ao gravar e servir um arquivo grande, que
+não deve crescer com o tamanho do arquivo (tudo anda em blocos).
+
+Para testar o S3 sem a AWS, suba um MinIO (ou o servidor do moto) e crie o
+bucket antes:
+
+    S3_ENDPOINT_URL=http://localhost:9000 AWS_ACCESS_KEY_ID=minioadmin \\
+    AWS_SECRET_ACCESS_KEY=minioadmin ARMAZENAMENTO=s3 S3_BUCKET=oficina \\
+    python benchmarks/bench_armazenamento.py [--fotos 4] [--mb 50]
+
+Os arquivos de teste têm "bench_" no nome e são apagados no final.
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+from io import BytesIO
+
+from PIL import Image
+
+from dados import app, db, recriar_banco, popular_banco, cliente_logado
+
+from app import Foto, armazenamento, remover_derivados_foto
+
+
+def foto():
+    saida = BytesIO()
+    Image.effect_noise((2000, 1500), 60).convert("RGB").save(saida, "JPEG", quality=90)
+    saida.seek(0)
+    return saida
+
+
+class ArquivoGrande:
+    """Arquivo de `tamanho` bytes gerado em blocos, sem ocupar a memória."""
+    def __init__(self, tamanho):
+        self.restante = tamanho
+
+    def read(self, n=-1):
+        n = self.restante if n < 0 else min(n, self.restante)
+        self.restante -= n
+        return b"\0" * n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fotos", type=int, default=4)
+    parser.add_argument("--mb", type=int, default=50)
+    args = parser.parse_args()
+
+    nome_grande = "bench_grande.bin"
+    nomes = []
+    print(f"armazenamento: {armazenamento.__class__.__name__}")
+    try:
+        with app.app_context():
+            recriar_banco()
+            popular_banco(1)
+            client = cliente_logado()
+
+        inicio = time.perf_counter()
+        client.post("/os/1/adicionar_foto",
+                    data={"foto": [(foto(), f"bench_{i}.jpg") for i in range(args.fotos)]},
+                    content_type="multipart/form-data")
+        tempo_upload = time.perf_counter() - inicio
+        with app.app_context():
+            while db.session.query(Foto.id).filter_by(pronta=False).count():
+                db.session.rollback()
+                time.sleep(0.1)
+            fotos = [(f.id, f.nome_arquivo) for f in Foto.query.all()]
+        nomes = [nome for _, nome in fotos]
+        print(f"{args.fotos} fotos enviadas em {tempo_upload * 1000:.0f} ms, "
+              f"prontas em {time.perf_counter() - inicio:.2f}s")
+
+        for foto_id, _ in fotos:
+            for tamanho in ("miniatura", "media", "original"):
+                resposta = client.get(f"/fotos/{foto_id}/{tamanho}")
+                if resposta.status_code == 302:
+                    destino = resposta.headers["Location"]
+                    assert "Signature" in destino or "X-Amz-Signature" in destino, destino
+                else:
+                    assert resposta.status_code == 200, (tamanho, resposta.status_code)
+                    assert resposta.headers.get("X-Accel-Redirect") or resposta.get_data()[:2] == b"\xff\xd8"
+        print(f"galeria: {client.get(f'/fotos/{fotos[0][0]}/media').status_code} "
+              f"({'URL assinada' if getattr(armazenamento, 'url_assinada', False) else 'servida pelo app'})")
+
+        resposta = client.get("/os/pdf/1?formato=json")
+        assert resposta.status_code in (200, 202), resposta.status_code
+        job = resposta.get_json()["job"]
+        while (estado := client.get(f"/pdf/{job}/status").get_json()["estado"]) == "pendente":
+            time.sleep(0.2)
+        assert estado == "pronto", estado
+        print("PDF com as fotos do armazenamento: ok")
+
+        # Arquivo grande: gravação e leitura em blocos
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        armazenamento.salvar(nome_grande, ArquivoGrande(args.mb * 1024 * 1024))
+        tempo_gravacao = time.perf_counter() - inicio
+        _, pico_gravacao = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        with app.test_request_context():
+            if hasattr(armazenamento, "url_assinada"):
+                armazenamento.url_assinada = False  # mede o repasse em blocos
+            resposta = armazenamento.resposta(nome_grande)
+            resposta.direct_passthrough = False
+            recebidos = sum(len(bloco) for bloco in resposta.response)
+            resposta.close()
+        _, pico_leitura = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert recebidos == args.mb * 1024 * 1024, recebidos
+        print(f"arquivo de {args.mb} MB: gravado em {tempo_gravacao:.2f}s com pico de "
+              f"{pico_gravacao / 1e6:.1f} MB, lido com pico de {pico_leitura / 1e6:.1f} MB")
+    finally:
+        armazenamento.remover(nome_grande)
+        for nome in nomes:
+            armazenamento.remover(nome)
+            remover_derivados_foto(nome)
+        pasta = getattr(armazenamento, "pasta", None)  # local: não deixa pastas vazias para trás
+        for sub in glob.glob(os.path.join(pasta, "*", "")) + [pasta] if pasta else []:
+            if os.path.isdir(sub) and not os.listdir(sub):
+                os.rmdir(sub)
+
+
+if __name__ == "__main__":
+    main()
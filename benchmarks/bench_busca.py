@@ -0,0 +1,63 @@
+"""
+Mede o tempo de resposta da busca global (/busca?formato=json) numa base
+com 100k clientes e 100k ordens de serviço. Meta: < 50 ms por consulta.
+
+Uso:  python benchmarks/bench_busca.py [--ordens 100000] [--repeticoes 10]
+"""
+import argparse
+import statistics
+import time
+
+from dados import app, recriar_banco, popular_banco, cliente_logado
+
+META_MS = 50
+
+TERMOS = [
+    "Cliente 4242",       # nome
+    "clie",               # prefixo de nome
+    "(31) 90004",         # telefone formatado
+    "3190004",            # telefone só com dígitos
+    "000.042",            # CPF
+    "012-2024",           # número de OS / orçamento
+    "12",                 # número sem ano
+    "SN0000A1",           # número de série
+    "cabeca",             # peça sem acento
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ordens", type=int, default=100_000)
+    parser.add_argument("--repeticoes", type=int, default=10)
+    args = parser.parse_args()
+
+    with app.app_context():
+        recriar_banco()
+        print(f"Populando {args.ordens} ordens e clientes...")
+        popular_banco(args.ordens, n_clientes=args.ordens, itens_por_ordem=1)
+        client = cliente_logado()
+
+        acima_da_meta = []
+        print(f"{'termo':<14} | {'resultados':>10} | {'mediana (ms)':>12} | {'p95 (ms)':>8}")
+        for termo in TERMOS:
+            url = f"/busca?formato=json&q={termo}"
+            quantidade = len(client.get(url).get_json()["resultados"])
+            tempos = []
+            for _ in range(args.repeticoes):
+                inicio = time.perf_counter()
+                client.get(url)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            tempos.sort()
+            mediana = statistics.median(tempos)
+            p95 = tempos[max(0, int(len(tempos) * 0.95) - 1)]
+            print(f"{termo:<14} | {quantidade:>10} | {mediana:>12.1f} | {p95:>8.1f}")
+            if mediana > META_MS:
+                acima_da_meta.append(termo)
+
+    if acima_da_meta:
+        raise SystemExit(f"Acima da meta de {META_MS} ms: {acima_da_meta}")
+    print(f"OK: todas as buscas abaixo de {META_MS} ms.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Teste de estresse do pool de conexões com quedas de conexão. Em ciclos,
+várias threads fazem requisições ao mesmo tempo (mais threads que conexões no
+pool, para aparecer espera), o app fica ocioso e então todas as conexões
+paradas no pool são fechadas por baixo do SQLAlchemy, como quando o Postgres
+(idle_session_timeout) ou um firewall derruba conexões ociosas. Conta as
+requisições que falharam, separando a primeira de cada ciclo, e mostra as
+métricas do pool (as mesmas de /banco/pool) em três configurações:
+
+  sem proteção   DB_POOL_PRE_PING=0, DB_POOL_RECYCLE=-1 (o padrão antigo)
+  recycle        DB_POOL_PRE_PING=0, DB_POOL_RECYCLE=1 (menor que a pausa)
+  pre-ping       DB_POOL_PRE_PING=1 (o padrão)
+
+Roda no SQLite temporário dos benchmarks; o statement_timeout, o
+application_name e o modo PgBouncer só valem no Postgres.
+
+Uso:  python benchmarks/bench_conexoes_banco.py [--ciclos 5] [--threads 8] [--requisicoes 5] [--ocioso 1.5]
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+
+os.environ.setdefault("DB_POOL_SIZE", "2")
+os.environ.setdefault("DB_MAX_OVERFLOW", "2")
+
+from dados import app as app_dados, db, recriar_banco, popular_banco, Usuario  # noqa: E402
+
+import app as modulo_app  # noqa: E402
+
+ROTAS = ["/dashboard", "/clientes", "/busca?q=cliente&formato=json"]
+
+
+def cliente_logado(app):
+    client = app.test_client()
+    with app.app_context():
+        usuario = Usuario.query.filter_by(username="bench").first()
+    with client.session_transaction() as sessao:
+        sessao["_user_id"] = usuario.get_id()
+        sessao["_fresh"] = True
+    return client
+
+
+class Derrubador:
+    """Acompanha as conexões do pool e fecha as que estão paradas nele."""
+    def __init__(self, engine):
+        self.ociosas = set()
+        self.trava = threading.Lock()
+        db.event.listen(engine.pool, 'checkin', self.devolvida)
+        db.event.listen(engine.pool, 'checkout', self.retirada)
+        db.event.listen(engine.pool, 'close', self.retirada_do_pool)
+
+    def devolvida(self, conexao, registro):
+        if conexao is None:
+            return  # conexão invalidada: o pool abre outra no próximo uso
+        with self.trava:
+            self.ociosas.add(conexao)
+
+    def retirada(self, conexao, registro, proxy):
+        with self.trava:
+            self.ociosas.discard(conexao)
+
+    def retirada_do_pool(self, conexao, registro):
+        with self.trava:
+            self.ociosas.discard(conexao)
+
+    def derrubar(self):
+        with self.trava:
+            ociosas, self.ociosas = list(self.ociosas), set()
+        for conexao in ociosas:
+            conexao.close()
+        return len(ociosas)
+
+
+def rodar(nome, pre_ping, recycle, args):
+    modulo_app.DB_POOL_PRE_PING = pre_ping
+    modulo_app.DB_POOL_RECYCLE = recycle
+    app = modulo_app.create_app()
+    app.logger.setLevel(logging.CRITICAL)  # as falhas esperadas viram 500 com traceback no log
+    with app.app_context():
+        derrubador = Derrubador(db.engine)
+    client = cliente_logado(app)
+
+    falhas = primeiras_falhas = total = derrubadas = 0
+    trava = threading.Lock()
+
+    def carga(indice):
+        nonlocal falhas, total
+        cliente = cliente_logado(app)
+        for i in range(args.requisicoes):
+            status = cliente.get(ROTAS[(indice + i) % len(ROTAS)]).status_code
+            with trava:
+                total += 1
+                falhas += status != 200
+
+    inicio = time.perf_counter()
+    for _ in range(args.ciclos):
+        # a primeira requisição depois da pausa, sozinha
+        status = client.get(ROTAS[0]).status_code
+        total += 1
+        falhas += status != 200
+        primeiras_falhas += status != 200
+        threads = [threading.Thread(target=carga, args=(i,)) for i in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        time.sleep(args.ocioso)
+        derrubadas += derrubador.derrubar()
+    tempo = time.perf_counter() - inicio - args.ciclos * args.ocioso
+
+    with app.app_context():
+        metricas = modulo_app.estatisticas_pool()["padrao"]
+    print(f"{nome:<14}: {falhas:3d} de {total} requisições falharam ({primeiras_falhas} de {args.ciclos} "
+          f"primeiras depois da pausa), {derrubadas} conexões derrubadas, {tempo:.1f}s de carga")
+    print(f"{'':<16}pool: {metricas['checkouts']} checkouts, espera média {metricas['espera_media_ms']} ms, "
+          f"máx {metricas['espera_maxima_ms']} ms, {metricas['conexoes_abertas']} conexões abertas, "
+          f"{metricas['invalidadas']} invalidadas, {metricas['esgotados']} sem conexão no prazo")
+    with app.app_context():
+        db.engine.dispose()
+    return falhas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ciclos", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requisicoes", type=int, default=5, help="por thread em cada ciclo")
+    parser.add_argument("--ocioso", type=float, default=1.5, help="segundos parado antes de derrubar as conexões")
+    args = parser.parse_args()
+    if args.ocioso <= 1:
+        parser.error("--ocioso precisa passar de 1s, o pool_recycle usado no teste")
+
+    with app_dados.app_context():
+        recriar_banco()
+        popular_banco(500)
+        db.engine.dispose()
+
+    print(f"pool de {modulo_app.DB_POOL_SIZE} + {modulo_app.DB_MAX_OVERFLOW} conexões, {args.threads} threads "
+          f"x {args.requisicoes} requisições por ciclo, {args.ciclos} ciclos, pausa de {args.ocioso}s")
+    sem_protecao = rodar("sem proteção", False, -1, args)
+    recycle = rodar("recycle", False, 1, args)
+    pre_ping = rodar("pre-ping", True, -1, args)
+
+    assert sem_protecao > 0, "a queda das conexões deveria derrubar requisições sem pre-ping nem recycle"
+    assert recycle == 0, f"{recycle} requisições falharam com pool_recycle"
+    assert pre_ping == 0, f"{pre_ping} requisições falharam com pool_pre_ping"
+    print("nenhuma falha com pre-ping ou recycle: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Mede a latência da rota /dashboard conforme cresce o número de ordens
+concluídas (1k -> 100k) e compara a soma agregada no banco com a soma
+antiga feita em Python.
+
+Uso:  python benchmarks/bench_dashboard.py [--max 100000] [--repeticoes 5]
+"""
+import argparse
+import statistics
+import time
+
+from dados import app, db, recriar_banco, popular_banco, cliente_logado
+from app import OrdemServico, calcular_faturamento
+
+
+def cronometrar(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def soma_em_python():
+    # forma antiga: carrega cada ordem concluída e seus itens
+    ordens = OrdemServico.query.filter_by(status="Concluído").all()
+    return sum(item.quantidade * item.preco_cobrado
+               for os in ordens for item in os.itens_servico + os.itens_peca)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max", type=int, default=100_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--sem-python", action="store_true",
+                        help="não mede a soma antiga em Python (lenta em 100k)")
+    args = parser.parse_args()
+
+    tamanhos = [n for n in (1_000, 10_000, 100_000) if n <= args.max]
+
+    with app.app_context():
+        recriar_banco()
+        client = cliente_logado()
+        print(f"{'concluídas':>10} | {'/dashboard (ms)':>15} | {'SQL (ms)':>9} | {'Python (ms)':>11}")
+        total = 0
+        for n in tamanhos:
+            # metade das ordens é concluída, então inserimos 2x
+            popular_banco(2 * n - total)
+            total = 2 * n
+
+            assert client.get("/dashboard").status_code == 200
+            rota = cronometrar(lambda: client.get("/dashboard"), args.repeticoes)
+            sql = cronometrar(calcular_faturamento, args.repeticoes)
+            if args.sem_python:
+                python = float("nan")
+            else:
+                python = cronometrar(soma_em_python, 1)
+                db.session.expunge_all()
+            print(f"{n:>10} | {rota:>15.1f} | {sql:>9.1f} | {python:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Entrega dos arquivos de static/: compara o modo sem compilar (hash calculado
+na hora, sem compressão) com o compilado ("flask compilar-estaticos", com
+.br/.gz prontos). Para cada arquivo mostra os bytes enviados, os cabeçalhos
+de cache e confere o 304 da revalidação; no fim, o tempo médio por
+requisição no Flask.
+
+Uso:  python benchmarks/bench_estaticos.py [--repeticoes 200]
+      ESTATICOS_OFFLOAD=x-accel-redirect python benchmarks/bench_estaticos.py
+      (o app só devolve o cabeçalho; quem envia o arquivo é o nginx)
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("ESTATICOS_PASTA", tempfile.mkdtemp(prefix="oficina-estaticos-"))
+
+from dados import app, recriar_banco  # noqa: E402
+
+from flask import url_for  # noqa: E402
+
+from app import estaticos  # noqa: E402
+
+
+def medir(client, nomes, repeticoes):
+    with app.test_request_context():
+        urls = {nome: url_for("static", filename=nome) for nome in nomes}
+    total_bytes = 0
+    for nome, url in urls.items():
+        resposta = client.get(url, headers={"Accept-Encoding": "br, gzip"})
+        assert resposta.status_code == 200, (url, resposta.status_code)
+        corpo = len(resposta.get_data())
+        total_bytes += corpo
+        repetida = client.get(url, headers={"Accept-Encoding": "br, gzip",
+                                            "If-None-Match": resposta.headers.get("ETag", "")})
+        offload = resposta.headers.get("X-Accel-Redirect") or resposta.headers.get("X-Sendfile")
+        assert offload or repetida.status_code == 304, (url, repetida.status_code)
+        print(f"  {url:<48} {corpo / 1024:7.1f} KB  {resposta.headers.get('Content-Encoding', '-'):<5} "
+              f"{resposta.headers['Cache-Control']}{'  -> ' + offload if offload else ''}")
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for url in urls.values():
+            client.get(url, headers={"Accept-Encoding": "br, gzip"}).close()
+    tempo = (time.perf_counter() - inicio) / (repeticoes * len(urls)) * 1000
+    return total_bytes, tempo
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=200)
+    args = parser.parse_args()
+
+    with app.app_context():
+        recriar_banco()  # o worker de fotos consulta o banco na primeira requisição
+    client = app.test_client()
+    nomes = sorted(estaticos.listar())
+    tamanho_original = sum(os.path.getsize(os.path.join(estaticos.origem, nome)) for nome in nomes)
+
+    print("Sem compilar:")
+    sem_compilar = medir(client, nomes, args.repeticoes)
+    manifesto, _, formatos = estaticos.compilar()
+    print(f"Compilado ({', '.join(formatos)}) em {estaticos.destino}:")
+    compilado = medir(client, nomes, args.repeticoes)
+
+    print(f"\n{len(nomes)} arquivos, {tamanho_original / 1024:.0f} KB no disco")
+    for rotulo, (enviados, tempo) in (("sem compilar", sem_compilar), ("compilado", compilado)):
+        print(f"{rotulo:<13}: {enviados / 1024:6.0f} KB enviados, {tempo:.2f} ms por requisição no Flask")
+
+    assert client.get("/static/uploads/qualquer.jpg").status_code == 404
+    sw = client.get("/sw.js")
+    assert sw.status_code == 200 and "no-cache" in sw.headers["Cache-Control"], sw.headers
+    print("uploads fora de /static e /sw.js sem cache longo: ok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
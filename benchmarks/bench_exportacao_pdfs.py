@@ -0,0 +1,101 @@
+"""
+Exportação de PDFs em lote (/relatorios/pdfs/zip): baixa o ZIP de um período
+com OS e comprovantes de entrada, lendo a resposta em pedaços como o
+navegador, enquanto outra thread acompanha o progresso. Mede o tempo até o
+primeiro byte, o tempo total, o pico de memória do Python no processo do app
+(não deve crescer com o número de documentos) e confere o conteúdo do ZIP.
+A segunda rodada sai do cache de PDFs.
+
+Uso:  PDF_LOTE_WORKERS=2 python benchmarks/bench_exportacao_pdfs.py [--ordens 60] [--orcamentos 20]
+"""
+import argparse
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from dados import app, db, recriar_banco, popular_banco, cliente_logado
+
+from app import Orcamento, PDF_LOTE_WORKERS
+
+
+def baixar(client, lote, parametros, destino):
+    acompanhamento = []
+    parar = threading.Event()
+
+    def acompanhar():
+        while not parar.is_set():
+            acompanhamento.append(client.get(f"/relatorios/pdfs/{lote}/status").get_json())
+            time.sleep(0.5)
+
+    thread = threading.Thread(target=acompanhar)
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resposta = client.get("/relatorios/pdfs/zip", query_string={**parametros, "lote": lote}, buffered=False)
+    assert resposta.status_code == 200, (resposta.status_code, resposta.headers.get("Location"))
+    thread.start()
+    primeiro_byte = None
+    tamanho = 0
+    with open(destino, "wb") as arquivo:
+        for pedaco in resposta.response:
+            if primeiro_byte is None and pedaco:
+                primeiro_byte = time.perf_counter() - inicio
+            arquivo.write(pedaco)
+            tamanho += len(pedaco)
+    resposta.close()
+    tempo = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    parar.set()
+    thread.join()
+    return tempo, primeiro_byte, tamanho, pico, acompanhamento
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ordens", type=int, default=60)
+    parser.add_argument("--orcamentos", type=int, default=20)
+    args = parser.parse_args()
+
+    with app.app_context():
+        recriar_banco()
+        popular_banco(args.ordens)
+        inicio = datetime(2024, 1, 1)
+        db.session.execute(insert(Orcamento), [
+            {"cliente_id": 1, "numero_orcamento": i + 1, "ano": 2024, "equipamento": "Notebook",
+             "problema_informado": "Tela azul", "problema_constatado": "", "status": "Pendente",
+             "data_de_criacao": (inicio + timedelta(hours=i)).date()}
+            for i in range(args.orcamentos)
+        ])
+        db.session.commit()
+        client = cliente_logado()
+
+    parametros = {"data_inicio": "2024-01-01", "data_fim": "2024-12-31", "documentos": "todos"}
+    total = args.ordens + args.orcamentos
+    print(f"{total} documentos, PDF_LOTE_WORKERS={PDF_LOTE_WORKERS}")
+    for rodada in ("primeira", "cache"):
+        with tempfile.NamedTemporaryFile(suffix=".zip") as destino:
+            tempo, primeiro_byte, tamanho, pico, acompanhamento = baixar(
+                client, f"{rodada == 'cache':032x}", parametros, destino.name)
+            with zipfile.ZipFile(destino.name) as arquivo_zip:
+                assert arquivo_zip.testzip() is None
+                nomes = arquivo_zip.namelist()
+                assert len(nomes) == total and "ERROS.txt" not in nomes, (len(nomes), nomes[-1:])
+                assert all(arquivo_zip.read(nome)[:4] == b"%PDF" for nome in nomes)
+        andamento = [a["prontos"] for a in acompanhamento if "prontos" in a]
+        print(f"{rodada:<8}: {tempo:.1f}s ({tempo / total * 1000:.0f} ms/doc), primeiro byte em "
+              f"{primeiro_byte:.2f}s, ZIP de {tamanho / 1e6:.1f} MB, pico de memória {pico / 1e6:.1f} MB, "
+              f"progresso visto: {andamento[:1] + andamento[-1:]} de {total}")
+
+    # Filtro sem documentos e limite de exportações simultâneas
+    vazio = client.get("/relatorios/pdfs/zip", query_string={"data_inicio": "2030-01-01", "data_fim": "2030-01-31"})
+    assert vazio.status_code == 302, vazio.status_code
+    print("filtro sem documentos volta para o formulário: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Compara o PDF de uma OS com fotos de celular (12 MP) usando as fotos
+originais (já tratadas pela fila de fotos: sem EXIF, lado até 3000px) e as
+versões reduzidas para PDF (static/uploads/pdf/): tempo do xhtml2pdf e
+tamanho do arquivo.
+
+As fotos de teste são gravadas em static/uploads/ com "bench_" no nome e
+apagadas no final.
+
+Uso:  python benchmarks/bench_fotos_pdf.py [--fotos 6] [--repeticoes 3]
+"""
+import argparse
+import glob
+import os
+import statistics
+import time
+from io import BytesIO
+
+from flask import render_template
+from PIL import Image
+
+from dados import app, db, recriar_banco, popular_banco, cliente_logado, OrdemServico
+
+from app import Foto, html_para_pdf, nome_variante_foto
+
+TAMANHO_CELULAR = (4032, 3024)
+
+
+def foto_de_celular():
+    """JPEG de 12 MP com ruído, para ter o peso de uma foto real (alguns MB)."""
+    ruido = [Image.effect_noise(TAMANHO_CELULAR, 40 + 10 * canal) for canal in range(3)]
+    saida = BytesIO()
+    Image.merge("RGB", ruido).save(saida, "JPEG", quality=90)
+    saida.seek(0)
+    return saida
+
+
+def medir(html, repeticoes):
+    tempos, tamanho = [], 0
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        tamanho = len(html_para_pdf(html))
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), tamanho
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fotos", type=int, default=6)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    pasta_uploads = app.config["UPLOAD_FOLDER"]
+    try:
+        with app.app_context():
+            recriar_banco()
+            popular_banco(1)
+            client = cliente_logado()
+
+            for i in range(args.fotos):
+                client.post("/os/1/adicionar_foto", data={"foto": (foto_de_celular(), f"bench_{i}.jpg")},
+                            content_type="multipart/form-data")
+            # o tratamento do upload roda na fila de fotos; aqui esperamos ele terminar
+            while db.session.query(Foto.id).filter_by(pronta=False).count():
+                db.session.rollback()
+                time.sleep(0.1)
+
+            fotos = Foto.query.filter_by(ordem_servico_id=1).all()
+            tamanho_original = sum(os.path.getsize(os.path.join(pasta_uploads, f.nome_arquivo)) for f in fotos)
+            tamanho_reduzido = sum(os.path.getsize(os.path.join(pasta_uploads, nome_variante_foto(f.nome_arquivo, "pdf")))
+                                   for f in fotos)
+            print(f"{len(fotos)} fotos {TAMANHO_CELULAR[0]}x{TAMANHO_CELULAR[1]}: "
+                  f"{tamanho_original / 1e6:.1f} MB originais, {tamanho_reduzido / 1e6:.2f} MB reduzidas")
+
+            with app.test_request_context():
+                html_reduzido = render_template("template_pdf.html", ordem_servico=db.session.get(OrdemServico, 1),
+                                                base_dir=app.root_path)
+            html_original = html_reduzido
+            for foto in fotos:
+                html_original = html_original.replace(nome_variante_foto(foto.nome_arquivo, "pdf"), foto.nome_arquivo)
+
+            for nome, html in (("originais", html_original), ("reduzidas", html_reduzido)):
+                tempo, tamanho = medir(html, args.repeticoes)
+                print(f"PDF com fotos {nome:<9}: {tempo:.2f}s, {tamanho / 1e6:.2f} MB")
+    finally:
+        for caminho in glob.glob(os.path.join(pasta_uploads, "*_bench_*.jpg")) + \
+                glob.glob(os.path.join(pasta_uploads, "*", "*_bench_*.*")):
+            os.remove(caminho)
+        for pasta in glob.glob(os.path.join(pasta_uploads, "*", "")) + [pasta_uploads]:
+            if os.path.isdir(pasta) and not os.listdir(pasta):
+                os.rmdir(pasta)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Compara o tempo das consultas do dashboard, do relatório e dos detalhes
+do cliente com e sem os índices secundários do schema.
+
+Popula uma base grande, remove todos os índices declarados nos modelos,
+mede, recria os índices e mede de novo.
+
+Uso:  python benchmarks/bench_indices.py [--ordens 200000] [--repeticoes 5]
+"""
+import argparse
+import statistics
+import time
+
+from dados import app, db, recriar_banco, popular_banco
+from app import OrdemServico, Orcamento, calcular_faturamento, filtrar_relatorio
+
+
+def consultas_dashboard():
+    OrdemServico.query.filter(OrdemServico.status != "Concluído").count()
+    OrdemServico.query.filter(OrdemServico.status == "Concluído").count()
+    calcular_faturamento()
+    OrdemServico.query.order_by(OrdemServico.data_de_criacao.desc()).limit(5).all()
+
+
+def consultas_relatorio():
+    query = filtrar_relatorio('', '2024-03-01', '2024-03-31')
+    query.paginate(page=1, per_page=15, error_out=False)
+
+
+def consultas_detalhes_cliente():
+    for cliente_id in (7, 70, 700):
+        OrdemServico.query.filter_by(cliente_id=cliente_id).all()
+        Orcamento.query.filter_by(cliente_id=cliente_id).all()
+
+
+def consulta_numeracao():
+    db.session.query(db.func.max(OrdemServico.numero_sequencial)).filter_by(ano=2024).scalar()
+
+
+CENARIOS = {
+    "dashboard": consultas_dashboard,
+    "relatorios (1 mês)": consultas_relatorio,
+    "detalhes_cliente": consultas_detalhes_cliente,
+    "próximo número OS": consulta_numeracao,
+}
+
+
+def medir(repeticoes):
+    resultados = {}
+    for nome, funcao in CENARIOS.items():
+        funcao()  # aquecimento
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            db.session.expunge_all()
+        resultados[nome] = statistics.median(tempos)
+    return resultados
+
+
+def indices_do_schema():
+    return [indice for tabela in db.metadata.sorted_tables for indice in tabela.indexes]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ordens", type=int, default=200_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    with app.app_context():
+        recriar_banco()
+        print(f"Populando {args.ordens} ordens...")
+        popular_banco(args.ordens, n_clientes=args.ordens // 20)
+
+        for indice in indices_do_schema():
+            indice.drop(db.engine)
+        if db.engine.dialect.name == "sqlite":
+            db.session.execute(db.text("ANALYZE"))
+        antes = medir(args.repeticoes)
+
+        for indice in indices_do_schema():
+            indice.create(db.engine)
+        if db.engine.dialect.name == "sqlite":
+            db.session.execute(db.text("ANALYZE"))
+        depois = medir(args.repeticoes)
+
+    print(f"{'consulta':<20} | {'sem índices (ms)':>16} | {'com índices (ms)':>16} | {'ganho':>6}")
+    for nome in CENARIOS:
+        ganho = antes[nome] / depois[nome] if depois[nome] else float("inf")
+        print(f"{nome:<20} | {antes[nome]:>16.1f} | {depois[nome]:>16.1f} | {ganho:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
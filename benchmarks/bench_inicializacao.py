@@ -0,0 +1,103 @@
+"""
+Tempo de boot do app: importa `app` e chama create_app() em processos novos
+(como um worker do gunicorn que sobe ou reinicia), com `python -X importtime`, e mostra a
+mediana do tempo, a memória residente depois do import, os módulos que mais
+pesam e se alguma biblioteca de documentos (BIBLIOTECAS_DOCUMENTOS) foi
+importada sem precisar. Compara com PRECARREGAR_DOCUMENTOS=1 (o que o master
+paga ao pré-carregar antes do fork) e mede quanto o primeiro PDF/Word/recibo
+de um worker sem pré-carga gasta importando as bibliotecas.
+
+Uso:  python benchmarks/bench_inicializacao.py [--rodadas 5] [--top 15] [--alvo-ms 1500] [--relatorio importtime.txt]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PASTA_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FILHO = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+import app
+app.create_app()
+tempo_import = time.perf_counter() - inicio
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+carregadas = [nome for nome in app.BIBLIOTECAS_DOCUMENTOS if nome in sys.modules]
+inicio = time.perf_counter()
+app.precarregar_bibliotecas_documentos()
+print(json.dumps({"import": tempo_import, "rss_kb": rss, "carregadas": carregadas,
+                  "primeiro_documento": time.perf_counter() - inicio}))
+"""
+
+
+def importar(precarregar):
+    env = {**os.environ, "PRECARREGAR_DOCUMENTOS": "1" if precarregar else "0"}
+    processo = subprocess.run([sys.executable, "-X", "importtime", "-c", FILHO], cwd=PASTA_RAIZ, env=env,
+                              capture_output=True, text=True, check=True)
+    return json.loads(processo.stdout.splitlines()[-1]), processo.stderr
+
+
+def modulos_mais_lentos(importtime, quantidade):
+    """(cumulativo em ms, módulo) dos imports feitos direto pelo app, do mais lento para o mais rápido."""
+    linhas = []
+    dentro_do_app = False
+    for linha in reversed(importtime.splitlines()):
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        _, cumulativo, nome = linha.split("|")
+        if nome.strip() == "app":
+            dentro_do_app = True
+            continue
+        # o -X importtime lista os filhos antes do pai, com 2 espaços a mais de recuo por nível
+        recuo = len(nome) - len(nome.lstrip())
+        if dentro_do_app and recuo == 1:
+            break  # imports anteriores ao app (site, .pth do ambiente)
+        if dentro_do_app and recuo == 3:
+            linhas.append((int(cumulativo) / 1000, nome.strip()))
+    return sorted(linhas, reverse=True)[:quantidade]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rodadas", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--alvo-ms", type=float, default=1500, help="tempo de import do app a não passar")
+    parser.add_argument("--relatorio", help="grava a saída completa do -X importtime neste arquivo")
+    args = parser.parse_args()
+
+    resultados = {}
+    for precarregar in (False, True):
+        rodadas = [importar(precarregar) for _ in range(args.rodadas)]
+        resultados[precarregar] = rodadas
+        tempos = [dados["import"] * 1000 for dados, _ in rodadas]
+        rss = statistics.median(dados["rss_kb"] for dados, _ in rodadas) / 1024
+        rotulo = "PRECARREGAR_DOCUMENTOS=1" if precarregar else "sob demanda"
+        print(f"{rotulo:<24}: import do app {statistics.median(tempos):.0f} ms "
+              f"(min {min(tempos):.0f}, máx {max(tempos):.0f}), RSS {rss:.0f} MB")
+
+    sob_demanda = resultados[False]
+    dados, importtime = sob_demanda[len(sob_demanda) // 2]
+    if args.relatorio:
+        with open(args.relatorio, "w", encoding="utf-8") as arquivo:
+            arquivo.write(importtime)
+    print("\nimports diretos do app que mais pesam (ms acumulados, sob demanda):")
+    for cumulativo, nome in modulos_mais_lentos(importtime, args.top):
+        print(f"  {cumulativo:8.1f}  {nome}")
+
+    primeiro = statistics.median(dados["primeiro_documento"] for dados, _ in sob_demanda) * 1000
+    print(f"\nprimeiro PDF/Word/recibo de um worker sem pré-carga: +{primeiro:.0f} ms importando as bibliotecas")
+
+    carregadas = {nome for dados, _ in sob_demanda for nome in dados["carregadas"]}
+    assert not carregadas, f"bibliotecas de documentos importadas no boot: {sorted(carregadas)}"
+    print("nenhuma biblioteca de documentos importada no boot: ok")
+
+    mediana = statistics.median(dados["import"] * 1000 for dados, _ in sob_demanda)
+    assert mediana <= args.alvo_ms, f"boot de {mediana:.0f} ms acima do alvo de {args.alvo_ms:.0f} ms"
+    print(f"alvo de boot ({args.alvo_ms:.0f} ms): ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Login sob rajada (clientes conferindo a OS quando a loja abre): N threads
+fazem login ao mesmo tempo, cada uma de um IP, enquanto outra thread mede a
+latência de uma página sem bcrypt. Também confere o rehash do custo antigo
+no login, o corte de força bruta (429) antes de qualquer hash, que ele não
+bloqueia o dono da conta vindo de outro IP e que logins certos em sequência
+pelo mesmo IP (clientes atrás do mesmo proxy) não são limitados.
+
+Uso:  python benchmarks/bench_login.py [--clientes 40] [--threads 16]
+      SENHA_THREADS=2 BCRYPT_LOG_ROUNDS=12 python benchmarks/bench_login.py
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from dados import app, db, bcrypt, recriar_banco, popular_banco, Cliente
+
+from app import LOGIN_MAX_POR_IP, SENHA_THREADS, custo_do_hash, falhas_por_ip, falhas_por_usuario
+
+
+def login(client, username, senha, ip):
+    inicio = time.perf_counter()
+    resposta = client.post("/login_cliente", data={"username": username, "password": senha},
+                           environ_base={"REMOTE_ADDR": ip})
+    return resposta.status_code, time.perf_counter() - inicio
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clientes", type=int, default=40)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+    custo = app.config["BCRYPT_LOG_ROUNDS"]
+
+    with app.app_context():
+        recriar_banco()
+        popular_banco(args.clientes * 10, n_clientes=args.clientes)
+        # Metade dos clientes com hash de custo antigo: o login refaz com o atual
+        antigo = bcrypt.generate_password_hash("bench", rounds=max(4, custo - 2)).decode()
+        db.session.query(Cliente).filter(Cliente.id % 2 == 0).update({"password_hash": antigo})
+        db.session.commit()
+        usernames = [c for (c,) in db.session.query(Cliente.username_cliente)]
+
+    print(f"bcrypt custo {custo}, SENHA_THREADS={SENHA_THREADS}, {args.threads} logins simultâneos")
+    pendentes = list(enumerate(usernames))
+    trava = threading.Lock()
+    resultados = []
+    latencias_pagina = []
+    terminou = threading.Event()
+
+    def fazer_logins():
+        client = app.test_client()
+        while True:
+            with trava:
+                if not pendentes:
+                    return
+                i, username = pendentes.pop()
+            while True:
+                resultado = login(client, username, "bench", f"10.0.{i // 250}.{i % 250 + 1}")
+                resultados.append(resultado)
+                if resultado[0] != 503:
+                    break
+                time.sleep(0.5)  # como o usuário apertando "Entrar" de novo
+            client.get("/logout_cliente")
+
+    def medir_pagina():
+        client = app.test_client()
+        while not terminou.is_set():
+            inicio = time.perf_counter()
+            client.get("/contato")
+            latencias_pagina.append(time.perf_counter() - inicio)
+            time.sleep(0.01)
+
+    medidor = threading.Thread(target=medir_pagina)
+    medidor.start()
+    threads = [threading.Thread(target=fazer_logins) for _ in range(args.threads)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    tempo = time.perf_counter() - inicio
+    terminou.set()
+    medidor.join()
+
+    status = [s for s, _ in resultados]
+    tempos_ok = [t for s, t in resultados if s == 302]
+    print(f"{status.count(302)} logins em {tempo:.2f}s ({status.count(302) / tempo:.1f}/s), "
+          f"{status.count(503)} tentativas recusadas por fila cheia (503); latência dos logins "
+          f"p50 {statistics.median(tempos_ok) * 1000:.0f} ms, p95 {percentil(tempos_ok, 0.95) * 1000:.0f} ms")
+    print(f"página sem bcrypt durante a rajada: p50 {statistics.median(latencias_pagina) * 1000:.1f} ms, "
+          f"p95 {percentil(latencias_pagina, 0.95) * 1000:.1f} ms ({len(latencias_pagina)} requisições)")
+
+    with app.app_context():
+        custos = {custo_do_hash(h) for (h,) in db.session.query(Cliente.password_hash)}
+    assert status.count(302) == len(usernames) and custos == {custo}, (status.count(302), custos)
+    print(f"custos dos hashes depois dos logins: {sorted(custos)}")
+
+    # Força bruta num usuário: depois do limite, 429 sem gastar bcrypt
+    falhas_por_ip.limpar("login_cliente:10.9.9.9")
+    falhas_por_usuario.limpar(f"login_cliente:10.9.9.9:{usernames[0]}")
+    client = app.test_client()
+    respostas = [login(client, usernames[0], f"errada{i}", "10.9.9.9") for i in range(10)]
+    recusadas = [t for s, t in respostas if s == 429]
+    assert recusadas, [s for s, _ in respostas]
+    print(f"força bruta: {len(respostas) - len(recusadas)} senhas conferidas, {len(recusadas)} recusadas "
+          f"com 429 em {statistics.median(recusadas) * 1000:.1f} ms "
+          f"(senha conferida: {statistics.median([t for s, t in respostas if s != 429]) * 1000:.0f} ms)")
+    status_certa, _ = login(client, usernames[0], "bench", "10.9.9.9")
+    assert status_certa == 429, status_certa
+    print("a senha certa também espera a janela vinda do IP bloqueado: ok")
+    status_dono, _ = login(client, usernames[0], "bench", "10.8.8.8")
+    assert status_dono == 302, status_dono
+    client.get("/logout_cliente")
+    print("o dono da conta entra de outro IP: ok")
+
+    # Mesmo IP (proxy sem PROXIES_CONFIAVEIS, ou a rede da loja): só falhas contam
+    respostas = []
+    for username in (usernames * 2)[:LOGIN_MAX_POR_IP + 5]:
+        respostas.append(login(client, username, "bench", "10.7.7.7")[0])
+        client.get("/logout_cliente")
+    assert respostas.count(302) == len(respostas), respostas
+    print(f"{len(respostas)} logins certos seguidos do mesmo IP (limite de {LOGIN_MAX_POR_IP} falhas): ok")
+
+
+if __name__ == "__main__":
+    main()
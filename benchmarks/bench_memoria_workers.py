@@ -0,0 +1,131 @@
+"""
+Memória por worker do gunicorn com e sem preload (gunicorn.conf.py,
+GUNICORN_PRELOAD). Sobe o gunicorn de verdade com N workers num banco SQLite
+temporário, aquece os workers com páginas, busca e PDFs e lê
+/proc/<pid>/smaps_rollup do master e de cada worker. Nos dois modos os
+workers têm as bibliotecas de documentos carregadas (PRECARREGAR_DOCUMENTOS=1),
+como fica um worker depois de gerar o primeiro PDF, Word e recibo:
+
+  RSS      memória residente (conta de novo as páginas compartilhadas)
+  PSS      RSS com cada página compartilhada dividida entre os processos
+  privada  páginas só do processo (o que cada worker a mais custa)
+
+A soma do PSS do master com os workers é o que o conjunto ocupa de fato.
+
+Uso:  python benchmarks/bench_memoria_workers.py [--workers 2] [--repeticoes 10]
+"""
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from dados import PASTA_RAIZ, app, recriar_banco, popular_banco, Usuario
+
+ROTAS = ["/dashboard", "/clientes", "/relatorios", "/busca?q=cliente", "/os/1", "/os/pdf/1", "/recibo/gerar"]
+
+
+def porta_livre():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def cookie_de_sessao():
+    """Sessão do Flask assinada com a SECRET_KEY do app, já logada como funcionário."""
+    with app.app_context():
+        usuario = Usuario.query.filter_by(username="bench").first()
+        valor = app.session_interface.get_signing_serializer(app).dumps({"_user_id": usuario.get_id(), "_fresh": True})
+    return f"{app.config['SESSION_COOKIE_NAME']}={valor}"
+
+
+def memoria(pid):
+    """Campos de /proc/<pid>/smaps_rollup em KB."""
+    campos = {}
+    with open(f"/proc/{pid}/smaps_rollup") as arquivo:
+        for linha in arquivo:
+            partes = linha.split()
+            if len(partes) == 3 and partes[2] == "kB":
+                campos[partes[0].rstrip(":")] = int(partes[1])
+    return {
+        "rss": campos["Rss"],
+        "pss": campos["Pss"],
+        "privada": campos["Private_Clean"] + campos["Private_Dirty"],
+        "compartilhada": campos["Shared_Clean"] + campos["Shared_Dirty"],
+    }
+
+
+def filhos(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as arquivo:
+        return [int(filho) for filho in arquivo.read().split()]
+
+
+def get(url, cookie):
+    pedido = urllib.request.Request(url, headers={"Cookie": cookie})
+    with urllib.request.urlopen(pedido, timeout=60) as resposta:
+        resposta.read()
+        return resposta.status
+
+
+def medir(preload, workers, repeticoes, cookie):
+    porta = porta_livre()
+    env = {**os.environ, "PORT": str(porta), "WEB_CONCURRENCY": str(workers),
+           "GUNICORN_PRELOAD": "1" if preload else "0", "PRECARREGAR_DOCUMENTOS": "1", "PDF_WORKERS": "0"}
+    inicio = time.perf_counter()
+    servidor = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+                                cwd=PASTA_RAIZ, env=env, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{porta}"
+    try:
+        while True:
+            try:
+                get(f"{base}/login", cookie)
+                break
+            except OSError:
+                if servidor.poll() is not None:
+                    raise RuntimeError("o gunicorn não subiu")
+                time.sleep(0.1)
+        while len(filhos(servidor.pid)) < workers:
+            time.sleep(0.1)
+        pronto = time.perf_counter() - inicio
+        # Cada conexão nova cai num worker qualquer: repetindo, todos passam pelas rotas
+        for _ in range(repeticoes):
+            for rota in ROTAS:
+                status = get(base + rota, cookie)
+                assert status == 200, (rota, status)
+        return pronto, memoria(servidor.pid), [memoria(pid) for pid in filhos(servidor.pid)]
+    finally:
+        servidor.send_signal(signal.SIGTERM)
+        servidor.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--repeticoes", type=int, default=10)
+    args = parser.parse_args()
+
+    with app.app_context():
+        recriar_banco()
+        popular_banco(500)
+    cookie = cookie_de_sessao()
+
+    print(f"{args.workers} workers, {args.repeticoes} rodadas de {len(ROTAS)} rotas (MB)")
+    totais = {}
+    for preload in (False, True):
+        pronto, master, workers = medir(preload, args.workers, args.repeticoes, cookie)
+        rotulo = "com preload" if preload else "sem preload"
+        media = {campo: statistics.mean(w[campo] for w in workers) / 1024 for campo in workers[0]}
+        totais[preload] = (master["pss"] + sum(w["pss"] for w in workers)) / 1024
+        print(f"{rotulo}: pronto em {pronto:.1f}s | master RSS {master['rss'] / 1024:.0f}, PSS {master['pss'] / 1024:.0f} | "
+              f"por worker RSS {media['rss']:.0f}, PSS {media['pss']:.0f}, privada {media['privada']:.0f}, "
+              f"compartilhada {media['compartilhada']:.0f} | total (PSS) {totais[preload]:.0f}")
+    print(f"preload economiza {totais[False] - totais[True]:.0f} MB no total "
+          f"({(totais[False] - totais[True]) / args.workers:.0f} MB por worker)")
+
+
+if __name__ == "__main__":
+    main()
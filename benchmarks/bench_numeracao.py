@@ -0,0 +1,94 @@
+"""
+Teste de concorrência da numeração de OS e orçamentos: várias threads
+cadastram ao mesmo tempo e, no fim, a numeração do ano precisa ser
+exatamente 1..N, sem buracos nem repetições.
+
+Uso:  python benchmarks/bench_numeracao.py [--threads 8] [--por-thread 25]
+"""
+import argparse
+import threading
+import time
+from datetime import datetime
+
+from dados import app, db, recriar_banco, popular_banco, cliente_logado, OrdemServico
+
+from app import Orcamento, ContadorDocumento
+
+FORMULARIO_OS = {
+    "equipamento": "Impressora", "marca": "Epson", "modelo": "L3150",
+    "defeito": "Não liga", "status": "Em andamento",
+}
+FORMULARIO_ORCAMENTO = {
+    "equipamento": "Impressora", "marca": "HP", "modelo": "Ink Tank 416",
+    "problema_informado": "Mancha a folha", "problema_constatado": "Cabeça entupida",
+    "status": "Pendente",
+}
+
+
+def disparar(client, por_thread, barreira, erros):
+    barreira.wait()
+    for i in range(por_thread):
+        if i % 2 == 0:
+            resposta = client.post("/cliente/1/os/cadastrar", data=FORMULARIO_OS)
+        else:
+            resposta = client.post("/orcamento/1/novo", data=FORMULARIO_ORCAMENTO)
+        if resposta.status_code != 302:
+            erros.append(resposta.status_code)
+
+
+def conferir(nome, numeros, esperado):
+    numeros = sorted(numeros)
+    ok = numeros == list(range(1, esperado + 1))
+    print(f"{nome:<12} | {len(numeros):>5} emitidos | {'OK' if ok else 'FALHOU'}")
+    if not ok:
+        repetidos = sorted({n for n in numeros if numeros.count(n) > 1})
+        faltando = sorted(set(range(1, esperado + 1)) - set(numeros))
+        print(f"  repetidos: {repetidos[:20]}  faltando: {faltando[:20]}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--por-thread", type=int, default=25)
+    args = parser.parse_args()
+
+    with app.app_context():
+        recriar_banco()
+        popular_banco(0, n_clientes=1)
+        clients = [cliente_logado() for _ in range(args.threads)]
+        db.session.remove()
+
+    barreira = threading.Barrier(args.threads)
+    erros = []
+    threads = [
+        threading.Thread(target=disparar, args=(client, args.por_thread, barreira, erros))
+        for client in clients
+    ]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    total_os = args.threads * ((args.por_thread + 1) // 2)
+    total_orcamentos = args.threads * (args.por_thread // 2)
+    ano = datetime.utcnow().year
+    with app.app_context():
+        numeros_os = [n for (n,) in db.session.query(OrdemServico.numero_sequencial).filter_by(ano=ano)]
+        numeros_orc = [n for (n,) in db.session.query(Orcamento.numero_orcamento).filter_by(ano=ano)]
+        contadores = {c.tipo: c.ultimo_numero for c in ContadorDocumento.query.filter_by(ano=ano)}
+
+    print(f"{args.threads} threads x {args.por_thread} cadastros em {duracao:.2f}s")
+    ok = conferir("OS", numeros_os, total_os) and contadores.get("os") == total_os
+    ok = conferir("Orçamentos", numeros_orc, total_orcamentos) and ok
+    ok = ok and contadores.get("orcamento") == total_orcamentos
+    if erros:
+        print(f"Respostas inesperadas: {erros[:20]}")
+    if erros or not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
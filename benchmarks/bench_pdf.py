@@ -0,0 +1,104 @@
+"""
+Rajada de pedidos de PDF contra a fila de PDFs: mede quanto tempo as rotas
+de PDF seguram a requisição, a latência de uma página comum (/dashboard)
+durante a rajada e quanto tempo até todos os PDFs ficarem prontos. Depois
+repete os mesmos pedidos (reimpressão), que devem sair do cache de PDFs.
+
+Uso:  PDF_WORKERS=2 python benchmarks/bench_pdf.py [--pedidos 20]
+      PDF_WORKERS=0 python benchmarks/bench_pdf.py   (geração na requisição)
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+
+from dados import app, recriar_banco, popular_banco, cliente_logado
+
+from app import fila_pdf
+
+
+def medir_pagina(client, parar, tempos):
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        client.get("/dashboard")
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        time.sleep(0.05)
+
+
+def rodada(client, pedidos):
+    inicio = time.perf_counter()
+    jobs, recusados, tempos_envio = [], 0, []
+    for os_id in range(1, pedidos + 1):
+        antes = time.perf_counter()
+        resposta = client.get(f"/os/pdf/{os_id}?formato=json")
+        tempos_envio.append((time.perf_counter() - antes) * 1000)
+        if resposta.is_json and resposta.status_code in (200, 202):  # 200 = já estava no cache
+            jobs.append(resposta.get_json()["job"])
+        elif resposta.status_code == 503:
+            recusados += 1
+        else:
+            assert resposta.data.startswith(b"%PDF"), resposta.status_code
+
+    estados = {}
+    while jobs:
+        for job in list(jobs):
+            estado = client.get(f"/pdf/{job}/status").get_json()["estado"]
+            if estado != "pendente":
+                estados[estado] = estados.get(estado, 0) + 1
+                if estado == "pronto":
+                    assert client.get(f"/pdf/{job}/download").data.startswith(b"%PDF")
+                jobs.remove(job)
+        time.sleep(0.2)
+    return tempos_envio, estados, recusados, time.perf_counter() - inicio
+
+
+def conferir_falha():
+    """Um documento que o gerador não consegue converter tem que terminar em 'erro', não ficar pendente."""
+    documento = {"arquivos": []}  # dict sem os campos do layout: o ReportLab levanta KeyError
+    with app.test_request_context():
+        job = fila_pdf.enviar(documento, fila_pdf.cache.chave(documento), "falha.pdf", "/")
+    inicio = time.perf_counter()
+    while (estado := fila_pdf.consultar(job))["estado"] == "pendente":
+        assert time.perf_counter() - inicio < fila_pdf.timeout + 10, "job com falha continua pendente"
+        time.sleep(0.2)
+    assert estado["estado"] == "erro", estado
+    assert os.path.exists(fila_pdf.caminho(job, "inicio"))
+    print(f"PDF com falha termina em 'erro' ({estado['mensagem']!r}): ok")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pedidos", type=int, default=20)
+    args = parser.parse_args()
+
+    with app.app_context():
+        recriar_banco()
+        popular_banco(args.pedidos, itens_por_ordem=3)
+        client_pdf = cliente_logado()
+        client_pagina = cliente_logado()
+
+    print(f"PDF_WORKERS={fila_pdf.workers}, fila máxima {fila_pdf.fila_max}, timeout {fila_pdf.timeout}s")
+    parar, tempos_pagina = threading.Event(), []
+    medidor = threading.Thread(target=medir_pagina, args=(client_pagina, parar, tempos_pagina))
+    medidor.start()
+
+    primeira = rodada(client_pdf, args.pedidos)
+    parar.set()
+    medidor.join()
+    # Reimpressão dos mesmos documentos: tudo deve vir do cache de PDFs
+    segunda = rodada(client_pdf, args.pedidos)
+
+    for nome, (tempos_envio, estados, recusados, total) in (("1ª rodada", primeira), ("reimpressão", segunda)):
+        print(f"{nome}: requisição de PDF mediana {statistics.median(tempos_envio):.1f} ms, "
+              f"máx {max(tempos_envio):.1f} ms; jobs {estados or 'nenhum (geração na requisição)'}, "
+              f"recusados pela fila cheia: {recusados}; último PDF em {total:.2f}s")
+    print(f"/dashboard durante a 1ª rodada: mediana {statistics.median(tempos_pagina):.1f} ms, "
+          f"máx {max(tempos_pagina):.1f} ms ({len(tempos_pagina)} amostras)")
+    print(f"cache de PDFs: {client_pdf.get('/pdf/cache').get_json()}")
+    if fila_pdf.workers > 0:
+        conferir_falha()
+
+
+if __name__ == "__main__":
+    main()
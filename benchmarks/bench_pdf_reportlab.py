@@ -0,0 +1,143 @@
+"""
+Compara os dois motores de PDF da OS e do orçamento: o HTML dos templates
+convertido pelo xhtml2pdf e o layout montado direto no ReportLab
+(PDF_MOTOR_OS / PDF_MOTOR_ORCAMENTO). Para documentos com 0, 20 e 200 itens
+e algumas fotos, mede o tempo (montar o documento + converter, mediana das
+repetições), o pico de memória do Python (tracemalloc, numa rodada à parte),
+o tamanho e o número de páginas do PDF.
+
+As fotos de teste são gravadas em static/uploads/ com "bench_" no nome e
+apagadas no final.
+
+Uso:  python benchmarks/bench_pdf_reportlab.py [--itens 0 20 200] [--fotos 4] [--repeticoes 3]
+"""
+import argparse
+import glob
+import os
+import statistics
+import time
+import tracemalloc
+from io import BytesIO
+
+from PIL import Image
+from pypdf import PdfReader
+
+from dados import app, db, recriar_banco, popular_banco, cliente_logado, OrdemServico, Servico, Peca, ItemServico, ItemPeca
+
+import app as modulo_app
+from app import (Configuracao, Foto, Orcamento, ItemOrcamentoServico, ItemOrcamentoPeca, documento_pdf_os,
+                 documento_pdf_orcamento, documento_para_pdf)
+
+MOTORES = ("xhtml2pdf", "reportlab")
+
+
+def foto():
+    ruido = [Image.effect_noise((2400, 1800), 30 + 10 * canal) for canal in range(3)]
+    saida = BytesIO()
+    Image.merge("RGB", ruido).save(saida, "JPEG", quality=85)
+    saida.seek(0)
+    return saida
+
+
+def gerar(tipo, documento_id):
+    with app.test_request_context():
+        if tipo == "os":
+            documento = documento_pdf_os(db.session.get(OrdemServico, documento_id))
+        else:
+            documento = documento_pdf_orcamento(db.session.get(Orcamento, documento_id))
+        return documento_para_pdf(documento)
+
+
+def medir(tipo, documento_id, motor, repeticoes):
+    modulo_app.MOTORES_PDF[tipo] = motor
+    gerar(tipo, documento_id)  # aquece fontes e imagens em cache dos dois motores
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        conteudo = gerar(tipo, documento_id)
+        tempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    gerar(tipo, documento_id)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    paginas = len(PdfReader(BytesIO(conteudo)).pages)
+    return statistics.median(tempos), pico, len(conteudo), paginas
+
+
+def criar_documentos(quantidades, fotos):
+    """Uma OS e um orçamento para cada quantidade de itens, todos com as mesmas fotos."""
+    servico = Servico.query.first()
+    peca = Peca.query.first()
+    ordens, orcamentos = [], []
+    for n, ordem in zip(quantidades, OrdemServico.query.order_by(OrdemServico.id)):
+        orcamento = Orcamento(cliente_id=ordem.cliente_id, numero_orcamento=ordem.numero_sequencial, ano=2024,
+                              equipamento="Impressora", marca="Epson", modelo="L3150", numero_de_serie="X5QK012345",
+                              problema_informado="Não puxa papel", problema_constatado="Rolete gasto e almofada cheia",
+                              observacoes_cliente="Cliente pediu para guardar as peças trocadas.",
+                              tecnico_responsavel="Bench", validade_do_orcamento="10 dias", status="Pendente")
+        db.session.add(orcamento)
+        db.session.flush()
+        for i in range(n):
+            if i % 2:
+                db.session.add(ItemPeca(ordem_servico_id=ordem.id, peca_id=peca.id, quantidade=1 + i % 3, preco_cobrado=250.0))
+                db.session.add(ItemOrcamentoPeca(orcamento_id=orcamento.id, peca_id=peca.id, quantidade=1, preco_cobrado=250.0))
+            else:
+                db.session.add(ItemServico(ordem_servico_id=ordem.id, servico_id=servico.id, quantidade=1, preco_cobrado=80.0))
+                db.session.add(ItemOrcamentoServico(orcamento_id=orcamento.id, servico_id=servico.id, quantidade=1,
+                                                    preco_cobrado=80.0))
+        for original in fotos:
+            if ordem.id != original.ordem_servico_id:
+                db.session.add(Foto(nome_arquivo=original.nome_arquivo, legenda=original.legenda, ordem_servico_id=ordem.id))
+            db.session.add(Foto(nome_arquivo=original.nome_arquivo, legenda=original.legenda, orcamento_id=orcamento.id))
+        ordens.append(ordem.id)
+        orcamentos.append(orcamento.id)
+    db.session.commit()
+    return ordens, orcamentos
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--itens", type=int, nargs="+", default=[0, 20, 200])
+    parser.add_argument("--fotos", type=int, default=4)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    pasta_uploads = app.config["UPLOAD_FOLDER"]
+    try:
+        with app.app_context():
+            recriar_banco()
+            popular_banco(len(args.itens), itens_por_ordem=0)
+            db.session.add(Configuracao(nome_loja="Oficina Bench", cnpj="00.000.000/0001-00", endereco="Rua A, 100",
+                                        telefone="(31) 3333-0000", site="oficina.example", email_contato="oi@oficina.example",
+                                        texto_garantia="Garantia de 90 dias para o serviço executado. " * 6))
+            db.session.commit()
+            client = cliente_logado()
+            primeira = OrdemServico.query.order_by(OrdemServico.id).first().id
+            for i in range(args.fotos):
+                client.post(f"/os/{primeira}/adicionar_foto", data={"foto": (foto(), f"bench_{i}.jpg"), "legenda": f"Foto {i + 1}"},
+                            content_type="multipart/form-data")
+            # o tratamento do upload roda na fila de fotos; aqui esperamos ele terminar
+            while db.session.query(Foto.id).filter_by(pronta=False).count():
+                db.session.rollback()
+                time.sleep(0.1)
+            ordens, orcamentos = criar_documentos(args.itens, Foto.query.all())
+
+            print(f"{args.fotos} fotos por documento, mediana de {args.repeticoes} repetições")
+            for tipo, ids in (("os", ordens), ("orcamento", orcamentos)):
+                for n, documento_id in zip(args.itens, ids):
+                    resultados = {motor: medir(tipo, documento_id, motor, args.repeticoes) for motor in MOTORES}
+                    for motor, (tempo, pico, tamanho, paginas) in resultados.items():
+                        print(f"{tipo:<9} {n:>4} itens  {motor:<9}: {tempo * 1000:7.0f} ms, pico {pico / 1e6:6.1f} MB, "
+                              f"{tamanho / 1e3:6.0f} KB, {paginas} pág.")
+                    print(f"{'':<25}reportlab {resultados['xhtml2pdf'][0] / resultados['reportlab'][0]:.1f}x mais rápido")
+    finally:
+        for caminho in glob.glob(os.path.join(pasta_uploads, "*_bench_*.jpg")) + \
+                glob.glob(os.path.join(pasta_uploads, "*", "*_bench_*.*")):
+            os.remove(caminho)
+        for pasta in glob.glob(os.path.join(pasta_uploads, "*", "")) + [pasta_uploads]:
+            if os.path.isdir(pasta) and not os.listdir(pasta):
+                os.rmdir(pasta)
+
+
+if __name__ == "__main__":
+    main()
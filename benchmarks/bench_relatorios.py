@@ -0,0 +1,65 @@
+"""
+Conta quantos comandos SQL a rota /relatorios executa para bases de
+tamanhos diferentes. O número precisa ser o mesmo em todos os tamanhos;
+se crescer com as linhas, voltou a existir N+1 e o script falha.
+
+Uso:  python benchmarks/bench_relatorios.py
+"""
+import time
+
+from sqlalchemy import event
+
+from dados import app, db, recriar_banco, popular_banco, cliente_logado
+
+
+class ContadorSQL:
+    def __init__(self, engine):
+        self.engine = engine
+        self.total = 0
+
+    def _contar(self, *args):
+        self.total += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._contar)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._contar)
+
+
+def main():
+    consultas = {
+        "sem filtro": "/relatorios",
+        "por nome": "/relatorios?busca_nome=Cliente",
+        "por período": "/relatorios?data_inicio=2024-01-01&data_fim=2025-12-31",
+        "página 3": "/relatorios?page=3&data_inicio=2024-01-01&data_fim=2025-12-31",
+    }
+    resultados = {}
+
+    with app.app_context():
+        recriar_banco()
+        client = cliente_logado()
+        total = 0
+        for n in (50, 500, 5000):
+            popular_banco(n - total)
+            total = n
+            for nome, url in consultas.items():
+                client.get(url)  # aquece cache de templates
+                db.session.remove()
+                with ContadorSQL(db.engine) as contador:
+                    inicio = time.perf_counter()
+                    resposta = client.get(url)
+                    tempo = (time.perf_counter() - inicio) * 1000
+                assert resposta.status_code == 200, resposta.status_code
+                resultados.setdefault(nome, []).append(contador.total)
+                print(f"{n:>6} ordens | {nome:<12} | {contador.total:>2} comandos SQL | {tempo:7.1f} ms")
+
+    variaveis = {nome: qtds for nome, qtds in resultados.items() if len(set(qtds)) > 1}
+    if variaveis:
+        raise SystemExit(f"Número de consultas varia com o tamanho da base: {variaveis}")
+    print("OK: número de consultas constante.")
+
+
+if __name__ == "__main__":
+    main()
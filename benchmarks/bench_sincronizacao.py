@@ -0,0 +1,118 @@
+"""
+Sincronização dos cadastros feitos offline no PWA (/offline/sincronizar):
+simula um tablet que ficou sem conexão e guardou N entradas de OS com fotos,
+e manda a fila em lotes. Depois reenvia a mesma fila de vários "aparelhos"
+ao mesmo tempo (resposta perdida, duas abas abertas) e confere que cada
+chave virou exatamente uma OS, sem buracos na numeração.
+
+Uso:  python benchmarks/bench_sincronizacao.py [--itens 40] [--fotos 2] [--lote 10] [--reenvios 4]
+"""
+import argparse
+import base64
+import glob
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from io import BytesIO
+
+from PIL import Image
+
+from dados import app, db, recriar_banco, popular_banco, cliente_logado, OrdemServico
+
+from app import EnvioOffline, Foto, armazenamento, remover_derivados_foto
+
+
+def foto():
+    """JPEG como o fila_offline.js grava: lado até 2000px, qualidade 85."""
+    saida = BytesIO()
+    Image.effect_noise((2000, 1500), 8).convert("RGB").save(saida, "JPEG", quality=85)
+    return base64.b64encode(saida.getvalue()).decode()
+
+
+def lotes(itens, tamanho):
+    return [itens[i:i + tamanho] for i in range(0, len(itens), tamanho)]
+
+
+def enviar(client, itens, tamanho_lote):
+    estados = []
+    for lote in lotes(itens, tamanho_lote):
+        resposta = client.post("/offline/sincronizar", json={"itens": lote})
+        assert resposta.status_code == 200, resposta.status_code
+        estados += [resultado["estado"] for resultado in resposta.get_json()["resultados"]]
+    return estados
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--itens", type=int, default=40)
+    parser.add_argument("--fotos", type=int, default=2, help="fotos por item")
+    parser.add_argument("--lote", type=int, default=10)
+    parser.add_argument("--reenvios", type=int, default=4, help="aparelhos reenviando a fila ao mesmo tempo")
+    args = parser.parse_args()
+
+    with app.app_context():
+        recriar_banco()
+        popular_banco(1)
+        clientes = [cliente_logado() for _ in range(args.reenvios + 1)]
+        os_antes = OrdemServico.query.count()
+
+    conteudo = foto()
+    itens = [{"chave": str(uuid.uuid4()), "tipo": "os", "cliente_id": 1,
+              "dados": {"equipamento": f"Notebook {i}", "defeito": "Não liga", "status": "Pendente"},
+              "criado_em": "2026-01-05T09:30:00-03:00",
+              "fotos": [{"nome": f"bench_{i}_{j}.jpg", "conteudo": conteudo} for j in range(args.fotos)]}
+             for i in range(args.itens)]
+    mb = sum(len(f["conteudo"]) for item in itens for f in item["fotos"]) / 1e6
+    try:
+        inicio = time.perf_counter()
+        estados = enviar(clientes[0], itens, args.lote)
+        tempo = time.perf_counter() - inicio
+        assert estados == ["criado"] * args.itens, estados
+        print(f"{args.itens} itens ({mb:.1f} MB de fotos em base64) em lotes de {args.lote}: "
+              f"{tempo:.2f}s ({tempo / args.itens * 1000:.0f} ms por item)")
+
+        # Reenvio da fila inteira por vários aparelhos ao mesmo tempo, mais itens novos
+        novos = [{**item, "chave": str(uuid.uuid4()), "fotos": []} for item in itens[:args.lote]]
+        fila = itens + novos
+        respostas = []
+        threads = [threading.Thread(target=lambda client=client: respostas.append(enviar(client, fila, args.lote)))
+                   for client in clientes[1:]]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        tempo = time.perf_counter() - inicio
+        criados = sum(estados.count("criado") for estados in respostas)
+        duplicados = sum(estados.count("duplicado") for estados in respostas)
+        print(f"{args.reenvios} reenvios simultâneos de {len(fila)} itens em {tempo:.2f}s: "
+              f"{criados} criados, {duplicados} duplicados, "
+              f"{sum(len(e) for e in respostas) - criados - duplicados} outros")
+
+        with app.app_context():
+            total = OrdemServico.query.count() - os_antes
+            numeros = sorted(n for (n,) in db.session.query(OrdemServico.numero_sequencial)
+                             .filter(OrdemServico.ano == datetime.utcnow().year))
+            assert total == len(fila) == EnvioOffline.query.count(), (total, len(fila))
+            assert numeros == list(range(1, len(numeros) + 1)), "numeração com buracos"
+            fotos = Foto.query.count()
+            assert fotos == args.itens * args.fotos, fotos
+        print(f"ok: {total} OS para {len(fila)} chaves, numeração sem buracos, {fotos} fotos")
+    finally:
+        with app.app_context():
+            while db.session.query(Foto.id).filter_by(pronta=False).count():
+                db.session.rollback()
+                time.sleep(0.1)
+            for (nome,) in db.session.query(Foto.nome_arquivo):
+                armazenamento.remover(nome)
+                remover_derivados_foto(nome)
+        pasta = getattr(armazenamento, "pasta", None)  # local: não deixa pastas vazias para trás
+        for sub in glob.glob(os.path.join(pasta, "*", "")) + [pasta] if pasta else []:
+            if os.path.isdir(sub) and not os.listdir(sub):
+                os.rmdir(sub)
+
+
+if __name__ == "__main__":
+    main()
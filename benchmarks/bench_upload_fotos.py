@@ -0,0 +1,82 @@
+"""
+Mede o upload de várias fotos de celular (12 MP, com EXIF de rotação) numa
+única requisição: quanto tempo a requisição leva (só grava os bytes) e
+quanto tempo até o worker de fotos deixar todas prontas. Confere também que
+o original foi regravado sem EXIF e na orientação certa.
+
+As fotos de teste são gravadas em static/uploads/ com "bench_" no nome e
+apagadas no final.
+
+Uso:  python benchmarks/bench_upload_fotos.py [--fotos 6]
+"""
+import argparse
+import glob
+import os
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from dados import app, db, recriar_banco, popular_banco, cliente_logado
+
+from app import Foto, ProcessamentoFoto
+
+TAMANHO_CELULAR = (4032, 3024)
+ORIENTACAO_90_GRAUS = 6
+
+
+def foto_de_celular():
+    ruido = [Image.effect_noise(TAMANHO_CELULAR, 40 + 10 * canal) for canal in range(3)]
+    exif = Image.Exif()
+    exif[0x0112] = ORIENTACAO_90_GRAUS
+    exif[0x0110] = "Celular de teste"
+    saida = BytesIO()
+    Image.merge("RGB", ruido).save(saida, "JPEG", quality=90, exif=exif)
+    saida.seek(0)
+    return saida
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fotos", type=int, default=6)
+    args = parser.parse_args()
+
+    pasta_uploads = app.config["UPLOAD_FOLDER"]
+    try:
+        with app.app_context():
+            recriar_banco()
+            popular_banco(1)
+            client = cliente_logado()
+        arquivos = [(foto_de_celular(), f"bench_{i}.jpg") for i in range(args.fotos)]
+
+        inicio = time.perf_counter()
+        client.post("/os/1/adicionar_foto", data={"foto": arquivos, "legenda": "Antes do reparo"},
+                    content_type="multipart/form-data")
+        tempo_requisicao = time.perf_counter() - inicio
+
+        with app.app_context():
+            while db.session.query(Foto.id).filter_by(pronta=False).count():
+                db.session.rollback()
+                time.sleep(0.1)
+            tempo_total = time.perf_counter() - inicio
+            fotos = Foto.query.all()
+            assert len(fotos) == args.fotos
+            assert ProcessamentoFoto.query.count() == 0
+            for foto in fotos:
+                with Image.open(os.path.join(pasta_uploads, foto.nome_arquivo)) as original:
+                    assert not original.getexif(), "EXIF não foi removido"
+                    assert original.size[0] < original.size[1], "orientação não foi aplicada"
+
+        print(f"{args.fotos} fotos {TAMANHO_CELULAR[0]}x{TAMANHO_CELULAR[1]} numa requisição: "
+              f"resposta em {tempo_requisicao * 1000:.0f} ms, todas prontas em {tempo_total:.2f}s")
+    finally:
+        for caminho in glob.glob(os.path.join(pasta_uploads, "*_bench_*.jpg")) + \
+                glob.glob(os.path.join(pasta_uploads, "*", "*_bench_*.*")):
+            os.remove(caminho)
+        for pasta in glob.glob(os.path.join(pasta_uploads, "*", "")) + [pasta_uploads]:
+            if os.path.isdir(pasta) and not os.listdir(pasta):
+                os.rmdir(pasta)
+
+
+if __name__ == "__main__":
+    main()
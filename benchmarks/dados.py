@@ -0,0 +1,131 @@
+"""
+Funções de apoio dos benchmarks: cria um banco SQLite temporário e popula
+com clientes, ordens de serviço e itens usando inserts em lote.
+
+Deve ser importado ANTES de `app`, pois define a DATABASE_URL.
+"""
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+PASTA_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_RAIZ)
+
+if "DATABASE_URL" not in os.environ:
+    _pasta_temporaria = tempfile.mkdtemp(prefix="oficina-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_pasta_temporaria, 'bench.db')}"
+    # PDFs de uma rodada anterior não podem contar como acerto do cache
+    os.environ.setdefault("PDF_CACHE_PASTA", os.path.join(_pasta_temporaria, "pdf_cache"))
+
+from flask_migrate import upgrade  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app import (  # noqa: E402
+    create_app, db, bcrypt, Cliente, ContadorDocumento, OrdemServico, Servico, Peca, ItemServico, ItemPeca, Usuario
+)
+
+app = create_app()
+
+STATUS = ["Em andamento", "Concluído"]
+ANO = 2024
+
+
+def recriar_banco():
+    """
+    Cria o schema pelas migrações (inclui os índices de busca, que não estão
+    nos modelos). Espera um banco vazio, como o temporário criado acima.
+    """
+    upgrade(directory=os.path.join(PASTA_RAIZ, "migrations"))
+    senha = bcrypt.generate_password_hash("bench").decode("utf-8")
+    db.session.add(Usuario(username="bench", password_hash=senha, role="funcionario"))
+    db.session.add(Servico(descricao_servico="Limpeza", preco_unitario=80.0))
+    db.session.add(Peca(nome_peca="Cabeça de impressão", preco_unitario=250.0))
+    db.session.commit()
+
+
+def popular_banco(n_ordens, n_clientes=None, itens_por_ordem=2, lote=5000):
+    """
+    Insere `n_ordens` ordens (metade concluídas) distribuídas entre clientes,
+    cada uma com `itens_por_ordem` serviços e peças. Pode ser chamada de novo
+    para acrescentar ordens: a numeração do ano continua de onde parou e o
+    contador de numeração acompanha.
+    """
+    aleatorio = random.Random(42)
+    n_clientes = n_clientes or max(1, n_ordens // 10)
+    clientes_existentes = db.session.query(db.func.count(Cliente.id)).scalar()
+    ordens_existentes = db.session.query(db.func.max(OrdemServico.id)).scalar() or 0
+    ultimo_numero = db.session.query(db.func.max(OrdemServico.numero_sequencial))\
+        .filter(OrdemServico.ano == ANO).scalar() or 0
+    servico_id = Servico.query.first().id
+    peca_id = Peca.query.first().id
+    senha = Usuario.query.first().password_hash
+
+    novos_clientes = [
+        {
+            "nome": f"Cliente {i}",
+            "username_cliente": f"cli{i}",
+            "password_hash": senha,
+            "role": "cliente",
+            "telefone_celular": f"(31) 9{i // 10000:04d}-{i % 10000:04d}",
+            "cpf": f"{i // 1000000 % 1000:03d}.{i // 1000 % 1000:03d}.{i % 1000:03d}-{i % 97:02d}",
+        }
+        for i in range(clientes_existentes, n_clientes)
+    ]
+    if novos_clientes:
+        db.session.execute(insert(Cliente), novos_clientes)
+        db.session.commit()
+
+    inicio = datetime(2024, 1, 1)
+    for base in range(0, n_ordens, lote):
+        ordens, servicos, pecas = [], [], []
+        for i in range(base, min(base + lote, n_ordens)):
+            os_id = ordens_existentes + i + 1
+            ordem = {
+                "id": os_id,
+                "cliente_id": aleatorio.randint(1, n_clientes),
+                "numero_sequencial": ultimo_numero + i + 1,
+                "ano": ANO,
+                "equipamento": "Impressora",
+                "numero_de_serie": f"SN{os_id:08X}",
+                "defeito": "Não liga",
+                "status": STATUS[i % 2],
+                "data_de_criacao": inicio + timedelta(minutes=7 * i),
+                "valor_total_itens": 0.0,
+            }
+            for _ in range(itens_por_ordem):
+                servico = {"quantidade": 1, "preco_cobrado": 80.0,
+                           "ordem_servico_id": os_id, "servico_id": servico_id}
+                peca = {"quantidade": aleatorio.randint(1, 3), "preco_cobrado": 250.0,
+                        "ordem_servico_id": os_id, "peca_id": peca_id}
+                # o insert em lote não passa pelo flush, então o total vai pronto
+                ordem["valor_total_itens"] += (servico["quantidade"] * servico["preco_cobrado"]
+                                               + peca["quantidade"] * peca["preco_cobrado"])
+                servicos.append(servico)
+                pecas.append(peca)
+            ordens.append(ordem)
+        db.session.execute(insert(OrdemServico), ordens)
+        if servicos:
+            db.session.execute(insert(ItemServico), servicos)
+            db.session.execute(insert(ItemPeca), pecas)
+        db.session.commit()
+
+    if n_ordens:
+        # o insert em lote não passa por reservar_proximo_numero
+        contador = ContadorDocumento.query.filter_by(tipo="os", ano=ANO).first()
+        if contador is None:
+            contador = ContadorDocumento(tipo="os", ano=ANO, ultimo_numero=0)
+            db.session.add(contador)
+        contador.ultimo_numero = ultimo_numero + n_ordens
+        db.session.commit()
+
+
+def cliente_logado():
+    """Retorna um test_client do Flask já autenticado como funcionário."""
+    client = app.test_client()
+    usuario = Usuario.query.filter_by(username="bench").first()
+    with client.session_transaction() as sessao:
+        sessao["_user_id"] = usuario.get_id()
+        sessao["_fresh"] = True
+    return client
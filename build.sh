@@ -1,2 +1,9 @@
 #!/usr/bin/env bash
-flask db upgrade
\ No newline at end of file
+# Deploy (Procfile: gunicorn -c gunicorn.conf.py wsgi:app)
+# Atrás do roteador do Heroku ou de um nginx, defina PROXIES_CONFIAVEIS com o
+# número de proxies na frente do app (1 no Heroku). Sem isso todos os clientes
+# aparecem com o IP do proxy e o limite de falhas de login por IP
+# (LOGIN_MAX_POR_IP) vale para a loja inteira de uma vez.
+flask db upgrade
+flask baixar-dependencias-web
+flask compilar-estaticos
\ No newline at end of file
@@ -0,0 +1,52 @@
+# Configuração do gunicorn (Procfile: gunicorn -c gunicorn.conf.py wsgi:app)
+#
+# Com GUNICORN_PRELOAD=1 (padrão) o master importa o app, as bibliotecas de
+# documentos e monta o create_app() uma vez, e os workers nascem do fork já
+# com tudo carregado, dividindo as páginas de memória com o master
+# (copy-on-write). Para o compartilhamento durar:
+#  - gc.freeze() antes do fork move os objetos do master para uma geração
+#    permanente, que o coletor dos workers não percorre (percorrer escreve
+#    nos cabeçalhos dos objetos e força a cópia das páginas);
+#  - as conexões do banco abertas no master (ex.: uma consulta no import) não
+#    podem ser usadas por dois processos: cada worker descarta o pool herdado
+#    em post_fork e abre as suas.
+# Sem preload (GUNICORN_PRELOAD=0) cada worker importa tudo sozinho: sobe mais
+# devagar e ocupa mais memória, mas recarrega o código a cada reinício.
+#
+# benchmarks/bench_memoria_workers.py mede a memória por worker nos dois modos.
+#
+# Atrás do roteador do Heroku ou de um nginx, defina também PROXIES_CONFIAVEIS
+# (veja build.sh): o app só enxerga o IP real do cliente com ele.
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+if preload_app:
+    # O master já paga o import do xhtml2pdf/ReportLab e os workers herdam
+    os.environ.setdefault('PRECARREGAR_DOCUMENTOS', '1')
+
+
+def pre_fork(server, worker):
+    # Antes de cada fork: tudo o que o master criou até aqui fica fora da coleta
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    from app import db
+
+    # close=False: só esquece as conexões herdadas, sem fechá-las (elas ainda
+    # são do master); o worker abre conexões novas na primeira consulta
+    with server.app.wsgi().app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
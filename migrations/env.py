@@ -1,4 +1,5 @@
 import logging
+import re
 from logging.config import fileConfig
 
 from flask import current_app
@@ -90,9 +91,22 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # the search indexes (FTS5 tables on SQLite, trigram indexes on
+    # PostgreSQL) are managed by hand in the "busca indexada" migration
+    # and must not show up as removed objects in autogenerate
+    def include_object(object, name, type_, reflected, compare_to):
+        if reflected and compare_to is None:
+            if type_ == 'table' and re.search(r'_busca(_\w+)?$', name):
+                return False
+            if type_ == 'index' and name and name.endswith('_trgm'):
+                return False
+        return True
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
@@ -0,0 +1,48 @@
+"""total armazenado dos itens em ordem_servico e orcamento
+
+Revision ID: 3b9d2c41a7e0
+Revises: 71f4f6dccc9e
+Create Date: 2026-10-18 09:12:44.103518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9d2c41a7e0'
+down_revision = '71f4f6dccc9e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ordem_servico', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('valor_total_itens', sa.Float(), server_default='0', nullable=False))
+
+    with op.batch_alter_table('orcamento', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('valor_total_itens', sa.Float(), server_default='0', nullable=False))
+
+    # Preenche os totais das linhas que já existem
+    op.execute("""
+        UPDATE ordem_servico SET valor_total_itens =
+            (SELECT COALESCE(SUM(quantidade * preco_cobrado), 0) FROM item_servico
+              WHERE item_servico.ordem_servico_id = ordem_servico.id)
+          + (SELECT COALESCE(SUM(quantidade * preco_cobrado), 0) FROM item_peca
+              WHERE item_peca.ordem_servico_id = ordem_servico.id)
+    """)
+    op.execute("""
+        UPDATE orcamento SET valor_total_itens =
+            (SELECT COALESCE(SUM(quantidade * preco_cobrado), 0) FROM item_orcamento_servico
+              WHERE item_orcamento_servico.orcamento_id = orcamento.id)
+          + (SELECT COALESCE(SUM(quantidade * preco_cobrado), 0) FROM item_orcamento_peca
+              WHERE item_orcamento_peca.orcamento_id = orcamento.id)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('orcamento', schema=None) as batch_op:
+        batch_op.drop_column('valor_total_itens')
+
+    with op.batch_alter_table('ordem_servico', schema=None) as batch_op:
+        batch_op.drop_column('valor_total_itens')
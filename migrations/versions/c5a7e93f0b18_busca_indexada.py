@@ -0,0 +1,99 @@
+"""busca indexada (pg_trgm no PostgreSQL, FTS5 no SQLite)
+
+Revision ID: c5a7e93f0b18
+Revises: 8e4f1a6b2d93
+Create Date: 2026-10-18 11:20:05.918342
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a7e93f0b18'
+down_revision = '8e4f1a6b2d93'
+branch_labels = None
+depends_on = None
+
+# Deve ficar igual a CAMPOS_BUSCA em app.py
+CAMPOS_BUSCA = {
+    'cliente': ['nome'],
+    'peca': ['nome_peca', 'codigo_interno'],
+    'servico': ['descricao_servico'],
+    'curriculo': ['nome'],
+    'contrato': ['locatario_nome'],
+    'impressora': ['modelo'],
+}
+
+# Atenção: migrações futuras que recriarem uma dessas tabelas no SQLite
+# (batch_alter_table com recreate) apagam os triggers abaixo e precisam
+# chamar criar_triggers_sqlite() de novo.
+
+
+def criar_triggers_sqlite(tabela, colunas):
+    fts = f"{tabela}_busca"
+    lista = ', '.join(colunas)
+    novos = ', '.join(f"new.{c}" for c in colunas)
+    antigos = ', '.join(f"old.{c}" for c in colunas)
+    op.execute(f"""
+        CREATE TRIGGER {fts}_ai AFTER INSERT ON {tabela} BEGIN
+            INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER {fts}_ad AFTER DELETE ON {tabela} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {antigos});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER {fts}_au AFTER UPDATE OF {lista} ON {tabela} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {antigos});
+            INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos});
+        END
+    """)
+
+
+def upgrade():
+    dialeto = op.get_bind().dialect.name
+
+    if dialeto == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        # unaccent() não é IMMUTABLE, então não pode ser usada em índice diretamente
+        op.execute("""
+            CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+            LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+            AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+        """)
+        for tabela, colunas in CAMPOS_BUSCA.items():
+            for coluna in colunas:
+                op.execute(
+                    f"CREATE INDEX ix_{tabela}_{coluna}_trgm ON {tabela} "
+                    f"USING gin (f_unaccent(lower({coluna})) gin_trgm_ops)"
+                )
+
+    elif dialeto == 'sqlite':
+        for tabela, colunas in CAMPOS_BUSCA.items():
+            fts = f"{tabela}_busca"
+            op.execute(
+                f"CREATE VIRTUAL TABLE {fts} USING fts5({', '.join(colunas)}, "
+                f"content='{tabela}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+            )
+            criar_triggers_sqlite(tabela, colunas)
+            op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialeto = op.get_bind().dialect.name
+
+    if dialeto == 'postgresql':
+        for tabela, colunas in CAMPOS_BUSCA.items():
+            for coluna in colunas:
+                op.execute(f"DROP INDEX IF EXISTS ix_{tabela}_{coluna}_trgm")
+        op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
+
+    elif dialeto == 'sqlite':
+        for tabela in CAMPOS_BUSCA:
+            fts = f"{tabela}_busca"
+            for sufixo in ('ai', 'ad', 'au'):
+                op.execute(f"DROP TRIGGER IF EXISTS {fts}_{sufixo}")
+            op.execute(f"DROP TABLE IF EXISTS {fts}")
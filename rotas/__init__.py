@@ -0,0 +1,11 @@
+"""
+Rotas do app, um blueprint por área. Os modelos, formulários e serviços
+continuam em app.py; create_app() registra todos os BLUEPRINTS.
+"""
+from rotas import (autenticacao, catalogo, clientes, configuracoes, contratos, curriculos, fotos, impressoras,
+                   offline, orcamentos, ordens_servico, pdf, principal, recibos, relatorios)
+
+BLUEPRINTS = (
+    principal.bp, autenticacao.bp, clientes.bp, ordens_servico.bp, orcamentos.bp, catalogo.bp, relatorios.bp,
+    pdf.bp, fotos.bp, offline.bp, curriculos.bp, contratos.bp, configuracoes.bp, impressoras.bp, recibos.bp,
+)
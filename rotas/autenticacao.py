@@ -0,0 +1,48 @@
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import login_user, logout_user
+
+from app import autenticar, Cliente, Usuario
+
+bp = Blueprint('autenticacao', __name__)
+
+
+@bp.route("/logout")
+def logout():
+    logout_user()
+    flash("Logoff efetuado!", "danger")
+    return redirect(url_for("autenticacao.login"))
+
+@bp.route("/logout_cliente")
+def logout_cliente():
+    logout_user()
+    flash("Logoff efetuado!", "danger")
+    return redirect(url_for("principal.index"))
+
+@bp.route("/login", methods = ("GET", "POST"))
+def login():
+    if request.method == "POST":
+        user, erro = autenticar(Usuario, Usuario.username, 'login')
+        if erro:
+            return erro
+
+        if user:
+            login_user(user)
+            return redirect(url_for('principal.home'))
+        else:
+            flash("Usuário ou senha incorretos", "danger")
+            return redirect(url_for('autenticacao.login'))
+
+    return render_template('login.html')
+
+@bp.route("/login_cliente", methods = ("GET", "POST"))
+def login_cliente():
+    if request.method == "POST":
+        user, erro = autenticar(Cliente, Cliente.username_cliente, 'login_cliente')
+        if erro:
+            return erro
+
+        if user:
+            login_user(user)
+            return redirect(url_for('clientes.dashboard_cliente'))
+
+    return render_template('login_cliente.html')
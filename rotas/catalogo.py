@@ -0,0 +1,181 @@
+from flask import abort, Blueprint, flash, redirect, render_template, request, url_for
+
+from app import aplicar_busca, buscar_no_catalogo, cache_catalogo, db, Peca, role_required, Servico
+
+bp = Blueprint('catalogo', __name__)
+
+
+@bp.route("/servicos")
+@role_required('funcionario')
+def listar_servicos():
+    page = request.args.get("page", 1, type=int)
+    termo_busca = request.args.get("termo_busca")
+    servico_query = Servico.query
+
+    if termo_busca:
+        servico_query = aplicar_busca(servico_query, Servico, termo_busca)
+
+    paginacao = servico_query.order_by(Servico.descricao_servico).paginate(
+        page=page, per_page=15, error_out=False
+    )
+    servicos_por_pagina = paginacao.items
+
+    return render_template(
+        "listar_servicos.html",
+          servicos = servicos_por_pagina,
+          paginacao = paginacao,
+          termo_busca = termo_busca
+          )
+
+@bp.route("/servicos/cadastrar", methods = ["GET", "POST"])
+@role_required('funcionario')
+def cadastrar_servico():
+    if request.method == "POST":
+        descricao_servico = request.form["descricao_servico"]
+        detalhes_opcional = request.form["detalhes_opcional"]
+        unidade_medida = request.form["unidade_medida"]
+        preco_unitario = request.form["preco_unitario"]
+        if preco_unitario == "":
+            preco_unitario_novo = 0.0
+        else:
+            preco_unitario_novo = preco_unitario.replace(",", ".")
+
+        novo_servico = Servico(
+            descricao_servico=descricao_servico,
+            detalhes_opcional=detalhes_opcional,
+            unidade_medida = unidade_medida,
+            preco_unitario = preco_unitario_novo,
+            )
+        db.session.add(novo_servico)
+        db.session.commit()
+        cache_catalogo.invalidar()
+        flash("Serviço cadastrado com sucesso!", "success")
+        return redirect(url_for("catalogo.listar_servicos"))
+    
+    return render_template("cadastrar_servico.html")
+
+@bp.route("/servicos/editar/<int:id>", methods=["GET", "POST"])
+@role_required('funcionario')
+def editar_servico(id):
+    servico_a_editar = Servico.query.get_or_404(id)
+    if request.method == "POST": 
+        descricao_servico = request.form["descricao_servico"]
+        detalhes_opcional = request.form["detalhes_opcional"]
+        unidade_medida = request.form["unidade_medida"]
+        preco_unitario = request.form["preco_unitario"]
+
+        servico_a_editar.descricao_servico = descricao_servico
+        servico_a_editar.detalhes_opcional = detalhes_opcional
+        servico_a_editar.unidade_medida = unidade_medida
+        servico_a_editar.preco_unitario = preco_unitario
+
+        db.session.commit()
+        cache_catalogo.invalidar()
+        flash("Serviço editado com sucesso!", "success")
+
+        return redirect(url_for("catalogo.listar_servicos"))
+    
+    return render_template("editar_servicos.html", servico_a_editar = servico_a_editar)
+
+@bp.route("/servicos/deletar/<int:id>")
+@role_required('funcionario')
+def deletar_servico(id):
+    servico_a_deletar = Servico.query.get(id)
+    db.session.delete(servico_a_deletar)
+    db.session.commit()
+    cache_catalogo.invalidar()
+    flash("Serviço apagado com sucesso!", "success")
+    return redirect(url_for("catalogo.listar_servicos"))
+
+@bp.route("/peca", methods = ["GET"])
+@role_required('funcionario')
+def listar_pecas():
+    page = request.args.get("page", 1, type=int)
+    termo_busca = request.args.get("termo_busca")
+    pecas_query = Peca.query
+
+    if termo_busca:
+        pecas_query = aplicar_busca(pecas_query, Peca, termo_busca)
+
+    paginacao = pecas_query.order_by(Peca.nome_peca).paginate(
+        page=page, per_page=15, error_out=False
+    )
+
+    pecas = paginacao.items
+    
+
+    return render_template("listar_pecas.html", pecas = pecas, paginacao = paginacao, termo_busca = termo_busca)
+
+@bp.route("/peca/cadastrar", methods = ["GET", "POST"])
+@role_required('funcionario')
+def cadastrar_peca():
+    if request.method == "POST":
+        nome_peca = request.form["nome_peca"]
+        detalhes_opcional = request.form["detalhes_opcional"]
+        codigo_interno = request.form["codigo_interno"]
+        unidade_medida = request.form["unidade_medida"]
+        preco_unitario = request.form["preco_unitario"]
+        if preco_unitario == "":
+            preco_unitario_novo = 0.0
+        else:
+            preco_unitario_novo = preco_unitario.replace(",", ".")
+
+        nova_peca = Peca(
+            nome_peca=nome_peca,
+            detalhes_opcional=detalhes_opcional,
+            codigo_interno=codigo_interno,
+            unidade_medida = unidade_medida,
+            preco_unitario = preco_unitario_novo,
+            )
+        db.session.add(nova_peca)
+        db.session.commit()
+        cache_catalogo.invalidar()
+        flash("Peça cadastrada com sucesso!", "success")
+        return redirect(url_for("catalogo.listar_pecas"))
+    
+    return render_template("cadastrar_peca.html")
+
+@bp.route("/peca/editar/<int:id>", methods=["GET", "POST"])
+@role_required('funcionario')
+def editar_peca(id):
+    peca_a_editar = Peca.query.get_or_404(id)
+    if request.method == "POST": 
+        nome_peca = request.form["nome_peca"]
+        detalhes_opcional = request.form["detalhes_opcional"]
+        codigo_interno = request.form["codigo_interno"]
+        unidade_medida = request.form["unidade_medida"]
+        preco_unitario = request.form["preco_unitario"]
+
+        peca_a_editar.nome_peca = nome_peca
+        peca_a_editar.detalhes_opcional = detalhes_opcional
+        peca_a_editar.codigo_interno = codigo_interno
+        peca_a_editar.unidade_medida = unidade_medida
+        peca_a_editar.preco_unitario = preco_unitario
+
+        db.session.commit()
+        cache_catalogo.invalidar()
+        flash("Peça editada com sucesso!", "success")
+
+        return redirect(url_for("catalogo.listar_pecas"))
+    
+    return render_template("editar_peca.html", peca_a_editar = peca_a_editar)
+
+@bp.route("/peca/deletar/<int:id>")
+@role_required('funcionario')
+def deletar_peca(id):
+    peca_a_deletar = Peca.query.get(id)
+    db.session.delete(peca_a_deletar)
+    db.session.commit()
+    cache_catalogo.invalidar()
+    flash("Peça apagada com sucesso!", "success")
+    return redirect(url_for("catalogo.listar_pecas"))
+
+@bp.route("/catalogo/<tipo>")
+@role_required('funcionario')
+def buscar_catalogo(tipo):
+    """Busca enquanto digita dos campos de serviço/peça (JSON)."""
+    if tipo not in ('servico', 'peca'):
+        abort(404)
+    termo = request.args.get('q', '')
+    limite = min(request.args.get('limite', 20, type=int), 50)
+    return {'resultados': buscar_no_catalogo(tipo, termo, limite)}
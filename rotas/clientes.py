@@ -0,0 +1,174 @@
+from flask import abort, Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user
+from sqlalchemy.orm import joinedload
+
+from app import aplicar_busca, Cliente, db, gerar_hash_senha, Impressora, OrdemServico, role_required
+
+bp = Blueprint('clientes', __name__)
+
+
+@bp.route("/cliente/dashboard")
+@role_required('cliente')
+def dashboard_cliente():
+    return render_template("dashboard_cliente.html")
+
+@bp.route("/cliente/os/<int:id>")
+@role_required("cliente")
+def ver_os_cliente(id):
+    ordem_servico = OrdemServico.query.get(id)
+    if ordem_servico.cliente_id == current_user.id:
+        return render_template("ver_os_cliente.html", ordem_servico=ordem_servico)
+    else:
+        abort(403)
+
+@bp.route("/clientes/cadastrar", methods=["GET", "POST"])
+@role_required('funcionario')
+def cadastrar_cliente():
+    if request.method == "POST":
+        #dados do usuario e senha do cliente
+        username_cliente = request.form["username_cliente"]
+        password_cliente = request.form["password_cliente"]
+
+        password_hash = gerar_hash_senha(password_cliente)
+
+        #dados do cliente
+        nome_cliente = request.form["nome"]
+        telefone_celular = request.form["telefone_celular"]
+        telefone_auxiliar = request.form["telefone_auxiliar"]
+        cpf = request.form["cpf"]
+        cnpj = request.form["cnpj"]
+        cep = request.form["cep"]
+        logradouro = request.form["logradouro"]
+        numero = request.form["numero"]
+        complemento = request.form["complemento"]
+        bairro = request.form["bairro"]
+        cidade = request.form["cidade"]
+        estado = request.form["estado"]
+        anotacoes = request.form["anotacoes"]
+        novo_cliente = Cliente(
+            nome=nome_cliente,
+            username_cliente=username_cliente,
+            password_hash=password_hash,
+            senha_plana_temporaria = password_cliente,
+            telefone_celular=telefone_celular,
+            telefone_auxiliar = telefone_auxiliar,
+            cpf = cpf,
+            cnpj = cnpj,
+            cep = cep,
+            logradouro = logradouro,
+            numero = numero,
+            complemento = complemento,
+            bairro = bairro,
+            cidade = cidade,
+            estado = estado,
+            anotacoes = anotacoes
+            )
+        db.session.add(novo_cliente)
+        db.session.commit()
+
+        flash("Cliente cadastrado com sucesso!", "success")
+        return redirect(url_for("clientes.listar_clientes"))
+
+    return render_template("cadastrar_cliente.html")
+
+@bp.route("/clientes/deletar/<int:id>")
+@role_required('funcionario')
+def deletar_cliente(id):
+    cliente_a_deletar = Cliente.query.get(id)
+    db.session.delete(cliente_a_deletar)
+    db.session.commit()
+    flash("Cliente apagado com sucesso!", "success")
+    return redirect(url_for("clientes.listar_clientes"))
+
+@bp.route("/clientes/editar/<int:id>", methods=["GET", "POST"])
+@role_required('funcionario')
+def editar_cliente(id):
+    cliente_a_editar = Cliente.query.get_or_404(id)
+    todas_impressoras = Impressora.query.options(joinedload(Impressora.clientes_com_acesso)).order_by(Impressora.modelo).all()
+
+    if request.method == "POST": 
+        nome_cliente = request.form["nome"]
+        telefone_celular = request.form["telefone_celular"]
+        telefone_auxiliar = request.form["telefone_auxiliar"]
+        cpf = request.form["cpf"]
+        cnpj = request.form["cnpj"]
+        cep = request.form["cep"]
+        logradouro = request.form["logradouro"]
+        numero = request.form["numero"]
+        complemento = request.form["complemento"]
+        bairro = request.form["bairro"]
+        cidade = request.form["cidade"]
+        estado = request.form["estado"]
+        anotacoes = request.form["anotacoes"]
+
+        cliente_a_editar.impressoras_permitidas = []
+        ids_impressoras_permitidas = request.form.getlist("impressora_permitida")
+        for impressora_id_str in ids_impressoras_permitidas:
+            impressora_id = int(impressora_id_str)
+            impressora = Impressora.query.get(impressora_id)
+            if impressora:
+                cliente_a_editar.impressoras_permitidas.append(impressora)
+
+        nova_senha = request.form.get('nova_senha')
+        if nova_senha:
+            # Criptografa a nova senha
+            password_hash = gerar_hash_senha(nova_senha)
+            # Salva a nova senha criptografada no banco
+            cliente_a_editar.password_hash = password_hash
+            cliente_a_editar.senha_plana_temporaria = nova_senha
+
+
+        cliente_a_editar.nome = nome_cliente
+        cliente_a_editar.telefone_celular = telefone_celular
+        cliente_a_editar.telefone_auxiliar = telefone_auxiliar
+        cliente_a_editar.cpf = cpf
+        cliente_a_editar.cnpj = cnpj
+        cliente_a_editar.cep = cep
+        cliente_a_editar.logradouro = logradouro
+        cliente_a_editar.numero = numero
+        cliente_a_editar.complemento = complemento
+        cliente_a_editar.bairro = bairro
+        cliente_a_editar.cidade = cidade
+        cliente_a_editar.estado = estado
+        cliente_a_editar.anotacoes = anotacoes
+
+        db.session.commit()
+        flash("Cliente editado com sucesso!", "success")
+
+        return redirect(url_for("clientes.listar_clientes"))
+    
+    return render_template(
+        "editar_cliente.html", 
+        cliente_a_editar = cliente_a_editar,
+        todas_impressoras = todas_impressoras
+        )
+
+@bp.route("/clientes", methods = ["GET"])
+@role_required('funcionario')
+def listar_clientes():
+    page = request.args.get("page", 1, type=int)
+
+    termo_busca = request.args.get("termo_busca")
+    query_clientes = Cliente.query
+    
+    if termo_busca:
+        query_clientes = aplicar_busca(query_clientes, Cliente, termo_busca)
+
+    paginacao = query_clientes.order_by(Cliente.nome).paginate(page=page, per_page=15, error_out=False)
+
+    clientes_da_pagina = paginacao.items
+        
+    return render_template(
+        "listar_clientes.html",
+         clientes = clientes_da_pagina,
+         paginacao = paginacao,
+         termo_busca = termo_busca
+         )
+
+@bp.route("/cliente/<int:id>")
+@role_required('funcionario')
+def detalhes_cliente(id):
+    cliente_a_detalhar = Cliente.query.get(id)
+    ordens_servico = cliente_a_detalhar.ordens_servico
+    orcamentos = cliente_a_detalhar.orcamento
+    return render_template("detalhes_cliente.html", cliente_a_detalhar = cliente_a_detalhar, ordens_servico = ordens_servico, orcamentos=orcamentos)
@@ -0,0 +1,101 @@
+import os
+import uuid
+from datetime import datetime
+
+from flask import abort, Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import login_required
+from werkzeug.utils import secure_filename
+
+from app import (
+    armazenamento, Configuracao, ConfiguracaoForm, db, FOTO_CACHE_MAX_AGE, invalidar_cache_configuracao,
+    role_required
+)
+
+bp = Blueprint('configuracoes', __name__)
+
+
+@bp.route("/configuracoes", methods=["GET", "POST"])
+@login_required
+@role_required('funcionario')
+def configuracoes():
+    config = Configuracao.query.first()
+    if not config:
+        config = Configuracao()
+        db.session.add(config)
+    
+    form = ConfiguracaoForm()
+    if form.validate_on_submit():
+        config.nome_loja = form.nome_loja.data
+        config.cnpj = form.cnpj.data
+        config.endereco = form.endereco.data
+        config.telefone = form.telefone.data
+
+        if form.logomarca.data:
+            logo_file = form.logomarca.data
+            # Nome novo a cada envio: cópias em cache (navegador, PDFs, S3) nunca ficam velhas
+            extensao = os.path.splitext(secure_filename(logo_file.filename))[1].lower()
+            filename = f"logo_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}{extensao}"
+            armazenamento.salvar(filename, logo_file.stream)
+            logo_antiga, config.logomarca = config.logomarca, filename
+        
+        config.texto_garantia = form.texto_garantia.data
+        config.email_contato = form.email_contato.data
+        config.site = form.site.data
+        
+        db.session.commit()
+        invalidar_cache_configuracao()
+        if form.logomarca.data and logo_antiga:
+            armazenamento.remover(logo_antiga)
+        flash("Configurações salvas com sucesso!", "success")
+        return redirect(url_for('configuracoes.configuracoes'))
+    elif request.method == "GET":
+        form.nome_loja.data = config.nome_loja
+        form.cnpj.data = config.cnpj
+        form.endereco.data = config.endereco
+        form.telefone.data = config.telefone
+        form.texto_garantia.data = config.texto_garantia
+        form.email_contato.data = config.email_contato
+        form.site.data = config.site
+    
+    return render_template("configuracoes.html", form=form, config=config)
+
+@bp.route("/configuracoes/reset", methods=["POST"])
+@login_required
+@role_required('funcionario')
+def configuracoes_reset():
+    config = Configuracao.query.first()
+    if config:
+        db.session.delete(config)
+    db.session.commit()
+    invalidar_cache_configuracao()
+    flash("Configurações resetadas com sucesso!", "success")
+    return redirect(url_for('configuracoes.configuracoes'))
+
+@bp.route("/configuracoes/logo/<nome>")
+@login_required
+def logomarca(nome):
+    config = Configuracao.query.first()
+    if not config or config.logomarca != nome:
+        abort(404)
+    # O nome muda a cada envio, então o navegador pode guardar por bastante tempo
+    return armazenamento.resposta(nome, max_age=FOTO_CACHE_MAX_AGE)
+
+@bp.route("/configuracoes/logo/remover", methods=["POST"])
+@login_required
+@role_required('funcionario')
+def configuracoes_remove_logo():
+    config = Configuracao.query.first()
+
+    if config and config.logomarca:
+        try:
+            armazenamento.remover(config.logomarca)
+
+            config.logomarca = None
+            db.session.commit()
+            invalidar_cache_configuracao()
+            flash("Logomarca removida com sucesso!", "success")
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao remover a logomarca: {e}", "danger")
+
+    return redirect(url_for('configuracoes.configuracoes'))
@@ -0,0 +1,214 @@
+from datetime import datetime
+from io import BytesIO
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, send_file, url_for
+from flask_login import login_required
+
+from app import aplicar_busca, Contrato, ContratoForm, db, responder_pdf, role_required
+
+bp = Blueprint('contratos', __name__)
+
+
+@bp.route("/contrato/novo", methods=["POST", "GET"])
+@login_required
+@role_required('funcionario')
+def novo_contrato():
+    form = ContratoForm()
+
+    if form.validate_on_submit():
+        novo_contrato = Contrato()
+        novo_contrato.locador_nome = form.locador_nome.data
+        novo_contrato.locador_rg = form.locador_rg.data
+        novo_contrato.locador_cpf = form.locador_cpf.data
+        novo_contrato.locador_endereco = form.locador_endereco.data
+        
+        novo_contrato.locatario_nome = form.locatario_nome.data
+        novo_contrato.locatario_rg = form.locatario_rg.data
+        novo_contrato.locatario_cpf = form.locatario_cpf.data
+        novo_contrato.locatario_endereco = form.locatario_endereco.data
+        
+        novo_contrato.endereco_imovel = form.endereco_imovel.data
+        novo_contrato.finalidade = form.finalidade.data
+        novo_contrato.prazo_meses = form.prazo_meses.data
+        novo_contrato.data_inicio = form.data_inicio.data
+        novo_contrato.data_fim = form.data_fim.data
+        novo_contrato.dia_pagamento = form.dia_pagamento.data
+        novo_contrato.indice_reajuste = form.indice_reajuste.data
+        novo_contrato.multa_percentual = form.multa_percentual.data
+        novo_contrato.juros_percentual = form.juros_percentual.data
+        valor_str = form.valor_aluguel.data or '0'
+
+        # Tenta converter para um número float, tratando os formatos brasileiros
+        try:
+            # 1. Remove o separador de milhar (ponto)
+            # 2. Troca o separador decimal (vírgula) por ponto
+            valor_float = float(valor_str.replace('.', '').replace(',', '.'))
+        except ValueError:
+            # Se o usuário digitar um texto inválido (ex: "mil reais"), salva 0.0
+            valor_float = 0.0
+
+        # Salva o número float e limpo no banco de dados
+        novo_contrato.valor_aluguel = valor_float
+
+        novo_contrato.cidade_foro = form.cidade_foro.data
+        novo_contrato.cidade = form.cidade.data
+        novo_contrato.data_assinatura = form.data_assinatura.data
+        novo_contrato.data_criacao = datetime.now()
+
+        db.session.add(novo_contrato)
+        db.session.commit()
+        flash("Contrato criado com sucesso!", "success")
+
+        return redirect(url_for('contratos.preview_contrato', id=novo_contrato.id))
+    
+    return render_template("novo_contrato.html", form=form)
+
+@bp.route("/contrato/preview/<int:id>")
+@login_required
+@role_required('funcionario')
+def preview_contrato(id):
+    contrato = Contrato.query.get_or_404(id)
+    return render_template("template_contrato.html", contrato=contrato)
+
+@bp.route("/contrato/<int:id>/download_pdf")
+@login_required
+@role_required('funcionario')
+def download_contrato_pdf(id):
+
+    # 1. Busca os dados (igual a antes)
+    contrato = Contrato.query.get_or_404(id)
+    
+    base_dir = current_app.root_path
+    # 2. Renderiza um template HTML para uma string (igual a antes)
+    # Lembre-se que tínhamos falado em criar um pdf_template.html limpo
+    html_renderizado = render_template("template_contrato.html", contrato=contrato, para_pdf = True)
+
+    # 3. A conversão para PDF roda na fila de PDFs, fora desta requisição
+    nome_arquivo = f"Contrato-{contrato.locatario_nome}.pdf"
+    return responder_pdf(html_renderizado, nome_arquivo, url_for('contratos.preview_contrato', id=id))
+
+@bp.route("/contrato/<int:id>/download_word")
+@login_required
+@role_required('funcionario')
+def download_contrato_word(id):
+    contrato = Contrato.query.get_or_404(id)
+    html_renderizado = render_template("template_contrato.html", contrato=contrato, para_pdf = True)
+    
+    from htmldocx import HtmlToDocx
+    parser = HtmlToDocx()
+
+    docx = parser.parse_html_string(html_renderizado)
+
+    buffer = BytesIO()
+    docx.save(buffer)
+    buffer.seek(0)
+    
+    return send_file(
+        buffer, 
+        as_attachment=True, 
+        download_name=f'Contrato-{contrato.locador_nome}.docx', 
+        mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+
+@bp.route("/contrato/deletar/<int:id>")
+@login_required
+@role_required('funcionario')
+def deletar_contrato(id): 
+    contrato_a_deletar = Contrato.query.get_or_404(id)
+    db.session.delete(contrato_a_deletar)
+    db.session.commit()
+    flash("Contrato apagado com sucesso!", "success")
+    return redirect(url_for('contratos.listar_contratos'))
+
+@bp.route("/contrato/editar/<int:id>", methods=["GET", "POST"])
+@login_required
+@role_required('funcionario')
+def editar_contrato(id):
+    contrato = Contrato.query.get_or_404(id)
+    form = ContratoForm()
+
+    if form.validate_on_submit():
+        contrato.locador_nome = form.locador_nome.data
+        contrato.locador_rg = form.locador_rg.data
+        contrato.locador_cpf = form.locador_cpf.data
+        contrato.locador_endereco = form.locador_endereco.data
+        
+        contrato.locatario_nome = form.locatario_nome.data
+        contrato.locatario_rg = form.locatario_rg.data
+        contrato.locatario_cpf = form.locatario_cpf.data
+        contrato.locatario_endereco = form.locatario_endereco.data
+        
+        contrato.endereco_imovel = form.endereco_imovel.data
+        contrato.finalidade = form.finalidade.data
+        contrato.prazo_meses = form.prazo_meses.data
+        contrato.data_inicio = form.data_inicio.data
+        contrato.data_fim = form.data_fim.data
+        contrato.dia_pagamento = form.dia_pagamento.data
+        contrato.indice_reajuste = form.indice_reajuste.data
+        contrato.multa_percentual = form.multa_percentual.data
+        contrato.juros_percentual = form.juros_percentual.data
+        valor_str = form.valor_aluguel.data or '0' # Pega o texto do form ou '0' se estiver vazio
+        try:
+            valor_float = float(valor_str.replace('.', '').replace(',', '.')) # Remove o separador de milhar e troca a vírgula
+        except ValueError:
+            valor_float = 0.0 # Define um valor padrão em caso de erro
+
+        contrato.valor_aluguel = valor_float # Salva o número float convertido
+
+
+        contrato.cidade_foro = form.cidade_foro.data
+        contrato.cidade = form.cidade.data
+        contrato.data_assinatura = form.data_assinatura.data
+
+        db.session.commit()
+        flash("Contrato editado com sucesso!", "success")
+        return redirect(url_for('contratos.listar_contratos'))
+    
+    elif request.method == "GET":
+        form.locador_nome.data = contrato.locador_nome
+        form.locador_rg.data = contrato.locador_rg
+        form.locador_cpf.data = contrato.locador_cpf
+        form.locador_endereco.data = contrato.locador_endereco
+        
+        form.locatario_nome.data = contrato.locatario_nome
+        form.locatario_rg.data = contrato.locatario_rg
+        form.locatario_cpf.data = contrato.locatario_cpf
+        form.locatario_endereco.data = contrato.locatario_endereco
+        
+        form.endereco_imovel.data = contrato.endereco_imovel
+        form.finalidade.data = contrato.finalidade 
+        form.prazo_meses.data = contrato.prazo_meses
+        form.data_inicio.data = contrato.data_inicio
+        form.data_fim.data = contrato.data_fim
+        form.valor_aluguel.data = contrato.valor_aluguel
+        form.dia_pagamento.data = contrato.dia_pagamento
+        form.indice_reajuste.data = contrato.indice_reajuste
+        form.multa_percentual.data = contrato.multa_percentual
+        form.juros_percentual.data = contrato.juros_percentual
+        form.valor_aluguel.data = contrato.valor_aluguel
+
+        form.cidade_foro.data = contrato.cidade_foro
+        form.cidade.data = contrato.cidade
+        form.data_assinatura.data = contrato.data_assinatura
+    
+    return render_template("novo_contrato.html", form=form, contrato=contrato)
+
+@bp.route("/contratos") # Ou a URL que você preferir
+@login_required
+@role_required('funcionario')
+def listar_contratos():
+    # 1. Pega o termo de busca (igual antes)
+    page = request.args.get('page', 1, type=int)
+    termos_busca = request.args.get('busca', '')
+    
+    # 2. Muda a query para o modelo Contrato
+    query = Contrato.query
+
+    # 3. Muda o filtro para um campo do Contrato (ex: nome do locatário)
+    if termos_busca:
+        query = aplicar_busca(query, Contrato, termos_busca)
+
+    paginacao = query.order_by(Contrato.locatario_nome).paginate(page=page, per_page=15, error_out=False)
+    contratos = paginacao.items
+        
+    # 5. Renderiza o template de listagem de contratos
+    return render_template('listar_contratos.html', contratos=contratos, paginacao = paginacao, termos_busca=termos_busca)
@@ -0,0 +1,235 @@
+from datetime import datetime
+from io import BytesIO
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, send_file, url_for
+from flask_login import login_required
+
+from app import (
+    aplicar_busca, Curriculo, CurriculoPasso1Form, CurriculoPasso2Form, CurriculoPasso3Form,
+    CurriculoPasso4Form, Curso, db, ExperienciaProfissional, FormacaoAcademica, responder_pdf, role_required
+)
+
+bp = Blueprint('curriculos', __name__)
+
+
+@bp.route("/curriculo/novo")
+@login_required
+@role_required('funcionario')
+def novo_curriculo():
+    novo_curriculo = Curriculo(data_criacao = datetime.now())
+    db.session.add(novo_curriculo)
+    db.session.commit()
+
+    return redirect(url_for('curriculos.curriculo_passo1', curriculo_id=novo_curriculo.id))
+
+@bp.route("/curriculo/passo1/<int:curriculo_id>", methods=["GET", "POST"])
+@login_required
+@role_required('funcionario')
+def curriculo_passo1(curriculo_id):
+    curriculo = Curriculo.query.get_or_404(curriculo_id)
+    form = CurriculoPasso1Form()
+
+    if form.validate_on_submit():
+        curriculo.nome = form.nome.data
+        curriculo.estado_civil = form.estado_civil.data
+        curriculo.idade = form.idade.data
+        curriculo.endereco = form.endereco.data
+        curriculo.telefone_principal = form.telefone_principal.data
+        curriculo.email = form.email.data
+
+        db.session.commit()
+        flash("Passo um concluido com sucesso!", "success")
+
+        return redirect(url_for('curriculos.curriculo_passo2', curriculo_id=curriculo.id))
+    if request.method == "GET":
+        form.nome.data = curriculo.nome
+        form.estado_civil.data = curriculo.estado_civil
+        form.idade.data = curriculo.idade
+        form.endereco.data = curriculo.endereco
+        form.telefone_principal.data = curriculo.telefone_principal
+        form.email.data = curriculo.email
+    
+    return render_template("curriculo_passo1.html", form=form)
+
+@bp.route("/curriculo/passo2/<int:curriculo_id>", methods=["GET", "POST"])
+@login_required
+@role_required('funcionario')
+def curriculo_passo2(curriculo_id):
+    curriculo = Curriculo.query.get_or_404(curriculo_id)
+    form = CurriculoPasso2Form()
+
+    if form.validate_on_submit():
+        lista_de_descricoes = form.formacoes.data
+        lista_de_cursos = form.cursos.data
+        for formacoes in curriculo.formacoes:
+            db.session.delete(formacoes)
+        for cursos in curriculo.cursos:
+            db.session.delete(cursos)
+
+
+        for descricao in lista_de_descricoes:
+            if descricao:
+                nova_formacao = FormacaoAcademica(descricao=descricao, curriculo_id=curriculo.id)
+                db.session.add(nova_formacao)
+
+        for descricao in lista_de_cursos:
+            if descricao:
+                novo_curso = Curso(descricao=descricao, curriculo_id=curriculo.id)
+                db.session.add(novo_curso)
+
+        db.session.commit()
+        flash("Formações cadastradas com sucesso!", "success")
+
+        return redirect(url_for('curriculos.curriculo_passo3', curriculo_id=curriculo.id))
+    if request.method == "GET":
+        formacoes_atuais = curriculo.formacoes
+        cursos_atuais = curriculo.cursos
+        lista_de_descricoes = [formacao.descricao for formacao in formacoes_atuais]
+        lista_de_cursos = [curso.descricao for curso in cursos_atuais]
+        form = CurriculoPasso2Form(formacoes=lista_de_descricoes, cursos=lista_de_cursos)
+
+    return render_template("curriculo_passo2.html", form=form)
+
+@bp.route("/curriculo/passo3/<int:curriculo_id>", methods=["GET", "POST"])
+@login_required
+@role_required('funcionario')
+def curriculo_passo3(curriculo_id):
+    curriculo = Curriculo.query.get_or_404(curriculo_id)
+    form = CurriculoPasso3Form()
+
+    if form.validate_on_submit():
+        lista_de_experiencias  = form.experiencias.data
+        for experiencias in curriculo.experiencias:
+            db.session.delete(experiencias)
+        
+        for dados_experiencia in lista_de_experiencias:
+            if dados_experiencia['empresa'] and dados_experiencia['cargo']:
+                nova_experiencia = ExperienciaProfissional(
+                    empresa = dados_experiencia['empresa'],
+                    cargo = dados_experiencia['cargo'],
+                    data_admissao = dados_experiencia['data_admissao'],
+                    data_demissao = dados_experiencia['data_demissao'],
+                    desabilitar_datas = dados_experiencia['desabilitar_datas'],
+                    periodo = dados_experiencia['periodo'],
+                    curriculo_id = curriculo.id
+                )
+                db.session.add(nova_experiencia)
+
+        db.session.commit()
+        flash("Experiências cadastradas com sucesso!", "success")
+
+        return redirect(url_for('curriculos.curriculo_passo4', curriculo_id=curriculo.id))
+    if request.method == "GET":
+        experiencias_atuais = curriculo.experiencias
+        dados_para_o_form = []
+        for experiencia in experiencias_atuais:
+            dados_para_o_form.append({
+                'empresa': experiencia.empresa,
+                'cargo': experiencia.cargo,
+                'data_admissao': experiencia.data_admissao,
+                'data_demissao': experiencia.data_demissao,
+                'desabilitar_datas': experiencia.desabilitar_datas,
+                'periodo': experiencia.periodo
+            })
+        form = CurriculoPasso3Form(experiencias=dados_para_o_form)
+
+    return render_template("curriculo_passo3.html", form=form)
+
+@bp.route("/curriculo/passo4/<int:curriculo_id>", methods=["GET", "POST"])
+@login_required
+@role_required('funcionario')
+def curriculo_passo4(curriculo_id):
+    curriculo = Curriculo.query.get_or_404(curriculo_id)
+    form = CurriculoPasso4Form()
+
+    if form.validate_on_submit():
+        curriculo.objetivo = form.objetivo.data
+
+        db.session.commit()
+        flash("Passo 4 concluido com sucesso!", "success")
+
+        return redirect(url_for('curriculos.curriculo_passo_final', curriculo_id=curriculo.id))
+    
+    if request.method == "GET":
+        if curriculo.objetivo != None:
+            form.objetivo.data = curriculo.objetivo
+        else:
+            form.objetivo.data = """Busco uma vaga no mercado de trabalho, numa empresa onde eu possa
+me desenvolver profissionalmente, demonstrar minhas competências e habilidades
+técnicas e emocionais e, em conjunto com os meus colegas e gestores, eu possa
+colaborar para o crescimento da organização e do grupo"""
+        
+    return render_template("curriculo_passo4.html", form=form)
+
+@bp.route("/curriculo/passo_final/<int:curriculo_id>")
+@login_required
+@role_required('funcionario')
+def curriculo_passo_final(curriculo_id):
+    curriculo = Curriculo.query.get_or_404(curriculo_id)
+    
+    return render_template("curriculo_preview.html", curriculo=curriculo)
+
+@bp.route("/curriculo/<int:curriculo_id>/download_pdf")
+@login_required
+@role_required('funcionario')
+def download_curriculo_pdf(curriculo_id):
+    # 1. Busca os dados (igual a antes)
+    curriculo = Curriculo.query.get_or_404(curriculo_id)
+    
+    base_dir = current_app.root_path
+    # 2. Renderiza um template HTML para uma string (igual a antes)
+    # Lembre-se que tínhamos falado em criar um pdf_template.html limpo
+    html_renderizado = render_template("curriculo_preview.html", curriculo=curriculo, para_pdf = True)
+
+    # 3. A conversão para PDF roda na fila de PDFs, fora desta requisição
+    nome_arquivo = f"Curriculo-{curriculo.nome}.pdf"
+    return responder_pdf(html_renderizado, nome_arquivo, url_for('curriculos.curriculo_passo_final', curriculo_id=curriculo_id))
+
+@bp.route("/curriculos")
+@login_required
+@role_required('funcionario')
+def listar_curriculos():
+    page = request.args.get('page', 1, type=int)
+    termos_busca = request.args.get('busca', '')
+    query = Curriculo.query
+
+    if termos_busca:
+        query = aplicar_busca(query, Curriculo, termos_busca)
+
+    paginacao = query.order_by(Curriculo.nome).paginate(page=page, per_page=15, error_out=False)
+
+    curriculos = paginacao.items
+                                      
+    return render_template('listar_curriculos.html', curriculos=curriculos, paginacao = paginacao, termos_busca=termos_busca)
+
+@bp.route("/curriculos/deletar/<int:curriculo_id>")
+@login_required
+@role_required('funcionario')
+def deletar_curriculo(curriculo_id): 
+    curriculo_a_deletar = Curriculo.query.get_or_404(curriculo_id)
+    db.session.delete(curriculo_a_deletar)
+    db.session.commit()
+    flash("Curriculo apagado com sucesso!", "success")
+    return redirect(url_for('curriculos.listar_curriculos'))
+
+@bp.route("/curriculo/<int:curriculo_id>/download_word")
+@login_required
+@role_required('funcionario')
+def download_curriculo_word(curriculo_id):
+    curriculo = Curriculo.query.get_or_404(curriculo_id)
+    html_renderizado = render_template("curriculo_preview.html", curriculo=curriculo, para_pdf = True)
+    
+    from htmldocx import HtmlToDocx
+    parser = HtmlToDocx()
+
+    docx = parser.parse_html_string(html_renderizado)
+
+    buffer = BytesIO()
+    docx.save(buffer)
+    buffer.seek(0)
+    
+    return send_file(
+        buffer, 
+        as_attachment=True, 
+        download_name=f'Curriculo-{curriculo.nome}.docx', 
+        mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
@@ -0,0 +1,37 @@
+from flask import abort, Blueprint, request
+from flask_login import current_user, login_required
+
+from app import (
+    armazenamento, Foto, FOTO_CACHE_MAX_AGE, gerar_variantes_foto, nome_variante_foto, TAMANHOS_GALERIA,
+    VARIANTES_FOTO
+)
+
+bp = Blueprint('fotos', __name__)
+
+
+@bp.route("/fotos/<int:foto_id>/<tamanho>")
+@login_required
+def foto_reduzida(foto_id, tamanho):
+    formato = request.args.get('formato', 'jpg')
+    if tamanho != 'original' and (tamanho not in TAMANHOS_GALERIA or formato not in VARIANTES_FOTO[tamanho][1]):
+        abort(404)
+    foto = Foto.query.get_or_404(foto_id)
+    if current_user.role != 'funcionario':
+        # Cliente só vê fotos das próprias OS/orçamentos
+        documento = foto.ordem_servico or foto.orcamento
+        if documento is None or documento.cliente_id != current_user.id:
+            abort(403)
+
+    if tamanho == 'original':
+        nome = foto.nome_arquivo
+    else:
+        nome = nome_variante_foto(foto.nome_arquivo, tamanho, formato)
+        if not armazenamento.existe(nome):
+            if not gerar_variantes_foto(foto.nome_arquivo, [tamanho]):
+                # Original que o Pillow não lê: melhor mostrar ele do que nada
+                nome = foto.nome_arquivo
+    resposta = armazenamento.resposta(nome, max_age=FOTO_CACHE_MAX_AGE)
+    # Exige login: só o navegador guarda, proxies não
+    resposta.cache_control.public = False
+    resposta.cache_control.private = True
+    return resposta
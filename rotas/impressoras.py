@@ -0,0 +1,228 @@
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+from sqlalchemy.orm import joinedload
+
+from app import aplicar_busca, db, Impressora, ImpressoraForm, RecursoForm, RecursoImpressora, role_required
+
+bp = Blueprint('impressoras', __name__)
+
+
+@bp.route("/utilidades/impressoras")
+@login_required
+@role_required('funcionario')
+def listar_impressoras():
+    page = request.args.get('page', 1, type=int)
+    termos_busca = request.args.get('busca', '')
+    query = Impressora.query
+
+    if termos_busca:
+        query = aplicar_busca(query, Impressora, termos_busca)
+
+    paginacao = query.order_by(Impressora.modelo).paginate(page=page, per_page=15, error_out=False)
+    impressoras = paginacao.items
+
+    # Vamos usar um novo template para esta página
+    return render_template(
+        'listar_impressoras.html', 
+        impressoras=impressoras, 
+        paginacao = paginacao, 
+        termos_busca=termos_busca
+    )
+
+@bp.route("/utilidades/impressoras/nova", methods=["GET", "POST"])
+@login_required
+@role_required('funcionario')
+def nova_impressora():
+    form = ImpressoraForm()
+    if form.validate_on_submit():
+        # Verifica se o modelo já existe
+        modelo_existente = Impressora.query.filter_by(modelo=form.modelo.data).first()
+        if modelo_existente:
+            flash('Erro: Já existe uma impressora cadastrada com esse modelo.', 'danger')
+        else:
+            nova_imp = Impressora(
+                modelo=form.modelo.data,
+                descricao=form.descricao.data
+            )
+            db.session.add(nova_imp)
+            db.session.commit()
+            flash('Impressora cadastrada com sucesso!', 'success')
+            return redirect(url_for('impressoras.listar_impressoras'))
+
+    # Vamos criar um template simples para o formulário
+    return render_template('form_impressora.html', form=form, titulo='Nova Categoria de Link')
+
+@bp.route("/utilidades/impressoras/editar/<int:id>", methods=["GET", "POST"])
+@login_required
+@role_required('funcionario')
+def editar_impressora(id):
+    impressora = Impressora.query.get_or_404(id)
+    form = ImpressoraForm()
+
+    if form.validate_on_submit():
+        impressora.modelo = form.modelo.data
+        impressora.descricao = form.descricao.data
+        db.session.commit()
+        flash('Impressora atualizada com sucesso!', 'success')
+        return redirect(url_for('impressoras.listar_impressoras'))
+
+    elif request.method == "GET":
+        form.modelo.data = impressora.modelo
+        form.descricao.data = impressora.descricao
+
+    return render_template('form_impressora.html', form=form, titulo=f'Editar Categoria: {impressora.modelo}')
+
+@bp.route("/utilidades/impressoras/deletar/<int:id>", methods=["POST"])
+@login_required
+@role_required('funcionario')
+def deletar_impressora(id):
+    # Usamos POST para segurança, e o botão no template já faz isso.
+    impressora = Impressora.query.get_or_404(id)
+
+    # Graças ao 'cascade' que definimos no modelo, 
+    # o banco de dados também apagará todos os 'Recursos' (links) 
+    # associados a esta impressora.
+
+    db.session.delete(impressora)
+    db.session.commit()
+    flash(f'Impressora "{impressora.modelo}" e todos os seus links foram apagados com sucesso!', 'success')
+    return redirect(url_for('impressoras.listar_impressoras'))
+
+@bp.route("/utilidades/impressoras/<int:id>/detalhes", methods=["GET", "POST"])
+@login_required
+@role_required('funcionario')
+def detalhes_impressora(id):
+    # 1. Busca a impressora (a "categoria")
+    impressora = Impressora.query.get_or_404(id)
+
+    # 2. Cria o formulário para adicionar um NOVO recurso
+    form = RecursoForm()
+
+    # 3. Lógica para salvar o NOVO recurso
+    if form.validate_on_submit():
+        novo_recurso = RecursoImpressora(
+            impressora_id = impressora.id,
+            tipo = form.tipo.data,
+            descricao = form.descricao.data,
+            sistema_operacional = form.sistema_operacional.data,
+            link_download = form.link_download.data
+        )
+        db.session.add(novo_recurso)
+        db.session.commit()
+        flash('Novo recurso adicionado com sucesso!', 'success')
+        return redirect(url_for('impressoras.detalhes_impressora', id=impressora.id)) # Recarrega a página
+
+    # 4. No GET, apenas busca os recursos já existentes para listar
+    recursos_cadastrados = impressora.recursos
+
+    # 5. Renderiza um novo template
+    return render_template(
+        'detalhes_impressora.html', 
+        impressora=impressora, 
+        recursos=recursos_cadastrados, 
+        form=form
+    )
+
+@bp.route("/utilidades/recurso/deletar/<int:id>", methods=["POST"])
+@login_required
+@role_required('funcionario')
+def deletar_recurso(id):
+    # 1. Busca o recurso (o link) que será deletado
+    recurso = RecursoImpressora.query.get_or_404(id)
+
+    # 2. IMPORTANTE: Precisamos saber para qual impressora voltar.
+    #    Guardamos o ID da impressora "pai" antes de deletar.
+    impressora_id = recurso.impressora_id
+
+    # 3. Deleta o recurso
+    db.session.delete(recurso)
+    db.session.commit()
+
+    flash('Recurso (link) removido com sucesso!', 'success')
+
+    # 4. Redireciona de volta para a página de detalhes da impressora
+    return redirect(url_for('impressoras.detalhes_impressora', id=impressora_id))
+
+@bp.route("/utilidades/recurso/editar/<int:id>", methods=["GET", "POST"])
+@login_required
+@role_required('funcionario')
+def editar_recurso(id):
+
+    # 1. Busca o recurso específico que queremos editar
+    recurso = RecursoImpressora.query.get_or_404(id)
+
+    # 2. Reutilizamos o mesmo formulário que já criamos
+    form = RecursoForm()
+
+    # 3. Lógica de salvamento (POST)
+    if form.validate_on_submit():
+        # Atualiza os dados do objeto 'recurso'
+        recurso.tipo = form.tipo.data
+        recurso.descricao = form.descricao.data
+        recurso.sistema_operacional = form.sistema_operacional.data
+        recurso.link_download = form.link_download.data
+
+        db.session.commit()
+        flash('Recurso atualizado com sucesso!', 'success')
+
+        # Redireciona de volta para a página de detalhes
+        return redirect(url_for('impressoras.detalhes_impressora', id=recurso.impressora_id))
+
+    # 4. Lógica de carregamento (GET)
+    elif request.method == "GET":
+        # Preenche o formulário com os dados atuais do recurso
+        form.tipo.data = recurso.tipo
+        form.descricao.data = recurso.descricao
+        form.sistema_operacional.data = recurso.sistema_operacional
+        form.link_download.data = recurso.link_download
+
+    # 5. Renderiza um novo template para o formulário de edição
+    return render_template(
+        'form_recurso.html', 
+        form=form, 
+        recurso=recurso,  # Passamos 'recurso' para o template
+        titulo=f'Editar Recurso: {recurso.descricao[:30]}...'
+    )
+
+@bp.route("/resets")
+@login_required
+@role_required('cliente')
+def dashboard_resets():
+    # --- PASSO 1: Verificação de Permissão (NOVA LÓGICA) ---
+    # Verifica se o cliente tem PELO MENOS UMA impressora permitida.
+    # .count() é mais rápido do que carregar todos os objetos.
+    if current_user.impressoras_permitidas.count() == 0:
+        flash("Você não tem permissão para acessar esta área.", "danger")
+        return redirect(url_for('clientes.dashboard_cliente')) # Volta para o dashboard normal
+
+    # --- PASSO 2: Lógica de Busca (NOVA LÓGICA) ---
+    page = request.args.get('page', 1, type=int)
+    termos_busca = request.args.get('busca', '')
+
+    # A MUDANÇA PRINCIPAL:
+    # Em vez de Impressora.query, buscamos DENTRO da lista do usuário
+    query = current_user.impressoras_permitidas.options(
+        joinedload(Impressora.recursos) # A otimização que já tínhamos
+    ).order_by(Impressora.modelo)
+
+    if termos_busca:
+        # Filtra pelo modelo da impressora
+        query = aplicar_busca(query, Impressora, termos_busca)
+
+    # A paginação funciona exatamente da mesma forma
+    paginacao = query.paginate(
+        page=page, 
+        per_page=10,
+        error_out=False
+    )
+    impressoras_da_pagina = paginacao.items
+
+    # --- PASSO 3: Renderizar o Template ---
+    # O template 'dashboard_resets.html' não precisa de NENHUMA MUDANÇA,
+    # pois ele já espera as variáveis 'impressoras' e 'paginacao'.
+    return render_template(
+        'dashboard_resets.html', 
+        impressoras=impressoras_da_pagina, 
+        paginacao=paginacao,
+        termos_busca=termos_busca
+    )
@@ -0,0 +1,56 @@
+from flask import Blueprint, current_app, request
+from sqlalchemy.exc import IntegrityError
+
+from app import (
+    armazenamento, db, EnvioOffline, fila_fotos, ItemOfflineInvalido, OFFLINE_MAX_ITENS,
+    resultado_envio_offline, role_required, sincronizar_item_offline
+)
+
+bp = Blueprint('offline', __name__)
+
+
+@bp.route("/offline/sincronizar", methods=["POST"])
+@role_required('funcionario')
+def sincronizar_offline():
+    """
+    Recebe {"itens": [{"chave", "tipo": "os"|"orcamento", "cliente_id",
+    "dados": {campos do formulário}, "fotos": [{"nome", "conteudo"}],
+    "criado_em"}]} e responde um resultado por item, na mesma ordem:
+    'criado', 'duplicado' (chave já recebida), 'erro' (com 'mensagem'; não
+    adianta reenviar sem corrigir) ou 'adiado' (falha passageira; reenviar).
+    """
+    corpo = request.get_json(silent=True)
+    itens = corpo.get('itens') if isinstance(corpo, dict) else None
+    if not isinstance(itens, list) or not itens:
+        return {'erro': "Envie um JSON com a lista 'itens'."}, 400
+    if len(itens) > OFFLINE_MAX_ITENS:
+        return {'erro': f"No máximo {OFFLINE_MAX_ITENS} itens por lote."}, 413
+
+    resultados, criados = [], False
+    for item in itens:
+        chave = item.get('chave') if isinstance(item, dict) else None
+        fotos_gravadas = []
+        # Um commit por item: um erro desfaz só ele (inclusive o número reservado)
+        try:
+            resultado = sincronizar_item_offline(item, fotos_gravadas)
+            db.session.commit()
+        except ItemOfflineInvalido as e:
+            db.session.rollback()
+            resultado = {'chave': chave, 'estado': 'erro', 'mensagem': str(e)}
+        except Exception as e:
+            db.session.rollback()
+            existente = EnvioOffline.query.filter_by(chave=chave).first() if isinstance(e, IntegrityError) else None
+            if existente:
+                # Outra sincronização do mesmo item gravou a chave primeiro
+                resultado = resultado_envio_offline(existente, 'duplicado')
+            else:
+                current_app.logger.exception("Erro ao sincronizar o cadastro offline %s", chave)
+                resultado = {'chave': chave, 'estado': 'adiado', 'mensagem': "Erro ao salvar; será reenviado."}
+        if resultado['estado'] != 'criado':
+            for nome in fotos_gravadas:
+                armazenamento.remover(nome)
+        criados = criados or resultado['estado'] == 'criado'
+        resultados.append(resultado)
+    if criados:
+        fila_fotos.avisar()
+    return {'resultados': resultados}
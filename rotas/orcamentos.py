@@ -0,0 +1,348 @@
+from datetime import datetime
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+from flask_login import login_required
+
+from app import (
+    armazenamento, Cliente, criar_orcamento, db, documento_pdf_orcamento, fila_fotos, Foto, gravar_arquivos_fotos,
+    ItemOrcamentoPeca, ItemOrcamentoServico, ItemPeca, ItemServico, obter_configuracao, Orcamento,
+    OrdemServico, Peca, receber_fotos, registrar_fotos, remover_derivados_foto, reservar_proximo_numero, responder_pdf,
+    role_required, Servico
+)
+
+bp = Blueprint('orcamentos', __name__)
+
+
+@bp.route("/orcamento/<int:cliente_id>/novo", methods=["POST", "GET"])
+@login_required
+@role_required('funcionario')
+def novo_orcamento(cliente_id):
+    cliente = Cliente.query.get_or_404(cliente_id)
+    
+    if request.method == "POST":
+        # As fotos vão para o armazenamento antes de reservar o número: o
+        # contador do ano fica travado até o commit
+        fotos = gravar_arquivos_fotos(request.files.getlist('foto'))
+        try:
+            novo_orcamento = criar_orcamento(cliente_id, request.form)
+            registrar_fotos(fotos, '', orcamento_id=novo_orcamento.id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for nome in fotos:
+                armazenamento.remover(nome)
+            raise
+        if fotos:
+            fila_fotos.avisar()
+        
+        flash(f"Orçamento {novo_orcamento.numero_orcamento} criado com sucesso! Agora adicione os itens.", "success")
+        
+        # Redireciona para uma futura página de detalhes do orçamento
+        # return redirect(url_for("orcamentos.detalhes_orcamento", id=novo_orcamento.id))
+        
+        # Por enquanto, redireciona para a página do cliente
+        return redirect(url_for("clientes.detalhes_cliente", id=cliente_id))
+
+    return render_template("novo_orcamento.html", cliente = cliente)
+
+@bp.route("/orcamento/deletar/<int:id>")
+@role_required('funcionario')
+def deletar_orcamento(id):
+    orcamento_a_deletar = Orcamento.query.get(id)
+    id_do_cliente = orcamento_a_deletar.cliente.id
+    db.session.delete(orcamento_a_deletar)
+    db.session.commit()
+    flash("Orçamento apagado com sucesso!", "success")
+    return redirect(url_for("clientes.detalhes_cliente", id=id_do_cliente))
+
+@bp.route("/orcamento/<int:id>", methods=["GET", "POST"])
+@role_required('funcionario')
+def detalhes_orcamento(id):
+    orcamento = Orcamento.query.get(id)
+
+    if request.method == "POST":
+        equipamento = request.form.get('equipamento')
+        marca = request.form.get('marca')
+        modelo = request.form.get('modelo')
+        numero_de_serie = request.form.get('numero_de_serie')
+        
+        problema_informado = request.form.get('problema_informado')
+        problema_constatado = request.form.get('problema_constatado')
+        observacoes_cliente = request.form.get('observacoes_cliente')
+        observacoes_internas = request.form.get('observacoes_internas')
+        status = request.form.get('status')
+        tecnico_responsavel = request.form.get('tecnico_responsavel')
+
+        orcamento.equipamento = equipamento
+        orcamento.marca = marca
+        orcamento.modelo = modelo
+        orcamento.numero_de_serie = numero_de_serie
+        orcamento.validade_do_orcamento = request.form.get("validade_do_orcamento") or None
+        orcamento.problema_informado = problema_informado
+        orcamento.problema_constatado = problema_constatado
+        orcamento.observacoes_cliente = observacoes_cliente
+        orcamento.observacoes_internas = observacoes_internas
+        orcamento.status = status
+        orcamento.tecnico_responsavel = tecnico_responsavel
+    
+        db.session.commit()
+
+        return redirect(url_for("clientes.detalhes_cliente", id=orcamento.cliente_id))
+    
+    return render_template("detalhes_orcamento.html", orcamento = orcamento)
+
+@bp.route("/orcamento/item_servico/adicionar/<int:orcamento_id>", methods=["POST"])
+@role_required('funcionario')
+def adicionar_servico_orcamento(orcamento_id):
+    """
+    Rota para adicionar um item de serviço a um orçamento específico.
+    """
+    orcamento = Orcamento.query.get_or_404(orcamento_id)
+    
+    # Pega os dados do formulário
+    servico_id = request.form.get("servico_id")
+    quantidade = request.form.get("quantidade", 1, type=int) # Padrão é 1
+    preco_cobrado_str = request.form.get("preco_cobrado")
+
+    # Busca o serviço no banco de dados para pegar o preço padrão
+    servico = Servico.query.get(servico_id)
+    if not servico:
+        flash("Serviço não encontrado!", "danger")
+        return redirect(url_for("orcamentos.detalhes_orcamento", id=orcamento_id))
+
+    # Define o preço a ser usado
+    if preco_cobrado_str:
+        preco_cobrado = float(preco_cobrado_str.replace(",", "."))
+    else:
+        preco_cobrado = servico.preco_unitario # Usa o preço padrão do serviço
+
+    # Cria o novo item de serviço para o orçamento
+    novo_item = ItemOrcamentoServico(
+        quantidade=quantidade,
+        preco_cobrado=preco_cobrado,
+        orcamento_id=orcamento.id,
+        servico_id=servico.id
+    )
+
+    db.session.add(novo_item)
+    db.session.commit()
+    
+    flash("Serviço adicionado ao orçamento com sucesso!", "success")
+    # Redireciona de volta para a página de detalhes, focando na seção de serviços
+    return redirect(url_for("orcamentos.detalhes_orcamento", id=orcamento_id) + "#adicionar_servico")
+
+@bp.route("/orcamento/item_servico/remover/<int:item_id>", methods=["POST"])
+@role_required('funcionario')
+def remover_servico_orcamento(item_id):
+    """
+    Rota para remover um item de serviço de um orçamento.
+    """
+    item_a_remover = ItemOrcamentoServico.query.get_or_404(item_id)
+    orcamento_id = item_a_remover.orcamento_id
+    
+    db.session.delete(item_a_remover)
+    db.session.commit()
+    
+    flash("Serviço removido do orçamento com sucesso!", "success")
+    return redirect(url_for("orcamentos.detalhes_orcamento", id=orcamento_id) + "#adicionar_servico")
+
+@bp.route("/orcamento/item_peca/adicionar/<int:orcamento_id>", methods=["POST"])
+@role_required('funcionario')
+def adicionar_peca_orcamento(orcamento_id):
+    """
+    Rota para adicionar um item de peça a um orçamento específico.
+    """
+    orcamento = Orcamento.query.get_or_404(orcamento_id)
+    
+    # Pega os dados do formulário
+    peca_id = request.form.get("peca_id")
+    quantidade = request.form.get("quantidade", 1, type=int)
+    preco_cobrado_str = request.form.get("preco_cobrado")
+
+    # Busca a peça para pegar o preço padrão
+    peca = Peca.query.get(peca_id)
+    if not peca:
+        flash("Peça não encontrada!", "danger")
+        return redirect(url_for("orcamentos.detalhes_orcamento", id=orcamento_id))
+
+    # Define o preço
+    if preco_cobrado_str:
+        preco_cobrado = float(preco_cobrado_str.replace(",", "."))
+    else:
+        preco_cobrado = peca.preco_unitario
+
+    # Cria o novo item de peça para o orçamento
+    novo_item = ItemOrcamentoPeca(
+        quantidade=quantidade,
+        preco_cobrado=preco_cobrado,
+        orcamento_id=orcamento.id,
+        peca_id=peca.id
+    )
+
+    db.session.add(novo_item)
+    db.session.commit()
+    
+    flash("Peça adicionada ao orçamento com sucesso!", "success")
+    return redirect(url_for("orcamentos.detalhes_orcamento", id=orcamento_id) + "#adicionar_peca")
+
+@bp.route("/orcamento/item_peca/remover/<int:item_id>", methods=["POST"])
+@role_required('funcionario')
+def remover_peca_orcamento(item_id):
+    """
+    Rota para remover um item de peça de um orçamento.
+    """
+    item_a_remover = ItemOrcamentoPeca.query.get_or_404(item_id)
+    orcamento_id = item_a_remover.orcamento_id
+    
+    db.session.delete(item_a_remover)
+    db.session.commit()
+    
+    flash("Peça removida do orçamento com sucesso!", "success")
+    return redirect(url_for("orcamentos.detalhes_orcamento", id=orcamento_id) + "#adicionar_peca")
+
+@bp.route("/orcamento/<int:orcamento_id>/adicionar_foto", methods=["POST"])
+@login_required
+@role_required('funcionario')
+def adicionar_foto_orcamento(orcamento_id):
+    if 'foto' not in request.files:
+        return redirect(request.referrer)
+
+    legenda = request.form.get('legenda', '')
+    # AQUI, conectamos as fotos ao ORÇAMENTO (o tratamento das imagens fica para a fila)
+    aceitas = receber_fotos(request.files.getlist('foto'), legenda, orcamento_id=orcamento_id)
+    if aceitas:
+        flash(f"{aceitas} foto(s) adicionada(s) com sucesso!", "success")
+
+    return redirect(url_for('orcamentos.detalhes_orcamento', id=orcamento_id) + "#adicionar-foto")
+
+@bp.route("/orcamento/<int:foto_id>/remover_foto", methods=["POST"])
+@login_required
+@role_required('funcionario')
+def remover_foto_orcamento(foto_id):
+    foto_a_remover = Foto.query.get_or_404(foto_id)
+    
+    # Precisamos saber para qual orçamento voltar
+    orcamento_id = foto_a_remover.orcamento_id 
+
+    try:
+        armazenamento.remover(foto_a_remover.nome_arquivo)
+        remover_derivados_foto(foto_a_remover.nome_arquivo)
+        
+        db.session.delete(foto_a_remover)
+        db.session.commit()
+        flash("Foto apagada com sucesso!", "success")
+    except Exception as e:
+        print(f"Erro ao deletar foto: {e}")
+        db.session.rollback()
+
+    return redirect(url_for('orcamentos.detalhes_orcamento', id=orcamento_id) + "#fotos_equipamento")
+
+@bp.route("/orcamento/pdf/<int:orcamento_id>")
+@login_required
+@role_required('funcionario')
+def gerar_pdf_orcamento(orcamento_id):
+    # 1. Busca os dados do orçamento
+    orcamento = Orcamento.query.get_or_404(orcamento_id)
+    
+    # 2. Monta o documento (HTML de template_pdf_orcamento.html ou layout do ReportLab, conforme PDF_MOTOR_ORCAMENTO)
+    documento = documento_pdf_orcamento(orcamento)
+
+    # 3. A conversão para PDF roda na fila de PDFs, fora desta requisição
+    nome_arquivo = f"Orcamento-{orcamento.numero_formatado}.pdf"
+    return responder_pdf(documento, nome_arquivo, url_for('orcamentos.detalhes_orcamento', id=orcamento_id))
+
+@bp.route("/orcamento/exibir_pdf/<int:orcamento_id>")
+@login_required
+@role_required('funcionario')
+def exibir_pdf_orcamento(orcamento_id):
+    orcamento = Orcamento.query.get_or_404(orcamento_id)
+    
+    return render_template("template_pdf_orcamento.html", orcamento=orcamento)
+
+@bp.route("/orcamento/converter/<int:orcamento_id>", methods=["POST"])
+@login_required
+@role_required('funcionario')
+def converter_orcamento_para_os(orcamento_id):
+    orcamento = Orcamento.query.get_or_404(orcamento_id)
+
+    if orcamento.status != 'Aprovado':
+        flash("Apenas orçamentos aprovados podem ser convertidos em OS.", "warning")
+        return redirect(url_for('orcamentos.detalhes_orcamento', id=orcamento_id))
+
+    os_existente = OrdemServico.query.filter_by(orcamento_id=orcamento.id).first()
+    if os_existente:
+        flash(f"Este orçamento já foi convertido na OS #{os_existente.numero_formatado}.", "info")
+        return redirect(url_for('os.detalhes_os', id=os_existente.id))
+
+    ano_atual = datetime.utcnow().year
+    novo_numero_sequencial = reservar_proximo_numero('os', ano_atual)
+
+    # --- LÓGICA DE CÓPIA ATUALIZADA ---
+    nova_os = OrdemServico(
+        cliente_id=orcamento.cliente_id,
+        numero_sequencial=novo_numero_sequencial,
+        ano=ano_atual,
+        equipamento=orcamento.equipamento,
+        marca=orcamento.marca,
+        modelo=orcamento.modelo,
+        status='Em andamento',
+        orcamento_id=orcamento.id,
+        
+        # Copiando os novos campos
+        numero_de_serie=orcamento.numero_de_serie,
+        tecnico_responsavel=orcamento.tecnico_responsavel,
+        defeito=orcamento.problema_informado, # 'defeito' na OS recebe 'problema_informado'
+        problema_constatado=orcamento.problema_constatado,
+        observacoes_cliente=orcamento.observacoes_cliente,
+        observacoes_internas=orcamento.observacoes_internas
+    )
+    db.session.add(nova_os)
+    
+    for item_orc in orcamento.itens_servico:
+        novo_item_servico = ItemServico(
+            quantidade=item_orc.quantidade,
+            preco_cobrado=item_orc.preco_cobrado,
+            servico_id=item_orc.servico_id,
+            ordem_servico=nova_os
+        )
+        db.session.add(novo_item_servico)
+
+    for item_orc in orcamento.itens_peca:
+        novo_item_peca = ItemPeca(
+            quantidade=item_orc.quantidade,
+            preco_cobrado=item_orc.preco_cobrado,
+            peca_id=item_orc.peca_id,
+            ordem_servico=nova_os
+        )
+        db.session.add(novo_item_peca)
+
+    for foto in orcamento.fotos:
+        foto.ordem_servico_id = nova_os.id
+    
+    orcamento.status = 'Convertido em OS'
+    
+    db.session.commit()
+
+    flash(f"Orçamento convertido com sucesso na OS #{nova_os.numero_formatado}!", "success")
+    return redirect(url_for('os.detalhes_os', id=nova_os.id))
+
+@bp.route("/orcamento/<int:id>/comprovante_entrada_pdf", methods=["GET"])
+@login_required
+@role_required('funcionario')
+def gerar_comprovante_entrada_pdf(id):
+    orcamento = Orcamento.query.get_or_404(id)
+        
+    config = obter_configuracao()
+    
+    base_dir = current_app.root_path
+    
+    html_renderizado = render_template(
+        "template_comprovante_entrada.html",
+          orcamento=orcamento,
+          config=config,
+          para_pdf = True,
+          base_dir=base_dir
+    )
+
+    nome_arquivo = f"Comprovante-Entrada-{orcamento.numero_formatado}.pdf"
+    return responder_pdf(html_renderizado, nome_arquivo, url_for('orcamentos.detalhes_orcamento', id=id))
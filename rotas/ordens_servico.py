@@ -0,0 +1,210 @@
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import login_required
+
+from app import (
+    armazenamento, Cliente, criar_os, db, documento_pdf_os, fila_fotos, Foto, gravar_arquivos_fotos, ItemPeca,
+    ItemServico, OrdemServico, Peca, receber_fotos, registrar_fotos, remover_derivados_foto, responder_pdf,
+    role_required, Servico
+)
+
+bp = Blueprint('os', __name__)
+
+
+@bp.route("/cliente/<int:cliente_id>/os/cadastrar", methods = ["GET", "POST"])
+@role_required('funcionario')
+def cadastrar_os(cliente_id):
+    cliente = Cliente.query.get_or_404(cliente_id)
+    if request.method == "POST":
+        # As fotos vão para o armazenamento antes de reservar o número: o
+        # contador do ano fica travado até o commit
+        fotos = gravar_arquivos_fotos(request.files.getlist('foto'))
+        try:
+            nova_os = criar_os(cliente_id, request.form)
+            registrar_fotos(fotos, '', ordem_servico_id=nova_os.id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for nome in fotos:
+                armazenamento.remover(nome)
+            raise
+        if fotos:
+            fila_fotos.avisar()
+        flash(f"OS cadastrado com sucesso!", "success")
+        return redirect(url_for("clientes.detalhes_cliente", id=cliente_id))
+
+    return render_template("cadastrar_os.html", cliente = cliente)
+
+@bp.route("/os/<int:id>", methods=["GET", "POST"])
+@role_required('funcionario')
+def detalhes_os(id):
+    ordem_servico = OrdemServico.query.get_or_404(id) # Alterado para get_or_404
+
+    if request.method == "POST":
+        # Salva os campos existentes
+        ordem_servico.equipamento = request.form["equipamento"]
+        ordem_servico.marca = request.form["marca"]
+        ordem_servico.modelo = request.form["modelo"]
+        ordem_servico.defeito = request.form["defeito"]
+        ordem_servico.status = request.form["status"]
+        
+        # Salva os NOVOS campos
+        ordem_servico.tecnico_responsavel = request.form.get('tecnico_responsavel')
+        ordem_servico.numero_de_serie = request.form.get('numero_de_serie')
+        ordem_servico.problema_constatado = request.form.get('problema_constatado')
+        ordem_servico.servico_executado = request.form.get('servico_executado')
+        ordem_servico.observacoes_cliente = request.form.get('observacoes_cliente')
+        ordem_servico.observacoes_internas = request.form.get('observacoes_internas')
+    
+        db.session.commit()
+        flash("Ordem de Serviço salva com sucesso!", "success")
+        return redirect(url_for("os.detalhes_os", id=ordem_servico.id))
+    
+    return render_template("detalhes_os.html", ordem_servico=ordem_servico)
+
+@bp.route("/os/deletar/<int:id>")
+@role_required('funcionario')
+def deletar_os(id):
+    os_a_deletar = OrdemServico.query.get(id)
+    id_do_cliente = os_a_deletar.cliente.id
+    db.session.delete(os_a_deletar)
+    db.session.commit()
+    flash("Os apagada com sucesso!", "success")
+    return redirect(url_for("clientes.detalhes_cliente", id=id_do_cliente))
+
+@bp.route("/item/adicionar/<int:os_id>", methods=["GET", "POST"])
+@role_required('funcionario')
+def adicionar_servico(os_id):
+    if request.method == "POST":
+        quantidade = request.form["quantidade"]
+        preco_cobrado = request.form["preco_cobrado"]
+        
+        servico_id = request.form["servico_id"]
+        servico = Servico.query.get(servico_id)
+
+        if preco_cobrado == "":
+            preco_cobrado_novo = servico.preco_unitario
+        else:
+            preco_cobrado_novo = preco_cobrado.replace(",", ".")
+
+        novo_item = ItemServico(
+            quantidade = int(quantidade),
+            preco_cobrado = float(preco_cobrado_novo),
+            ordem_servico_id = os_id,
+            servico_id = servico_id
+        )
+
+        db.session.add(novo_item)
+        db.session.commit()
+        flash("Serviço adicionado com sucesso!", "success")
+        return redirect(url_for("os.detalhes_os", id=os_id) + "#adicionar_servico")
+    
+    return render_template("detalhes_os.html")
+
+@bp.route("/item/adicionar_peca/<int:os_id>", methods=["GET", "POST"])
+@role_required('funcionario')
+def adicionar_peca(os_id):
+    if request.method == "POST":
+        quantidade = request.form["quantidade"]
+        preco_cobrado = request.form["preco_cobrado"]
+        
+        peca_id = request.form["peca_id"]
+        peca = Peca.query.get(peca_id)
+
+        if preco_cobrado == "":
+            preco_cobrado_novo = peca.preco_unitario
+        else:
+            preco_cobrado_novo = preco_cobrado.replace(",", ".")
+
+        novo_item = ItemPeca(
+            quantidade = int(quantidade),
+            preco_cobrado = float(preco_cobrado_novo),
+            ordem_servico_id = os_id,
+            peca_id = peca_id
+        )
+
+        db.session.add(novo_item)
+        db.session.commit()
+        flash("Peça adicionado com sucesso!", "success")
+        return redirect(url_for("os.detalhes_os", id=os_id) + "#adicionar_peca")
+    
+    return render_template("detalhes_os.html")
+
+@bp.route("/item/deletar/<int:id>")
+@role_required('funcionario')
+def remover_servico(id):
+    item_a_deletar = ItemServico.query.get(id)
+    os_id = item_a_deletar.ordem_servico.id
+    db.session.delete(item_a_deletar)
+    db.session.commit()
+    flash("Serviço apagado com sucesso!", "success")
+    
+    return redirect(url_for("os.detalhes_os", id = os_id) + "#adicionar_servico")
+
+@bp.route("/item_peca/deletar/<int:id>")
+@role_required('funcionario')
+def remover_peca(id):
+    peca_a_deletar = ItemPeca.query.get(id)
+    os_id = peca_a_deletar.ordem_servico.id
+    db.session.delete(peca_a_deletar)
+    db.session.commit()
+    flash("Peça removida com sucesso!", "success")
+    return redirect(url_for("os.detalhes_os", id = os_id)+ "#adicionar_peca")
+
+@bp.route("/os/pdf/<int:os_id>")
+@login_required
+@role_required('funcionario')
+def gerar_pdf_os(os_id):
+    # 1. Busca os dados (igual a antes)
+    ordem_servico = OrdemServico.query.get_or_404(os_id)
+
+    # 2. Monta o documento (HTML de template_pdf.html ou layout do ReportLab, conforme PDF_MOTOR_OS)
+    documento = documento_pdf_os(ordem_servico)
+
+    # 3. A conversão para PDF roda na fila de PDFs, fora desta requisição
+    nome_arquivo = f"OS-{ordem_servico.numero_formatado}.pdf"
+    return responder_pdf(documento, nome_arquivo, url_for('os.detalhes_os', id=os_id))
+
+@bp.route("/os/exibir_pdf/<int:os_id>")
+@login_required
+def exibir_pdf_os(os_id):
+    ordem_servico = OrdemServico.query.get_or_404(os_id)
+    return render_template("template_pdf.html", ordem_servico=ordem_servico)
+
+@bp.route("/os/<int:os_id>/adicionar_foto", methods=["POST"])
+@login_required
+@role_required('funcionario')
+def adicionar_foto(os_id):
+    if 'foto' not in request.files:
+        return redirect(request.referrer or url_for('os.detalhes_os', id=os_id))
+
+    legenda = request.form.get('legenda', '')
+    # Várias fotos de uma vez; o tratamento das imagens fica para a fila
+    aceitas = receber_fotos(request.files.getlist('foto'), legenda, ordem_servico_id=os_id)
+    if aceitas:
+        flash(f"{aceitas} foto(s) adicionada(s) com sucesso!", "success")
+
+    return redirect(url_for('os.detalhes_os', id=os_id) + "#adicionar-foto")
+
+@bp.route("/os/<int:foto_id>/remover_foto", methods=["POST"])
+@login_required
+@role_required('funcionario')
+def remover_foto(foto_id):
+    foto_a_remover = Foto.query.get_or_404(foto_id)
+
+    os_id = foto_a_remover.ordem_servico_id
+
+    try:
+        # 3. Deleta o arquivo do armazenamento (disco ou bucket)
+        armazenamento.remover(foto_a_remover.nome_arquivo)
+        remover_derivados_foto(foto_a_remover.nome_arquivo)
+        
+        # 4. Deleta o registro do banco de dados
+        db.session.delete(foto_a_remover)
+        db.session.commit()
+        flash("Foto apagada com sucesso!", "success")
+    except Exception as e:
+        # (Opcional) Adicionar uma mensagem de erro se algo der errado
+        print(f"Erro ao deletar foto: {e}")
+        db.session.rollback()
+
+    return redirect(url_for('os.detalhes_os', id=os_id) + "#fotos_equipamento")
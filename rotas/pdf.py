@@ -0,0 +1,45 @@
+from flask import abort, Blueprint, redirect, render_template, url_for
+from flask_login import current_user, login_required
+
+from app import cache_pdf, enviar_pdf, fila_pdf, role_required
+
+bp = Blueprint('pdf', __name__)
+
+
+def job_pdf_do_usuario(job_id):
+    job = fila_pdf.consultar(job_id)
+    if job is None or job['usuario_id'] != current_user.get_id():
+        abort(404)
+    return job
+
+@bp.route("/pdf/<job_id>")
+@login_required
+@role_required('funcionario')
+def acompanhar_pdf(job_id):
+    job = job_pdf_do_usuario(job_id)
+    return render_template("pdf_aguardando.html", job=job, job_id=job_id)
+
+@bp.route("/pdf/<job_id>/status")
+@login_required
+@role_required('funcionario')
+def status_pdf(job_id):
+    job = job_pdf_do_usuario(job_id)
+    resposta = {'estado': job['estado'], 'mensagem': job.get('mensagem')}
+    if job['estado'] == 'pronto':
+        resposta['download'] = url_for('pdf.baixar_pdf', job_id=job_id)
+    return resposta
+
+@bp.route("/pdf/<job_id>/download")
+@login_required
+@role_required('funcionario')
+def baixar_pdf(job_id):
+    job = job_pdf_do_usuario(job_id)
+    if job['estado'] != 'pronto':
+        return redirect(url_for('pdf.acompanhar_pdf', job_id=job_id))
+    return enviar_pdf(cache_pdf.caminho(job['chave']), job['nome_arquivo'])
+
+@bp.route("/pdf/cache")
+@login_required
+@role_required('funcionario')
+def estatisticas_cache_pdf():
+    return cache_pdf.estatisticas()
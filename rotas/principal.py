@@ -0,0 +1,83 @@
+import os
+
+from flask import Blueprint, render_template, request, Response
+
+from app import (
+    buscar_tudo, calcular_faturamento, Cliente, Contrato, Curriculo, estaticos, estatisticas_pool,
+    gerar_service_worker, Impressora, Orcamento, OrdemServico, role_required, ROTULOS_BUSCA
+)
+
+bp = Blueprint('principal', __name__)
+
+
+@bp.route('/sw.js')
+def service_worker():
+    # Sem cache de longa duração: o navegador precisa ver logo uma versão nova
+    compilado = os.path.join(estaticos.destino, 'sw.js')
+    if estaticos.foi_compilado() and os.path.exists(compilado):
+        return estaticos.resposta(compilado, max_age=0)
+    resposta = Response(gerar_service_worker(), mimetype='application/javascript')
+    resposta.cache_control.no_cache = True
+    resposta.add_etag()
+    return resposta.make_conditional(request)
+
+@bp.route('/offline.html')
+def offline():
+    return render_template('offline.html')
+
+@bp.route("/busca")
+@role_required('funcionario')
+def busca_global():
+    termo = request.args.get('q', '')
+    resultados = buscar_tudo(termo)
+
+    if request.args.get('formato') == 'json':
+        return {'termo': termo, 'resultados': resultados}
+
+    return render_template('busca.html', termo=termo, resultados=resultados, rotulos_busca=ROTULOS_BUSCA)
+
+@bp.route("/banco/pool")
+@role_required('funcionario')
+def estatisticas_banco():
+    # Contadores do worker que respondeu (o pid vem junto)
+    return estatisticas_pool()
+
+@bp.route("/")
+def index():
+    return render_template("index.html")
+
+@bp.route("/dashboard")
+@role_required('funcionario')
+def home():
+    total_clientes = Cliente.query.count()
+    ordens_abertas = OrdemServico.query.filter(OrdemServico.status != "Concluído").count()
+    ordens_concluidas = OrdemServico.query.filter(OrdemServico.status == "Concluído").count()
+    orcamento_aberto = Orcamento.query.filter(Orcamento.status != "Aprovado" or Orcamento.status != "Convertido em OS").count()
+    orcamento_concluido = Orcamento.query.filter(Orcamento.status == "Aprovado" or Orcamento.status == "Convertido em OS").count()
+
+    total_curriculos = Curriculo.query.count()
+    total_contratos = Contrato.query.count()
+    total_links = Impressora.query.count()
+
+    # Soma feita direto no banco, sem carregar as ordens nem os itens
+    faturamento_total = calcular_faturamento(status='Concluído')
+
+    ultimas_os = OrdemServico.query.order_by(OrdemServico.data_de_criacao.desc()).limit(5).all()
+
+    return render_template(
+        "home.html",
+        total_clientes=total_clientes,
+        ordens_abertas=ordens_abertas,
+        ordens_concluidas=ordens_concluidas,
+        orcamento_aberto = orcamento_aberto,
+        orcamento_concluido = orcamento_concluido,
+        total_curriculos = total_curriculos,
+        total_contratos = total_contratos,
+        total_links = total_links,
+        ultimas_os = ultimas_os,
+        faturamento_total = faturamento_total
+        )
+
+@bp.route("/contato")
+def pagina_contato():
+    return render_template("pagina_contato.html")
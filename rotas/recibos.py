@@ -0,0 +1,56 @@
+from flask import Blueprint, current_app, flash, render_template, url_for
+from flask_login import login_required
+
+from app import ReciboSimplesForm, responder_pdf, role_required
+
+bp = Blueprint('recibos', __name__)
+
+
+@bp.route("/recibo/gerar", methods=["GET", "POST"])
+@login_required
+@role_required('funcionario')
+def gerar_recibo_rapido():
+    form = ReciboSimplesForm()
+    
+    if form.validate_on_submit():
+        try:
+            # 1. Tratamento do valor para conversão numérica
+            # Remove pontos de milhar e troca vírgula por ponto decimal
+            valor_str = form.valor.data.replace('.', '').replace(',', '.')
+            valor_float = float(valor_str)
+            
+            # 2. Geração do valor por extenso (Ex: "cento e cinquenta reais")
+            # O parâmetro to='currency' cuida dos termos "reais" e "centavos"
+            from num2words import num2words
+            valor_extenso = num2words(valor_float, to='currency', lang='pt_BR')
+            
+            # 3. Organização dos dados para o template
+            dados_recibo = {
+                'valor': form.valor.data,
+                'valor_extenso': valor_extenso, # Enviando o extenso para o PDF
+                'pagador': form.pagador.data,
+                'documento': form.document_pagador.data,
+                'referente': form.referente_a.data,
+                'cidade': form.cidade.data,
+                'data': form.data_emissao.data.strftime('%d/%m/%Y')
+            }
+            
+            # 4. Preparação para o PDF
+            base_dir = current_app.root_path
+            # Certifique-se de que 'config' está disponível (via context_processor ou query direta)
+            html_renderizado = render_template(
+                "template_recibo_pdf.html", 
+                recibo=dados_recibo, 
+                base_dir=base_dir
+            )
+            
+            # 5. Geração do arquivo PDF (na fila de PDFs)
+            nome_arquivo = f"Recibo_{form.pagador.data[:15]}.pdf"
+            return responder_pdf(html_renderizado, nome_arquivo, url_for('recibos.gerar_recibo_rapido'))
+
+        except ValueError:
+            flash("Valor numérico inválido. Use o formato 00,00", "warning")
+        except Exception as e:
+            flash(f"Ocorreu um erro inesperado: {str(e)}", "danger")
+        
+    return render_template("gerar_recibo.html", form=form)
@@ -0,0 +1,137 @@
+import json
+import uuid
+from datetime import datetime
+
+from flask import (
+    abort, Blueprint, flash, redirect, render_template, request, Response, stream_with_context, url_for
+)
+from flask_login import current_user
+
+from app import (
+    documentos_do_lote, DOCUMENTOS_LOTE_PDF, fila_pdf, filtrar_documentos_lote, filtrar_relatorio,
+    FORMATOS_EXPORTACAO, gerar_zip_pdfs, linhas_exportacao, PADRAO_JOB_PDF, PDF_LOTE_MAX, ProgressoLotePDF,
+    role_required, vagas_lote_pdf
+)
+
+bp = Blueprint('relatorios', __name__)
+
+
+@bp.route("/relatorios", methods=["GET", "POST"])
+@role_required('funcionario')
+def relatorios():
+    # Os filtros podem vir do formulário ou da URL (links de paginação)
+    page = request.values.get("page", 1, type=int)
+    busca_nome = request.values.get('busca_nome', '')
+    data_inicio_str = request.values.get('data_inicio', '')
+    data_fim_str = request.values.get('data_fim', '')
+
+    query = filtrar_relatorio(busca_nome, data_inicio_str, data_fim_str)
+    paginacao = query.paginate(page=page, per_page=15, error_out=False)
+
+    return render_template(
+        "relatorios.html",
+        ordens_exibidas=paginacao.items,
+        paginacao=paginacao,
+        busca_nome=busca_nome,
+        data_inicio=data_inicio_str,
+        data_fim=data_fim_str
+        )
+
+@bp.route("/relatorios/export")
+@role_required('funcionario')
+def exportar_relatorio():
+    formato = request.args.get('formato', 'csv')
+    if formato not in FORMATOS_EXPORTACAO:
+        abort(400)
+    gerador, mimetype = FORMATOS_EXPORTACAO[formato]
+
+    query = filtrar_relatorio(
+        request.args.get('busca_nome', ''),
+        request.args.get('data_inicio', ''),
+        request.args.get('data_fim', '')
+    )
+
+    nome_arquivo = f"Relatorio-OS-{datetime.now().strftime('%Y%m%d-%H%M')}.{formato}"
+    return Response(
+        stream_with_context(gerador(linhas_exportacao(query))),
+        mimetype=mimetype,
+        headers={"Content-disposition": f"attachment; filename={nome_arquivo}"}
+    )
+
+@bp.route("/relatorios/pdfs")
+@role_required('funcionario')
+def exportar_pdfs():
+    return render_template(
+        "exportar_pdfs.html",
+        busca_nome=request.args.get('busca_nome', ''),
+        data_inicio=request.args.get('data_inicio', ''),
+        data_fim=request.args.get('data_fim', ''),
+        status=request.args.get('status', ''),
+        documentos=request.args.get('documentos', 'todos'),
+        lote_id=uuid.uuid4().hex,
+    )
+
+@bp.route("/relatorios/pdfs/zip")
+@role_required('funcionario')
+def exportar_pdfs_zip():
+    documentos = request.args.get('documentos', 'todos')
+    tipos = list(DOCUMENTOS_LOTE_PDF) if documentos == 'todos' else [documentos]
+    if any(tipo not in DOCUMENTOS_LOTE_PDF for tipo in tipos):
+        abort(400)
+    lote_id = request.args.get('lote') or uuid.uuid4().hex
+    if not PADRAO_JOB_PDF.fullmatch(lote_id):
+        abort(400)
+    voltar = url_for('relatorios.exportar_pdfs', **request.args.to_dict())
+
+    try:
+        selecionados = [
+            (tipo, filtrar_documentos_lote(DOCUMENTOS_LOTE_PDF[tipo][0], request.args.get('data_inicio', ''),
+                                           request.args.get('data_fim', ''), request.args.get('status', ''),
+                                           request.args.get('busca_nome', '')))
+            for tipo in tipos
+        ]
+    except ValueError:
+        flash("Data inválida.", "danger")
+        return redirect(voltar)
+    total = sum(len(ids) for _, ids in selecionados)
+    if total == 0:
+        flash("Nenhum documento encontrado com esses filtros.", "warning")
+        return redirect(voltar)
+    if total > PDF_LOTE_MAX:
+        flash(f"{total} documentos encontrados; o limite por exportação é {PDF_LOTE_MAX}. "
+              "Diminua o período.", "warning")
+        return redirect(voltar)
+    if not vagas_lote_pdf.acquire(blocking=False):
+        flash("Já há uma exportação de PDFs em andamento. Tente novamente quando ela terminar.", "warning")
+        return redirect(voltar)
+
+    try:
+        progresso = ProgressoLotePDF(fila_pdf.caminho(lote_id, 'lote'), total, current_user.get_id())
+        fila_pdf.limpar_antigos()
+        nome_arquivo = f"PDFs-{datetime.now().strftime('%Y%m%d-%H%M')}.zip"
+        resposta = Response(
+            stream_with_context(gerar_zip_pdfs(documentos_do_lote(selecionados), progresso)),
+            mimetype='application/zip',
+            headers={"Content-disposition": f"attachment; filename={nome_arquivo}",
+                     "X-Lote-PDF": lote_id, "X-Total-Documentos": str(total)}
+        )
+    except BaseException:
+        vagas_lote_pdf.release()
+        raise
+    # A vaga volta quando o envio termina (ou o navegador desiste)
+    resposta.call_on_close(vagas_lote_pdf.release)
+    return resposta
+
+@bp.route("/relatorios/pdfs/<lote_id>/status")
+@role_required('funcionario')
+def status_exportacao_pdfs(lote_id):
+    if not PADRAO_JOB_PDF.fullmatch(lote_id):
+        abort(404)
+    try:
+        with open(fila_pdf.caminho(lote_id, 'lote'), encoding='utf-8') as arquivo:
+            progresso = json.load(arquivo)
+    except (FileNotFoundError, ValueError):
+        return {'estado': 'aguardando'}
+    if progresso.pop('usuario_id') != current_user.get_id():
+        abort(404)
+    return progresso
@@ -0,0 +1,67 @@
+// Campo de busca de serviço/peça dos formulários "Adicionar" da OS e do orçamento.
+// Consulta /catalogo/<tipo>?q=... enquanto o usuário digita e guarda o id
+// escolhido no <input type="hidden"> do mesmo bloco.
+document.querySelectorAll('.catalogo-busca').forEach(function (bloco) {
+  const campo = bloco.querySelector('input[type="search"]');
+  const escolhido = bloco.querySelector('input[type="hidden"]');
+  const lista = bloco.querySelector('.dropdown-menu');
+  const formulario = bloco.closest('form');
+  const precoCobrado = formulario.querySelector('input[name="preco_cobrado"]');
+  let espera = null;
+  let controle = null;
+
+  function formatarPreco(valor) {
+    return 'R$ ' + Number(valor || 0).toFixed(2).replace('.', ',');
+  }
+
+  function buscar() {
+    if (controle) controle.abort();
+    controle = new AbortController();
+    fetch(bloco.dataset.url + '?q=' + encodeURIComponent(campo.value.trim()), {signal: controle.signal})
+      .then(function (resposta) { return resposta.json(); })
+      .then(function (dados) {
+        lista.replaceChildren();
+        if (dados.resultados.length === 0) {
+          const vazio = document.createElement('span');
+          vazio.className = 'dropdown-item-text text-body-secondary';
+          vazio.textContent = 'Nenhum item encontrado';
+          lista.appendChild(vazio);
+        }
+        dados.resultados.forEach(function (item) {
+          const opcao = document.createElement('button');
+          opcao.type = 'button';
+          opcao.className = 'dropdown-item text-truncate';
+          opcao.textContent = item.nome + (item.codigo ? ' (' + item.codigo + ')' : '') + ' - ' + formatarPreco(item.preco);
+          opcao.addEventListener('click', function () {
+            campo.value = item.nome;
+            escolhido.value = item.id;
+            if (precoCobrado) precoCobrado.placeholder = 'Preço padrão: ' + formatarPreco(item.preco);
+            campo.classList.remove('is-invalid');
+            lista.classList.remove('show');
+          });
+          lista.appendChild(opcao);
+        });
+        lista.classList.add('show');
+      })
+      .catch(function () {});
+  }
+
+  campo.addEventListener('input', function () {
+    escolhido.value = '';
+    clearTimeout(espera);
+    espera = setTimeout(buscar, 200);
+  });
+  campo.addEventListener('focus', buscar);
+
+  document.addEventListener('click', function (evento) {
+    if (!bloco.contains(evento.target)) lista.classList.remove('show');
+  });
+
+  formulario.addEventListener('submit', function (evento) {
+    if (!escolhido.value) {
+      evento.preventDefault();
+      campo.classList.add('is-invalid');
+      campo.focus();
+    }
+  });
+});
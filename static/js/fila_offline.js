@@ -0,0 +1,208 @@
+// Fila de cadastros feitos sem conexão (tablet do balcão).
+// Formulários com data-fila-offline="os|orcamento" e data-cliente-id, enviados
+// com o aparelho offline, vão para o IndexedDB em vez do servidor. Quando a
+// conexão volta, a fila é mandada em lotes para /offline/sincronizar; cada
+// item tem uma chave única, então reenviar um lote (resposta perdida, duas
+// abas abertas) não duplica a OS. Itens recusados pelo servidor ficam na fila
+// com a mensagem de erro, para alguém conferir.
+(function () {
+  const indicador = document.getElementById('filaOffline');
+  if (!indicador || !('indexedDB' in window)) return;
+
+  const URL_SINCRONIZAR = indicador.dataset.url;
+  const LOTE_MAX_BYTES = 8 * 1024 * 1024;  // conexão ruim: se um lote cair, perde-se pouco
+  const LOTE_MAX_ITENS = 20;               // OFFLINE_MAX_ITENS no app
+  const FOTO_LADO_MAX = 2000;
+  const INTERVALO = 60 * 1000;
+  let sincronizando = false;
+
+  function abrirBanco() {
+    return new Promise(function (resolver, rejeitar) {
+      const pedido = indexedDB.open('oficina-offline', 1);
+      pedido.onupgradeneeded = function () {
+        pedido.result.createObjectStore('envios', {keyPath: 'chave'});
+      };
+      pedido.onsuccess = function () { resolver(pedido.result); };
+      pedido.onerror = function () { rejeitar(pedido.error); };
+    });
+  }
+
+  function operar(modo, acao) {
+    return abrirBanco().then(function (banco) {
+      return new Promise(function (resolver, rejeitar) {
+        const transacao = banco.transaction('envios', modo);
+        const resultado = acao(transacao.objectStore('envios'));
+        transacao.oncomplete = function () { banco.close(); resolver(resultado && resultado.result); };
+        transacao.onerror = function () { banco.close(); rejeitar(transacao.error); };
+      });
+    });
+  }
+
+  const listar = function () { return operar('readonly', function (envios) { return envios.getAll(); }); };
+  const guardar = function (item) { return operar('readwrite', function (envios) { envios.put(item); }); };
+  const apagar = function (chave) { return operar('readwrite', function (envios) { envios.delete(chave); }); };
+
+  function novaChave() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2) + Math.random().toString(36).slice(2);
+  }
+
+  // Foto de celular (alguns MB) reduzida para JPEG com lado até FOTO_LADO_MAX:
+  // cabe no IndexedDB de um tablet e no lote de sincronização
+  function reduzirFoto(arquivo) {
+    return createImageBitmap(arquivo).then(function (imagem) {
+      const escala = Math.min(1, FOTO_LADO_MAX / Math.max(imagem.width, imagem.height));
+      const tela = document.createElement('canvas');
+      tela.width = Math.round(imagem.width * escala);
+      tela.height = Math.round(imagem.height * escala);
+      tela.getContext('2d').drawImage(imagem, 0, 0, tela.width, tela.height);
+      imagem.close();
+      return new Promise(function (resolver) { tela.toBlob(resolver, 'image/jpeg', 0.85); });
+    }).then(function (blob) {
+      return {nome: arquivo.name.replace(/\.[^.]*$/, '') + '.jpg', blob: blob};
+    }).catch(function () {
+      return {nome: arquivo.name, blob: arquivo};  // formato que o navegador não decodifica: vai como está
+    });
+  }
+
+  function paraBase64(blob) {
+    return new Promise(function (resolver, rejeitar) {
+      const leitor = new FileReader();
+      leitor.onload = function () { resolver(leitor.result.slice(leitor.result.indexOf(',') + 1)); };
+      leitor.onerror = function () { rejeitar(leitor.error); };
+      leitor.readAsDataURL(blob);
+    });
+  }
+
+  function atualizarIndicador() {
+    return listar().then(function (itens) {
+      const comErro = itens.filter(function (item) { return item.erro; });
+      indicador.classList.toggle('d-none', itens.length === 0);
+      indicador.classList.toggle('text-bg-danger', comErro.length > 0);
+      indicador.classList.toggle('text-bg-warning', comErro.length === 0);
+      indicador.textContent = itens.length + (itens.length === 1 ? ' cadastro offline' : ' cadastros offline');
+      indicador.title = comErro.length
+        ? comErro.map(function (item) { return item.dados.equipamento + ': ' + item.erro; }).join('\n')
+        : 'Aguardando conexão para enviar';
+    });
+  }
+
+  document.querySelectorAll('form[data-fila-offline]').forEach(function (formulario) {
+    formulario.addEventListener('submit', function (evento) {
+      if (navigator.onLine) return;
+      evento.preventDefault();
+      const campos = new FormData(formulario);
+      const dados = {};
+      const fotos = [];
+      campos.forEach(function (valor, nome) {
+        if (valor instanceof File) {
+          if (valor.size) fotos.push(valor);
+        } else {
+          dados[nome] = valor;
+        }
+      });
+      Promise.all(fotos.map(reduzirFoto)).then(function (reduzidas) {
+        return guardar({
+          chave: novaChave(),
+          tipo: formulario.dataset.filaOffline,
+          cliente_id: Number(formulario.dataset.clienteId),
+          dados: dados,
+          fotos: reduzidas,
+          criado_em: new Date().toISOString(),
+        });
+      }).then(function () {
+        formulario.reset();
+        return atualizarIndicador();
+      }).then(function () {
+        alert('Sem conexão: o cadastro foi guardado neste aparelho e será enviado quando a conexão voltar.');
+      }).catch(function (erro) {
+        alert('Não foi possível guardar o cadastro offline: ' + erro);
+      });
+    });
+  });
+
+  function montarLotes(itens) {
+    const lotes = [];
+    let atual = [];
+    let bytes = 0;
+    itens.forEach(function (item) {
+      // base64 aumenta 4/3; o JSON do restante é desprezível perto das fotos
+      const tamanho = item.fotos.reduce(function (soma, foto) { return soma + foto.blob.size * 4 / 3; }, 2048);
+      if (atual.length && (bytes + tamanho > LOTE_MAX_BYTES || atual.length >= LOTE_MAX_ITENS)) {
+        lotes.push(atual);
+        atual = [];
+        bytes = 0;
+      }
+      atual.push(item);
+      bytes += tamanho;
+    });
+    if (atual.length) lotes.push(atual);
+    return lotes;
+  }
+
+  function enviarLote(lote) {
+    return Promise.all(lote.map(function (item) {
+      return Promise.all(item.fotos.map(function (foto) {
+        return paraBase64(foto.blob).then(function (conteudo) { return {nome: foto.nome, conteudo: conteudo}; });
+      })).then(function (fotos) {
+        return {chave: item.chave, tipo: item.tipo, cliente_id: item.cliente_id, dados: item.dados,
+                fotos: fotos, criado_em: item.criado_em};
+      });
+    })).then(function (corpo) {
+      return fetch(URL_SINCRONIZAR, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        credentials: 'same-origin',
+        body: JSON.stringify({itens: corpo}),
+      });
+    }).then(function (resposta) {
+      if (!resposta.ok) throw new Error('HTTP ' + resposta.status);
+      return resposta.json();
+    }).then(function (dados) {
+      const porChave = {};
+      lote.forEach(function (item) { porChave[item.chave] = item; });
+      return Promise.all(dados.resultados.map(function (resultado) {
+        const item = porChave[resultado.chave];
+        if (!item || resultado.estado === 'adiado') return null;  // fica na fila para a próxima tentativa
+        if (resultado.estado === 'erro') {
+          item.erro = resultado.mensagem;
+          return guardar(item);
+        }
+        return apagar(item.chave);  // criado agora ou numa tentativa anterior
+      }));
+    });
+  }
+
+  function sincronizar() {
+    if (sincronizando || !navigator.onLine) return Promise.resolve();
+    sincronizando = true;
+    return listar().then(function (itens) {
+      // Itens recusados só voltam a ser enviados depois que alguém os remover
+      const pendentes = itens.filter(function (item) { return !item.erro; });
+      return montarLotes(pendentes).reduce(function (anterior, lote) {
+        return anterior.then(function () { return enviarLote(lote); });
+      }, Promise.resolve());
+    }).catch(function (erro) {
+      console.warn('Sincronização offline adiada:', erro);
+    }).then(function () {
+      sincronizando = false;
+      return atualizarIndicador();
+    });
+  }
+
+  indicador.addEventListener('click', function () {
+    listar().then(function (itens) {
+      const comErro = itens.filter(function (item) { return item.erro; });
+      if (comErro.length && confirm('Descartar ' + comErro.length + ' cadastro(s) recusado(s) pelo servidor?\n\n' +
+                                    indicador.title)) {
+        return Promise.all(comErro.map(function (item) { return apagar(item.chave); }));
+      }
+      return sincronizar();
+    }).then(atualizarIndicador);
+  });
+
+  window.addEventListener('online', sincronizar);
+  window.addEventListener('load', sincronizar);
+  setInterval(sincronizar, INTERVALO);
+  atualizarIndicador();
+})();
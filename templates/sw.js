@@ -0,0 +1,132 @@
+// Gerado por gerar_service_worker() em app.py a partir do manifesto dos estáticos.
+const VERSAO = {{ versao|tojson }};
+const CACHE_ESTATICOS = 'oficina-estaticos-' + VERSAO;
+const CACHE_PAGINAS = 'oficina-paginas-' + VERSAO;
+const CACHE_EXTERNOS = 'oficina-externos';
+const CACHES_ATUAIS = [CACHE_ESTATICOS, CACHE_PAGINAS, CACHE_EXTERNOS];
+
+const PRECACHE = {{ precache|tojson }};
+const PAGINAS_PUBLICAS = {{ paginas_publicas|tojson }};
+const SAIDAS = {{ saidas|tojson }};
+const PAGINA_OFFLINE = {{ pagina_offline|tojson }};
+
+// catalogo.1a2b3c4d5e6f.js: o conteúdo nunca muda para a mesma URL
+const URL_COM_HASH = /\.[0-9a-f]{12}\.[^/.]+$/;
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(preCarregar().then(() => self.skipWaiting()));
+});
+
+async function preCarregar() {
+    const cache = await caches.open(CACHE_ESTATICOS);
+    const anteriores = (await caches.keys())
+        .filter((nome) => nome.startsWith('oficina-estaticos-') && nome !== CACHE_ESTATICOS);
+    await Promise.all(PRECACHE.map(async (url) => {
+        // Arquivo com hash que a versão anterior já tinha: mesmo conteúdo, não baixa de novo
+        if (URL_COM_HASH.test(url)) {
+            for (const nome of anteriores) {
+                const guardada = await (await caches.open(nome)).match(url);
+                if (guardada) {
+                    return cache.put(url, guardada);
+                }
+            }
+        }
+        return cache.add(new Request(url, { cache: 'reload' }));
+    }));
+}
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil(
+        caches.keys().then((nomes) => Promise.all(
+            nomes
+                .filter((nome) => nome.startsWith('oficina-') && !CACHES_ATUAIS.includes(nome))
+                .map((nome) => caches.delete(nome))
+        )).then(() => self.clients.claim())
+    );
+});
+
+function podeGuardar(resposta) {
+    if (resposta.type === 'opaque') {
+        return true;
+    }
+    const controle = resposta.headers.get('Cache-Control') || '';
+    return resposta.ok && !resposta.redirected && !controle.includes('no-store');
+}
+
+async function cacheFirst(pedido, nomeCache) {
+    const cache = await caches.open(nomeCache);
+    const guardada = await cache.match(pedido);
+    if (guardada) {
+        return guardada;
+    }
+    const resposta = await fetch(pedido);
+    if (podeGuardar(resposta)) {
+        cache.put(pedido, resposta.clone());
+    }
+    return resposta;
+}
+
+async function staleWhileRevalidate(event, nomeCache, paginaOffline) {
+    const cache = await caches.open(nomeCache);
+    const guardada = await cache.match(event.request);
+    const atualizacao = fetch(event.request).then((resposta) => {
+        if (podeGuardar(resposta)) {
+            return cache.put(event.request, resposta.clone()).then(() => resposta);
+        }
+        return resposta;
+    });
+    if (guardada) {
+        event.waitUntil(atualizacao.catch(() => {}));
+        return guardada;
+    }
+    return atualizacao.catch(() => paginaOffline ? caches.match(PAGINA_OFFLINE) : Response.error());
+}
+
+async function networkFirst(pedido, nomeCache) {
+    const cache = await caches.open(nomeCache);
+    try {
+        const resposta = await fetch(pedido);
+        if (podeGuardar(resposta)) {
+            cache.put(pedido, resposta.clone());
+        }
+        return resposta;
+    } catch (erro) {
+        return (await cache.match(pedido)) || caches.match(PAGINA_OFFLINE);
+    }
+}
+
+self.addEventListener('fetch', (event) => {
+    const pedido = event.request;
+    if (pedido.method !== 'GET') {
+        return;
+    }
+    const url = new URL(pedido.url);
+
+    if (url.origin !== self.location.origin) {
+        // Bibliotecas que ainda vêm da CDN (sem static/vendor/)
+        if (['style', 'script', 'font'].includes(pedido.destination)) {
+            event.respondWith(staleWhileRevalidate(event, CACHE_EXTERNOS, false));
+        }
+        return;
+    }
+
+    if (SAIDAS.includes(url.pathname)) {
+        // Saiu da conta: páginas de quem estava logado não ficam no aparelho
+        event.waitUntil(caches.delete(CACHE_PAGINAS));
+        return;
+    }
+
+    if (url.pathname.startsWith('/static/')) {
+        event.respondWith(URL_COM_HASH.test(url.pathname)
+            ? cacheFirst(pedido, CACHE_ESTATICOS)
+            : staleWhileRevalidate(event, CACHE_ESTATICOS, false));
+        return;
+    }
+
+    if (pedido.mode === 'navigate') {
+        event.respondWith(PAGINAS_PUBLICAS.includes(url.pathname)
+            ? staleWhileRevalidate(event, CACHE_PAGINAS, true)
+            : networkFirst(pedido, CACHE_PAGINAS));
+    }
+    // Demais pedidos (buscas em JSON, fotos, PDFs) vão direto para a rede
+});
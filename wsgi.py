@@ -0,0 +1,7 @@
+# Ponto de entrada do servidor (gunicorn -c gunicorn.conf.py wsgi:app) e do "flask ..."
+from app import create_app
+
+app = create_app()
+
+if __name__ == "__main__":
+    app.run(debug=True)